@@ -10,6 +10,7 @@ import warnings
 from contextlib import suppress
 from ipaddress import ip_address
 from pathlib import Path
+from typing import Annotated
 
 import click
 import httpx
@@ -774,6 +775,42 @@ def api_key(
         api_key_banner(unmasked_api_key)
 
 
+@app.command()
+def replay(
+    capsule_path: Annotated[
+        Path, typer.Argument(help="Path to the run capsule to replay.", exists=True, dir_okay=False)
+    ],
+    rerun_components: bool = typer.Option(  # noqa: FBT001
+        default=False, help="Rebuild every component, serving only the LLM calls from the capsule."
+    ),
+    log_level: str = typer.Option("error", help="Logging level."),
+) -> None:
+    """Replays a recorded run offline and reports whether it ended as the recorded run did.
+
+    Only replay capsules you trust: they are unpickled.
+    """
+    configure(log_level=log_level)
+    from axiestudio.graph.graph.capsule import RunCapsule, replay_capsule
+
+    async def areplay():
+        await initialize_services()
+        return await replay_capsule(RunCapsule.load(capsule_path), rerun_components=rerun_components)
+
+    result = asyncio.run(areplay())
+    table = Table(box=box.ROUNDED)
+    table.add_column("")
+    table.add_column("Replay")
+    table.add_row("Restored components", str(len(result.restored)))
+    table.add_row("Rebuilt components", str(len(result.rebuilt)))
+    table.add_row("Diverged components", ", ".join(result.diverged) or "none")
+    table.add_row("Recorded error", result.recorded_error or "none")
+    table.add_row("Error", result.error or "none")
+    table.add_row("Duration", f"{result.duration:.3f}s")
+    Console().print(table)
+    if not result.reproduced:
+        raise typer.Exit(1)
+
+
 def show_version(*, value: bool):
     if value:
         default = "DEV"
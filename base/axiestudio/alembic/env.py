@@ -37,6 +37,11 @@ target_metadata.naming_convention = NAMING_CONVENTION
 # ... etc.
 
 
+def include_name(name, type_, parent_names) -> bool:  # noqa: ARG001
+    # The SQLite full-text index and its shadow tables are not part of the models
+    return not (type_ == "table" and name and name.startswith("flow_search_fts"))
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -57,6 +62,7 @@ def run_migrations_offline() -> None:
         dialect_opts={"paramstyle": "named"},
         render_as_batch=True,
         prepare_threshold=None,
+        include_name=include_name,
     )
 
     with context.begin_transaction():
@@ -80,7 +86,11 @@ def _sqlite_do_begin(conn):
 
 def _do_run_migrations(connection):
     context.configure(
-        connection=connection, target_metadata=target_metadata, render_as_batch=True, prepare_threshold=None
+        connection=connection,
+        target_metadata=target_metadata,
+        render_as_batch=True,
+        prepare_threshold=None,
+        include_name=include_name,
     )
 
     with context.begin_transaction():
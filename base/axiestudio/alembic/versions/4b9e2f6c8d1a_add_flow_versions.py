@@ -0,0 +1,70 @@
+"""Add content-addressed flow payloads and flow versions
+
+Revision ID: 4b9e2f6c8d1a
+Revises: 7c1e5d9a4b3f
+Create Date: 2026-10-19 14:03:52.716240
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+from axiestudio.utils import migration
+
+# revision identifiers, used by Alembic.
+revision: str = "4b9e2f6c8d1a"
+down_revision: Union[str, None] = "7c1e5d9a4b3f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    if not migration.table_exists("flow_payload", conn):
+        op.create_table(
+            "flow_payload",
+            sa.Column("hash", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column("data", sa.LargeBinary(), nullable=False),
+            sa.Column("size", sa.Integer(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint("hash"),
+        )
+    if not migration.table_exists("flow_version", conn):
+        op.create_table(
+            "flow_version",
+            sa.Column("id", sqlmodel.sql.sqltypes.types.Uuid(), nullable=False),
+            sa.Column("flow_id", sqlmodel.sql.sqltypes.types.Uuid(), nullable=False),
+            sa.Column("version", sa.Integer(), nullable=False),
+            sa.Column("payload_hash", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(["flow_id"], ["flow.id"], "fk_flow_version_flow_id", ondelete="CASCADE"),
+            sa.ForeignKeyConstraint(["payload_hash"], ["flow_payload.hash"], "fk_flow_version_payload_hash"),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("flow_id", "version", name="unique_flow_version"),
+        )
+        with op.batch_alter_table("flow_version", schema=None) as batch_op:
+            batch_op.create_index(batch_op.f("ix_flow_version_flow_id"), ["flow_id"], unique=False)
+            batch_op.create_index(batch_op.f("ix_flow_version_payload_hash"), ["payload_hash"], unique=False)
+
+    # Runs record the version of the flow they ran
+    for table_name in ("flow", "transaction", "vertex_build"):
+        column_name = "version" if table_name == "flow" else "flow_version"
+        if not migration.column_exists(table_name, column_name, conn):
+            with op.batch_alter_table(table_name, schema=None) as batch_op:
+                batch_op.add_column(sa.Column(column_name, sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    for table_name in ("flow", "transaction", "vertex_build"):
+        column_name = "version" if table_name == "flow" else "flow_version"
+        if migration.column_exists(table_name, column_name, conn):
+            with op.batch_alter_table(table_name, schema=None) as batch_op:
+                batch_op.drop_column(column_name)
+
+    if migration.table_exists("flow_version", conn):
+        op.drop_table("flow_version")
+    if migration.table_exists("flow_payload", conn):
+        op.drop_table("flow_payload")
@@ -0,0 +1,51 @@
+"""Add content hash and name lookup indexes to the file table
+
+Revision ID: 7c1e5d9a4b3f
+Revises: def789ghi012
+Create Date: 2026-10-19 10:12:31.482105
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+from axiestudio.utils import migration
+
+# revision identifiers, used by Alembic.
+revision: str = "7c1e5d9a4b3f"
+down_revision: Union[str, None] = "def789ghi012"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)  # type: ignore
+    file_indexes = {index["name"] for index in inspector.get_indexes("file")}
+
+    with op.batch_alter_table("file", schema=None) as batch_op:
+        if not migration.column_exists("file", "content_hash", conn):
+            batch_op.add_column(sa.Column("content_hash", sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+        if "ix_file_user_id_content_hash" not in file_indexes:
+            batch_op.create_index("ix_file_user_id_content_hash", ["user_id", "content_hash"], unique=False)
+
+    # Lets PostgreSQL serve the anchored LIKE used to find name collisions from an index
+    # whatever the database collation is; SQLite does not need it
+    if conn.dialect.name == "postgresql" and "ix_file_name_pattern" not in file_indexes:
+        op.create_index("ix_file_name_pattern", "file", ["name"], postgresql_ops={"name": "varchar_pattern_ops"})
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)  # type: ignore
+    file_indexes = {index["name"] for index in inspector.get_indexes("file")}
+
+    if "ix_file_name_pattern" in file_indexes:
+        op.drop_index("ix_file_name_pattern", table_name="file")
+    with op.batch_alter_table("file", schema=None) as batch_op:
+        if "ix_file_user_id_content_hash" in file_indexes:
+            batch_op.drop_index("ix_file_user_id_content_hash")
+        if migration.column_exists("file", "content_hash", conn):
+            batch_op.drop_column("content_hash")
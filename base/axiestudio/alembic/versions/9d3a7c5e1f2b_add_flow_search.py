@@ -0,0 +1,144 @@
+"""Add the full-text search index of flows
+
+Revision ID: 9d3a7c5e1f2b
+Revises: 4b9e2f6c8d1a
+Create Date: 2026-10-19 15:12:40.318502
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+from axiestudio.utils import migration
+
+# revision identifiers, used by Alembic.
+revision: str = "9d3a7c5e1f2b"
+down_revision: Union[str, None] = "4b9e2f6c8d1a"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 500
+MAX_INDEXED_TEXT_LENGTH = 20_000
+PROMPT_FIELD_NAMES = {"template", "system_prompt", "system_message"}
+
+# The search index as of this revision, the application's one may change after it
+PG_SEARCH_VECTOR = (
+    "(setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(tags, '') || ' ' || coalesce(description, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(components, '')), 'C') || "
+    "setweight(to_tsvector('simple', coalesce(prompts, '')), 'D'))"
+)
+COLUMNS = "name, description, tags, components, prompts"
+NEW_VALUES = "new.name, new.description, new.tags, new.components, new.prompts"
+OLD_VALUES = "old.name, old.description, old.tags, old.components, old.prompts"
+SQLITE_FTS_CREATE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS flow_search_fts USING fts5({COLUMNS}, "
+    "content='flow_search_document', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS flow_search_document_ai AFTER INSERT ON flow_search_document BEGIN "  # noqa: S608
+    f"INSERT INTO flow_search_fts(rowid, {COLUMNS}) VALUES (new.id, {NEW_VALUES}); END",
+    "CREATE TRIGGER IF NOT EXISTS flow_search_document_ad AFTER DELETE ON flow_search_document BEGIN "  # noqa: S608
+    f"INSERT INTO flow_search_fts(flow_search_fts, rowid, {COLUMNS}) VALUES ('delete', old.id, {OLD_VALUES}); END",
+    "CREATE TRIGGER IF NOT EXISTS flow_search_document_au AFTER UPDATE ON flow_search_document BEGIN "  # noqa: S608
+    f"INSERT INTO flow_search_fts(flow_search_fts, rowid, {COLUMNS}) VALUES ('delete', old.id, {OLD_VALUES}); "
+    f"INSERT INTO flow_search_fts(rowid, {COLUMNS}) VALUES (new.id, {NEW_VALUES}); END",
+    "INSERT INTO flow_search_fts(flow_search_fts) VALUES ('rebuild')",
+)
+SQLITE_FTS_DROP = (
+    "DROP TRIGGER IF EXISTS flow_search_document_ai",
+    "DROP TRIGGER IF EXISTS flow_search_document_ad",
+    "DROP TRIGGER IF EXISTS flow_search_document_au",
+    "DROP TABLE IF EXISTS flow_search_fts",
+)
+
+
+def search_text(row) -> dict[str, str]:
+    """The searchable text of a flow: its name, description, tags, component types and prompts."""
+    components: dict[str, None] = {}
+    prompts: list[str] = []
+    for node in (row.data or {}).get("nodes") or []:
+        node_data = node.get("data") or {}
+        node_info = node_data.get("node") or {}
+        for component_name in (node_data.get("type"), node_info.get("display_name")):
+            if isinstance(component_name, str) and component_name:
+                components[component_name] = None
+        for field_name, field in (node_info.get("template") or {}).items():
+            if not isinstance(field, dict):
+                continue
+            if (
+                field.get("type") == "prompt"
+                or field.get("_input_type") == "PromptInput"
+                or field_name in PROMPT_FIELD_NAMES
+            ):
+                value = field.get("value")
+                if isinstance(value, str) and value.strip():
+                    prompts.append(value)
+    return {
+        "name": row.name or "",
+        "description": (row.description or "")[:MAX_INDEXED_TEXT_LENGTH],
+        "tags": " ".join(row.tags or []),
+        "components": " ".join(components)[:MAX_INDEXED_TEXT_LENGTH],
+        "prompts": "\n".join(prompts)[:MAX_INDEXED_TEXT_LENGTH],
+    }
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    if migration.table_exists("flow_search_document", conn):
+        return
+    search_document = op.create_table(
+        "flow_search_document",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("flow_id", sqlmodel.sql.sqltypes.types.Uuid(), nullable=False),
+        sa.Column("name", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("description", sa.Text(), nullable=False),
+        sa.Column("tags", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("components", sa.Text(), nullable=False),
+        sa.Column("prompts", sa.Text(), nullable=False),
+        sa.ForeignKeyConstraint(["flow_id"], ["flow.id"], "fk_flow_search_document_flow_id", ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    with op.batch_alter_table("flow_search_document", schema=None) as batch_op:
+        batch_op.create_index(batch_op.f("ix_flow_search_document_flow_id"), ["flow_id"], unique=True)
+
+    # Index the existing flows, the triggers or the GIN index pick them up
+    flow = sa.table(
+        "flow",
+        sa.column("id", sa.Uuid()),
+        sa.column("name", sa.String()),
+        sa.column("description", sa.Text()),
+        sa.column("tags", sa.JSON()),
+        sa.column("data", sa.JSON()),
+    )
+    rows = conn.execute(sa.select(flow.c.id, flow.c.name, flow.c.description, flow.c.tags, flow.c.data))
+    while batch := rows.fetchmany(BACKFILL_BATCH_SIZE):
+        op.bulk_insert(
+            search_document,
+            [{"flow_id": row.id, **search_text(row)} for row in batch],
+        )
+
+    if conn.dialect.name == "postgresql":
+        op.create_index(
+            "ix_flow_search_document_vector",
+            "flow_search_document",
+            [sa.text(PG_SEARCH_VECTOR)],
+            postgresql_using="gin",
+        )
+    elif conn.dialect.name == "sqlite":
+        try:
+            for statement in SQLITE_FTS_CREATE:
+                conn.exec_driver_sql(statement)
+        except sa.exc.OperationalError:
+            # SQLite without FTS5, flows are searched without an index
+            pass
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    if conn.dialect.name == "sqlite":
+        for statement in SQLITE_FTS_DROP:
+            conn.exec_driver_sql(statement)
+    if migration.table_exists("flow_search_document", conn):
+        op.drop_table("flow_search_document")
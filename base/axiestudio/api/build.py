@@ -1,5 +1,4 @@
 import asyncio
-import json
 import time
 import traceback
 import uuid
@@ -30,13 +29,21 @@ from axiestudio.events.event_manager import EventManager
 from axiestudio.exceptions.component import ComponentBuildError
 from axiestudio.graph.graph.base import Graph
 from axiestudio.graph.utils import log_vertex_build
+from axiestudio.logging.logger import throttled
 from axiestudio.schema.message import ErrorMessage
 from axiestudio.schema.schema import OutputValue
+from axiestudio.services.cache.utils import CacheMiss
 from axiestudio.services.database.models.flow.model import Flow
-from axiestudio.services.deps import get_chat_service, get_telemetry_service, session_scope
+from axiestudio.services.deps import get_chat_service, get_settings_service, get_telemetry_service, session_scope
+from axiestudio.services.job_queue.event_log import EventLog
 from axiestudio.services.job_queue.service import JobQueueNotFoundError, JobQueueService
 from axiestudio.services.telemetry.schema import ComponentPayload, PlaygroundPayload
 
+# Response header with the cursor of the last event returned by a poll
+LAST_EVENT_ID_HEADER = "Last-Event-ID"
+# Seconds a build goes on after its stream disconnected, waiting for the client to read it again
+RECONNECT_GRACE_PERIOD = 30
+
 
 async def start_flow_build(
     *,
@@ -85,56 +92,50 @@ async def get_flow_events_response(
     job_id: str,
     queue_service: JobQueueService,
     event_delivery: EventDeliveryType,
+    after: int | None = None,
+    server_sent_events: bool = False,
 ):
-    """Get events for a specific build job, either as a stream or single event."""
+    """Get events for a specific build job, either as a stream or single event.
+
+    Events are read from the job's event log after the ``after`` cursor, the sequence number of
+    the last event the client received, so a client can resume a build after reconnecting.
+    Streams start from the first event when no cursor is given. Polls without a cursor continue
+    from where the previous cursorless poll of the job stopped.
+    """
     try:
-        main_queue, event_manager, event_task, _ = queue_service.get_queue_data(job_id)
+        event_log, event_manager, event_task, _ = queue_service.get_queue_data(job_id)
         if event_delivery in (EventDeliveryType.STREAMING, EventDeliveryType.DIRECT):
             if event_task is None:
                 logger.error(f"No event task found for job {job_id}")
                 raise HTTPException(status_code=404, detail="No event task found for job")
             return await create_flow_response(
-                queue=main_queue,
+                queue=event_log,
                 event_manager=event_manager,
                 event_task=event_task,
+                after=after or 0,
+                server_sent_events=server_sent_events,
             )
 
         # Polling mode - get all available events
         try:
-            events: list = []
-            # Get all available events from the queue without blocking
-            while not main_queue.empty():
-                _, value, _ = await main_queue.get()
-                if value is None:
-                    # End of stream, trigger end event
-                    if event_task is not None:
-                        event_task.cancel()
-                    event_manager.on_end(data={})
-                    # Include the end event
-                    events.append(None)
-                    break
-                events.append(value.decode("utf-8"))
-
-            # If no events were available, wait for one (with timeout)
-            if not events:
-                _, value, _ = await main_queue.get()
-                if value is None:
-                    # End of stream, trigger end event
-                    if event_task is not None:
-                        event_task.cancel()
-                    event_manager.on_end(data={})
-                else:
-                    events.append(value.decode("utf-8"))
+            event_log.touch()
+            cursor = event_log.default_cursor if after is None else after
+            # If no events are available, wait for one
+            await event_log.wait(cursor)
+            events = event_log.events_after(cursor)
+            if events:
+                cursor = events[-1][0]
+            if after is None:
+                event_log.default_cursor = cursor
 
             # Return as NDJSON format - each line is a complete JSON object
-            content = "\n".join([event for event in events if event is not None])
-            return Response(content=content, media_type="application/x-ndjson")
+            content = "\n".join([value.decode("utf-8") for _, _, value, _ in events])
+            return Response(
+                content=content, media_type="application/x-ndjson", headers={LAST_EVENT_ID_HEADER: str(cursor)}
+            )
         except asyncio.CancelledError as exc:
             logger.info(f"Event polling was cancelled for job {job_id}")
             raise HTTPException(status_code=499, detail="Event polling was cancelled") from exc
-        except asyncio.TimeoutError:
-            logger.warning(f"Timeout while waiting for events for job {job_id}")
-            return Response(content="", media_type="application/x-ndjson")  # Return empty response instead of error
 
     except JobQueueNotFoundError as exc:
         logger.error(f"Job not found: {job_id}. Error: {exc!s}")
@@ -147,33 +148,50 @@ async def get_flow_events_response(
 
 
 async def create_flow_response(
-    queue: asyncio.Queue,
+    queue: EventLog,
     event_manager: EventManager,
     event_task: asyncio.Task,
+    after: int = 0,
+    *,
+    server_sent_events: bool = False,
 ) -> DisconnectHandlerStreamingResponse:
-    """Create a streaming response for the flow build process."""
+    """Create a streaming response for the flow build process.
+
+    As server-sent events, each event carries its sequence number as its id, which the client
+    sends back in the ``Last-Event-ID`` header when it reconnects.
+    """
 
     async def consume_and_yield() -> AsyncIterator[str]:
-        while True:
-            try:
-                event_id, value, put_time = await queue.get()
-                if value is None:
-                    break
+        try:
+            async for seq, event_id, value, put_time in queue.read(after):
                 get_time = time.time()
-                yield value.decode("utf-8")
-                logger.debug(f"Event {event_id} consumed in {get_time - put_time:.4f}s")
-            except Exception as exc:  # noqa: BLE001
-                logger.exception(f"Error consuming event: {exc}")
-                break
+                if server_sent_events:
+                    yield f"id: {seq}\ndata: {value.decode('utf-8').rstrip()}\n\n"
+                else:
+                    yield value.decode("utf-8")
+                # Logged at most once a second, as there is an event per token when streaming
+                throttled("build-event-consumed", 1).debug(
+                    "Event {} consumed in {:.4f}s", event_id, get_time - put_time
+                )
+        except Exception as exc:  # noqa: BLE001
+            logger.exception(f"Error consuming event: {exc}")
 
     def on_disconnect() -> None:
-        logger.debug("Client disconnected, closing tasks")
-        event_task.cancel()
-        event_manager.on_end(data={})
+        disconnected_at = time.monotonic()
+
+        def cancel_if_abandoned() -> None:
+            if queue.last_read_at < disconnected_at and not event_task.done():
+                logger.debug("Client did not reconnect, closing tasks")
+                event_task.cancel()
+                event_manager.on_end(data={})
+
+        # The build goes on for a while, so a client that lost its connection can resume reading it
+        logger.debug("Client disconnected")
+        asyncio.get_running_loop().call_later(RECONNECT_GRACE_PERIOD, cancel_if_abandoned)
 
     return DisconnectHandlerStreamingResponse(
         consume_and_yield(),
-        media_type="application/x-ndjson",
+        media_type="text/event-stream" if server_sent_events else "application/x-ndjson",
         on_disconnect=on_disconnect,
     )
 
@@ -215,6 +233,7 @@ async def generate_flow_events(
                 graph = await create_graph(fresh_session, flow_id_str, flow_name)
 
             first_layer = sort_vertices(graph)
+            await plan_incremental_build(graph, flow_id_str)
 
             for vertex_id in first_layer:
                 graph.run_manager.add_to_vertices_being_run(vertex_id)
@@ -277,6 +296,27 @@ async def generate_flow_events(
             session_id=effective_session_id,
         )
 
+    async def plan_incremental_build(graph: Graph, flow_id_str: str) -> None:
+        """Reuses the results of components that did not change since the previous build of the flow."""
+        fingerprints_key = f"{flow_id_str}:vertex_fingerprints"
+        previous_fingerprints: dict[str, str] = {}
+        variables = None
+        if get_settings_service().settings.incremental_playground_builds:
+            cached = await chat_service.get_cache(fingerprints_key)
+            if not isinstance(cached, CacheMiss) and cached["result"].get("session_id") == graph.session_id:
+                previous_fingerprints = cached["result"]["fingerprints"]
+            variables = await graph.get_variable_values(str(current_user.id))
+        reusable_vertices = graph.plan_incremental_build(
+            previous_fingerprints,
+            force_build=[start_component_id] if start_component_id else None,
+            variables=variables,
+        )
+        if reusable_vertices:
+            logger.debug(f"Reusing the previous results of {len(reusable_vertices)} components")
+        await chat_service.set_cache(
+            fingerprints_key, {"session_id": graph.session_id, "fingerprints": graph.vertex_fingerprints}
+        )
+
     def sort_vertices(graph: Graph) -> list[str]:
         try:
             return graph.sort_vertices(stop_component_id, start_component_id)
@@ -340,6 +380,7 @@ async def generate_flow_events(
                     params=params,
                     data=result_data_response,
                     artifacts=artifacts,
+                    flow_version=graph.flow_version,
                 )
             else:
                 await chat_service.set_cache(flow_id_str, graph)
@@ -396,46 +437,20 @@ async def generate_flow_events(
 
         return build_response
 
-    async def build_vertices(
-        vertex_id: str,
-        graph: Graph,
-        event_manager: EventManager,
-    ) -> None:
-        """Build vertices and handle their events.
-
-        Args:
-            vertex_id: The ID of the vertex to build
-            graph: The graph instance
-            event_manager: Manager for handling events
-        """
+    async def build_vertex_and_send_event(vertex_id: str, graph: Graph) -> list[str]:
+        """Build a vertex, send its build event and return the vertices to build next."""
         try:
-            vertex_build_response: VertexBuildResponse = await _build_vertex(vertex_id, graph, event_manager)
+            vertex_build_response = await _build_vertex(vertex_id, graph, event_manager)
         except asyncio.CancelledError as exc:
             logger.error(f"Build cancelled: {exc}")
             raise
 
-        # send built event or error event
-        try:
-            vertex_build_response_json = vertex_build_response.model_dump_json()
-            build_data = json.loads(vertex_build_response_json)
-        except Exception as exc:
-            msg = f"Error serializing vertex build response: {exc}"
-            raise ValueError(msg) from exc
-
-        event_manager.on_end_vertex(data={"build_data": build_data})
+        # The response is encoded once, by the event manager
+        event_manager.on_end_vertex(data={"build_data": vertex_build_response})
 
         if vertex_build_response.valid and vertex_build_response.next_vertices_ids:
-            tasks = []
-            for next_vertex_id in vertex_build_response.next_vertices_ids:
-                task = asyncio.create_task(
-                    build_vertices(
-                        next_vertex_id,
-                        graph,
-                        event_manager,
-                    )
-                )
-                tasks.append(task)
-            await asyncio.gather(*tasks)
+            return vertex_build_response.next_vertices_ids
+        return []
 
     try:
         ids, vertices_to_run, graph = await build_graph_and_get_order()
@@ -449,18 +464,26 @@ async def generate_flow_events(
 
     event_manager.on_vertices_sorted(data={"ids": ids, "to_run": vertices_to_run})
 
-    tasks = []
-    for vertex_id in ids:
-        task = asyncio.create_task(build_vertices(vertex_id, graph, event_manager))
-        tasks.append(task)
+    failed_vertex_id = None
+
+    async def build(vertex_id: str) -> list[str]:
+        nonlocal failed_vertex_id
+        try:
+            return await build_vertex_and_send_event(vertex_id, graph)
+        except Exception:
+            failed_vertex_id = failed_vertex_id or vertex_id
+            raise
+
+    # The vertices run on the scheduler of API runs: one flat set of tasks, cancelled together
+    # The run is measured, stopped if it exceeds a quota and recorded to a capsule, like API runs
     try:
-        await asyncio.gather(*tasks)
+        await graph.execute(ids, build)
     except asyncio.CancelledError:
         background_tasks.add_task(graph.end_all_traces_in_context())
         raise
     except Exception as e:
         logger.error(f"Error building vertices: {e}")
-        custom_component = graph.get_vertex(vertex_id).custom_component
+        custom_component = graph.get_vertex(failed_vertex_id).custom_component if failed_vertex_id else None
         trace_name = getattr(custom_component, "trace_name", None)
         error_message = ErrorMessage(
             flow_id=flow_id,
@@ -470,6 +493,9 @@ async def generate_flow_events(
         )
         event_manager.on_error(data=error_message.data)
         raise
+    finally:
+        # Vertex errors do not stop the other branches, so the state goes only once the run is over
+        graph.end_run_state()
 
     event_manager.on_end(data={})
     await graph.end_all_traces()
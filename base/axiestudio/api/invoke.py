@@ -0,0 +1,247 @@
+"""Run flows from Python code in the same process, without going through the HTTP endpoints.
+
+Example:
+    async with invoke_flow(flow_id, user=current_user, inputs=inputs) as invocation:
+        async for event in invocation:
+            ...
+    text = invocation.result.text
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from fastapi import BackgroundTasks
+from loguru import logger
+from pydantic import BaseModel
+
+from axiestudio.api.build import generate_flow_events
+from axiestudio.events.event_manager import FlowEvent, create_default_event_manager
+from axiestudio.schema.playground_events import TokenEvent
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+    from types import TracebackType
+
+    from typing_extensions import Self
+
+    from axiestudio.api.v1.schemas import InputValueRequest
+    from axiestudio.services.database.models.user.model import User
+
+# Queued events past which the token chunks of a message are merged until the consumer catches up
+MAX_BUFFERED_EVENTS = 100
+
+# Runs whose events were all consumed but which are still running their background tasks
+_finishing_runs: set[asyncio.Task] = set()
+
+
+class EventQueue(asyncio.Queue):
+    """A queue of flow events that merges consecutive token chunks while the consumer is behind.
+
+    Components send events synchronously, so they cannot wait for a slow consumer. Instead of
+    growing without bound while an LLM streams, the queue merges each new token into the last
+    queued one of the same message; every other event is always delivered.
+    """
+
+    def __init__(self, max_buffered_events: int = MAX_BUFFERED_EVENTS) -> None:
+        super().__init__()
+        self.max_buffered_events = max_buffered_events
+
+    def _put(self, item) -> None:
+        _, event, _ = item
+        if self.qsize() >= self.max_buffered_events and self._queue and _is_token(event):
+            last_id, last_event, put_time = self._queue[-1]
+            if _is_token(last_event) and last_event.data.id == event.data.id:
+                merged = last_event.data.model_copy(update={"chunk": last_event.data.chunk + event.data.chunk})
+                self._queue[-1] = (last_id, FlowEvent(last_event.event, merged), put_time)
+                return
+        super()._put(item)
+
+
+def _is_token(event: FlowEvent | None) -> bool:
+    return event is not None and event.event == "token" and isinstance(event.data, TokenEvent)
+
+
+@dataclass
+class FlowInvocationResult:
+    """The outcome of a flow run."""
+
+    builds: list[dict[str, Any]] = field(default_factory=list)
+    """The build data of each component, in the order they finished."""
+    error: Any | None = None
+    """The error event, if the run failed."""
+
+    @property
+    def valid(self) -> bool:
+        return self.error is None and all(build.get("valid", False) for build in self.builds)
+
+    @property
+    def messages(self) -> list[str]:
+        """The text of the message each component produced, in the order they finished."""
+        messages = []
+        for build in self.builds:
+            message = ((build.get("data") or {}).get("results") or {}).get("message")
+            messages.append((message.get("text") or "") if isinstance(message, dict) else "")
+        return messages
+
+    @property
+    def text(self) -> str:
+        """The last message the flow produced."""
+        return next((message for message in reversed(self.messages) if message), "")
+
+
+class FlowInvocation:
+    """A flow run, iterated for its events. Use :func:`invoke_flow` to create one."""
+
+    def __init__(
+        self,
+        flow_id: uuid.UUID,
+        *,
+        user: User,
+        inputs: InputValueRequest | None = None,
+        files: list[str] | None = None,
+        stop_component_id: str | None = None,
+        start_component_id: str | None = None,
+        log_builds: bool = True,
+        background_tasks: BackgroundTasks | None = None,
+        max_buffered_events: int = MAX_BUFFERED_EVENTS,
+    ) -> None:
+        self.flow_id = flow_id
+        self.result = FlowInvocationResult()
+        self._queue = EventQueue(max_buffered_events)
+        self._event_manager = create_default_event_manager(self._queue, encode=False)
+        # Tasks given by the caller are theirs to run, ours run once the flow finished
+        self._owns_background_tasks = background_tasks is None
+        self._background_tasks = background_tasks or BackgroundTasks()
+        self._build_kwargs = {
+            "inputs": inputs,
+            "data": None,
+            "files": files,
+            "stop_component_id": stop_component_id,
+            "start_component_id": start_component_id,
+            "log_builds": log_builds,
+            "current_user": user,
+        }
+        self._task: asyncio.Task | None = None
+        self._done = False
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name=f"invoke_flow {self.flow_id}")
+
+    async def _run(self) -> None:
+        try:
+            await generate_flow_events(
+                flow_id=self.flow_id,
+                background_tasks=self._background_tasks,
+                event_manager=self._event_manager,
+                **self._build_kwargs,
+            )
+        except Exception:  # noqa: BLE001
+            # The error was sent as an event already
+            logger.opt(exception=True).debug(f"Flow {self.flow_id} failed")
+        finally:
+            self._queue.put_nowait((None, None, time.time()))
+            if self._owns_background_tasks:
+                try:
+                    await self._background_tasks()
+                except Exception:  # noqa: BLE001
+                    logger.exception(f"Error running the background tasks of flow {self.flow_id}")
+
+    async def __aiter__(self) -> AsyncIterator[FlowEvent]:
+        self.start()
+        while not self._done:
+            _, event, _ = await self._queue.get()
+            if event is None:
+                self._done = True
+                break
+            if event.event == "end_vertex":
+                build_data = event.data["build_data"]
+                if isinstance(build_data, BaseModel):
+                    # Builds are sent as models, for the event manager to encode them in one pass
+                    build_data = build_data.model_dump(mode="json")
+                    event = FlowEvent(event.event, {**event.data, "build_data": build_data})
+                self.result.builds.append(build_data)
+            elif event.event == "error":
+                self.result.error = event.data
+            yield event
+
+    async def wait(self) -> FlowInvocationResult:
+        """Run the flow to the end, skipping the events that were not consumed, and return its result."""
+        async for _ in self:
+            pass
+        return self.result
+
+    async def cancel(self) -> None:
+        """Stop the flow if it is still running."""
+        if self._task is None or self._task.done():
+            return
+        if self._done:
+            # The flow finished, only its background tasks are left
+            _finishing_runs.add(self._task)
+            self._task.add_done_callback(_finishing_runs.discard)
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+    async def __aenter__(self) -> Self:
+        self.start()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        # Leaving the block early, e.g. on a client disconnect, stops the flow
+        await self.cancel()
+
+
+def invoke_flow(
+    flow_id: uuid.UUID | str,
+    *,
+    user: User,
+    inputs: InputValueRequest | None = None,
+    files: list[str] | None = None,
+    stop_component_id: str | None = None,
+    start_component_id: str | None = None,
+    log_builds: bool = True,
+    background_tasks: BackgroundTasks | None = None,
+    max_buffered_events: int = MAX_BUFFERED_EVENTS,
+) -> FlowInvocation:
+    """Run a saved flow in this process, as the playground builds it.
+
+    The events are delivered as ``FlowEvent`` objects rather than NDJSON, and the final
+    result is collected while they are iterated.
+
+    Args:
+        flow_id: The id of the flow to run.
+        user: The user running the flow.
+        inputs: The input value and session of the run.
+        files: Files to pass to the flow.
+        stop_component_id: Stop the run after this component.
+        start_component_id: Start the run from this component.
+        log_builds: Whether to store the component builds.
+        background_tasks: Where to add the run's background tasks. If not given they are run
+            once the flow finished.
+        max_buffered_events: Queued events past which token chunks are merged.
+
+    Returns:
+        The run, to be used as an async context manager and iterated for its events.
+    """
+    return FlowInvocation(
+        flow_id if isinstance(flow_id, uuid.UUID) else uuid.UUID(flow_id),
+        user=user,
+        inputs=inputs,
+        files=files,
+        stop_component_id=stop_component_id,
+        start_component_id=start_component_id,
+        log_builds=log_builds,
+        background_tasks=background_tasks,
+        max_buffered_events=max_buffered_events,
+    )
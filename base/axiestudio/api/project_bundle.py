@@ -0,0 +1,571 @@
+"""Project bundles: a project with its flows, the files they reference and the variables they use, in one ZIP.
+
+A bundle is written while it is streamed and read back one entry at a time, so neither side holds
+the archive in memory. A file is stored once per content hash, however many flows reference it.
+The manifest records the hash of every object, so a bundle made against a previous one can leave
+out the objects that did not change since.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+import zipfile
+from datetime import datetime, timezone
+from pathlib import PurePosixPath
+from typing import TYPE_CHECKING, Any, BinaryIO, Literal
+from uuid import UUID, uuid4
+
+import orjson
+from loguru import logger
+from pydantic import BaseModel, Field, ValidationError
+from sqlmodel import col, select
+
+from axiestudio.api.utils import cascade_delete_folder
+from axiestudio.api.v2.files import create_user_file, delete_stored_file, get_file_by_content_hash
+from axiestudio.helpers.flow_import import UniqueNames
+from axiestudio.helpers.folders import generate_unique_folder_name
+from axiestudio.services.database.models.file.model import File as UserFile
+from axiestudio.services.database.models.flow.model import Flow, FlowCreate, FlowRead
+from axiestudio.services.database.models.flow_search.crud import extract_search_text, index_flow
+from axiestudio.services.database.models.flow_search.model import FlowSearchDocument
+from axiestudio.services.database.models.flow_version.crud import save_flow_version
+from axiestudio.services.database.models.folder.model import Folder
+from axiestudio.services.database.models.variable.model import Variable
+from axiestudio.services.deps import get_settings_service, get_storage_service, session_scope
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Iterable, Iterator
+
+    from axiestudio.services.database.models.user.model import User
+    from axiestudio.services.storage.service import StorageService
+
+BUNDLE_FORMAT = "axiestudio-project-bundle"
+BUNDLE_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+BUNDLE_CHUNK_SIZE = 1024 * 1024
+# Flows loaded from the database per query when writing a bundle, and written per transaction when importing one
+BUNDLE_BATCH_SIZE = 50
+
+# MCP settings of a project that are secrets, never written to a bundle
+_SECRET_AUTH_SETTINGS = {"api_key", "password", "bearer_token", "oauth_client_secret"}
+# Fields of a flow that belong to the instance it is on rather than to the flow
+_INSTANCE_FLOW_FIELDS = {"user_id", "folder_id", "fs_path", "version"}
+
+
+class BundleError(ValueError):
+    """A bundle is invalid, or cannot be applied to the project it is imported into."""
+
+
+class BundleProject(BaseModel):
+    id: UUID
+    name: str
+    description: str | None = None
+    auth_settings: dict | None = None
+    """The MCP settings of the project, without their secrets."""
+
+
+class BundleFlow(BaseModel):
+    id: UUID
+    name: str
+    sha256: str
+    included: bool = True
+    """Whether the flow is in the archive, or left out as unchanged since the base bundle."""
+
+    @property
+    def path(self) -> str:
+        return f"flows/{self.id}.json"
+
+
+class BundleFile(BaseModel):
+    sha256: str
+    name: str
+    size: int
+    references: list[str] = Field(default_factory=list)
+    """The paths the flows reference the file by."""
+    included: bool = True
+    """Whether the file is in the archive, or left out as unchanged since the base bundle."""
+
+    @property
+    def path(self) -> str:
+        return f"files/{self.sha256}"
+
+
+class BundleVariable(BaseModel):
+    name: str
+    type: str | None = None
+
+
+class BundleManifest(BaseModel):
+    """The contents of a bundle, with the hash of each flow and file."""
+
+    format: Literal["axiestudio-project-bundle"] = BUNDLE_FORMAT
+    version: int = BUNDLE_VERSION
+    id: UUID = Field(default_factory=uuid4)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    base_id: UUID | None = None
+    """The bundle this one was made against. The objects left out of this one are in it."""
+    project: BundleProject
+    flows: list[BundleFlow] = Field(default_factory=list)
+    files: list[BundleFile] = Field(default_factory=list)
+    variables: list[BundleVariable] = Field(default_factory=list)
+    """The variables the flows use. Only their names are exported, never their values."""
+
+
+class BundleImportResult(BaseModel):
+    """Counts of a bundle import."""
+
+    project_id: UUID
+    flows_created: int = 0
+    flows_updated: int = 0
+    files_stored: int = 0
+    files_reused: int = 0
+    """Files the user already had with the same content."""
+    missing_variables: list[str] = Field(default_factory=list)
+    """Variables the flows use that the user does not have."""
+
+
+def _template_fields(data: dict | None) -> Iterator[dict]:
+    for node in (data or {}).get("nodes") or []:
+        template = ((node.get("data") or {}).get("node") or {}).get("template") or {}
+        for field in template.values():
+            if isinstance(field, dict):
+                yield field
+
+
+def file_references(data: dict | None) -> list[str]:
+    """Return the storage paths of the files the components of a flow use."""
+    references = []
+    for field in _template_fields(data):
+        file_path = field.get("file_path")
+        paths = file_path if isinstance(file_path, list) else [file_path]
+        references.extend(path for path in paths if isinstance(path, str) and path)
+    return references
+
+
+def variable_names(data: dict | None) -> set[str]:
+    """Return the names of the variables the components of a flow load their values from."""
+    return {
+        field["value"]
+        for field in _template_fields(data)
+        if field.get("load_from_db") and isinstance(field.get("value"), str) and field["value"]
+    }
+
+
+def replace_file_references(data: dict | None, paths: dict[str, str]) -> None:
+    """Point the file fields of a flow at new storage paths, in place."""
+    for field in _template_fields(data):
+        file_path = field.get("file_path")
+        if isinstance(file_path, list):
+            field["file_path"] = [paths.get(path, path) if isinstance(path, str) else path for path in file_path]
+        elif isinstance(file_path, str):
+            field["file_path"] = paths.get(file_path, file_path)
+
+
+def _public_auth_settings(auth_settings: dict | None) -> dict | None:
+    if not auth_settings:
+        return None
+    return {key: None if key in _SECRET_AUTH_SETTINGS else value for key, value in auth_settings.items()}
+
+
+class _ZipOutput(io.RawIOBase):
+    """The unseekable output of a ``ZipFile``, taken in chunks while the archive is written."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._buffer = bytearray()
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        self._buffer.extend(data)
+        return len(data)
+
+    def take(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def _encode_flow(flow: Flow) -> bytes:
+    flow_dict = FlowRead.model_validate(flow, from_attributes=True).model_dump(
+        mode="json", exclude=_INSTANCE_FLOW_FIELDS
+    )
+    # Secrets are left out, but not the names of the variables their values are loaded from
+    for field in _template_fields(flow_dict.get("data")):
+        if field.get("password") and not field.get("load_from_db"):
+            field["value"] = None
+    # Sorted, so a flow that did not change has the same hash in every bundle
+    return orjson.dumps(flow_dict, option=orjson.OPT_SORT_KEYS)
+
+
+async def _project_flows(project_id: UUID, user_id: UUID) -> AsyncIterator[Flow]:
+    async with session_scope() as session:
+        stmt = select(Flow.id).where(Flow.folder_id == project_id, Flow.user_id == user_id).order_by(col(Flow.name))
+        flow_ids = (await session.exec(stmt)).all()
+    for start in range(0, len(flow_ids), BUNDLE_BATCH_SIZE):
+        async with session_scope() as session:
+            stmt = select(Flow).where(col(Flow.id).in_(flow_ids[start : start + BUNDLE_BATCH_SIZE]))
+            flows = (await session.exec(stmt.order_by(col(Flow.name)))).all()
+        for flow in flows:
+            yield flow
+
+
+async def _hash_stored_file(storage_service: StorageService, owner: str, file_name: str) -> tuple[str, int]:
+    digest = hashlib.sha256()
+    size = 0
+    async for chunk in storage_service.get_file_stream(owner, file_name, BUNDLE_CHUNK_SIZE):
+        digest.update(chunk)
+        size += len(chunk)
+    return digest.hexdigest(), size
+
+
+async def _bundle_files(
+    references: Iterable[str], *, user_id: UUID, flow_ids: set[str], storage_service: StorageService
+) -> list[tuple[BundleFile, str, str]]:
+    """Resolve file references to the stored files, one per content, with their storage folder and name.
+
+    Only the files of the user and of the flows of the bundle are included.
+    """
+    owners = {str(user_id), *flow_ids}
+    paths = []
+    for reference in references:
+        owner, _, file_name = reference.partition("/")
+        if owner in owners and file_name and "/" not in file_name:
+            paths.append(reference)
+        else:
+            logger.debug(f"Leaving file {reference} out of the bundle, it is not stored for the project")
+
+    async with session_scope() as session:
+        stmt = select(UserFile).where(UserFile.user_id == user_id, col(UserFile.path).in_(paths))
+        records = {record.path: record for record in (await session.exec(stmt)).all()}
+
+    files: dict[str, tuple[BundleFile, str, str]] = {}
+    for path in paths:
+        owner, _, file_name = path.partition("/")
+        record = records.get(path)
+        if record is not None and record.content_hash:
+            sha256, size = record.content_hash, record.size
+        else:
+            # Files stored before their content was hashed, or uploaded to a flow, are hashed here
+            try:
+                sha256, size = await _hash_stored_file(storage_service, owner, file_name)
+            except Exception:  # noqa: BLE001
+                logger.warning(f"Leaving file {path} out of the bundle, it could not be read")
+                continue
+        if sha256 in files:
+            files[sha256][0].references.append(path)
+            continue
+        name = f"{record.name}{PurePosixPath(record.path).suffix}" if record is not None else file_name
+        files[sha256] = (BundleFile(sha256=sha256, name=name, size=size, references=[path]), owner, file_name)
+    return list(files.values())
+
+
+async def _bundle_variables(names: set[str], user_id: UUID) -> list[BundleVariable]:
+    async with session_scope() as session:
+        stmt = select(Variable.name, Variable.type).where(Variable.user_id == user_id, col(Variable.name).in_(names))
+        types = dict((await session.exec(stmt)).all())
+    return [BundleVariable(name=name, type=types.get(name)) for name in sorted(names)]
+
+
+async def stream_project_bundle(
+    project: Folder, *, user_id: UUID, base: BundleManifest | None = None
+) -> AsyncIterator[bytes]:
+    """Write a bundle of a project, yielding the archive as it is written.
+
+    The flows are loaded a batch at a time and the files read from the storage a chunk at a time.
+    With a base manifest, the flows and files whose hash it has are listed in the manifest but left
+    out of the archive.
+    """
+    storage_service = get_storage_service()
+    base_flows = {flow.id: flow.sha256 for flow in base.flows} if base is not None else {}
+    base_files = {file.sha256 for file in base.files} if base is not None else set()
+    manifest = BundleManifest(
+        base_id=base.id if base is not None else None,
+        project=BundleProject(
+            id=project.id,
+            name=project.name,
+            description=project.description,
+            auth_settings=_public_auth_settings(project.auth_settings),
+        ),
+    )
+    references: dict[str, None] = {}
+    variables: set[str] = set()
+
+    output = _ZipOutput()
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        async for flow in _project_flows(project.id, user_id):
+            content = _encode_flow(flow)
+            sha256 = hashlib.sha256(content).hexdigest()
+            bundle_flow = BundleFlow(
+                id=flow.id, name=flow.name, sha256=sha256, included=base_flows.get(flow.id) != sha256
+            )
+            manifest.flows.append(bundle_flow)
+            references.update(dict.fromkeys(file_references(flow.data)))
+            variables.update(variable_names(flow.data))
+            if bundle_flow.included:
+                # Deflating is CPU bound, so it runs off the event loop
+                await asyncio.to_thread(archive.writestr, bundle_flow.path, content)
+                yield output.take()
+
+        flow_ids = {str(flow.id) for flow in manifest.flows}
+        files = await _bundle_files(references, user_id=user_id, flow_ids=flow_ids, storage_service=storage_service)
+        for bundle_file, owner, file_name in files:
+            bundle_file.included = bundle_file.sha256 not in base_files
+            manifest.files.append(bundle_file)
+            if not bundle_file.included:
+                continue
+            info = zipfile.ZipInfo(bundle_file.path)
+            # Uploaded files are mostly compressed already, so they are stored as they are
+            info.compress_type = zipfile.ZIP_STORED
+            info.file_size = bundle_file.size
+            with archive.open(info, "w", force_zip64=True) as entry:
+                async for chunk in storage_service.get_file_stream(owner, file_name, BUNDLE_CHUNK_SIZE):
+                    entry.write(chunk)
+                    if len(output) >= BUNDLE_CHUNK_SIZE:
+                        yield output.take()
+            yield output.take()
+
+        manifest.variables = await _bundle_variables(variables, user_id)
+        # Written last, as it holds the hashes of everything before it
+        await asyncio.to_thread(archive.writestr, MANIFEST_NAME, manifest.model_dump_json(indent=2))
+    yield output.take()
+
+
+class _EntryReader:
+    """Reads an entry of an archive in a worker thread, hashing it as it is read."""
+
+    def __init__(self, archive: zipfile.ZipFile, name: str) -> None:
+        self._archive = archive
+        self._name = name
+        self._entry: Any = None
+        self.digest = hashlib.sha256()
+
+    async def read(self, size: int = -1) -> bytes:
+        if self._entry is None:
+            self._entry = await asyncio.to_thread(self._archive.open, self._name)
+        chunk = await asyncio.to_thread(self._entry.read, size)
+        self.digest.update(chunk)
+        return chunk
+
+    def close(self) -> None:
+        if self._entry is not None:
+            self._entry.close()
+
+
+def read_manifest(archive: zipfile.ZipFile) -> BundleManifest:
+    """Read and validate the manifest of a bundle.
+
+    Raises:
+        BundleError: If the archive has no valid manifest or is of a newer version.
+    """
+    try:
+        manifest = BundleManifest.model_validate_json(archive.read(MANIFEST_NAME))
+    except KeyError as e:
+        msg = "The archive is not a project bundle, it has no manifest"
+        raise BundleError(msg) from e
+    except ValidationError as e:
+        msg = f"Invalid bundle manifest: {e}"
+        raise BundleError(msg) from e
+    if manifest.version > BUNDLE_VERSION:
+        msg = f"Bundle version {manifest.version} is not supported, the latest is {BUNDLE_VERSION}"
+        raise BundleError(msg)
+    return manifest
+
+
+async def _verify_entries(archive: zipfile.ZipFile, manifest: BundleManifest) -> None:
+    """Check that each object the manifest says is in the archive is, with the recorded hash."""
+    names = set(archive.namelist())
+    for obj in [*manifest.flows, *manifest.files]:
+        if not obj.included:
+            continue
+        if obj.path not in names:
+            msg = f"The bundle is missing {obj.path}"
+            raise BundleError(msg)
+        reader = _EntryReader(archive, obj.path)
+        try:
+            if isinstance(obj, BundleFlow):
+                # Flows are small enough to validate whole, one at a time
+                content = await reader.read()
+                try:
+                    FlowCreate.model_validate_json(content)
+                except ValidationError as e:
+                    msg = f"Flow {obj.name} of the bundle is invalid: {e}"
+                    raise BundleError(msg) from e
+            else:
+                while await reader.read(BUNDLE_CHUNK_SIZE):
+                    pass
+        finally:
+            reader.close()
+        if reader.digest.hexdigest() != obj.sha256:
+            msg = f"{obj.path} does not match its hash in the manifest"
+            raise BundleError(msg)
+
+
+async def _target_project(session, manifest: BundleManifest, user_id: UUID, project_id: UUID | None) -> Folder:
+    if project_id is not None:
+        stmt = select(Folder).where(Folder.id == project_id, Folder.user_id == user_id)
+        project = (await session.exec(stmt)).first()
+        if project is None:
+            msg = "Project not found"
+            raise LookupError(msg)
+    else:
+        project = Folder(
+            name=await generate_unique_folder_name(manifest.project.name, user_id, session),
+            description=manifest.project.description,
+            user_id=user_id,
+        )
+        session.add(project)
+    # The secrets were left out of the bundle, so settings the project already has are kept
+    if project.auth_settings is None and manifest.project.auth_settings:
+        project.auth_settings = manifest.project.auth_settings
+    await session.flush()
+    return project
+
+
+async def _delete_stored_files(session, files: list[UserFile], user: User, storage_service: StorageService) -> None:
+    for file in files:
+        await delete_stored_file(file, user, session, storage_service)
+        # The record is not there if the transaction storing it was rolled back
+        if (record := await session.get(UserFile, file.id)) is not None:
+            await session.delete(record)
+
+
+async def import_project_bundle(file: BinaryIO, *, user: User, project_id: UUID | None = None) -> BundleImportResult:
+    """Import a bundle into a new project, or into an existing one.
+
+    The archive is verified against its manifest before anything is written. Files the user
+    already has are reused by content, the others are stored, and the flows are pointed at the
+    stored files. Flows of the project with the id of a flow of the bundle are updated, the others
+    are created; flows of the project that are not in the bundle are left as they are.
+
+    Args:
+        file: The archive, a seekable binary file such as the spooled file of an upload.
+        user: The user the bundle is imported for.
+        project_id: The project to import into. A new project is created if not given.
+
+    Raises:
+        BundleError: If the bundle is invalid or, for a bundle made against a base bundle, the
+            objects it left out are not in the project.
+        LookupError: If the project does not exist.
+    """
+    try:
+        archive = await asyncio.to_thread(zipfile.ZipFile, file)
+    except zipfile.BadZipFile as e:
+        msg = f"The file is not a ZIP archive: {e}"
+        raise BundleError(msg) from e
+    try:
+        return await _import_bundle(archive, user=user, project_id=project_id)
+    finally:
+        archive.close()
+
+
+async def _import_bundle(archive: zipfile.ZipFile, *, user: User, project_id: UUID | None) -> BundleImportResult:
+    manifest = await asyncio.to_thread(read_manifest, archive)
+    await _verify_entries(archive, manifest)
+    storage_service = get_storage_service()
+    max_size = get_settings_service().settings.max_file_size_upload * 1024 * 1024
+
+    # Nothing is created in this transaction if the bundle cannot be applied
+    async with session_scope() as session:
+        project = await _target_project(session, manifest, user.id, project_id)
+        existing = (
+            await session.exec(
+                select(Flow.id, Flow.name, Flow.endpoint_name, Flow.folder_id).where(Flow.user_id == user.id)
+            )
+        ).all()
+        in_project = {flow_id for flow_id, _, _, folder_id in existing if folder_id == project.id}
+        left_out = [flow.name for flow in manifest.flows if not flow.included and flow.id not in in_project]
+        if left_out:
+            msg = (
+                f"Flows {', '.join(left_out)} are not in the bundle or the project; "
+                f"import bundle {manifest.base_id} first"
+            )
+            raise BundleError(msg)
+        reused: dict[str, UserFile] = {}
+        for bundle_file in manifest.files:
+            suffix = PurePosixPath(bundle_file.name).suffix
+            if stored := await get_file_by_content_hash(bundle_file.sha256, suffix, user, session):
+                reused[bundle_file.sha256] = stored
+            elif not bundle_file.included:
+                msg = f"File {bundle_file.name} is not in the bundle or stored; import bundle {manifest.base_id} first"
+                raise BundleError(msg)
+        user_variables = set((await session.exec(select(Variable.name).where(Variable.user_id == user.id))).all())
+        flow_ids = [flow.id for flow in manifest.flows]
+        taken_ids = set((await session.exec(select(Flow.id).where(col(Flow.id).in_(flow_ids)))).all())
+    result = BundleImportResult(
+        project_id=project.id,
+        missing_variables=[variable.name for variable in manifest.variables if variable.name not in user_variables],
+    )
+
+    stored_files: list[UserFile] = []
+    try:
+        paths: dict[str, str] = {}
+        async with session_scope() as session:
+            for bundle_file in manifest.files:
+                if (stored := reused.get(bundle_file.sha256)) is not None:
+                    result.files_reused += 1
+                else:
+                    reader = _EntryReader(archive, bundle_file.path)
+                    try:
+                        stored = await create_user_file(
+                            reader, bundle_file.name, user, session, storage_service, max_size
+                        )
+                    finally:
+                        reader.close()
+                    stored_files.append(stored)
+                    result.files_stored += 1
+                paths.update(dict.fromkeys(bundle_file.references, stored.path))
+
+        # The flows of the bundle are written over the project's flows with their id, so their names are free
+        updated = {flow.id for flow in manifest.flows if flow.included and flow.id in in_project}
+        names = UniqueNames({name for flow_id, name, _, _ in existing if flow_id not in updated})
+        endpoint_names = UniqueNames(
+            {endpoint for flow_id, _, endpoint, _ in existing if endpoint and flow_id not in updated},
+            pattern="{name}-{n}",
+        )
+        included = [flow for flow in manifest.flows if flow.included]
+        for start in range(0, len(included), BUNDLE_BATCH_SIZE):
+            batch = included[start : start + BUNDLE_BATCH_SIZE]
+            async with session_scope() as session:
+                for bundle_flow in batch:
+                    flow = FlowCreate.model_validate_json(await asyncio.to_thread(archive.read, bundle_flow.path))
+                    replace_file_references(flow.data, paths)
+                    flow.name = names.claim(flow.name)
+                    if flow.endpoint_name:
+                        flow.endpoint_name = endpoint_names.claim(flow.endpoint_name)
+                    if bundle_flow.id in updated:
+                        db_flow = await session.get(Flow, bundle_flow.id)
+                        for key, value in flow.model_dump(exclude=_INSTANCE_FLOW_FIELDS).items():
+                            setattr(db_flow, key, value)
+                        db_flow.updated_at = datetime.now(timezone.utc)
+                        await save_flow_version(session, db_flow)
+                        await index_flow(session, db_flow)
+                        result.flows_updated += 1
+                    else:
+                        db_flow = Flow.model_validate(flow, from_attributes=True)
+                        # Keeping the id lets the next bundle of the project update the flow
+                        db_flow.id = bundle_flow.id if bundle_flow.id not in taken_ids else uuid4()
+                        db_flow.user_id = user.id
+                        db_flow.folder_id = project.id
+                        db_flow.updated_at = datetime.now(timezone.utc)
+                        session.add(db_flow)
+                        await save_flow_version(session, db_flow)
+                        session.add(FlowSearchDocument(flow_id=db_flow.id, **extract_search_text(db_flow)))
+                        result.flows_created += 1
+    except BaseException:
+        # A failed or cancelled import leaves neither the files it stored nor a new project behind
+        try:
+            async with session_scope() as session:
+                await _delete_stored_files(session, stored_files, user, storage_service)
+                if project_id is None:
+                    await cascade_delete_folder(session, project.id)
+        except Exception:  # noqa: BLE001
+            logger.exception(f"Error cleaning up the failed bundle import into project {project.id}")
+        raise
+    return result
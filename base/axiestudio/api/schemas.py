@@ -1,7 +1,7 @@
 from pathlib import Path
 from uuid import UUID
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class UploadFileResponse(BaseModel):
@@ -12,3 +12,19 @@ class UploadFileResponse(BaseModel):
     path: Path
     size: int
     provider: str | None = None
+
+
+class UploadSessionCreate(BaseModel):
+    """Resumable upload creation schema."""
+
+    filename: str
+    size: int = Field(ge=0)
+
+
+class UploadSessionResponse(BaseModel):
+    """Resumable upload state schema."""
+
+    id: UUID
+    filename: str
+    size: int
+    offset: int
@@ -10,11 +10,15 @@ from fastapi import Depends, HTTPException, Query
 from fastapi_pagination import Params
 from loguru import logger
 from sqlalchemy import delete
+from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from axiestudio.graph.graph.base import Graph
 from axiestudio.services.auth.utils import get_current_active_user, get_current_active_user_mcp
 from axiestudio.services.database.models.flow.model import Flow
+from axiestudio.services.database.models.flow_search.crud import delete_flow_search_document
+from axiestudio.services.database.models.flow_version.crud import delete_flow_versions
+from axiestudio.services.database.models.folder.model import Folder
 from axiestudio.services.database.models.message.model import MessageTable
 from axiestudio.services.database.models.transactions.model import TransactionTable
 from axiestudio.services.database.models.user.model import User
@@ -186,7 +190,9 @@ async def build_graph_from_db_no_cache(flow_id: uuid.UUID, session: AsyncSession
         msg = "Invalid flow ID"
         raise ValueError(msg)
     kwargs["user_id"] = kwargs.get("user_id") or str(flow.user_id)
-    return await build_graph_from_data(flow_id, flow.data, flow_name=flow.name, **kwargs)
+    graph = await build_graph_from_data(flow_id, flow.data, flow_name=flow.name, **kwargs)
+    graph.flow_version = flow.version
+    return graph
 
 
 async def build_graph_from_db(flow_id: uuid.UUID, session: AsyncSession, chat_service: ChatService, **kwargs):
@@ -303,12 +309,22 @@ async def cascade_delete_flow(session: AsyncSession, flow_id: uuid.UUID) -> None
         await session.exec(delete(MessageTable).where(MessageTable.flow_id == flow_id))
         await session.exec(delete(TransactionTable).where(TransactionTable.flow_id == flow_id))
         await session.exec(delete(VertexBuildTable).where(VertexBuildTable.flow_id == flow_id))
+        await delete_flow_versions(session, flow_id)
+        await delete_flow_search_document(session, flow_id)
         await session.exec(delete(Flow).where(Flow.id == flow_id))
     except Exception as e:
         msg = f"Unable to cascade delete flow: {flow_id}"
         raise RuntimeError(msg, e) from e
 
 
+async def cascade_delete_folder(session: AsyncSession, folder_id: uuid.UUID) -> None:
+    """Delete a project along with its flows, as when an import into a new project fails."""
+    flow_ids = (await session.exec(select(Flow.id).where(Flow.folder_id == folder_id))).all()
+    for flow_id in flow_ids:
+        await cascade_delete_flow(session, flow_id)
+    await session.exec(delete(Folder).where(Folder.id == folder_id))
+
+
 def custom_params(
     page: int | None = Query(None),
     size: int | None = Query(None),
@@ -11,6 +11,7 @@ from axiestudio.api.v1.mcp import router as mcp_router
 from axiestudio.api.v1.mcp_projects import router as mcp_projects_router
 from axiestudio.api.v1.monitor import router as monitor_router
 from axiestudio.api.v1.projects import router as projects_router
+from axiestudio.api.v1.search import router as search_router
 from axiestudio.api.v1.showcase import router as showcase_router
 from axiestudio.api.v1.starter_projects import router as starter_projects_router
 from axiestudio.api.v1.subscriptions import router as subscriptions_router
@@ -33,6 +34,7 @@ __all__ = [
     "mcp_router",
     "monitor_router",
     "projects_router",
+    "search_router",
     "showcase_router",
     "starter_projects_router",
     "subscriptions_router",
@@ -11,6 +11,7 @@ from fastapi import (
     BackgroundTasks,
     Body,
     Depends,
+    Header,
     HTTPException,
     Request,
     status,
@@ -213,12 +214,22 @@ async def get_build_events(
     queue_service: Annotated[JobQueueService, Depends(get_queue_service)],
     *,
     event_delivery: EventDeliveryType = EventDeliveryType.STREAMING,
+    after: int | None = None,
+    last_event_id: Annotated[int | None, Header()] = None,
+    accept: Annotated[str | None, Header()] = None,
 ):
-    """Get events for a specific build job."""
+    """Get events for a specific build job.
+
+    Events are replayed after the ``after`` cursor or the ``Last-Event-ID`` header, the sequence
+    number of the last event received. Polled responses return that number in their
+    ``Last-Event-ID`` header, and streams sent as server-sent events as the id of each event.
+    """
     return await get_flow_events_response(
         job_id=job_id,
         queue_service=queue_service,
         event_delivery=event_delivery,
+        after=after if after is not None else last_event_id,
+        server_sent_events=accept is not None and "text/event-stream" in accept,
     )
 
 
@@ -378,6 +389,8 @@ async def build_vertex(
             next_runnable_vertices = [graph.stop_vertex]
 
         if not graph.run_manager.vertices_being_run and not next_runnable_vertices:
+            # The run is only over once no vertex is building or left to build
+            graph.end_run_state()
             background_tasks.add_task(graph.end_all_traces_in_context())
 
         build_response = VertexBuildResponse(
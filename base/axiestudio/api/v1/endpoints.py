@@ -29,7 +29,7 @@ from axiestudio.api.v1.schemas import (
 from axiestudio.custom.custom_component.component import Component
 from axiestudio.custom.utils import (
     add_code_field_to_build_config,
-    build_custom_component_template,
+    build_component_template_from_code,
     get_instance_name,
     update_component_build_config,
 )
@@ -50,7 +50,8 @@ from axiestudio.services.database.models.flow.utils import get_all_webhook_compo
 from axiestudio.services.database.models.user.model import User, UserRead
 from axiestudio.services.deps import get_session_service, get_settings_service, get_telemetry_service
 from axiestudio.services.telemetry.schema import RunPayload
-from axiestudio.utils.compression import compress_response
+from axiestudio.services.usage.service import RunQuotaExceededError
+from axiestudio.utils.compression import VersionedJSONCache, encoded_json_response
 from axiestudio.utils.version import get_version_info
 
 if TYPE_CHECKING:
@@ -60,18 +61,23 @@ if TYPE_CHECKING:
 router = APIRouter(tags=["Bas"])
 
 
+# Encodings of the component types served by /all, reused until the types change
+_all_types_cache = VersionedJSONCache()
+
+
 @router.get("/all", dependencies=[Depends(get_current_active_user)])
-async def get_all():
+async def get_all(request: Request):
     """Retrieve all component types with compression for better performance.
 
-    Returns a compressed response containing all available component types.
+    The types are encoded and compressed once per version of the component cache and served with
+    a strong ETag per encoding, so conditional requests get a 304 Not Modified response.
     """
-    from axiestudio.interface.components import get_and_cache_all_types_dict
+    from axiestudio.interface.components import component_cache, get_and_cache_all_types_dict
 
     try:
         all_types = await get_and_cache_all_types_dict(settings_service=get_settings_service())
-        # Return compressed response using our utility function
-        return compress_response(all_types)
+        encoded = await _all_types_cache.get(component_cache.version, all_types)
+        return encoded_json_response(request, encoded)
 
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc)) from exc
@@ -128,6 +134,7 @@ async def simple_run_flow(
         graph_data = flow.data.copy()
         graph_data = process_tweaks(graph_data, input_request.tweaks or {}, stream=stream)
         graph = Graph.from_payload(graph_data, flow_id=flow_id_str, user_id=str(user_id), flow_name=flow.name)
+        graph.flow_version = flow.version
         inputs = None
         if input_request.input_value is not None:
             inputs = [
@@ -368,6 +375,8 @@ async def simplified_run_flow(
                 run_error_message=str(exc),
             ),
         )
+        if isinstance(exc, RunQuotaExceededError) or isinstance(exc.__cause__, RunQuotaExceededError):
+            raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(exc)) from exc
         if "badly formed hexadecimal UUID string" in str(exc):
             # This means the Flow ID is not a valid UUID which means it can't find the flow
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
@@ -658,9 +667,7 @@ async def custom_component(
     raw_code: CustomComponentRequest,
     user: CurrentActiveUser,
 ) -> CustomComponentResponse:
-    component = Component(_code=raw_code.code)
-
-    built_frontend_node, component_instance = build_custom_component_template(component, user_id=user.id)
+    built_frontend_node, component_instance = build_component_template_from_code(raw_code.code, user_id=user.id)
     if raw_code.frontend_node is not None:
         built_frontend_node = await component_instance.update_frontend_node(built_frontend_node, raw_code.frontend_node)
 
@@ -675,6 +682,10 @@ async def custom_component(
     return CustomComponentResponse(data=built_frontend_node, type=type_)
 
 
+# The update in flight for each node being edited, keyed by user and node id
+_component_updates: dict[tuple[UUID, str], asyncio.Task] = {}
+
+
 @router.post("/custom_component/update", status_code=HTTPStatus.OK)
 async def custom_component_update(
     code_request: UpdateCustomComponentRequest,
@@ -686,16 +697,44 @@ async def custom_component_update(
     database), updates the component's build configuration, and validates outputs. Returns the updated component node as
     a JSON-serializable dictionary.
 
+    If the request names the node being edited, an update of the same node that is still in flight is cancelled
+    and answered with a 409, as its result would be overwritten anyway.
+
     Raises:
         HTTPException: If an error occurs during component building or updating.
         SerializationError: If serialization of the updated component node fails.
     """
+    if code_request.node_id is None:
+        component_node = await _update_component(code_request, user)
+    else:
+        key = (user.id, code_request.node_id)
+        if (previous := _component_updates.get(key)) is not None:
+            previous.cancel()
+        task = asyncio.create_task(_update_component(code_request, user))
+        _component_updates[key] = task
+        try:
+            component_node = await task
+        except asyncio.CancelledError:
+            if not task.done():
+                # This request was cancelled, not superseded
+                task.cancel()
+                raise
+            raise HTTPException(
+                status_code=HTTPStatus.CONFLICT, detail="Superseded by a newer update of the component"
+            ) from None
+        finally:
+            if _component_updates.get(key) is task:
+                del _component_updates[key]
+
     try:
-        component = Component(_code=code_request.code)
-        component_node, cc_instance = build_custom_component_template(
-            component,
-            user_id=user.id,
-        )
+        return jsonable_encoder(component_node)
+    except Exception as exc:
+        raise SerializationError.from_exception(exc, data=component_node) from exc
+
+
+async def _update_component(code_request: UpdateCustomComponentRequest, user: User) -> dict:
+    try:
+        component_node, cc_instance = build_component_template_from_code(code_request.code, user_id=user.id)
 
         component_node["tool_mode"] = code_request.tool_mode
 
@@ -737,11 +776,7 @@ async def custom_component_update(
 
     except Exception as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
-
-    try:
-        return jsonable_encoder(component_node)
-    except Exception as exc:
-        raise SerializationError.from_exception(exc, data=component_node) from exc
+    return component_node
 
 
 @router.get("/config")
@@ -8,7 +8,6 @@ from datetime import datetime, timezone
 from typing import Annotated
 from uuid import UUID
 
-import orjson
 from aiofile import async_open
 from anyio import Path
 from fastapi import APIRouter, Depends, File, HTTPException, Response, UploadFile
@@ -20,9 +19,11 @@ from sqlmodel import and_, col, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from axiestudio.api.utils import CurrentActiveUser, DbSession, cascade_delete_flow, remove_api_keys, validate_is_component
-from axiestudio.api.v1.schemas import FlowListCreate
+from axiestudio.api.v1.schemas import FlowListCreate  # noqa: TC001 Needed at runtime by FastAPI for the request body
+from axiestudio.helpers.flow_import import FlowExport, import_flows
 from axiestudio.helpers.user import get_user_by_flow_id_or_endpoint_name
 from axiestudio.initial_setup.constants import STARTER_FOLDER_NAME
+from axiestudio.initial_setup.setup import notify_fs_flows_changed
 from axiestudio.logging import logger
 from axiestudio.services.database.models.flow.model import (
     AccessTypeEnum,
@@ -33,9 +34,16 @@ from axiestudio.services.database.models.flow.model import (
     FlowUpdate,
 )
 from axiestudio.services.database.models.flow.utils import get_webhook_component_in_flow
+from axiestudio.services.database.models.flow_search.crud import index_flow
+from axiestudio.services.database.models.flow_version.crud import (
+    get_flow_version_data,
+    get_flow_versions,
+    save_flow_version,
+)
+from axiestudio.services.database.models.flow_version.model import FlowVersionRead
 from axiestudio.services.database.models.folder.constants import DEFAULT_FOLDER_NAME
 from axiestudio.services.database.models.folder.model import Folder
-from axiestudio.services.deps import get_settings_service
+from axiestudio.services.deps import get_settings_service, session_scope
 from axiestudio.utils.compression import compress_response
 
 # build router
@@ -51,6 +59,7 @@ async def _verify_fs_path(path: str | None) -> None:
 
 async def _save_flow_to_fs(flow: Flow) -> None:
     if flow.fs_path:
+        notify_fs_flows_changed()
         async with async_open(flow.fs_path, "w") as f:
             try:
                 await f.write(flow.model_dump_json())
@@ -140,6 +149,8 @@ async def _new_flow(
                 db_flow.folder_id = default_folder.id
 
         session.add(db_flow)
+        await save_flow_version(session, db_flow)
+        await index_flow(session, db_flow)
     except Exception as e:
         # If it is a validation error, return the error message
         if hasattr(e, "errors"):
@@ -345,6 +356,10 @@ async def update_flow(
 
         for key, value in update_data.items():
             setattr(db_flow, key, value)
+        if "data" in update_data:
+            await save_flow_version(session, db_flow)
+        if update_data.keys() & {"name", "description", "tags", "data"}:
+            await index_flow(session, db_flow)
 
         await _verify_fs_path(db_flow.fs_path)
 
@@ -382,6 +397,67 @@ async def update_flow(
     return db_flow
 
 
+@router.get("/{flow_id}/versions", response_model=list[FlowVersionRead], status_code=200)
+async def read_flow_versions(
+    *,
+    session: DbSession,
+    flow_id: UUID,
+    current_user: CurrentActiveUser,
+):
+    """Read the versions of a flow, the most recent first."""
+    if not await _read_flow(session=session, flow_id=flow_id, user_id=current_user.id):
+        raise HTTPException(status_code=404, detail="Flow not found")
+    return await get_flow_versions(session, flow_id)
+
+
+@router.get("/{flow_id}/versions/{version}", status_code=200)
+async def read_flow_version(
+    *,
+    session: DbSession,
+    flow_id: UUID,
+    version: int,
+    current_user: CurrentActiveUser,
+):
+    """Read the data of a version of a flow."""
+    if not await _read_flow(session=session, flow_id=flow_id, user_id=current_user.id):
+        raise HTTPException(status_code=404, detail="Flow not found")
+    data = await get_flow_version_data(session, flow_id, version)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Flow version not found")
+    return data
+
+
+@router.post("/{flow_id}/versions/{version}/restore", response_model=FlowRead, status_code=200)
+async def restore_flow_version(
+    *,
+    session: DbSession,
+    flow_id: UUID,
+    version: int,
+    current_user: CurrentActiveUser,
+):
+    """Restore the data of a flow from one of its versions.
+
+    The restored data is recorded as a new version, so the versions in between are kept.
+    """
+    db_flow = await _read_flow(session=session, flow_id=flow_id, user_id=current_user.id)
+    if not db_flow:
+        raise HTTPException(status_code=404, detail="Flow not found")
+    data = await get_flow_version_data(session, flow_id, version)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Flow version not found")
+
+    db_flow.data = data
+    await save_flow_version(session, db_flow)
+    await index_flow(session, db_flow)
+    db_flow.webhook = get_webhook_component_in_flow(db_flow.data) is not None
+    db_flow.updated_at = datetime.now(timezone.utc)
+    session.add(db_flow)
+    await session.commit()
+    await session.refresh(db_flow)
+    await _save_flow_to_fs(db_flow)
+    return db_flow
+
+
 @router.delete("/{flow_id}", status_code=200)
 async def delete_flow(
     *,
@@ -415,6 +491,8 @@ async def create_flows(
         flow.user_id = current_user.id
         db_flow = Flow.model_validate(flow, from_attributes=True)
         session.add(db_flow)
+        await save_flow_version(session, db_flow)
+        await index_flow(session, db_flow)
         db_flows.append(db_flow)
     await session.commit()
     for db_flow in db_flows:
@@ -425,46 +503,36 @@ async def create_flows(
 @router.post("/upload/", response_model=list[FlowRead], status_code=201)
 async def upload_file(
     *,
-    session: DbSession,
     file: Annotated[UploadFile, File(...)],
     current_user: CurrentActiveUser,
     folder_id: UUID | None = None,
+    validate_graphs: bool = False,
 ):
-    """Upload flows from a file."""
-    contents = await file.read()
-    data = orjson.loads(contents)
-    response_list = []
-    flow_list = FlowListCreate(**data) if "flows" in data else FlowListCreate(flows=[FlowCreate(**data)])
-    # Now we set the user_id for all flows
-    for flow in flow_list.flows:
-        flow.user_id = current_user.id
-        if folder_id:
-            flow.folder_id = folder_id
-        response = await _new_flow(session=session, flow=flow, user_id=current_user.id)
-        response_list.append(response)
+    """Upload flows from a file.
 
+    The file is read and imported in batches, each in its own transaction. Taken names and
+    endpoint names get a numbered suffix.
+    """
+    if folder_id is None:
+        async with session_scope() as session:
+            folder_id = (
+                await session.exec(
+                    select(Folder.id).where(Folder.name == DEFAULT_FOLDER_NAME, Folder.user_id == current_user.id)
+                )
+            ).first()
     try:
-        await session.commit()
-        for db_flow in response_list:
-            await session.refresh(db_flow)
-            await _save_flow_to_fs(db_flow)
-    except Exception as e:
-        if "UNIQUE constraint failed" in str(e):
-            # Get the name of the column that failed
-            columns = str(e).split("UNIQUE constraint failed: ")[1].split(".")[1].split("\n")[0]
-            # UNIQUE constraint failed: flow.user_id, flow.name
-            # or UNIQUE constraint failed: flow.name
-            # if the column has id in it, we want the other column
-            column = columns.split(",")[1] if "id" in columns.split(",")[0] else columns.split(",")[0]
-
-            raise HTTPException(
-                status_code=400, detail=f"{column.capitalize().replace('_', ' ')} must be unique"
-            ) from e
-        if isinstance(e, HTTPException):
-            raise
-        raise HTTPException(status_code=500, detail=str(e)) from e
+        export = await FlowExport.open(file)
+        result = await import_flows(
+            export.flows(), user_id=current_user.id, folder_id=folder_id, validate_graphs=validate_graphs
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
 
-    return response_list
+    for db_flow in result.flows:
+        if db_flow.fs_path:
+            await _verify_fs_path(db_flow.fs_path)
+            await _save_flow_to_fs(db_flow)
+    return result.flows
 
 
 @router.delete("/")
@@ -1,15 +1,18 @@
+import asyncio
 from typing import Annotated
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
 from fastapi_pagination import Page, Params
 from fastapi_pagination.ext.sqlmodel import apaginate
 from sqlalchemy import delete
 from sqlmodel import col, select
 
-from axiestudio.api.utils import DbSession, custom_params
+from axiestudio.api.utils import CurrentActiveUser, DbSession, custom_params
+from axiestudio.graph.graph.capsule import CAPSULE_SUFFIX, get_capsule_dir
 from axiestudio.schema.message import MessageResponse
-from axiestudio.services.auth.utils import get_current_active_user
+from axiestudio.services.auth.utils import get_current_active_superuser, get_current_active_user
 from axiestudio.services.database.models.message.model import MessageRead, MessageTable, MessageUpdate
 from axiestudio.services.database.models.transactions.crud import transform_transaction_table
 from axiestudio.services.database.models.transactions.model import TransactionTable
@@ -18,6 +21,9 @@ from axiestudio.services.database.models.vertex_builds.crud import (
     get_vertex_builds_by_flow_id,
 )
 from axiestudio.services.database.models.vertex_builds.model import VertexBuildMapModel
+from axiestudio.services.deps import get_db_service, get_tracing_service, get_usage_service
+from axiestudio.services.tracing.local import LocalTraceStore
+from axiestudio.services.tracing.schema import TraceRunRead
 
 router = APIRouter(prefix="/monitor", tags=["Monitor"])
 
@@ -201,3 +207,82 @@ async def get_transactions(
             return await apaginate(session, stmt, params=params, transformer=transform_transaction_table)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) from e
+
+
+def _get_local_trace_store() -> LocalTraceStore:
+    store = get_tracing_service().local_trace_store
+    if store is None:
+        raise HTTPException(status_code=404, detail="Local tracing is not enabled")
+    return store
+
+
+@router.get("/traces")
+async def get_traces(
+    current_user: CurrentActiveUser,
+    session_id: Annotated[str | None, Query()] = None,
+    limit: Annotated[int, Query(ge=1, le=500)] = 50,
+) -> list[TraceRunRead]:
+    """List the most recent runs of the current user in the local trace store, without their spans."""
+    store = _get_local_trace_store()
+    try:
+        runs = await asyncio.to_thread(
+            store.list_runs, user_id=str(current_user.id), session_id=session_id, limit=limit
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e)) from e
+    return [TraceRunRead.model_validate(run) for run in runs]
+
+
+@router.get("/traces/{run_id}")
+async def get_trace(run_id: UUID, current_user: CurrentActiveUser) -> TraceRunRead:
+    """Get a run from the local trace store with its span tree and the latency and token usage of each span."""
+    store = _get_local_trace_store()
+    try:
+        run = await asyncio.to_thread(store.get_run, str(run_id), user_id=str(current_user.id))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e)) from e
+    if run is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return TraceRunRead.model_validate(run)
+
+
+@router.get("/usage")
+async def get_usage(
+    current_user: CurrentActiveUser,
+    user_id: Annotated[UUID | None, Query()] = None,
+) -> dict:
+    """Get the resources used by the runs of the current user, in total, by flow and by API key.
+
+    Usage is counted by each worker, so this covers the runs of the worker answering the request.
+    Superusers can get the usage of another user.
+    """
+    if user_id is not None and user_id != current_user.id and not current_user.is_superuser:
+        raise HTTPException(status_code=403, detail="Only superusers can get the usage of another user")
+    return get_usage_service().get_usage(str(user_id or current_user.id))
+
+
+@router.get("/database", dependencies=[Depends(get_current_active_superuser)])
+async def get_database_pool_stats() -> dict:
+    """Get how the connections of the database pools are used: in use, checkout waits and long-held ones."""
+    return get_db_service().get_pool_stats()
+
+
+@router.get("/capsules")
+async def get_capsules(current_user: CurrentActiveUser) -> list[dict]:
+    """List the run capsules of the current user, the most recent first."""
+    directory = get_capsule_dir(str(current_user.id))
+    if directory is None or not directory.exists():
+        return []
+    capsules = [(path, path.stat()) for path in directory.glob(f"*{CAPSULE_SUFFIX}")]
+    capsules.sort(key=lambda item: item[1].st_mtime, reverse=True)
+    return [{"run_id": path.stem, "created_at": stat.st_mtime, "size": stat.st_size} for path, stat in capsules]
+
+
+@router.get("/capsules/{run_id}")
+async def download_capsule(run_id: UUID, current_user: CurrentActiveUser) -> FileResponse:
+    """Download a run capsule of the current user, to replay it with `axiestudio replay`."""
+    directory = get_capsule_dir(str(current_user.id))
+    path = directory / f"{run_id}{CAPSULE_SUFFIX}" if directory is not None else None
+    if path is None or not path.exists():
+        raise HTTPException(status_code=404, detail="Capsule not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=path.name)
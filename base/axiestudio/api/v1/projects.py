@@ -1,28 +1,43 @@
 import io
 import json
 import zipfile
+from collections.abc import AsyncIterator
 from datetime import datetime, timezone
 from typing import Annotated
 from urllib.parse import quote
 from uuid import UUID
 
-import orjson
 from fastapi import APIRouter, Depends, File, HTTPException, Response, UploadFile, status
 from fastapi.encoders import jsonable_encoder
 from fastapi.responses import StreamingResponse
 from fastapi_pagination import Params
 from fastapi_pagination.ext.sqlmodel import apaginate
+from loguru import logger
 from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
 from sqlmodel import select
 
-from axiestudio.api.utils import CurrentActiveUser, DbSession, cascade_delete_flow, custom_params, remove_api_keys
-from axiestudio.api.v1.flows import create_flows
-from axiestudio.api.v1.schemas import FlowListCreate
-from axiestudio.helpers.flow import generate_unique_flow_name
+from axiestudio.api.project_bundle import (
+    BundleError,
+    BundleImportResult,
+    BundleManifest,
+    import_project_bundle,
+    stream_project_bundle,
+)
+from axiestudio.api.utils import (
+    CurrentActiveUser,
+    DbSession,
+    cascade_delete_flow,
+    cascade_delete_folder,
+    custom_params,
+    remove_api_keys,
+)
+from axiestudio.helpers.flow_import import FlowExport, import_flows
 from axiestudio.helpers.folders import generate_unique_folder_name
 from axiestudio.initial_setup.constants import STARTER_FOLDER_NAME
-from axiestudio.services.database.models.flow.model import Flow, FlowCreate, FlowRead
+from axiestudio.services.database.models.flow.model import Flow, FlowRead
+from axiestudio.services.database.models.flow_search.crud import ranked_flow_ids
 from axiestudio.services.database.models.folder.constants import DEFAULT_FOLDER_NAME
 from axiestudio.services.database.models.folder.model import (
     Folder,
@@ -32,9 +47,13 @@ from axiestudio.services.database.models.folder.model import (
     FolderUpdate,
 )
 from axiestudio.services.database.models.folder.pagination_model import FolderWithPaginatedFlows
+from axiestudio.services.deps import session_scope
 
 router = APIRouter(prefix="/projects", tags=["Projects"])
 
+# Times the creation of a project is retried after its name was taken meanwhile
+MAX_PROJECT_NAME_RETRIES = 3
+
 
 @router.post("/", response_model=FolderRead, status_code=201)
 async def create_project(
@@ -125,14 +144,12 @@ async def read_project(
     is_flow: bool = False,
     search: str = "",
 ):
+    paginated = bool(params and params.page and params.size)
     try:
-        project = (
-            await session.exec(
-                select(Folder)
-                .options(selectinload(Folder.flows))
-                .where(Folder.id == project_id, Folder.user_id == current_user.id)
-            )
-        ).first()
+        stmt = select(Folder).where(Folder.id == project_id, Folder.user_id == current_user.id)
+        if not paginated:
+            stmt = stmt.options(selectinload(Folder.flows))
+        project = (await session.exec(stmt)).first()
     except Exception as e:
         if "No result found" in str(e):
             raise HTTPException(status_code=404, detail="Project not found") from e
@@ -142,17 +159,18 @@ async def read_project(
         raise HTTPException(status_code=404, detail="Project not found")
 
     try:
-        if params and params.page and params.size:
+        if paginated:
             stmt = select(Flow).where(Flow.folder_id == project_id)
 
+            ranked = await ranked_flow_ids(session, search) if search else None
+            if ranked is not None:
+                stmt = stmt.join(ranked, ranked.c.flow_id == Flow.id).order_by(ranked.c.rank)
             if Flow.updated_at is not None:
                 stmt = stmt.order_by(Flow.updated_at.desc())  # type: ignore[attr-defined]
             if is_component:
                 stmt = stmt.where(Flow.is_component == True)  # noqa: E712
             if is_flow:
                 stmt = stmt.where(Flow.is_component == False)  # noqa: E712
-            if search:
-                stmt = stmt.where(Flow.name.like(f"%{search}%"))  # type: ignore[attr-defined]
             import warnings
 
             with warnings.catch_warnings():
@@ -315,45 +333,140 @@ async def download_file(
         raise HTTPException(status_code=500, detail=str(e)) from e
 
 
-@router.post("/upload/", response_model=list[FlowRead], status_code=201)
-async def upload_file(
+@router.get("/{project_id}/bundle", status_code=200)
+async def export_project_bundle(
     *,
-    session: DbSession,
-    file: Annotated[UploadFile, File(...)],
+    project_id: UUID,
     current_user: CurrentActiveUser,
 ):
-    """Upload flows from a file."""
-    contents = await file.read()
-    data = orjson.loads(contents)
+    """Download a project as a bundle: its flows, the files they use and the names of their variables.
 
-    if not data:
-        raise HTTPException(status_code=400, detail="No flows found in the file")
+    The archive is streamed as it is written.
+    """
+    return await _project_bundle_response(project_id, current_user)
+
+
+@router.post("/{project_id}/bundle", status_code=200)
+async def export_project_bundle_changes(
+    *,
+    project_id: UUID,
+    base: BundleManifest,
+    current_user: CurrentActiveUser,
+):
+    """Download a bundle of a project with only the flows and files that changed since a previous bundle.
 
-    project_name = await generate_unique_folder_name(data["folder_name"], current_user.id, session)
+    The body is the manifest of the previous bundle.
+    """
+    return await _project_bundle_response(project_id, current_user, base=base)
 
-    data["folder_name"] = project_name
 
-    project = FolderCreate(name=data["folder_name"], description=data["folder_description"])
+async def _project_bundle_response(
+    project_id: UUID, current_user: CurrentActiveUser, base: BundleManifest | None = None
+) -> StreamingResponse:
+    async with session_scope() as session:
+        stmt = select(Folder).where(Folder.id == project_id, Folder.user_id == current_user.id)
+        project = (await session.exec(stmt)).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if base is not None and base.project.id != project.id:
+        raise HTTPException(status_code=400, detail="The base bundle is of another project")
 
-    new_project = Folder.model_validate(project, from_attributes=True)
-    new_project.id = None
-    new_project.user_id = current_user.id
-    session.add(new_project)
-    await session.commit()
-    await session.refresh(new_project)
+    current_time = datetime.now(tz=timezone.utc).astimezone().strftime("%Y%m%d_%H%M%S")
+    encoded_filename = quote(f"{current_time}_{project.name}_bundle.zip")
+    return StreamingResponse(
+        stream_project_bundle(project, user_id=current_user.id, base=base),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{encoded_filename}"},
+    )
 
-    del data["folder_name"]
-    del data["folder_description"]
 
-    if "flows" in data:
-        flow_list = FlowListCreate(flows=[FlowCreate(**flow) for flow in data["flows"]])
-    else:
+@router.post("/bundle/", response_model=BundleImportResult, status_code=201)
+async def import_bundle(
+    *,
+    file: Annotated[UploadFile, File(...)],
+    current_user: CurrentActiveUser,
+    project_id: UUID | None = None,
+):
+    """Import a project bundle into a new project, or into an existing one to apply a bundle of its changes."""
+    try:
+        return await import_project_bundle(file.file, user=current_user, project_id=project_id)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    except BundleError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+
+@router.post("/upload/", response_model=list[FlowRead], status_code=201)
+async def upload_file(
+    *,
+    file: Annotated[UploadFile, File(...)],
+    current_user: CurrentActiveUser,
+    validate_graphs: bool = False,
+):
+    """Upload flows from a file.
+
+    The file is read and imported in batches, each in its own transaction, so a large export does
+    not hold a database session for the whole import. If the import fails, the project is deleted
+    with the flows already imported.
+
+    The project is named before its flows are imported, so when the project fields come after the
+    flows in the file, as exports do not write them, the flows are read into memory first.
+    """
+    try:
+        export = await FlowExport.open(file)
+        flows = export.flows()
+        if export.has_flows and "folder_name" not in export.metadata:
+            flows = _iterate([flow async for flow in flows])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid file: {e}") from e
+
+    if not export.metadata or "folder_name" not in export.metadata:
+        raise HTTPException(status_code=400, detail="No flows found in the file")
+    if not export.has_flows:
         raise HTTPException(status_code=400, detail="No flows found in the data")
-    # Now we set the user_id for all flows
-    for flow in flow_list.flows:
-        flow_name = await generate_unique_flow_name(flow.name, current_user.id, session)
-        flow.name = flow_name
-        flow.user_id = current_user.id
-        flow.folder_id = new_project.id
-
-    return await create_flows(session=session, flow_list=flow_list, current_user=current_user)
+
+    project_id = await _create_project(
+        export.metadata["folder_name"], export.metadata.get("folder_description"), current_user.id
+    )
+    try:
+        result = await import_flows(
+            flows, user_id=current_user.id, folder_id=project_id, validate_graphs=validate_graphs
+        )
+    except BaseException as e:
+        # A failed or cancelled import leaves no partial project behind
+        try:
+            async with session_scope() as session:
+                await cascade_delete_folder(session, project_id)
+        except Exception:  # noqa: BLE001
+            logger.exception(f"Error deleting the project {project_id} of a failed import")
+        if isinstance(e, ValueError):
+            raise HTTPException(status_code=400, detail=str(e)) from e
+        if isinstance(e, IntegrityError):
+            raise HTTPException(status_code=409, detail="The flow names kept conflicting, try again") from e
+        raise
+    return result.flows
+
+
+async def _create_project(name: str, description: str | None, user_id: UUID) -> UUID:
+    """Create a project with a unique name, taking the next one if another request takes it meanwhile."""
+    retries = 0
+    while True:
+        try:
+            async with session_scope() as session:
+                project_name = await generate_unique_folder_name(name, user_id, session)
+                project = FolderCreate(name=project_name, description=description)
+                new_project = Folder.model_validate(project, from_attributes=True)
+                new_project.id = None
+                new_project.user_id = user_id
+                session.add(new_project)
+                await session.flush()
+                return new_project.id
+        except IntegrityError as e:
+            retries += 1
+            if retries > MAX_PROJECT_NAME_RETRIES:
+                raise HTTPException(status_code=409, detail="The project name kept conflicting, try again") from e
+
+
+async def _iterate(items: list) -> AsyncIterator:
+    for item in items:
+        yield item
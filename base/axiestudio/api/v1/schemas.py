@@ -206,6 +206,8 @@ class UpdateCustomComponentRequest(CustomComponentRequest):
     field_value: str | int | float | bool | dict | list | None = None
     template: dict
     tool_mode: bool = False
+    node_id: str | None = None
+    """The id of the node being edited, so a newer update of the node cancels the one in flight."""
 
     def get_template(self):
         return dotdict(self.template)
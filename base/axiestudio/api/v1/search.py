@@ -0,0 +1,44 @@
+from typing import Annotated
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi_pagination import Page, Params
+
+from axiestudio.api.utils import CurrentActiveUser, DbSession, custom_params
+from axiestudio.services.database.models.flow_search import FlowSearchResult
+from axiestudio.services.database.models.flow_search.crud import search_flows
+
+router = APIRouter(prefix="/search", tags=["Search"])
+
+
+@router.get("/flows", response_model=Page[FlowSearchResult], status_code=200)
+async def search_user_flows(
+    *,
+    session: DbSession,
+    current_user: CurrentActiveUser,
+    params: Annotated[Params | None, Depends(custom_params)],
+    q: Annotated[str, Query(max_length=500)] = "",
+    project_id: UUID | None = None,
+    is_component: bool | None = None,
+):
+    """Search the flows and components of the current user by name, description, tags, components and prompts.
+
+    The most relevant flows come first. Only the fields shown in listings are returned, not the flow data.
+    """
+    try:
+        import warnings
+
+        with warnings.catch_warnings():
+            warnings.filterwarnings(
+                "ignore", category=DeprecationWarning, module=r"fastapi_pagination\.ext\.sqlalchemy"
+            )
+            return await search_flows(
+                session,
+                q,
+                user_id=current_user.id,
+                params=params or Params(),
+                folder_id=project_id,
+                is_component=is_component,
+            )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e)) from e
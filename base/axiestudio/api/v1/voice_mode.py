@@ -22,8 +22,8 @@ from openai import OpenAI
 from sqlalchemy import select
 from starlette.websockets import WebSocket, WebSocketDisconnect
 
+from axiestudio.api.invoke import invoke_flow
 from axiestudio.api.utils import CurrentActiveUser, DbSession
-from axiestudio.api.v1.chat import build_flow_and_stream
 from axiestudio.api.v1.schemas import InputValueRequest
 from axiestudio.logging import logger
 from axiestudio.memory import aadd_messagetables
@@ -33,11 +33,7 @@ from axiestudio.services.database.models.flow.model import Flow
 from axiestudio.services.database.models.message.model import MessageTable
 from axiestudio.services.database.models.user.model import User
 from axiestudio.services.deps import get_variable_service, session_scope
-from axiestudio.utils.voice_utils import (
-    BYTES_PER_24K_FRAME,
-    VAD_SAMPLE_RATE_16K,
-    resample_24k_to_16k,
-)
+from axiestudio.utils.voice_utils import SpeechDetector
 
 router = APIRouter(prefix="/voice", tags=["Voice"])
 
@@ -428,28 +424,12 @@ async def handle_function_call(
         input_request = InputValueRequest(
             input_value=args.get("input"), components=[], type="chat", session=conversation_id
         )
-        response = await build_flow_and_stream(
-            flow_id=UUID(flow_id),
-            inputs=input_request,
-            background_tasks=background_tasks,
-            current_user=current_user,
-        )
-        result = ""
-        async for line in response.body_iterator:
-            if not line:
-                continue
-            event_data = json.loads(line)
-            msg_handler.client_send({"type": "flow.build.progress", "data": event_data})
-            if event_data.get("event") == "end_vertex":
-                text_part = (
-                    event_data.get("data", {})
-                    .get("build_data", "")
-                    .get("data", {})
-                    .get("results", {})
-                    .get("message", {})
-                    .get("text", "")
-                )
-                result += text_part
+        async with invoke_flow(
+            flow_id, user=current_user, inputs=input_request, background_tasks=background_tasks
+        ) as invocation:
+            async for event in invocation:
+                msg_handler.client_send({"type": "flow.build.progress", "data": event.to_dict()})
+        result = "".join(invocation.result.messages)
         function_output = {
             "type": "conversation.item.create",
             "item": {
@@ -773,36 +753,28 @@ async def flow_as_tool_websocket(
             session_update = {"type": "session.update", "session": openai_realtime_session}
             msg_handler.openai_send(session_update)
 
-            # Setup for VAD processing.
-            vad_queue: asyncio.Queue = asyncio.Queue()
-            vad_audio_buffer = bytearray()
+            # Setup for VAD processing, which runs on the DSP worker threads
+            speech_detector: SpeechDetector | None = None
+            if voice_config.barge_in_enabled:
+                try:
+                    speech_detector = SpeechDetector(get_vad())
+                except ImportError:
+                    logger.warning("Barge-in needs the webrtcvad package, install the audio extra to enable it")
             bot_speaking_flag = [False]
 
-            async def process_vad_audio() -> None:
-                nonlocal vad_audio_buffer
+            async def process_vad_audio(speech_detector: SpeechDetector) -> None:
                 last_speech_time = datetime.now(tz=timezone.utc)
-                vad = get_vad()
                 while True:
-                    base64_data = await vad_queue.get()
-                    raw_chunk_24k = base64.b64decode(base64_data)
-                    vad_audio_buffer.extend(raw_chunk_24k)
-                    has_speech = False
-                    while len(vad_audio_buffer) >= BYTES_PER_24K_FRAME:
-                        frame_24k = vad_audio_buffer[:BYTES_PER_24K_FRAME]
-                        del vad_audio_buffer[:BYTES_PER_24K_FRAME]
-                        try:
-                            frame_16k = resample_24k_to_16k(frame_24k)
-                            is_speech = vad.is_speech(frame_16k, VAD_SAMPLE_RATE_16K)
-                            if is_speech:
-                                has_speech = True
-                                logger.trace("!", end="")
-                                if bot_speaking_flag[0]:
-                                    msg_handler.openai_send({"type": "response.cancel"})
-                                    bot_speaking_flag[0] = False
-                        except Exception as e:  # noqa: BLE001
-                            logger.error(f"[ERROR] VAD processing failed (ValueError): {e}")
-                            continue
+                    try:
+                        has_speech = await speech_detector.detect()
+                    except Exception as e:  # noqa: BLE001
+                        logger.error(f"[ERROR] VAD processing failed: {e}")
+                        continue
                     if has_speech:
+                        logger.trace("!", end="")
+                        if bot_speaking_flag[0]:
+                            msg_handler.openai_send({"type": "response.cancel"})
+                            bot_speaking_flag[0] = False
                         last_speech_time = datetime.now(tz=timezone.utc)
                         logger.trace(".", end="")
                     else:
@@ -945,8 +917,8 @@ async def flow_as_tool_websocket(
                             num_audio_samples += len(base64_data)
                             event = {"type": "input_audio_buffer.append", "audio": base64_data}
                             msg_handler.openai_send(event)
-                            if voice_config.barge_in_enabled:
-                                await vad_queue.put(base64_data)
+                            if speech_detector is not None:
+                                speech_detector.feed(base64_data)
                         elif msg.get("type") == "response.create":
                             create_response(msg)
                         elif msg.get("type") == "input_audio_buffer.commit":
@@ -1092,9 +1064,9 @@ async def flow_as_tool_websocket(
                 except (WebSocketDisconnect, websockets.ConnectionClosedOK, websockets.ConnectionClosedError):
                     pass
 
-            if voice_config.barge_in_enabled:
+            if speech_detector is not None:
                 # Store the task reference to prevent it from being garbage collected
-                vad_task = asyncio.create_task(process_vad_audio())
+                vad_task = asyncio.create_task(process_vad_audio(speech_detector))
 
             try:
                 # Use gather with return_exceptions to collect any exceptions
@@ -1118,6 +1090,12 @@ async def flow_as_tool_websocket(
                     await openai_ws.close()
 
                 await close()
+                if speech_detector is not None:
+                    stats = speech_detector.stats
+                    logger.debug(
+                        f"Voice session {session_id} audio: {stats.chunks} chunks in {stats.batches} batches, "
+                        f"{stats.dropped_chunks} dropped, lag {stats.mean_lag:.3f}s mean / {stats.max_lag:.3f}s max"
+                    )
     except Exception as e:  # noqa: BLE001
         logger.error(f"Unexpected error: {e}")
         logger.error(traceback.format_exc())
@@ -1255,29 +1233,12 @@ async def flow_tts_websocket(
                                 input_request = InputValueRequest(
                                     input_value=transcript, components=[], type="chat", session=session_id
                                 )
-                                response = await build_flow_and_stream(
-                                    flow_id=UUID(flow_id),
-                                    inputs=input_request,
-                                    background_tasks=background_tasks,
-                                    current_user=current_user,
-                                )
-                                result = ""
-                                async for line in response.body_iterator:
-                                    if not line:
-                                        continue
-                                    event_data = json.loads(line)
-                                    client_send({"type": "flow.build.progress", "data": event_data})
-                                    if event_data.get("event") == "end_vertex":
-                                        text = (
-                                            event_data.get("data", {})
-                                            .get("build_data", "")
-                                            .get("data", {})
-                                            .get("results", {})
-                                            .get("message", {})
-                                            .get("text", "")
-                                        )
-                                        if text:
-                                            result = text
+                                async with invoke_flow(
+                                    flow_id, user=current_user, inputs=input_request, background_tasks=background_tasks
+                                ) as invocation:
+                                    async for flow_event in invocation:
+                                        client_send({"type": "flow.build.progress", "data": flow_event.to_dict()})
+                                result = invocation.result.text
                                 if result != "":
                                     if tts_config.use_elevenlabs:
                                         elevenlabs_client = await get_or_create_elevenlabs_client(
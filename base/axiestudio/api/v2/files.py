@@ -1,5 +1,10 @@
+import asyncio
+import hashlib
 import io
+import json
+import os
 import re
+import time
 import uuid
 import zipfile
 from collections.abc import AsyncGenerator, AsyncIterable
@@ -7,17 +12,21 @@ from datetime import datetime
 from http import HTTPStatus
 from pathlib import Path
 from typing import Annotated
+from weakref import WeakValueDictionary
 from zoneinfo import ZoneInfo
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+import anyio
+from aiofile import async_open
+from fastapi import APIRouter, Depends, File, HTTPException, Request, UploadFile
 from fastapi.responses import StreamingResponse
 from loguru import logger
-from sqlmodel import col, select
+from sqlmodel import col, or_, select
 
-from axiestudio.api.schemas import UploadFileResponse
+from axiestudio.api.schemas import UploadFileResponse, UploadSessionCreate, UploadSessionResponse
 from axiestudio.api.utils import CurrentActiveUser, DbSession
 from axiestudio.services.database.models.file.model import File as UserFile
 from axiestudio.services.deps import get_settings_service, get_storage_service
+from axiestudio.services.settings.service import SettingsService
 from axiestudio.services.storage.service import StorageService
 
 router = APIRouter(tags=["Files"], prefix="/files")
@@ -25,6 +34,10 @@ router = APIRouter(tags=["Files"], prefix="/files")
 # Set the static name of the MCP servers file
 MCP_SERVERS_FILE = "_mcp_servers"
 SAMPLE_DATA_DIR = Path(__file__).parent / "sample_data"
+# Size of the chunks uploads are streamed to the storage service in
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Seconds an unfinished resumable upload is kept before it is discarded
+UPLOAD_SESSION_TTL = 24 * 60 * 60
 
 
 async def byte_stream_generator(file_input, chunk_size: int = 8192) -> AsyncGenerator[bytes, None]:
@@ -63,21 +76,173 @@ async def fetch_file_object(file_id: uuid.UUID, current_user: CurrentActiveUser,
     return file
 
 
-async def save_file_routine(file, storage_service, current_user: CurrentActiveUser, file_content=None, file_name=None):
-    """Routine to save the file content to the storage service."""
+class StreamDigest:
+    """Running SHA-256 and size of a byte stream, optionally capped at a maximum size."""
+
+    def __init__(self, max_size: int | None = None):
+        self.max_size = max_size
+        self.size = 0
+        self._hash = hashlib.sha256()
+
+    @property
+    def hexdigest(self) -> str:
+        """The SHA-256 of the content seen so far, in hex."""
+        return self._hash.hexdigest()
+
+    async def wrap(self, chunks: AsyncIterable[bytes]) -> AsyncGenerator[bytes, None]:
+        """Yield the chunks unchanged while hashing and counting them."""
+        async for chunk in chunks:
+            self.size += len(chunk)
+            if self.max_size is not None and self.size > self.max_size:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"File size is larger than the maximum file size {self.max_size // (1024 * 1024)}MB.",
+                )
+            self._hash.update(chunk)
+            yield chunk
+
+
+async def save_file_routine(
+    file,
+    storage_service,
+    current_user: CurrentActiveUser,
+    file_content=None,
+    file_name=None,
+    digest: StreamDigest | None = None,
+):
+    """Routine to stream the file content to the storage service.
+
+    The content is read in ``UPLOAD_CHUNK_SIZE`` chunks, so an upload is never held in memory
+    as a whole. When ``digest`` is given, it is fed the content as it goes.
+    """
     file_id = uuid.uuid4()
 
-    if not file_content:
-        file_content = await file.read()
     if not file_name:
         file_name = file.filename
 
+    chunks = byte_stream_generator(file_content or file, chunk_size=UPLOAD_CHUNK_SIZE)
+    if digest is not None:
+        chunks = digest.wrap(chunks)
+
     # Save the file using the storage service.
-    await storage_service.save_file(flow_id=str(current_user.id), file_name=file_name, data=file_content)
+    await storage_service.save_file_stream(flow_id=str(current_user.id), file_name=file_name, chunks=chunks)
 
     return file_id, file_name
 
 
+async def get_unique_file_name(
+    file_name: str, current_user: CurrentActiveUser, session: DbSession, storage_service: StorageService
+) -> tuple[str, str]:
+    """Return the name to record a new file under and the name to store it under.
+
+    A number is appended to the name if it is taken, except for the MCP servers file, which
+    replaces the existing one instead.
+    """
+    try:
+        root_filename, file_extension = file_name.rsplit(".", 1)
+    except ValueError:
+        root_filename, file_extension = file_name, ""
+
+    # Special handling for the MCP servers config file: always keep the same root filename
+    if root_filename == MCP_SERVERS_FILE:
+        # Check if an existing record exists; if so, delete it to replace with the new one
+        existing_mcp_file = await get_file_by_name(root_filename, current_user, session)
+        if existing_mcp_file:
+            await delete_file(existing_mcp_file.id, current_user, session, storage_service)
+        return root_filename, file_name
+
+    # For normal files, ensure unique name by appending a count if necessary. Only the exact
+    # name and its numbered variants are fetched, both through the index on the name
+    stmt = select(UserFile.name).where(
+        or_(
+            col(UserFile.name) == root_filename,
+            col(UserFile.name).startswith(f"{root_filename} (", autoescape=True),
+        )
+    )
+    names = (await session.exec(stmt)).all()
+
+    if names:
+        # Extract the count from the filename
+        counts = [int(match.group(1)) for name in names if (match := re.search(r"\((\d+)\)(?=\.\w+$|$)", name))]
+        count = max(counts) if counts else 0
+        root_filename = f"{root_filename} ({count + 1})"
+
+    # Create the unique filename with extension for storage
+    return root_filename, f"{root_filename}.{file_extension}" if file_extension else root_filename
+
+
+async def get_file_by_content_hash(
+    content_hash: str, suffix: str, current_user: CurrentActiveUser, session: DbSession
+) -> UserFile | None:
+    """Get a file of the current user with the given content and file extension."""
+    stmt = select(UserFile).where(UserFile.user_id == current_user.id).where(UserFile.content_hash == content_hash)
+    files = (await session.exec(stmt)).all()
+    return next((file for file in files if Path(file.path).suffix == suffix), None)
+
+
+async def create_user_file(
+    file,
+    file_name: str,
+    current_user: CurrentActiveUser,
+    session: DbSession,
+    storage_service: StorageService,
+    max_size: int | None = None,
+) -> UserFile:
+    """Stream a file to the storage service and record it for the current user.
+
+    The content is hashed while it is stored. If the user already has a file with the same
+    content, the copy just written is dropped and the new record shares the stored object.
+    """
+    root_filename, unique_filename = await get_unique_file_name(file_name, current_user, session, storage_service)
+
+    digest = StreamDigest(max_size)
+    try:
+        file_id, stored_file_name = await save_file_routine(
+            file, storage_service, current_user, file_name=unique_filename, digest=digest
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error saving file: {e}") from e
+
+    path = f"{current_user.id}/{stored_file_name}"
+    duplicate = await get_file_by_content_hash(digest.hexdigest, Path(path).suffix, current_user, session)
+    if duplicate is not None and duplicate.path != path:
+        await storage_service.delete_file(flow_id=str(current_user.id), file_name=stored_file_name)
+        path = duplicate.path
+
+    new_file = UserFile(
+        id=file_id,
+        user_id=current_user.id,
+        name=root_filename,
+        path=path,
+        size=digest.size,
+        content_hash=digest.hexdigest,
+    )
+    session.add(new_file)
+
+    await session.commit()
+    await session.refresh(new_file)
+    return new_file
+
+
+async def delete_stored_file(
+    file: UserFile, current_user: CurrentActiveUser, session: DbSession, storage_service: StorageService
+) -> None:
+    """Delete the stored object of a file, unless another file of the user shares it."""
+    if file.content_hash is not None:
+        stmt = (
+            select(UserFile.id)
+            .where(UserFile.user_id == current_user.id)
+            .where(UserFile.content_hash == file.content_hash)
+            .where(UserFile.path == file.path)
+            .where(UserFile.id != file.id)
+        )
+        if (await session.exec(stmt)).first() is not None:
+            return
+    await storage_service.delete_file(flow_id=str(current_user.id), file_name=file.path.split("/")[-1])
+
+
 @router.post("", status_code=HTTPStatus.CREATED)
 @router.post("/", status_code=HTTPStatus.CREATED)
 async def upload_user_file(
@@ -98,8 +263,10 @@ async def upload_user_file(
     if not file or not file.filename:
         raise HTTPException(status_code=400, detail="No file provided")
 
-    # Validate file size (convert MB to bytes)
-    if file.size > max_file_size_upload * 1024 * 1024:
+    # Validate file size (convert MB to bytes). The size is checked again while streaming,
+    # as it is not known up front for every upload
+    max_size = max_file_size_upload * 1024 * 1024
+    if file.size is not None and file.size > max_size:
         raise HTTPException(
             status_code=413,
             detail=f"File size is larger than the maximum file size {max_file_size_upload}MB.",
@@ -107,74 +274,187 @@ async def upload_user_file(
 
     # Create a new database record for the uploaded file.
     try:
-        # Enforce unique constraint on name, except for the special _mcp_servers file
-        new_filename = file.filename
-        try:
-            root_filename, file_extension = new_filename.rsplit(".", 1)
-        except ValueError:
-            root_filename, file_extension = new_filename, ""
-
-        # Special handling for the MCP servers config file: always keep the same root filename
-        if root_filename == MCP_SERVERS_FILE:
-            # Check if an existing record exists; if so, delete it to replace with the new one
-            existing_mcp_file = await get_file_by_name(root_filename, current_user, session)
-            if existing_mcp_file:
-                await delete_file(existing_mcp_file.id, current_user, session, storage_service)
-            unique_filename = new_filename
-        else:
-            # For normal files, ensure unique name by appending a count if necessary
-            stmt = select(UserFile).where(col(UserFile.name).like(f"{root_filename}%"))
-            existing_files = await session.exec(stmt)
-            files = existing_files.all()  # Fetch all matching records
+        new_file = await create_user_file(file, file.filename, current_user, session, storage_service, max_size)
+    except HTTPException:
+        raise
+    except Exception as e:
+        # Optionally, you could also delete the file from disk if the DB insert fails.
+        raise HTTPException(status_code=500, detail=f"Database error: {e}") from e
 
-            if files:
-                counts = []
+    return UploadFileResponse(id=new_file.id, name=new_file.name, path=Path(new_file.path), size=new_file.size)
 
-                # Extract the count from the filename
-                for my_file in files:
-                    match = re.search(r"\((\d+)\)(?=\.\w+$|$)", my_file.name)
-                    if match:
-                        counts.append(int(match.group(1)))
 
-                count = max(counts) if counts else 0
-                root_filename = f"{root_filename} ({count + 1})"
+_upload_locks: WeakValueDictionary[str, asyncio.Lock] = WeakValueDictionary()
 
-            # Create the unique filename with extension for storage
-            unique_filename = f"{root_filename}.{file_extension}" if file_extension else root_filename
 
-        # Read file content and save with unique filename
-        try:
-            file_id, stored_file_name = await save_file_routine(
-                file, storage_service, current_user, file_name=unique_filename
-            )
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error saving file: {e}") from e
+def _upload_session_dir(current_user: CurrentActiveUser, settings_service: SettingsService) -> anyio.Path:
+    return anyio.Path(settings_service.settings.config_dir) / "uploads" / str(current_user.id)
 
-        # Compute the file size based on the path
-        file_size = await storage_service.get_file_size(
-            flow_id=str(current_user.id),
-            file_name=stored_file_name,
-        )
 
-        # Create a new file record
-        new_file = UserFile(
-            id=file_id,
-            user_id=current_user.id,
-            name=root_filename,
-            path=f"{current_user.id}/{stored_file_name}",
-            size=file_size,
+async def _read_upload_session(
+    upload_id: uuid.UUID, current_user: CurrentActiveUser, settings_service: SettingsService
+) -> tuple[dict, anyio.Path]:
+    """Return the metadata of an upload session of the current user and the path of its data."""
+    session_dir = _upload_session_dir(current_user, settings_service)
+    meta_path = session_dir / f"{upload_id}.json"
+    if not await meta_path.exists():
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return json.loads(await meta_path.read_text()), session_dir / f"{upload_id}.part"
+
+
+async def _upload_session_response(meta: dict, part_path: anyio.Path) -> UploadSessionResponse:
+    return UploadSessionResponse(
+        id=meta["id"], filename=meta["filename"], size=meta["size"], offset=(await part_path.stat()).st_size
+    )
+
+
+async def _remove_upload_session(part_path: anyio.Path) -> None:
+    await part_path.unlink(missing_ok=True)
+    await part_path.with_suffix(".json").unlink(missing_ok=True)
+
+
+async def _remove_expired_upload_sessions(session_dir: anyio.Path) -> None:
+    if not await session_dir.exists():
+        return
+    expires_before = time.time() - UPLOAD_SESSION_TTL
+    async for meta_path in session_dir.glob("*.json"):
+        if (await meta_path.stat()).st_mtime < expires_before:
+            await _remove_upload_session(meta_path.with_suffix(".part"))
+
+
+async def _file_chunks(path: anyio.Path) -> AsyncGenerator[bytes, None]:
+    async with async_open(str(path), "rb") as f:
+        while chunk := await f.read(UPLOAD_CHUNK_SIZE):
+            yield chunk
+
+
+@router.post("/uploads", status_code=HTTPStatus.CREATED)
+@router.post("/uploads/", status_code=HTTPStatus.CREATED, include_in_schema=False)
+async def create_upload_session(
+    upload: UploadSessionCreate,
+    current_user: CurrentActiveUser,
+    settings_service: Annotated[SettingsService, Depends(get_settings_service)],
+) -> UploadSessionResponse:
+    """Start a resumable upload.
+
+    The content is then sent in any number of ``PUT /files/uploads/{upload_id}`` requests, each
+    continuing at the offset the previous one stopped at, and the file is created by
+    ``POST /files/uploads/{upload_id}/complete``. An interrupted upload is resumed from the
+    offset returned by ``GET /files/uploads/{upload_id}``.
+    """
+    max_file_size_upload = settings_service.settings.max_file_size_upload
+    if upload.size > max_file_size_upload * 1024 * 1024:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File size is larger than the maximum file size {max_file_size_upload}MB.",
         )
-        session.add(new_file)
 
-        await session.commit()
-        await session.refresh(new_file)
-    except Exception as e:
-        # Optionally, you could also delete the file from disk if the DB insert fails.
-        raise HTTPException(status_code=500, detail=f"Database error: {e}") from e
+    session_dir = _upload_session_dir(current_user, settings_service)
+    await _remove_expired_upload_sessions(session_dir)
+    await session_dir.mkdir(parents=True, exist_ok=True)
+
+    upload_id = uuid.uuid4()
+    meta = {"id": str(upload_id), "filename": upload.filename, "size": upload.size}
+    part_path = session_dir / f"{upload_id}.part"
+    await part_path.touch()
+    await (session_dir / f"{upload_id}.json").write_text(json.dumps(meta))
+    return await _upload_session_response(meta, part_path)
+
+
+@router.get("/uploads/{upload_id}")
+async def get_upload_session(
+    upload_id: uuid.UUID,
+    current_user: CurrentActiveUser,
+    settings_service: Annotated[SettingsService, Depends(get_settings_service)],
+) -> UploadSessionResponse:
+    """Get the state of a resumable upload, including the offset to continue it from."""
+    meta, part_path = await _read_upload_session(upload_id, current_user, settings_service)
+    return await _upload_session_response(meta, part_path)
+
+
+@router.put("/uploads/{upload_id}")
+async def upload_chunk(
+    upload_id: uuid.UUID,
+    offset: int,
+    request: Request,
+    current_user: CurrentActiveUser,
+    settings_service: Annotated[SettingsService, Depends(get_settings_service)],
+) -> UploadSessionResponse:
+    """Append the request body to a resumable upload at ``offset``.
+
+    The body is streamed to disk as it is received. A chunk sent at any other offset than the
+    current one is rejected with 409, so a client that lost track can ask for the offset again.
+    """
+    meta, part_path = await _read_upload_session(upload_id, current_user, settings_service)
+    lock = _upload_locks.setdefault(str(upload_id), asyncio.Lock())
+    async with lock:
+        current_offset = (await part_path.stat()).st_size
+        if offset != current_offset:
+            raise HTTPException(
+                status_code=409, detail=f"Upload {upload_id} continues at offset {current_offset}, not {offset}."
+            )
+
+        written = 0
+        try:
+            async with async_open(str(part_path), "ab") as f:
+                async for chunk in request.stream():
+                    written += len(chunk)
+                    if offset + written > meta["size"]:
+                        raise HTTPException(
+                            status_code=413, detail=f"Upload {upload_id} is larger than its size of {meta['size']}."
+                        )
+                    await f.write(chunk)
+        except BaseException:
+            # Drop the incomplete chunk so the upload can resume at the offset it had
+            await anyio.to_thread.run_sync(os.truncate, str(part_path), offset)
+            raise
+
+    return await _upload_session_response(meta, part_path)
+
+
+@router.post("/uploads/{upload_id}/complete", status_code=HTTPStatus.CREATED)
+async def complete_upload_session(
+    upload_id: uuid.UUID,
+    session: DbSession,
+    current_user: CurrentActiveUser,
+    storage_service: Annotated[StorageService, Depends(get_storage_service)],
+    settings_service: Annotated[SettingsService, Depends(get_settings_service)],
+) -> UploadFileResponse:
+    """Create the file of a resumable upload once all of its content has been sent."""
+    meta, part_path = await _read_upload_session(upload_id, current_user, settings_service)
+    lock = _upload_locks.setdefault(str(upload_id), asyncio.Lock())
+    async with lock:
+        offset = (await part_path.stat()).st_size
+        if offset != meta["size"]:
+            raise HTTPException(
+                status_code=409, detail=f"Upload {upload_id} is incomplete: {offset} of {meta['size']} bytes received."
+            )
+
+        try:
+            new_file = await create_user_file(
+                _file_chunks(part_path), meta["filename"], current_user, session, storage_service
+            )
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {e}") from e
+        await _remove_upload_session(part_path)
 
     return UploadFileResponse(id=new_file.id, name=new_file.name, path=Path(new_file.path), size=new_file.size)
 
 
+@router.delete("/uploads/{upload_id}")
+async def delete_upload_session(
+    upload_id: uuid.UUID,
+    current_user: CurrentActiveUser,
+    settings_service: Annotated[SettingsService, Depends(get_settings_service)],
+):
+    """Abort a resumable upload and discard the content received so far."""
+    _, part_path = await _read_upload_session(upload_id, current_user, settings_service)
+    await _remove_upload_session(part_path)
+    return {"detail": f"Upload {upload_id} deleted successfully"}
+
+
 async def get_file_by_name(
     file_name: str,  # The name of the file to search for
     current_user: CurrentActiveUser,
@@ -277,7 +557,7 @@ async def delete_files_batch(
 
         # Delete all files from the storage service
         for file in files:
-            await storage_service.delete_file(flow_id=str(current_user.id), file_name=file.path)
+            await delete_stored_file(file, current_user, session, storage_service)
             await session.delete(file)
 
         # Delete all files from the database
@@ -475,7 +755,7 @@ async def delete_file(
             raise HTTPException(status_code=404, detail="File not found")
 
         # Delete the file from the storage service
-        await storage_service.delete_file(flow_id=str(current_user.id), file_name=file_to_delete.path)
+        await delete_stored_file(file_to_delete, current_user, session, storage_service)
 
         # Delete from the database
         await session.delete(file_to_delete)
@@ -507,7 +787,7 @@ async def delete_all_files(
 
         # Delete all files from the storage service
         for file in files:
-            await storage_service.delete_file(flow_id=str(current_user.id), file_name=file.path)
+            await delete_stored_file(file, current_user, session, storage_service)
             await session.delete(file)
 
         # Delete all files from the database
@@ -25,7 +25,7 @@ from axiestudio.utils.constants import MESSAGE_SENDER_AI
 if TYPE_CHECKING:
     from langchain_core.messages import BaseMessage
 
-    from axiestudio.schema.log import SendMessageFunctionType
+    from axiestudio.schema.log import SendMessageFunctionType, SendTokenFunctionType
 
 
 DEFAULT_TOOLS_DESCRIPTION = "En hjälpsam assistent med tillgång till följande verktyg:"
@@ -182,6 +182,7 @@ class LCAgentComponent(Component):
                 ),
                 agent_message,
                 cast("SendMessageFunctionType", self.send_message),
+                cast("SendTokenFunctionType", self._send_token_event) if self._event_manager else None,
             )
         except ExceptionWithMessageError as e:
             if hasattr(e, "agent_message") and hasattr(e.agent_message, "id"):
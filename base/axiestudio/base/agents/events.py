@@ -9,7 +9,7 @@ from typing_extensions import TypedDict
 
 from axiestudio.schema.content_block import ContentBlock
 from axiestudio.schema.content_types import TextContent, ToolContent
-from axiestudio.schema.log import SendMessageFunctionType
+from axiestudio.schema.log import SendMessageFunctionType, SendTokenFunctionType
 from axiestudio.schema.message import Message
 
 
@@ -27,6 +27,61 @@ class ExceptionWithMessageError(Exception):
         )
 
 
+# Streamed tokens are sent as lightweight deltas; the full message is only persisted
+# at state transitions or once one of these thresholds is crossed.
+STREAM_FLUSH_INTERVAL_SECONDS = 1.0
+STREAM_FLUSH_CHARS = 2048
+
+
+class MessageStreamCoalescer:
+    """Coalesces agent message persistence while tokens are being streamed.
+
+    Calling the coalescer stores and emits the full message, exactly like the wrapped
+    ``send_message_method``. Streamed chunks go through :meth:`stream`, which only emits a
+    token event and defers the full write until the time or size threshold is reached.
+    Without a ``send_token_method`` every chunk is persisted, as before.
+    """
+
+    def __init__(
+        self,
+        send_message_method: SendMessageFunctionType,
+        send_token_method: SendTokenFunctionType | None = None,
+        *,
+        flush_interval: float = STREAM_FLUSH_INTERVAL_SECONDS,
+        flush_chars: int = STREAM_FLUSH_CHARS,
+    ):
+        self.send_message_method = send_message_method
+        self.send_token_method = send_token_method
+        self.flush_interval = flush_interval
+        self.flush_chars = flush_chars
+        self._pending_chars = 0
+        self._last_flush = perf_counter()
+
+    @property
+    def has_pending(self) -> bool:
+        return self._pending_chars > 0
+
+    async def __call__(self, *, message: Message) -> Message:
+        self._pending_chars = 0
+        self._last_flush = perf_counter()
+        return await self.send_message_method(message=message)
+
+    async def stream(self, *, message: Message, chunk: str) -> Message:
+        message_id = getattr(message, "id", None)
+        if self.send_token_method is None or not message_id:
+            return await self(message=message)
+        await self.send_token_method(chunk, message_id)
+        self._pending_chars += len(chunk)
+        if self._pending_chars >= self.flush_chars or perf_counter() - self._last_flush >= self.flush_interval:
+            return await self(message=message)
+        return message
+
+    async def flush(self, message: Message) -> Message:
+        if self.has_pending:
+            return await self(message=message)
+        return message
+
+
 class InputDict(TypedDict):
     input: str
     chat_history: list[BaseMessage]
@@ -270,7 +325,10 @@ async def handle_on_chain_stream(
         if output_text and isinstance(agent_message.text, str):
             agent_message.text += output_text
             agent_message.properties.state = "partial"
-            agent_message = await send_message_method(message=agent_message)
+            if isinstance(send_message_method, MessageStreamCoalescer):
+                agent_message = await send_message_method.stream(message=agent_message, chunk=output_text)
+            else:
+                agent_message = await send_message_method(message=agent_message)
         if not agent_message.text:
             start_time = perf_counter()
     return agent_message, start_time
@@ -318,13 +376,19 @@ async def process_agent_events(
     agent_executor: AsyncIterator[dict[str, Any]],
     agent_message: Message,
     send_message_method: SendMessageFunctionType,
+    send_token_method: SendTokenFunctionType | None = None,
 ) -> Message:
-    """Process agent events and return the final output."""
+    """Process agent events and return the final output.
+
+    When ``send_token_method`` is given, streamed chunks are emitted as token events and the
+    message is only persisted at state transitions (see :class:`MessageStreamCoalescer`).
+    """
     if isinstance(agent_message.properties, dict):
         agent_message.properties.update({"icon": "Bot", "state": "partial"})
     else:
         agent_message.properties.icon = "Bot"
         agent_message.properties.state = "partial"
+    send_message_method = MessageStreamCoalescer(send_message_method, send_token_method)
     # Store the initial message
     agent_message = await send_message_method(message=agent_message)
     try:
@@ -340,6 +404,7 @@ async def process_agent_events(
             elif event["event"] in CHAIN_EVENT_HANDLERS:
                 chain_handler = CHAIN_EVENT_HANDLERS[event["event"]]
                 agent_message, start_time = await chain_handler(event, agent_message, send_message_method, start_time)
+        agent_message = await send_message_method.flush(agent_message)
         agent_message.properties.state = "complete"
     except Exception as e:
         raise ExceptionWithMessageError(agent_message, str(e)) from e
@@ -0,0 +1,150 @@
+"""Incremental ingestion of documents into vector stores.
+
+Documents are split, deduplicated and written in batches by a bounded pipeline, so only a few
+batches of chunks are held in memory at a time. Each chunk is stored under an id derived from its
+content, which lets a re-ingestion skip the chunks the vector store already has.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import inspect
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import orjson
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Iterable, Iterator
+
+    from langchain_core.documents import Document
+    from langchain_core.vectorstores import VectorStore
+    from langchain_text_splitters import TextSplitter
+
+    GetExistingIds = Callable[[list[str]], "set[str] | Awaitable[set[str]]"]
+
+DEFAULT_BATCH_SIZE = 64
+# Batches of chunks split ahead of the one being embedded and written
+DEFAULT_MAX_PENDING_BATCHES = 2
+
+
+@dataclass
+class IngestionProgress:
+    """Counts of an ingestion, updated as each stage processes a batch."""
+
+    documents: int = 0
+    """Documents split into chunks."""
+    chunks: int = 0
+    """Chunks produced by the split."""
+    skipped: int = 0
+    """Chunks the vector store already had."""
+    indexed: int = 0
+    """Chunks embedded and written to the vector store."""
+
+
+def chunk_id(document: Document, occurrence: int = 0) -> str:
+    """Return the id of a chunk, derived from its text and metadata.
+
+    Identical chunks of one ingestion are told apart by their occurrence, so they are all stored.
+    """
+    metadata = orjson.dumps(document.metadata, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS, default=str)
+    digest = hashlib.sha256(document.page_content.encode("utf-8") + b"\0" + metadata).hexdigest()
+    return f"{digest}-{occurrence}" if occurrence else digest
+
+
+def iter_chunks(documents: Iterable[Document], splitter: TextSplitter | None = None) -> Iterator[Document]:
+    """Split documents one at a time, yielding their chunks as they are produced."""
+    for document in documents:
+        if splitter is None:
+            yield document
+        else:
+            yield from splitter.split_documents([document])
+
+
+async def ingest_documents(
+    vector_store: VectorStore,
+    documents: Iterable[Document],
+    *,
+    splitter: TextSplitter | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_pending_batches: int = DEFAULT_MAX_PENDING_BATCHES,
+    get_existing_ids: GetExistingIds | None = None,
+    on_progress: Callable[[str, IngestionProgress], None] | None = None,
+) -> IngestionProgress:
+    """Split documents and add the chunks the vector store does not have yet.
+
+    Splitting runs ahead of the writes by at most ``max_pending_batches`` batches, so the memory
+    used is bounded by the batch size rather than by the number of documents.
+
+    Args:
+        vector_store: The vector store to add the chunks to.
+        documents: The documents to ingest. They are consumed lazily.
+        splitter: The splitter to chunk the documents with. If not given, documents are ingested whole.
+        batch_size: The number of chunks embedded and written at a time.
+        max_pending_batches: The number of split batches waiting to be written.
+        get_existing_ids: Returns which of the given ids the vector store has. Defaults to the
+            vector store's ``aget_by_ids``; if that is not supported, chunks are always written,
+            replacing the stored ones with the same id.
+        on_progress: Called with the stage (``"split"`` or ``"index"``) and the counts after each batch.
+
+    Returns:
+        The counts of the ingestion.
+    """
+    progress = IngestionProgress()
+    queue: asyncio.Queue[list[tuple[str, Document]] | None] = asyncio.Queue(maxsize=max(max_pending_batches, 1))
+
+    def report(stage: str) -> None:
+        if on_progress is not None:
+            on_progress(stage, progress)
+
+    async def split() -> None:
+        occurrences: dict[str, int] = {}
+        batch: list[tuple[str, Document]] = []
+        try:
+            for document in documents:
+                progress.documents += 1
+                for chunk in iter_chunks([document], splitter):
+                    base_id = chunk_id(chunk)
+                    occurrence = occurrences.get(base_id, 0)
+                    occurrences[base_id] = occurrence + 1
+                    batch.append((chunk_id(chunk, occurrence) if occurrence else base_id, chunk))
+                    progress.chunks += 1
+                    if len(batch) >= batch_size:
+                        await queue.put(batch)
+                        report("split")
+                        batch = []
+            if batch:
+                await queue.put(batch)
+                report("split")
+        finally:
+            await queue.put(None)
+
+    producer = asyncio.create_task(split())
+    try:
+        while (batch := await queue.get()) is not None:
+            ids = [id_ for id_, _ in batch]
+            existing = await _existing_ids(vector_store, ids, get_existing_ids)
+            new = [(id_, chunk) for id_, chunk in batch if id_ not in existing]
+            progress.skipped += len(batch) - len(new)
+            if new:
+                await vector_store.aadd_documents([chunk for _, chunk in new], ids=[id_ for id_, _ in new])
+                progress.indexed += len(new)
+            report("index")
+    except BaseException:
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+        raise
+    # Re-raise a failure of the split
+    await producer
+    return progress
+
+
+async def _existing_ids(vector_store: VectorStore, ids: list[str], get_existing_ids: GetExistingIds | None) -> set[str]:
+    if get_existing_ids is not None:
+        existing = get_existing_ids(ids)
+        return await existing if inspect.isawaitable(existing) else existing
+    try:
+        return {document.id for document in await vector_store.aget_by_ids(ids)}
+    except NotImplementedError:
+        return set()
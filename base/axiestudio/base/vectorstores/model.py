@@ -1,7 +1,9 @@
+import time
 from abc import abstractmethod
 from functools import wraps
 from typing import TYPE_CHECKING, Any
 
+from axiestudio.base.vectorstores.ingestion import IngestionProgress, ingest_documents
 from axiestudio.custom.custom_component.component import Component
 from axiestudio.field_typing import Text, VectorStore
 from axiestudio.helpers.data import docs_to_data
@@ -9,9 +11,18 @@ from axiestudio.inputs.inputs import BoolInput
 from axiestudio.io import HandleInput, Output, QueryInput
 from axiestudio.schema.data import Data
 from axiestudio.schema.dataframe import DataFrame
+from axiestudio.utils.async_helpers import run_until_complete
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable
+
     from langchain_core.documents import Document
+    from langchain_text_splitters import TextSplitter
+
+    from axiestudio.base.vectorstores.ingestion import GetExistingIds
+
+# Seconds between the progress logs of an ingestion
+INGESTION_LOG_INTERVAL = 5.0
 
 
 def check_cached_vector_store(f):
@@ -122,6 +133,41 @@ class LCVectorStoreComponent(Component):
                 result.append(_input)
         return result
 
+    def ingest_documents(
+        self,
+        vector_store: VectorStore,
+        documents: "Iterable[Document]",
+        *,
+        splitter: "TextSplitter | None" = None,
+        get_existing_ids: "GetExistingIds | None" = None,
+    ) -> IngestionProgress:
+        """Add the documents to the vector store in batches, skipping the chunks it already has.
+
+        See :func:`axiestudio.base.vectorstores.ingestion.ingest_documents`.
+        """
+        last_log = time.monotonic()
+
+        def log_progress(stage: str, progress: IngestionProgress) -> None:
+            nonlocal last_log
+            if time.monotonic() - last_log >= INGESTION_LOG_INTERVAL:
+                last_log = time.monotonic()
+                self.log(f"Ingestion {stage}: {progress}")
+
+        progress = run_until_complete(
+            ingest_documents(
+                vector_store,
+                documents,
+                splitter=splitter,
+                get_existing_ids=get_existing_ids,
+                on_progress=log_progress,
+            )
+        )
+        self.log(
+            f"Ingested {progress.documents} documents: {progress.indexed} chunks added, "
+            f"{progress.skipped} already in the vector store."
+        )
+        return progress
+
     def search_with_vector_store(
         self,
         input_value: Text,
@@ -7,6 +7,7 @@ class CombineTextComponent(Component):
     display_name = "Kombinera text"
     description = "Sammanfoga två textkällor till en enda textbit med en angiven avgränsare."
     icon = "merge"
+    deterministic = True
     name = "CombineText"
     legacy: bool = True
 
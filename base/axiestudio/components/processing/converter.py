@@ -52,6 +52,7 @@ class TypeConverterComponent(Component):
     description = "Konvertera mellan olika typer (Message, Data, DataFrame)"
     documentation: str = "https://docs.axiestudio.se/components-processing#type-convert"
     icon = "repeat"
+    deterministic = True
 
     inputs = [
         HandleInput(
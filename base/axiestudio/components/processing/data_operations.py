@@ -35,6 +35,7 @@ class DataOperationsComponent(Component):
     description = "Utför olika operationer på ett Data-objekt."
     documentation: str = "https://docs.axiestudio.se/components-processing#data-operations"
     icon = "file-json"
+    deterministic = True
     name = "DataOperations"
     default_keys = ["operations", "data"]
     metadata = {
@@ -20,6 +20,7 @@ class DataFrameOperationsComponent(Component):
     description = "Perform various operations on a DataFrame."
     documentation: str = "https://docs.axiestudio.org/components-processing#dataframe-operations"
     icon = "table"
+    deterministic = True
     name = "DataFrameOperations"
 
     OPERATION_CHOICES = [
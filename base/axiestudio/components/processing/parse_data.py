@@ -9,6 +9,7 @@ class ParseDataComponent(Component):
     display_name = "Data till meddelande"
     description = "Konvertera Data-objekt till meddelanden med valfritt {field_name} från indata."
     icon = "message-square"
+    deterministic = True
     name = "ParseData"
     legacy = True
     metadata = {
@@ -10,6 +10,7 @@ class ParseDataFrameComponent(Component):
         "Varje kolumn i DataFrame behandlas som en möjlig mallnyckel, t.ex. {col_name}."
     )
     icon = "braces"
+    deterministic = True
     name = "ParseDataFrame"
     legacy = True
 
@@ -16,6 +16,7 @@ class ParseJSONDataComponent(Component):
     display_name = "Parse JSON"
     description = "Convert and extract JSON fields."
     icon = "braces"
+    deterministic = True
     name = "ParseJSONData"
     legacy: bool = True
 
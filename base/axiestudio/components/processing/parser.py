@@ -12,6 +12,7 @@ class ParserComponent(Component):
     description = "Extracts text using a template."
     documentation: str = "https://docs.axiestudio.org/components-processing#parser"
     icon = "braces"
+    deterministic = True
 
     inputs = [
         HandleInput(
@@ -11,6 +11,7 @@ class PromptComponent(Component):
     description: str = "Skapa en promptmall med dynamiska variabler."
     documentation: str = "https://docs.axiestudio.org/components-prompts"
     icon = "braces"
+    deterministic = True
     trace_type = "prompt"
     name = "Prompt Template"
     priority = 0  # Set priority to 0 to make it appear first
@@ -13,6 +13,7 @@ class SplitTextComponent(Component):
     description: str = "Dela text i bitar baserat på specificerade kriterier."
     documentation: str = "https://docs.axiestudio.org/components-processing#split-text"
     icon = "scissors-line-dashed"
+    deterministic = True
     name = "SplitText"
 
     inputs = [
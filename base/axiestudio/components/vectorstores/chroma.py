@@ -1,4 +1,3 @@
-from copy import deepcopy
 from typing import TYPE_CHECKING
 
 from chromadb.config import Settings
@@ -134,25 +133,22 @@ class ChromaVectorStoreComponent(LCVectorStoreComponent):
         # Convert DataFrame to Data if needed using parent's method
         ingest_data = self._prepare_ingest_data()
 
-        stored_documents_without_id = []
-        if self.allow_duplicates:
-            stored_data = []
-        else:
-            stored_data = chroma_collection_to_data(vector_store.get(limit=self.limit))
-            for value in deepcopy(stored_data):
-                del value.id
-                stored_documents_without_id.append(value)
-
         documents = []
         for _input in ingest_data or []:
             if isinstance(_input, Data):
-                if _input not in stored_documents_without_id:
-                    documents.append(_input.to_lc_document())
+                documents.append(_input.to_lc_document())
             else:
                 msg = "Vektorlager-indata måste vara Data-objekt."
                 raise TypeError(msg)
 
-        if documents and self.embedding is not None:
+        if documents and self.embedding is not None and not self.allow_duplicates:
+            # Documents are stored under content ids, so the ones already stored are skipped
+            self.ingest_documents(
+                vector_store,
+                documents,
+                get_existing_ids=lambda ids: set(vector_store.get(ids=ids, include=[])["ids"]),
+            )
+        elif documents and self.embedding is not None:
             self.log(f"Lägger till {len(documents)} dokument i Vektorlagret.")
             vector_store.add_documents(documents)
         else:
@@ -73,6 +73,7 @@ ATTR_FUNC_MAPPING: dict[str, Callable] = {
     "icon": validate_icon,
     "minimized": getattr_return_bool,
     "frozen": getattr_return_bool,
+    "deterministic": getattr_return_bool,
     "is_input": getattr_return_bool,
     "is_output": getattr_return_bool,
     "conditional_paths": getattr_return_list_of_str,
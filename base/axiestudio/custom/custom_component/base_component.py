@@ -1,9 +1,9 @@
 import copy
-import operator
 import re
+import threading
 from typing import TYPE_CHECKING, Any, ClassVar
 
-from cachetools import TTLCache, cachedmethod
+from cachetools import LRUCache, TTLCache, cachedmethod
 from fastapi import HTTPException
 from loguru import logger
 
@@ -16,6 +16,11 @@ if TYPE_CHECKING:
     from uuid import UUID
 
 
+# Parsed code trees, shared by all the components built from the same code
+_code_tree_cache: LRUCache = LRUCache(maxsize=256)
+_code_tree_lock = threading.Lock()
+
+
 class ComponentCodeNullError(HTTPException):
     pass
 
@@ -52,7 +57,7 @@ class BaseComponent:
                 pass
         super().__setattr__(key, value)
 
-    @cachedmethod(cache=operator.attrgetter("cache"))
+    @cachedmethod(cache=lambda _: _code_tree_cache, lock=lambda _: _code_tree_lock)
     def get_code_tree(self, code: str):
         parser = CodeParser(code)
         return parser.parse_code()
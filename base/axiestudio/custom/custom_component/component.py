@@ -1605,6 +1605,11 @@ class Component(CustomComponent):
                 msg_copy = message.model_copy()
                 msg_copy.text = complete_message
                 await self._send_message_event(msg_copy, id_=message_id)
+            await self._send_token_event(chunk, message_id)
+        return complete_message
+
+    async def _send_token_event(self, chunk: str, message_id: str | UUID) -> None:
+        if hasattr(self, "_event_manager") and self._event_manager:
             await asyncio.to_thread(
                 self._event_manager.on_token,
                 data={
@@ -1612,7 +1617,6 @@ class Component(CustomComponent):
                     "id": str(message_id),
                 },
             )
-        return complete_message
 
     async def send_error(
         self,
@@ -15,6 +15,7 @@ from axiestudio.helpers.flow import list_flows, load_flow, run_flow
 from axiestudio.schema.data import Data
 from axiestudio.services.deps import get_storage_service, get_variable_service, session_scope
 from axiestudio.services.storage.service import StorageService
+from axiestudio.services.usage.accounting import get_usage_callback
 from axiestudio.template.utils import update_frontend_node_with_template_values
 from axiestudio.type_extraction.type_extraction import post_process_type
 from axiestudio.utils import validate
@@ -64,6 +65,10 @@ class CustomComponent(BaseComponent):
     priority: int | None = None
     """The priority of the component in the category. Lower priority means it will be displayed first. Defaults to None.
     """
+    deterministic: bool = False
+    """Whether the outputs depend only on the code, parameters and inputs. Results of deterministic components
+    are memoized across runs. Defaults to False.
+    """
 
     def __init__(self, **data) -> None:
         """Initializes a new instance of the CustomComponent class.
@@ -536,6 +541,8 @@ class CustomComponent(BaseComponent):
         )
 
     def get_langchain_callbacks(self) -> list[BaseCallbackHandler]:
-        if self._tracing_service:
-            return self._tracing_service.get_langchain_callbacks()
-        return []
+        callbacks = self._tracing_service.get_langchain_callbacks() if self._tracing_service else []
+        # Tokens are counted against the run even when tracing is off
+        if (usage_callback := get_usage_callback()) is not None:
+            callbacks.append(usage_callback)
+        return callbacks
@@ -2,6 +2,7 @@
 import ast
 import asyncio
 import contextlib
+import copy
 import hashlib
 import inspect
 import re
@@ -10,6 +11,7 @@ from pathlib import Path
 from typing import Any
 from uuid import UUID
 
+from cachetools import LRUCache
 from fastapi import HTTPException
 from loguru import logger
 from pydantic import BaseModel
@@ -32,6 +34,9 @@ from axiestudio.type_extraction.type_extraction import extract_inner_type
 from axiestudio.utils import validate
 from axiestudio.utils.util import get_base_classes
 
+# The component class and base template of code built in the editor, keyed by the hash of the code
+_component_template_cache: LRUCache = LRUCache(maxsize=256)
+
 
 def _generate_code_hash(source_code: str, modname: str, class_name: str) -> str:
     """Generate a hash of the component source code.
@@ -488,6 +493,32 @@ def build_custom_component_template_from_inputs(
     return frontend_node.to_dict(keep_name=False), cc_instance
 
 
+def build_component_template_from_code(
+    code: str, user_id: str | UUID | None = None
+) -> tuple[dict[str, Any], CustomComponent | Component]:
+    """Builds a frontend node template and instance for a component from its code.
+
+    The code of a component is only parsed, evaluated and turned into a template the first time
+    it is seen; later builds of the same code copy the template and instantiate the evaluated
+    class. Only components built from inputs are cached, as the template of a legacy custom
+    component comes from its build_config, which may change between calls.
+
+    Returns:
+        A tuple containing the frontend node dictionary and the component instance.
+    """
+    code_hash = hashlib.sha256(code.encode("utf-8")).hexdigest()
+    cached = _component_template_cache.get(code_hash)
+    if cached is not None:
+        component_class, template = cached
+        return copy.deepcopy(template), component_class(_user_id=user_id, _code=code)
+
+    component = Component(_code=code)
+    template, instance = build_custom_component_template(component, user_id=user_id)
+    if isinstance(instance, Component) and "inputs" in component.template_config:
+        _component_template_cache[code_hash] = (type(instance), copy.deepcopy(template))
+    return template, instance
+
+
 def build_custom_component_template(
     custom_component: CustomComponent,
     user_id: str | UUID | None = None,
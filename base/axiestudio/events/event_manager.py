@@ -5,10 +5,12 @@ import json
 import time
 import uuid
 from functools import partial
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any, NamedTuple
 
+import orjson
 from fastapi.encoders import jsonable_encoder
 from loguru import logger
+from pydantic import BaseModel
 from typing_extensions import Protocol
 
 from axiestudio.schema.playground_events import create_event_by_type
@@ -27,9 +29,45 @@ class PartialEventCallback(Protocol):
     def __call__(self, *, data: LoggableType): ...
 
 
+class FlowEvent(NamedTuple):
+    """An event of a flow run, as delivered to in-process consumers."""
+
+    event: str
+    data: Any
+
+    def to_dict(self) -> dict:
+        """Return the event as it is sent over HTTP."""
+        return {"event": self.event, "data": jsonable_encoder(self.data)}
+
+
+def _encode_default(obj: Any) -> Any:
+    # Models are serialized by pydantic straight to JSON, as jsonable_encoder would, without a dict in between
+    if isinstance(obj, BaseModel):
+        return orjson.Fragment(obj.model_dump_json(by_alias=True))
+    return jsonable_encoder(obj)
+
+
+def encode_event(event_type: str, data: Any) -> bytes:
+    """Encode an event as a line of the NDJSON stream, in a single pass over its data."""
+    try:
+        encoded = orjson.dumps(
+            {"event": event_type, "data": data}, default=_encode_default, option=orjson.OPT_NON_STR_KEYS
+        )
+    except (orjson.JSONEncodeError, ValueError):
+        # Integers beyond 64 bits, lone surrogates and the like are left to the standard library
+        encoded = json.dumps({"event": event_type, "data": jsonable_encoder(data)}).encode("utf-8")
+    return encoded + b"\n\n"
+
+
 class EventManager:
-    def __init__(self, queue: asyncio.Queue):
+    def __init__(self, queue: asyncio.Queue, *, encode: bool = True):
+        """Send the events of a flow run to a queue.
+
+        When ``encode`` is False the events are queued as ``FlowEvent`` objects instead of
+        NDJSON lines, for consumers running in the same process.
+        """
         self.queue = queue
+        self.encode = encode
         self.events: dict[str, PartialEventCallback] = {}
 
     @staticmethod
@@ -73,11 +111,11 @@ class EventManager:
             logger.debug(f"Error creating playground event: {e}")
         except Exception:
             raise
-        jsonable_data = jsonable_encoder(data)
-        json_data = {"event": event_type, "data": jsonable_data}
         event_id = f"{event_type}-{uuid.uuid4()}"
-        str_data = json.dumps(json_data) + "\n\n"
-        self.queue.put_nowait((event_id, str_data.encode("utf-8"), time.time()))
+        if not self.encode:
+            self.queue.put_nowait((event_id, FlowEvent(event_type, data), time.time()))
+            return
+        self.queue.put_nowait((event_id, encode_event(event_type, data), time.time()))
 
     def noop(self, *, data: LoggableType) -> None:
         pass
@@ -86,8 +124,8 @@ class EventManager:
         return self.events.get(name, self.noop)
 
 
-def create_default_event_manager(queue):
-    manager = EventManager(queue)
+def create_default_event_manager(queue, *, encode: bool = True):
+    manager = EventManager(queue, encode=encode)
     manager.register_event("on_token", "token")
     manager.register_event("on_vertices_sorted", "vertices_sorted")
     manager.register_event("on_error", "error")
@@ -19,8 +19,10 @@ from loguru import logger
 
 from axiestudio.exceptions.component import ComponentBuildError
 from axiestudio.graph.edge.base import CycleEdge, Edge
+from axiestudio.graph.graph.capsule import CapsuleRecorder, capsule_var, save_run_capsule
 from axiestudio.graph.graph.constants import Finish, lazy_load_vertex_dict
 from axiestudio.graph.graph.runnable_vertices_manager import RunnableVerticesManager
+from axiestudio.graph.graph.scheduler import run_vertices
 from axiestudio.graph.graph.schema import GraphData, GraphDump, StartConfigDict, VertexBuildResult
 from axiestudio.graph.graph.state_model import create_state_model_from_graph
 from axiestudio.graph.graph.utils import (
@@ -34,22 +36,41 @@ from axiestudio.graph.graph.utils import (
 from axiestudio.graph.schema import InterfaceComponentTypes, RunOutputs
 from axiestudio.graph.utils import log_vertex_build
 from axiestudio.graph.vertex.base import Vertex, VertexStates
+from axiestudio.graph.vertex.fingerprint import (
+    UnfingerprintableValueError,
+    fingerprint_value,
+    get_config_fingerprint,
+    get_input_fingerprint,
+    get_result_fingerprint,
+)
 from axiestudio.graph.vertex.schema import NodeData, NodeTypeEnum
 from axiestudio.graph.vertex.vertex_types import ComponentVertex, InterfaceVertex, StateVertex
 from axiestudio.logging.logger import LogConfig, configure
 from axiestudio.schema.dotdict import dotdict
 from axiestudio.schema.schema import INPUT_FIELD_NAME, InputType, OutputValue
 from axiestudio.services.cache.utils import CacheMiss
-from axiestudio.services.deps import get_chat_service, get_tracing_service
+from axiestudio.services.deps import (
+    get_chat_service,
+    get_db_service,
+    get_settings_service,
+    get_state_service,
+    get_tracing_service,
+    get_usage_service,
+    get_variable_service,
+    get_vertex_cache_service,
+    session_scope,
+)
+from axiestudio.services.usage.accounting import RunUsage
 from axiestudio.utils.async_helpers import run_until_complete
 
 if TYPE_CHECKING:
-    from collections.abc import Callable, Generator, Iterable
+    from collections.abc import Awaitable, Callable, Generator, Iterable
 
     from axiestudio.api.v1.schemas import InputValueRequest
     from axiestudio.custom.custom_component.component import Component
     from axiestudio.events.event_manager import EventManager
     from axiestudio.graph.edge.schema import EdgeData
+    from axiestudio.graph.graph.capsule import CapsuleReplayer
     from axiestudio.graph.schema import ResultData
     from axiestudio.services.chat.schema import GetCache, SetCache
     from axiestudio.services.tracing.service import TracingService
@@ -87,6 +108,8 @@ class Graph:
         self._updates = 0
         self.flow_id = flow_id
         self.flow_name = flow_name
+        # The version of the flow's data this graph was built from, if it was loaded from the database
+        self.flow_version: int | None = None
         self.description = description
         self.user_id = user_id
         self._is_input_vertices: list[str] = []
@@ -120,6 +143,13 @@ class Graph:
         self._lock = asyncio.Lock()
         self.raw_graph_data: GraphData = {"nodes": [], "edges": []}
         self._is_cyclic: bool | None = None
+        self.vertex_fingerprints: dict[str, str] = {}
+        self.reusable_vertices: set[str] = set()
+        # Resources used by the last run
+        self.usage: RunUsage | None = None
+        # Set while the run is recorded to, or replayed from, a run capsule
+        self.capsule_recorder: CapsuleRecorder | None = None
+        self.capsule_replayer: CapsuleReplayer | None = None
         self._cycles: list[tuple[str, str]] | None = None
         self._cycle_vertices: set[str] | None = None
         self._call_order: list[str] = []
@@ -627,6 +657,14 @@ class Graph:
                 session_id=self.session_id,
             )
 
+    def end_run_state(self) -> None:
+        """Frees the state kept for the current run by the state service.
+
+        Only call this once the whole run is over: the vertices still building read and write it.
+        """
+        if self._run_id:
+            get_state_service().end_run(self._run_id)
+
     def _end_all_traces_async(self, outputs: dict[str, Any] | None = None, error: Exception | None = None) -> None:
         task = asyncio.create_task(self.end_all_traces(outputs, error))
         self._end_trace_tasks.add(task)
@@ -767,10 +805,12 @@ class Graph:
             )
             self.increment_run_count()
         except Exception as exc:
+            self.end_run_state()
             self._end_all_traces_async(error=exc)
             msg = f"Error running graph: {exc}"
             raise ValueError(msg) from exc
 
+        self.end_run_state()
         self._end_all_traces_async()
         # Get the outputs
         vertex_outputs = []
@@ -973,6 +1013,7 @@ class Graph:
             "edges": self.edges,
             "flow_id": self.flow_id,
             "flow_name": self.flow_name,
+            "flow_version": self.flow_version,
             "description": self.description,
             "user_id": self.user_id,
             "raw_graph_data": self.raw_graph_data,
@@ -996,6 +1037,8 @@ class Graph:
             "_is_output_vertices": self._is_output_vertices,
             "has_session_id_vertices": self.has_session_id_vertices,
             "_sorted_vertices_layers": self._sorted_vertices_layers,
+            "vertex_fingerprints": self.vertex_fingerprints,
+            "reusable_vertices": self.reusable_vertices,
         }
 
     def __deepcopy__(self, memo):
@@ -1037,6 +1080,11 @@ class Graph:
             state["run_manager"] = run_manager
         else:
             state["run_manager"] = RunnableVerticesManager.from_dict(run_manager)
+        # Graphs cached before flows were versioned have no flow version
+        state.setdefault("flow_version", None)
+        state.setdefault("usage", None)
+        state.setdefault("capsule_recorder", None)
+        state.setdefault("capsule_replayer", None)
         self.__dict__.update(state)
         self.vertex_map = {vertex.id: vertex for vertex in self.vertices}
         self.tracing_service = get_tracing_service()
@@ -1324,6 +1372,7 @@ class Graph:
             msg = "Graph not prepared. Call prepare() first."
             raise ValueError(msg)
         if not self._run_queue:
+            self.end_run_state()
             self._end_all_traces_async()
             return Finish()
         vertex_id = self.get_next_in_queue()
@@ -1420,18 +1469,26 @@ class Graph:
         """
         vertex = self.get_vertex(vertex_id)
         self.run_manager.add_to_vertices_being_run(vertex_id)
+        # Vertex ids are copied along with flows, so the cached results of a vertex are scoped to
+        # the flow and user that built them
+        cache_key = f"{self.flow_id}:{user_id or self.user_id}:{vertex.id}"
         try:
             params = ""
             should_build = False
-            if not vertex.frozen:
+            reusable = vertex.id in self.reusable_vertices
+            if not vertex.frozen and not reusable:
                 should_build = True
             else:
                 # Check the cache for the vertex
                 if get_cache is not None:
-                    cached_result = await get_cache(key=vertex.id)
+                    cached_result = await get_cache(key=cache_key)
                 else:
                     cached_result = CacheMiss()
-                if isinstance(cached_result, CacheMiss):
+                if isinstance(cached_result, CacheMiss) or (
+                    # Reused results must come from a build of the same configuration
+                    not vertex.frozen
+                    and cached_result["result"].get("fingerprint") != self.vertex_fingerprints.get(vertex.id)
+                ):
                     should_build = True
                 else:
                     try:
@@ -1454,7 +1511,19 @@ class Graph:
                     except KeyError:
                         should_build = True
 
+            if should_build and self.capsule_replayer is not None and self.capsule_replayer.restore_vertex(vertex):
+                should_build = False
+
+            memo_key = self._get_memo_key(vertex, user_id or self.user_id) if should_build else None
+            if memo_key is not None and self._restore_memoized_vertex(vertex, memo_key):
+                should_build = False
+
             if should_build:
+                if reusable:
+                    # The vertex could not be reused, so whatever depends on it must be rebuilt too
+                    self.reusable_vertices.difference_update(
+                        successor.id for successor in self.get_all_successors(vertex)
+                    )
                 await vertex.build(
                     user_id=user_id,
                     inputs=inputs_dict,
@@ -1462,6 +1531,10 @@ class Graph:
                     files=files,
                     event_manager=event_manager,
                 )
+                if self.capsule_replayer is not None:
+                    self.capsule_replayer.check_vertex(vertex)
+                if memo_key is not None:
+                    self._memoize_vertex(vertex, memo_key)
                 if set_cache is not None:
                     vertex_dict = {
                         "built": vertex.built,
@@ -1470,15 +1543,20 @@ class Graph:
                         "built_object": vertex.built_object,
                         "built_result": vertex.built_result,
                         "full_data": vertex.full_data,
+                        "fingerprint": self.vertex_fingerprints.get(vertex.id),
                     }
 
-                    await set_cache(key=vertex.id, data=vertex_dict)
+                    await set_cache(key=cache_key, data=vertex_dict)
 
         except Exception as exc:
             if not isinstance(exc, ComponentBuildError):
                 logger.exception("Error building Component")
+            if self.capsule_recorder is not None:
+                self.capsule_recorder.record_error(vertex, exc)
             raise
 
+        if self.capsule_recorder is not None:
+            self.capsule_recorder.record_vertex(vertex)
         if vertex.result is not None:
             params = f"{vertex.built_object_repr()}{params}"
             valid = True
@@ -1492,6 +1570,188 @@ class Graph:
             result_dict=result_dict, params=params, valid=valid, artifacts=artifacts, vertex=vertex
         )
 
+    async def get_variable_values(self, user_id: str | None) -> dict[str, str | None]:
+        """Returns the values of the variables the vertices load from the database, keyed by name.
+
+        Variables that cannot be loaded have a None value, as they do when the vertices are built.
+
+        Args:
+            user_id (str | None): The user owning the variables.
+
+        Returns:
+            dict[str, str | None]: The values keyed by variable name.
+        """
+        fields = {
+            vertex.raw_params[field]: field
+            for vertex in self.vertices
+            for field in vertex.load_from_db_fields
+            if vertex.raw_params.get(field)
+        }
+        if not fields or user_id is None:
+            return {}
+        variable_service = get_variable_service()
+        values: dict[str, str | None] = {}
+        # Variables are only read, from the read replica if there is one
+        async with session_scope(read_only=True) as session:
+            for name, field in fields.items():
+                try:
+                    values[name] = await variable_service.get_variable(
+                        user_id=uuid.UUID(str(user_id)), name=name, field=field, session=session
+                    )
+                except (TypeError, ValueError):
+                    values[name] = None
+        return values
+
+    def compute_vertex_fingerprints(self, variables: dict[str, str | None] | None = None) -> dict[str, str]:
+        """Computes a configuration fingerprint for each vertex, covering the vertex and everything upstream of it.
+
+        Vertices whose configuration cannot be fingerprinted, and every vertex of a cyclic graph,
+        are left out and therefore never considered unchanged. So are the vertices loading a
+        variable from the database whose value is not in ``variables``.
+
+        Args:
+            variables (dict[str, str | None] | None): The values of the variables the vertices load
+                from the database, as returned by :meth:`get_variable_values`.
+
+        Returns:
+            dict[str, str]: The fingerprints keyed by vertex id.
+        """
+        self.vertex_fingerprints = {}
+        if self.is_cyclic:
+            return self.vertex_fingerprints
+
+        def _lineage_fingerprint(vertex_id: str) -> str | None:
+            if vertex_id in self.vertex_fingerprints:
+                return self.vertex_fingerprints[vertex_id]
+            predecessors = sorted(set(self.predecessor_map.get(vertex_id, [])))
+            upstream = [_lineage_fingerprint(predecessor_id) for predecessor_id in predecessors]
+            if any(fingerprint is None for fingerprint in upstream):
+                return None
+            try:
+                config = get_config_fingerprint(self.get_vertex(vertex_id), variables)
+            except UnfingerprintableValueError as exc:
+                logger.debug(f"Not fingerprinting {vertex_id}: {exc}")
+                return None
+            fingerprint = fingerprint_value({"config": config, "upstream": upstream})
+            self.vertex_fingerprints[vertex_id] = fingerprint
+            return fingerprint
+
+        for vertex_id in self.vertex_map:
+            _lineage_fingerprint(vertex_id)
+        return self.vertex_fingerprints
+
+    def plan_incremental_build(
+        self,
+        previous_fingerprints: dict[str, str],
+        *,
+        force_build: list[str] | None = None,
+        variables: dict[str, str | None] | None = None,
+    ) -> set[str]:
+        """Marks the vertices whose results from the previous build can be reused.
+
+        A vertex is dirty when its fingerprint differs from the previous build. Dirty vertices,
+        input vertices and the ones in ``force_build`` are rebuilt together with all of their
+        successors; every other vertex is restored from the cached result of the previous build.
+        If nothing was edited since the previous build, nothing is reused and the flow runs again.
+
+        Args:
+            previous_fingerprints (dict[str, str]): The fingerprints of the previous build.
+            force_build (list[str] | None): Ids of vertices that must be rebuilt regardless.
+            variables (dict[str, str | None] | None): The values of the variables the vertices load
+                from the database, as returned by :meth:`get_variable_values`.
+
+        Returns:
+            set[str]: The ids of the reusable vertices.
+        """
+        fingerprints = self.compute_vertex_fingerprints(variables)
+        self.reusable_vertices = set()
+        changed = {
+            vertex_id
+            for vertex_id in self.vertex_map
+            if vertex_id not in fingerprints or previous_fingerprints.get(vertex_id) != fingerprints[vertex_id]
+        }
+        if not previous_fingerprints or not changed:
+            return self.reusable_vertices
+
+        dirty = changed | set(force_build or [])
+        dirty.update(vertex.id for vertex in self.vertices if vertex.is_input)
+        for vertex_id in list(dirty):
+            if vertex_id in self.vertex_map:
+                dirty.update(successor.id for successor in self.get_all_successors(self.get_vertex(vertex_id)))
+        self.reusable_vertices = set(self.vertex_map) - dirty
+        return self.reusable_vertices
+
+    @staticmethod
+    def _get_memo_key(vertex: Vertex, user_id: str | None) -> str | None:
+        """Returns the memoization key of a deterministic vertex, or None if it must be built.
+
+        Keys are scoped by user, so results are never handed to another user's flows.
+        """
+        if (
+            not vertex.deterministic
+            or not vertex.is_active()
+            or vertex.load_from_db_fields
+            or vertex.has_cycle_edges
+            or vertex.is_loop
+            or not get_settings_service().settings.memoize_deterministic_components
+        ):
+            return None
+        try:
+            return f"vertex_memo:{user_id}:{get_input_fingerprint(vertex)}"
+        except UnfingerprintableValueError as exc:
+            logger.debug(f"Not memoizing {vertex.id}: {exc}")
+            return None
+
+    @staticmethod
+    def _restore_memoized_vertex(vertex: Vertex, memo_key: str) -> bool:
+        """Restores a vertex from its memoized result. Returns True on a cache hit."""
+        cached_result = get_vertex_cache_service().get(memo_key)
+        if isinstance(cached_result, CacheMiss):
+            return False
+        # Each build gets its own copy, so changes made downstream never reach the cache
+        cached_result = copy.deepcopy(cached_result)
+        vertex.built = True
+        vertex.built_object = cached_result["built_object"]
+        vertex.built_result = cached_result["built_result"]
+        vertex.results = dict(cached_result["results"])
+        vertex.artifacts = cached_result["artifacts"]
+        vertex.artifacts_raw = cached_result["artifacts_raw"]
+        vertex.artifacts_type = cached_result["artifacts_type"]
+        vertex.outputs_logs = cached_result["outputs_logs"]
+        vertex.logs = cached_result["logs"]
+        vertex.result_fingerprint = cached_result["result_fingerprint"]
+        vertex.finalize_build()
+        if vertex.result is not None:
+            vertex.result.used_frozen_result = True
+        return True
+
+    @staticmethod
+    def _memoize_vertex(vertex: Vertex, memo_key: str) -> None:
+        try:
+            result_fingerprint = get_result_fingerprint(vertex)
+        except UnfingerprintableValueError as exc:
+            logger.debug(f"Not memoizing {vertex.id}: {exc}")
+            return
+        try:
+            # A snapshot, as the vertex's own results are still handed to its successors
+            snapshot = copy.deepcopy(
+                {
+                    "built_object": vertex.built_object,
+                    "built_result": vertex.built_result,
+                    "results": vertex.results,
+                    "artifacts": vertex.artifacts,
+                    "artifacts_raw": vertex.artifacts_raw,
+                    "artifacts_type": vertex.artifacts_type,
+                    "outputs_logs": vertex.outputs_logs,
+                    "logs": vertex.logs,
+                    "result_fingerprint": result_fingerprint,
+                }
+            )
+        except Exception as exc:  # noqa: BLE001
+            logger.debug(f"Not memoizing {vertex.id}, its results cannot be copied: {exc}")
+            return
+        get_vertex_cache_service().set(memo_key, snapshot)
+
     def get_vertex_edges(
         self,
         vertex_id: str,
@@ -1527,52 +1787,87 @@ class Graph:
         start_component_id: str | None = None,
         event_manager: EventManager | None = None,
     ) -> Graph:
-        """Processes the graph with vertices in each layer run in parallel."""
+        """Processes the graph, building each vertex as soon as its predecessors are built."""
         has_webhook_component = "webhook" in start_component_id.lower() if start_component_id else False
         first_layer = self.sort_vertices(start_component_id=start_component_id)
-        vertex_task_run_count: dict[str, int] = {}
-        to_process = deque(first_layer)
-        layer_index = 0
+        if self.capsule_replayer is not None:
+            first_layer = self.capsule_replayer.restore_run_plan(self)
         chat_service = get_chat_service()
         await self.initialize_run()
         lock = asyncio.Lock()
-        while to_process:
-            current_batch = list(to_process)  # Copy current deque items to a list
-            to_process.clear()  # Clear the deque for new items
-            tasks = []
-            for vertex_id in current_batch:
-                vertex = self.get_vertex(vertex_id)
-                task = asyncio.create_task(
-                    self.build_vertex(
-                        vertex_id=vertex_id,
-                        user_id=self.user_id,
-                        inputs_dict={},
-                        fallback_to_env_vars=fallback_to_env_vars,
-                        get_cache=chat_service.get_cache,
-                        set_cache=chat_service.set_cache,
-                        event_manager=event_manager,
-                    ),
-                    name=f"{vertex.id} Run {vertex_task_run_count.get(vertex_id, 0)}",
-                )
-                tasks.append(task)
-                vertex_task_run_count[vertex_id] = vertex_task_run_count.get(vertex_id, 0) + 1
+        for vertex_id in first_layer:
+            self.run_manager.add_to_vertices_being_run(vertex_id)
 
-            logger.debug(f"Running layer {layer_index} with {len(tasks)} tasks, {current_batch}")
+        async def build(vertex_id: str) -> list[str]:
             try:
-                next_runnable_vertices = await self._execute_tasks(
-                    tasks, lock=lock, has_webhook_component=has_webhook_component
+                result = await self.build_vertex(
+                    vertex_id=vertex_id,
+                    user_id=self.user_id,
+                    inputs_dict={},
+                    fallback_to_env_vars=fallback_to_env_vars,
+                    get_cache=chat_service.get_cache,
+                    set_cache=chat_service.set_cache,
+                    event_manager=event_manager,
                 )
-            except Exception:
-                logger.exception(f"Error executing tasks in layer {layer_index}")
+            except Exception as e:
+                logger.error(f"Vertex {vertex_id} failed with exception: {e}")
+                if has_webhook_component:
+                    await self._log_vertex_build_from_exception(vertex_id, e)
                 raise
-            if not next_runnable_vertices:
-                break
-            to_process.extend(next_runnable_vertices)
-            layer_index += 1
+            if self.flow_id is not None:
+                await log_vertex_build(
+                    flow_id=self.flow_id,
+                    vertex_id=result.vertex.id,
+                    valid=result.valid,
+                    params=result.params,
+                    data=result.result_dict,
+                    artifacts=result.artifacts,
+                    flow_version=self.flow_version,
+                )
+            # Formatted only if a sink takes debug lines, results can be large
+            logger.debug(
+                "Vertex {}, result: {}, object: {}", vertex_id, result.vertex.built_result, result.vertex.built_object
+            )
+            return await self.get_next_runnable_vertices(lock, vertex=result.vertex, cache=False)
 
+        await self.execute(first_layer, build)
         logger.debug("Graph processing complete")
         return self
 
+    async def execute(self, first_layer: list[str], build: Callable[[str], Awaitable[list[str]]]) -> None:
+        """Runs the builds of the vertices from the first layer on, each as soon as it is runnable.
+
+        The run is measured and held to the run quotas. It is recorded to a run capsule if the
+        run_capsules setting asks for it, unless the graph is replaying a capsule or the run is
+        part of a recorded run, as a subflow is.
+        """
+        settings = get_settings_service().settings
+        self.usage = RunUsage(run_id=self._run_id, user_id=self.user_id, flow_id=self.flow_id)
+        recorder = None
+        if capsule_var.get() is None and self.capsule_replayer is None and settings.run_capsules != "off":
+            recorder = CapsuleRecorder(self, first_layer)
+        self.capsule_recorder = recorder
+        capsule = self.capsule_replayer or recorder
+        # The builds run in a task copying the context, which routes their LLM calls to the capsule
+        token = capsule_var.set(capsule) if capsule is not None else None
+        try:
+            # Logging the builds and loading variables reuse a session when they follow each other
+            async with get_db_service().unit_of_work():
+                await get_usage_service().track_run(
+                    self.usage, run_vertices(first_layer, build, max_concurrency=settings.max_concurrent_vertex_builds)
+                )
+        except Exception as exc:
+            if recorder is not None:
+                await save_run_capsule(recorder.finish(exc))
+            raise
+        finally:
+            self.capsule_recorder = None
+            if token is not None:
+                capsule_var.reset(token)
+        # A component failing in the playground does not fail the run, but fails its capsule
+        if recorder is not None and (settings.run_capsules == "all" or recorder.capsule.error is not None):
+            await save_run_capsule(recorder.finish())
+
     def find_next_runnable_vertices(self, vertex_successors_ids: list[str]) -> list[str]:
         """Determines the next set of runnable vertices from a list of successor vertex IDs.
 
@@ -1659,64 +1954,9 @@ class Graph:
             params=params,
             data=result_data_response,
             artifacts={},
+            flow_version=self.flow_version,
         )
 
-    async def _execute_tasks(
-        self, tasks: list[asyncio.Task], lock: asyncio.Lock, *, has_webhook_component: bool = False
-    ) -> list[str]:
-        """Executes tasks in parallel, handling exceptions for each task.
-
-        Args:
-            tasks: List of tasks to execute
-            lock: Async lock for synchronization
-            has_webhook_component: Whether the graph has a webhook component
-        """
-        results = []
-        completed_tasks = await asyncio.gather(*tasks, return_exceptions=True)
-        vertices: list[Vertex] = []
-
-        for i, result in enumerate(completed_tasks):
-            task_name = tasks[i].get_name()
-            vertex_id = tasks[i].get_name().split(" ")[0]
-
-            if isinstance(result, Exception):
-                logger.error(f"Task {task_name} failed with exception: {result}")
-                if has_webhook_component:
-                    await self._log_vertex_build_from_exception(vertex_id, result)
-
-                # Cancel all remaining tasks
-                for t in tasks[i + 1 :]:
-                    t.cancel()
-                raise result
-            if isinstance(result, VertexBuildResult):
-                if self.flow_id is not None:
-                    await log_vertex_build(
-                        flow_id=self.flow_id,
-                        vertex_id=result.vertex.id,
-                        valid=result.valid,
-                        params=result.params,
-                        data=result.result_dict,
-                        artifacts=result.artifacts,
-                    )
-
-                vertices.append(result.vertex)
-            else:
-                msg = f"Invalid result from task {task_name}: {result}"
-                raise TypeError(msg)
-
-        for v in vertices:
-            # set all executed vertices as non-runnable to not run them again.
-            # they could be calculated as predecessor or successors of parallel vertices
-            # This could usually happen with input vertices like ChatInput
-            self.run_manager.remove_vertex_from_runnables(v.id)
-
-            logger.debug(f"Vertex {v.id}, result: {v.built_result}, object: {v.built_object}")
-
-        for v in vertices:
-            next_runnable_vertices = await self.get_next_runnable_vertices(lock, vertex=v, cache=False)
-            results.extend(next_runnable_vertices)
-        return list(set(results))
-
     def topological_sort(self) -> list[Vertex]:
         """Performs a topological sort of the vertices in the graph.
 
@@ -1753,7 +1993,7 @@ class Graph:
     def generator_build(self) -> Generator[Vertex, None, None]:
         """Builds each vertex in the graph and yields it."""
         sorted_vertices = self.topological_sort()
-        logger.debug("There are %s vertices in the graph", len(sorted_vertices))
+        logger.debug("There are {} vertices in the graph", len(sorted_vertices))
         yield from sorted_vertices
 
     def get_predecessors(self, vertex):
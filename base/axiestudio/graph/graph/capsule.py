@@ -0,0 +1,436 @@
+"""Run capsules: recordings of flow runs that can be replayed offline.
+
+A capsule holds what a run computed from: the flow as it ran, the parameters each vertex was
+built with, the results of the vertices and the responses of the LLM calls made through
+LangChain. Replaying it rebuilds the graph and substitutes the recorded results for what
+cannot be reproduced offline, so a failure or a slow run can be investigated without the
+services the flow calls.
+
+Capsules are pickled, like the results in the cache: only load capsules you trust.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import gzip
+import pickle
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from langchain_core.caches import BaseCache
+from loguru import logger
+from pandas import DataFrame
+
+from axiestudio.graph.utils import UnbuiltObject, UnbuiltResult
+from axiestudio.graph.vertex.base import Vertex
+from axiestudio.graph.vertex.fingerprint import UnfingerprintableValueError, get_result_fingerprint
+from axiestudio.schema.data import Data
+from axiestudio.schema.message import Message
+from axiestudio.services.deps import get_settings_service
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from langchain_core.outputs import Generation
+
+    from axiestudio.graph.graph.base import Graph
+
+CAPSULE_VERSION = 1
+CAPSULE_SUFFIX = ".capsule"
+
+_PLAIN_TYPES = (str, int, float, bool, bytes, type(None), UnbuiltObject, UnbuiltResult, DataFrame)
+# The attributes of a built vertex that make up its result, as memoized by the graph
+_RESULT_ATTRIBUTES = (
+    "built_object",
+    "built_result",
+    "results",
+    "artifacts",
+    "artifacts_raw",
+    "artifacts_type",
+    "outputs_logs",
+    "logs",
+)
+
+# The recorder or replayer of the current run, read by the LLM cache
+capsule_var: ContextVar[CapsuleRecorder | CapsuleReplayer | None] = ContextVar("capsule", default=None)
+
+
+class CapsuleMissError(LookupError):
+    """Raised on replay when a component makes an LLM call that is not in the capsule."""
+
+
+class RecordedBuildError(ValueError):
+    """Raised on replay by a component that failed in the recorded run, with its error message."""
+
+
+@dataclass
+class VertexRecord:
+    """What a vertex was built with and what it returned, in a recorded run."""
+
+    params: dict[str, Any] = field(default_factory=dict)
+    result: bytes | None = None
+    """The pickled result attributes of the vertex, None if they cannot be replayed."""
+    result_fingerprint: str | None = None
+    error: str | None = None
+
+
+@dataclass
+class RunCapsule:
+    """A recorded run of a flow."""
+
+    run_id: str
+    graph_data: dict
+    flow_id: str | None = None
+    flow_name: str | None = None
+    user_id: str | None = None
+    session_id: str | None = None
+    first_layer: list[str] = field(default_factory=list)
+    vertices_to_run: list[str] = field(default_factory=list)
+    build_order: list[str] = field(default_factory=list)
+    vertices: dict[str, VertexRecord] = field(default_factory=dict)
+    llm_calls: dict[tuple[str, str], list[Sequence[Generation]]] = field(default_factory=dict)
+    """The responses of the LLM calls of the run, by prompt and model, in the order they were made."""
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    version: int = CAPSULE_VERSION
+
+    def to_bytes(self) -> bytes:
+        return gzip.compress(pickle.dumps(self, protocol=pickle.HIGHEST_PROTOCOL))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> RunCapsule:
+        capsule = pickle.loads(gzip.decompress(data))  # noqa: S301
+        if not isinstance(capsule, cls):
+            msg = "Not a run capsule"
+            raise TypeError(msg)
+        if capsule.version != CAPSULE_VERSION:
+            msg = f"Unsupported run capsule version {capsule.version}, expected {CAPSULE_VERSION}"
+            raise ValueError(msg)
+        return capsule
+
+    def save(self, path: Path) -> None:
+        path.write_bytes(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: Path) -> RunCapsule:
+        return cls.from_bytes(path.read_bytes())
+
+
+def _is_plain(value: Any) -> bool:
+    """Whether a result is plain data, which can be replayed in place of building its vertex."""
+    if isinstance(value, Message):
+        # The fields of a message are plain by their schema, what else it carries may not be
+        extra = {key: item for key, item in value.data.items() if key not in Message.model_fields}
+        return isinstance(value.text, str | None) and _is_plain(extra)
+    if isinstance(value, Data):
+        return _is_plain(value.data)
+    if isinstance(value, dict):
+        return all(_is_plain(key) and _is_plain(item) for key, item in value.items())
+    if isinstance(value, list | tuple):
+        return all(_is_plain(item) for item in value)
+    return isinstance(value, _PLAIN_TYPES)
+
+
+def _is_secret_field(field_config: Any) -> bool:
+    return (
+        isinstance(field_config, dict) and bool(field_config.get("password")) and not field_config.get("load_from_db")
+    )
+
+
+def _strip_secrets(graph_data: dict) -> dict:
+    """Return a copy of the graph data without the values of password fields, kept only as variable names."""
+    graph_data = copy.deepcopy(graph_data)
+    for node in graph_data.get("nodes", []):
+        template = node.get("data", {}).get("node", {}).get("template", {})
+        for field_config in template.values():
+            if _is_secret_field(field_config):
+                field_config["value"] = ""
+    return graph_data
+
+
+def _recordable_params(vertex: Vertex) -> dict[str, Any]:
+    """The parameters of a vertex that are not results of other vertices or secrets."""
+    template = vertex.data["node"].get("template", {})
+    params = {}
+    for key, value in vertex.raw_params.items():
+        if _is_secret_field(template.get(key)):
+            continue
+        if isinstance(value, Vertex) or (
+            isinstance(value, list | dict)
+            and any(isinstance(item, Vertex) for item in (value.values() if isinstance(value, dict) else value))
+        ):
+            continue
+        try:
+            pickle.dumps(value)
+        except Exception:  # noqa: BLE001
+            logger.debug(f"Not recording the parameter {key} of {vertex.id}")
+            continue
+        params[key] = value
+    return params
+
+
+def _dump_result(vertex: Vertex) -> bytes | None:
+    result = {name: getattr(vertex, name) for name in _RESULT_ATTRIBUTES}
+    if not all(_is_plain(result[name]) for name in ("built_object", "built_result", "results", "artifacts_raw")):
+        return None
+    try:
+        return pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:  # noqa: BLE001
+        return None
+
+
+class CapsuleLLMCache(BaseCache):
+    """LangChain LLM cache recording the responses of the run being recorded, and serving them on replay.
+
+    Calls made outside of a recorded or replayed run go to the cache it replaced, if any.
+    """
+
+    def __init__(self, wrapped: BaseCache | None = None) -> None:
+        self.wrapped = wrapped
+
+    def lookup(self, prompt: str, llm_string: str) -> Sequence[Generation] | None:
+        session = capsule_var.get()
+        if isinstance(session, CapsuleReplayer):
+            return session.lookup_llm_call(prompt, llm_string)
+        value = self.wrapped.lookup(prompt, llm_string) if self.wrapped is not None else None
+        if value is not None and isinstance(session, CapsuleRecorder):
+            session.record_llm_call(prompt, llm_string, value)
+        return value
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        session = capsule_var.get()
+        if isinstance(session, CapsuleRecorder):
+            session.record_llm_call(prompt, llm_string, return_val)
+        if self.wrapped is not None and not isinstance(session, CapsuleReplayer):
+            self.wrapped.update(prompt, llm_string, return_val)
+
+    async def alookup(self, prompt: str, llm_string: str) -> Sequence[Generation] | None:
+        session = capsule_var.get()
+        if isinstance(session, CapsuleReplayer):
+            return session.lookup_llm_call(prompt, llm_string)
+        value = await self.wrapped.alookup(prompt, llm_string) if self.wrapped is not None else None
+        if value is not None and isinstance(session, CapsuleRecorder):
+            session.record_llm_call(prompt, llm_string, value)
+        return value
+
+    async def aupdate(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        session = capsule_var.get()
+        if isinstance(session, CapsuleRecorder):
+            session.record_llm_call(prompt, llm_string, return_val)
+        if self.wrapped is not None and not isinstance(session, CapsuleReplayer):
+            await self.wrapped.aupdate(prompt, llm_string, return_val)
+
+    def clear(self, **kwargs: Any) -> None:
+        if self.wrapped is not None:
+            self.wrapped.clear(**kwargs)
+
+
+def install_llm_cache() -> None:
+    """Make the capsule cache the global LangChain LLM cache, wrapping the one set up, if not done yet."""
+    from langchain_core.globals import get_llm_cache, set_llm_cache
+
+    current = get_llm_cache()
+    if not isinstance(current, CapsuleLLMCache):
+        set_llm_cache(CapsuleLLMCache(current))
+
+
+class CapsuleRecorder:
+    """Records a run of a graph into a capsule as its vertices are built."""
+
+    def __init__(self, graph: Graph, first_layer: list[str]) -> None:
+        install_llm_cache()
+        self.capsule = RunCapsule(
+            run_id=graph.run_id,
+            graph_data=_strip_secrets(graph.dump()["data"]),
+            flow_id=graph.flow_id,
+            flow_name=graph.flow_name,
+            user_id=graph.user_id,
+            session_id=graph.session_id,
+            first_layer=list(first_layer),
+            vertices_to_run=sorted(graph.vertices_to_run),
+        )
+
+    def record_vertex(self, vertex: Vertex) -> None:
+        try:
+            result_fingerprint = get_result_fingerprint(vertex)
+        except UnfingerprintableValueError:
+            result_fingerprint = None
+        self.capsule.vertices[vertex.id] = VertexRecord(
+            params=_recordable_params(vertex), result=_dump_result(vertex), result_fingerprint=result_fingerprint
+        )
+        self.capsule.build_order.append(vertex.id)
+
+    def record_error(self, vertex: Vertex, error: BaseException) -> None:
+        self.capsule.vertices[vertex.id] = VertexRecord(params=_recordable_params(vertex), error=str(error))
+        self.capsule.build_order.append(vertex.id)
+        if self.capsule.error is None:
+            self.capsule.error = str(error)
+
+    def record_llm_call(self, prompt: str, llm_string: str, generations: Sequence[Generation]) -> None:
+        self.capsule.llm_calls.setdefault((prompt, llm_string), []).append(generations)
+
+    def finish(self, error: BaseException | None = None) -> RunCapsule:
+        """Return the capsule of the run, with the error that failed it, else that of its first failed vertex."""
+        if error is not None:
+            self.capsule.error = str(error)
+        return self.capsule
+
+
+class CapsuleReplayer:
+    """Replays a capsule in a graph built from its flow.
+
+    Vertices whose recorded result is plain data are restored from it, unless they are
+    deterministic or rerun_components is set. The others are rebuilt with the recorded
+    parameters, their LLM calls served from the capsule, and their results compared to the
+    recorded ones.
+    """
+
+    def __init__(self, capsule: RunCapsule, *, rerun_components: bool = False) -> None:
+        install_llm_cache()
+        self.capsule = capsule
+        self.rerun_components = rerun_components
+        self.restored: list[str] = []
+        self.rebuilt: list[str] = []
+        self.diverged: list[str] = []
+        self._llm_call_counts: dict[tuple[str, str], int] = {}
+
+    def restore_run_plan(self, graph: Graph) -> list[str]:
+        """Set the vertices to run to those of the recorded run and return its first layer."""
+        graph.vertices_to_run = set(self.capsule.vertices_to_run)
+        graph.build_run_map()
+        return list(self.capsule.first_layer)
+
+    def restore_vertex(self, vertex: Vertex) -> bool:
+        """Restore a vertex from its recorded result. Returns False if it must be built.
+
+        Raises:
+            RecordedBuildError: If the vertex failed in the recorded run and is not rebuilt.
+        """
+        record = self.capsule.vertices.get(vertex.id)
+        if record is None:
+            return False
+        rebuild = self.rerun_components or vertex.deterministic or vertex.has_cycle_edges or vertex.is_loop
+        if record.error is not None and not rebuild:
+            raise RecordedBuildError(record.error)
+        if rebuild or record.result is None:
+            vertex.update_raw_params(dict(record.params))
+            return False
+        for name, value in pickle.loads(record.result).items():  # noqa: S301
+            setattr(vertex, name, value)
+        vertex.built = True
+        vertex.result_fingerprint = record.result_fingerprint
+        vertex.finalize_build()
+        self.restored.append(vertex.id)
+        return True
+
+    def check_vertex(self, vertex: Vertex) -> None:
+        """Compare the result of a rebuilt vertex to the recorded one."""
+        self.rebuilt.append(vertex.id)
+        record = self.capsule.vertices.get(vertex.id)
+        if record is None or record.result_fingerprint is None:
+            return
+        try:
+            result_fingerprint = get_result_fingerprint(vertex)
+        except UnfingerprintableValueError:
+            return
+        if result_fingerprint != record.result_fingerprint:
+            self.diverged.append(vertex.id)
+
+    def lookup_llm_call(self, prompt: str, llm_string: str) -> Sequence[Generation]:
+        key = (prompt, llm_string)
+        responses = self.capsule.llm_calls.get(key)
+        if not responses:
+            msg = "The capsule has no response for this LLM call: its prompt or model differs from the recorded run"
+            raise CapsuleMissError(msg)
+        # Identical calls get the responses in the order they were recorded, then the last one
+        index = self._llm_call_counts.get(key, 0)
+        self._llm_call_counts[key] = index + 1
+        return responses[min(index, len(responses) - 1)]
+
+
+@dataclass
+class ReplayResult:
+    """The outcome of replaying a capsule."""
+
+    graph: Graph
+    restored: list[str]
+    """Vertices restored from their recorded results."""
+    rebuilt: list[str]
+    diverged: list[str]
+    """Rebuilt vertices whose results differ from the recorded ones."""
+    error: str | None
+    recorded_error: str | None
+    duration: float
+
+    @property
+    def reproduced(self) -> bool:
+        """Whether the replay ended as the recorded run did."""
+        return not self.diverged and self.error == self.recorded_error
+
+
+async def replay_capsule(
+    capsule: RunCapsule, *, rerun_components: bool = False, fallback_to_env_vars: bool = True
+) -> ReplayResult:
+    """Replay a recorded run in a new graph built from the recorded flow."""
+    from axiestudio.graph.graph.base import Graph
+
+    graph = Graph.from_payload(
+        copy.deepcopy(capsule.graph_data), flow_id=capsule.flow_id, flow_name=capsule.flow_name, user_id=capsule.user_id
+    )
+    if capsule.session_id:
+        graph.session_id = capsule.session_id
+    replayer = CapsuleReplayer(capsule, rerun_components=rerun_components)
+    graph.capsule_replayer = replayer
+    error = None
+    start = time.perf_counter()
+    try:
+        await graph.process(fallback_to_env_vars=fallback_to_env_vars)
+    except Exception as exc:  # noqa: BLE001
+        error = str(exc)
+    return ReplayResult(
+        graph=graph,
+        restored=replayer.restored,
+        rebuilt=replayer.rebuilt,
+        diverged=replayer.diverged,
+        error=error,
+        recorded_error=capsule.error,
+        duration=time.perf_counter() - start,
+    )
+
+
+def get_capsule_dir(user_id: str | None) -> Path | None:
+    """The folder of the capsules of a user, None if there is no config dir to keep them in."""
+    config_dir = get_settings_service().settings.config_dir
+    if not config_dir:
+        return None
+    return Path(config_dir) / "capsules" / (user_id or "local")
+
+
+def _write_capsule(capsule: RunCapsule, directory: Path, max_count: int) -> Path:
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{capsule.run_id}{CAPSULE_SUFFIX}"
+    capsule.save(path)
+    capsules = sorted(directory.glob(f"*{CAPSULE_SUFFIX}"), key=lambda item: item.stat().st_mtime, reverse=True)
+    for old_path in capsules[max_count:] if max_count else []:
+        old_path.unlink(missing_ok=True)
+    return path
+
+
+async def save_run_capsule(capsule: RunCapsule) -> Path | None:
+    """Save a capsule in the folder of its user, deleting the oldest beyond run_capsules_max_count."""
+    directory = get_capsule_dir(capsule.user_id)
+    if directory is None:
+        return None
+    try:
+        path = await asyncio.to_thread(
+            _write_capsule, capsule, directory, get_settings_service().settings.run_capsules_max_count
+        )
+    except Exception:  # noqa: BLE001
+        logger.opt(exception=True).warning(f"Could not save the capsule of run {capsule.run_id}")
+        return None
+    logger.debug(f"Saved the capsule of run {capsule.run_id} to {path}")
+    return path
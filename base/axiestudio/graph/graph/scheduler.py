@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from typing import TYPE_CHECKING
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Iterable
+
+
+async def run_vertices(
+    vertex_ids: Iterable[str],
+    build: Callable[[str], Awaitable[Iterable[str]]],
+    *,
+    max_concurrency: int | None = None,
+) -> None:
+    """Build vertices as soon as they become runnable, with at most ``max_concurrency`` at a time.
+
+    ``build`` builds a vertex and returns the ids of the vertices it made runnable, which are
+    scheduled from the same flat set of tasks, so wide flows do not nest a task per branch. If a
+    build fails or the run is cancelled, the builds still running are cancelled and awaited before
+    the error is raised.
+
+    Args:
+        vertex_ids: The vertices to build first.
+        build: Builds a vertex, returning the ids of the vertices to build next.
+        max_concurrency: The number of vertices built at a time. None or 0 means no limit.
+    """
+    pending = deque(dict.fromkeys(vertex_ids))
+    running: dict[asyncio.Task, str] = {}
+    try:
+        while pending or running:
+            while pending and (not max_concurrency or len(running) < max_concurrency):
+                vertex_id = pending.popleft()
+                running[asyncio.create_task(build(vertex_id), name=f"{vertex_id} build")] = vertex_id
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                vertex_id = running.pop(task)
+                # Raises the error of a failed build, cancelling the others below
+                next_vertex_ids = task.result()
+                # A vertex made runnable by two branches is only queued once
+                pending.extend(v_id for v_id in next_vertex_ids if v_id not in pending)
+                logger.trace(f"Built {vertex_id}, {len(running)} running and {len(pending)} pending")
+    finally:
+        for task in running:
+            task.cancel()
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
@@ -154,6 +154,7 @@ async def log_transaction(
             status=status,
             error=error,
             flow_id=flow_id if isinstance(flow_id, UUID) else UUID(flow_id),
+            flow_version=source.graph.flow_version,
         )
         async with session_getter(get_db_service()) as session:
             with session.no_autoflush:
@@ -172,6 +173,7 @@ async def log_vertex_build(
     params: Any,
     data: ResultDataResponse | dict,
     artifacts: dict | None = None,
+    flow_version: int | None = None,
 ) -> None:
     """Asynchronously logs a vertex build record to the database if vertex build storage is enabled.
 
@@ -190,6 +192,7 @@ async def log_vertex_build(
 
         vertex_build = VertexBuildBase(
             flow_id=flow_id,
+            flow_version=flow_version,
             id=vertex_id,
             valid=valid,
             params=str(params) if params else None,
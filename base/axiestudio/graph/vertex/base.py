@@ -21,6 +21,7 @@ from axiestudio.schema.data import Data
 from axiestudio.schema.message import Message
 from axiestudio.schema.schema import INPUT_FIELD_NAME, OutputValue, build_output_logs
 from axiestudio.services.deps import get_storage_service
+from axiestudio.services.usage.accounting import account_vertex
 from axiestudio.utils.schemas import ChatOutputResponse
 from axiestudio.utils.util import sync_to_async
 
@@ -33,6 +34,7 @@ if TYPE_CHECKING:
     from axiestudio.graph.graph.base import Graph
     from axiestudio.graph.vertex.schema import NodeData
     from axiestudio.services.tracing.schema import Log
+    from axiestudio.services.usage.accounting import VertexUsage
 
 
 class VertexStates(str, Enum):
@@ -76,12 +78,15 @@ class Vertex:
         self.built_object: Any = UnbuiltObject()
         self.built_result: Any = None
         self.built = False
+        self.result_fingerprint: str | None = None
         self._successors_ids: list[str] | None = None
         self.artifacts: dict[str, Any] = {}
         self.artifacts_raw: dict[str, Any] | None = {}
         self.artifacts_type: dict[str, str] = {}
         self.steps: list[Callable] = [self._build]
         self.steps_ran: list[Callable] = []
+        # Resources used by the last build
+        self.usage: VertexUsage | None = None
         self.task_id: str | None = None
         self.is_task = is_task
         self.params = params or {}
@@ -243,6 +248,7 @@ class Vertex:
 
         self.description: str = self.data["node"].get("description", "")
         self.frozen: bool = self.data["node"].get("frozen", False)
+        self.deterministic: bool = self.data["node"].get("deterministic", False)
 
         self.is_input = self.data["node"].get("is_input") or self.is_input
         self.is_output = self.data["node"].get("is_output") or self.is_output
@@ -378,7 +384,7 @@ class Vertex:
         event_manager: EventManager | None = None,
     ) -> None:
         """Initiate the build process."""
-        logger.debug(f"Building {self.display_name}")
+        logger.debug("Building {}", self.display_name)
         await self._build_each_vertex_in_params_dict()
 
         if self.base_type is None:
@@ -686,6 +692,7 @@ class Vertex:
         self.built = False
         self.built_object = UnbuiltObject()
         self.built_result = UnbuiltResult()
+        self.result_fingerprint = None
         self.artifacts = {}
         self.steps_ran = []
         self.build_params()
@@ -750,11 +757,13 @@ class Vertex:
 
                 self.update_raw_params(chat_input, overwrite=True)
 
-            # Run steps
-            for step in self.steps:
-                if step not in self.steps_ran:
-                    await step(user_id=user_id, event_manager=event_manager, **kwargs)
-                    self.steps_ran.append(step)
+            # Run steps, measuring the resources they use
+            with account_vertex(self.id) as usage:
+                for step in self.steps:
+                    if step not in self.steps_ran:
+                        await usage.meter(step(user_id=user_id, event_manager=event_manager, **kwargs))
+                        self.steps_ran.append(step)
+            self.usage = usage
 
             self.finalize_build()
 
@@ -0,0 +1,171 @@
+"""Content fingerprints for vertex inputs and results.
+
+A fingerprint is a stable hash of what a vertex computes from: its component code, its
+parameters and the results of the vertices it depends on. Two builds with the same
+fingerprint are interchangeable, which lets deterministic components be memoized.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from collections.abc import AsyncIterator, Iterator
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from enum import Enum
+from typing import TYPE_CHECKING, Any
+from uuid import UUID
+
+import numpy as np
+import orjson
+import pandas as pd
+from pydantic import BaseModel
+from pydantic.v1 import BaseModel as BaseModelV1
+
+from axiestudio.schema.message import Message
+from axiestudio.serialization import serialize
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+    from axiestudio.graph.vertex.base import Vertex
+
+# Message fields that change on every run without changing what the message carries
+MESSAGE_VOLATILE_KEYS = frozenset({"id", "timestamp", "flow_id"})
+# Types whose serialized form reflects their content, rather than falling back to str()
+CONTENT_TYPES = (
+    str,
+    int,
+    float,
+    bytes,
+    datetime,
+    date,
+    time,
+    timedelta,
+    UUID,
+    Decimal,
+    Enum,
+    pd.DataFrame,
+    pd.Series,
+    np.generic,
+    np.ndarray,
+)
+
+
+class UnfingerprintableValueError(ValueError):
+    """Raised when a value cannot be reduced to a stable fingerprint (e.g. an unconsumed stream)."""
+
+
+def _to_stable_payload(value: Any, *, strict: bool) -> Any:
+    if isinstance(value, AsyncIterator | Iterator):
+        msg = "Streams cannot be fingerprinted"
+        raise UnfingerprintableValueError(msg)
+    if isinstance(value, Message):
+        if isinstance(value.text, AsyncIterator | Iterator):
+            msg = "Streaming messages cannot be fingerprinted"
+            raise UnfingerprintableValueError(msg)
+        data = {key: item for key, item in value.data.items() if key not in MESSAGE_VOLATILE_KEYS}
+        return {"__type__": "Message", "text": value.text, "data": _to_stable_payload(data, strict=strict)}
+    if isinstance(value, dict):
+        return {str(key): _to_stable_payload(item, strict=strict) for key, item in value.items()}
+    if isinstance(value, list | tuple):
+        return [_to_stable_payload(item, strict=strict) for item in value]
+    if not strict or value is None or isinstance(value, CONTENT_TYPES):
+        return serialize(value, to_str=True)
+    if isinstance(value, BaseModel | BaseModelV1):
+        fields = value.model_dump() if isinstance(value, BaseModel) else value.dict()
+        return {"__type__": type(value).__name__, "fields": _to_stable_payload(fields, strict=strict)}
+    msg = f"{type(value).__name__} has no serialized form to fingerprint"
+    raise UnfingerprintableValueError(msg)
+
+
+def fingerprint_value(value: Any, *, strict: bool = False) -> str:
+    """Return a SHA-256 hex digest of ``value``'s content.
+
+    Values without a serialized form are hashed by their ``str()``, which may not reflect
+    their content (e.g. it holds a memory address). With ``strict`` they are rejected instead.
+
+    Raises:
+        UnfingerprintableValueError: If the value holds a stream or cannot be serialized.
+    """
+    payload = _to_stable_payload(value, strict=strict)
+    try:
+        dumped = orjson.dumps(
+            payload, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS, default=None if strict else str
+        )
+    except TypeError as e:
+        msg = f"Value cannot be fingerprinted: {e}"
+        raise UnfingerprintableValueError(msg) from e
+    return hashlib.sha256(dumped).hexdigest()
+
+
+def get_result_fingerprint(vertex: Vertex) -> str:
+    """Return the strict fingerprint of a built vertex's results, computing it once per build."""
+    if vertex.result_fingerprint is None:
+        vertex.result_fingerprint = fingerprint_value(vertex.results or vertex.built_object, strict=True)
+    return vertex.result_fingerprint
+
+
+def _param_fingerprint(value: Any) -> Any:
+    from axiestudio.graph.vertex.base import Vertex
+
+    if isinstance(value, Vertex):
+        return {"__vertex__": get_result_fingerprint(value)}
+    if isinstance(value, list) and value and all(isinstance(item, Vertex) for item in value):
+        return [{"__vertex__": get_result_fingerprint(item)} for item in value]
+    if isinstance(value, dict) and any(isinstance(item, Vertex) for item in value.values()):
+        return {key: _param_fingerprint(item) for key, item in value.items()}
+    return value
+
+
+def _config_param_fingerprint(value: Any) -> Any:
+    from axiestudio.graph.vertex.base import Vertex
+
+    if isinstance(value, Vertex):
+        return {"__source__": value.id}
+    if isinstance(value, list) and value and all(isinstance(item, Vertex) for item in value):
+        return [{"__source__": item.id} for item in value]
+    if isinstance(value, dict) and any(isinstance(item, Vertex) for item in value.values()):
+        return {key: _config_param_fingerprint(item) for key, item in value.items()}
+    return value
+
+
+def _get_code(vertex: Vertex) -> str | None:
+    template = vertex.data["node"]["template"]
+    return template.get("code", {}).get("value") if isinstance(template.get("code"), dict) else None
+
+
+def get_config_fingerprint(vertex: Vertex, variables: Mapping[str, str | None] | None = None) -> str:
+    """Return the fingerprint of a vertex's configuration, available before anything is built.
+
+    Unlike :func:`get_input_fingerprint`, upstream vertices are referenced by id rather than
+    by result, so the fingerprint only changes when the vertex itself or its wiring is edited.
+    Fields loaded from the database are fingerprinted by the value of their variable, taken
+    from ``variables``, so editing the variable changes the fingerprint too.
+
+    Raises:
+        UnfingerprintableValueError: If any of the parameters cannot be fingerprinted, or the
+            value of a variable is not in ``variables``.
+    """
+    params = {key: _config_param_fingerprint(value) for key, value in vertex.raw_params.items()}
+    for field in vertex.load_from_db_fields:
+        if not (name := params.get(field)):
+            continue
+        if variables is None or name not in variables:
+            msg = f"The value of the variable {name} is not known"
+            raise UnfingerprintableValueError(msg)
+        # Only a hash of the value is kept, as fingerprints are cached
+        params[field] = {"__variable__": name, "value": fingerprint_value(variables[name])}
+    return fingerprint_value({"type": vertex.vertex_type, "code": _get_code(vertex), "params": params})
+
+
+def get_input_fingerprint(vertex: Vertex) -> str:
+    """Return the strict fingerprint of everything a vertex build depends on.
+
+    The fingerprint combines the component code, the raw parameters and the result
+    fingerprints of the upstream vertices referenced by those parameters.
+
+    Raises:
+        UnfingerprintableValueError: If any of the inputs cannot be fingerprinted.
+    """
+    params = {key: _param_fingerprint(value) for key, value in vertex.raw_params.items()}
+    return fingerprint_value({"type": vertex.vertex_type, "code": _get_code(vertex), "params": params}, strict=True)
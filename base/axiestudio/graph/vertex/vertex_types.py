@@ -448,6 +448,7 @@ class InterfaceVertex(ComponentVertex):
             params=self.built_object_repr(),
             data=self.result,
             artifacts=self.artifacts,
+            flow_version=self.graph.flow_version,
         )
 
         self._validate_built_object()
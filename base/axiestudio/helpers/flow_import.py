@@ -0,0 +1,389 @@
+"""Bulk import of flow exports.
+
+An export is parsed incrementally, so only a batch of flows is held in memory at a time. Name
+collisions are resolved against the names the user already has, loaded with a single query, and
+each batch is validated while the previous one is written in its own transaction.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import codecs
+import json
+import multiprocessing
+import os
+import re
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any
+
+from loguru import logger
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+
+from axiestudio.services.database.models.flow.model import Flow, FlowCreate
+from axiestudio.services.database.models.flow_search.crud import extract_search_text
+from axiestudio.services.database.models.flow_search.model import FlowSearchDocument
+from axiestudio.services.database.models.flow_version.crud import save_flow_version
+from axiestudio.services.deps import session_scope
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterable, AsyncIterator, Awaitable, Callable
+    from uuid import UUID
+
+IMPORT_BATCH_SIZE = 100
+READ_CHUNK_SIZE = 64 * 1024
+MAX_GRAPH_VALIDATION_WORKERS = 4
+# Times a batch is written again after a name it claimed was taken meanwhile
+MAX_NAME_CONFLICT_RETRIES = 3
+
+_json_decoder = json.JSONDecoder()
+_whitespace = re.compile(r"[ \t\n\r]*")
+
+
+class FlowImportError(ValueError):
+    """A flow of an import is invalid. The batches before it were imported."""
+
+    def __init__(self, message: str, *, imported: int = 0) -> None:
+        super().__init__(message)
+        self.imported = imported
+
+
+@dataclass
+class FlowImportProgress:
+    """Counts of an import, updated after each batch."""
+
+    parsed: int = 0
+    """Flows read from the export."""
+    imported: int = 0
+    """Flows written to the database."""
+    renamed: int = 0
+    """Flows whose name was taken, imported under a new one."""
+
+
+@dataclass
+class FlowImportResult:
+    flows: list[Flow] = field(default_factory=list)
+    progress: FlowImportProgress = field(default_factory=FlowImportProgress)
+
+
+class _JSONStream:
+    """Decodes JSON values from a byte stream, reading only as much as each value needs."""
+
+    def __init__(self, read: Callable[[int], Awaitable[bytes]], chunk_size: int) -> None:
+        self._read = read
+        self._chunk_size = chunk_size
+        self._utf8 = codecs.getincrementaldecoder("utf-8-sig")()
+        self._text = ""
+        self._pos = 0
+        self._eof = False
+
+    async def _fill(self, size: int) -> bool:
+        if self._eof:
+            return False
+        chunk = await self._read(size)
+        self._eof = not chunk
+        self._text = self._text[self._pos :] + self._utf8.decode(chunk, final=self._eof)
+        self._pos = 0
+        return True
+
+    async def peek(self) -> str:
+        """Return the next character that is not whitespace, or an empty string at the end."""
+        while True:
+            self._pos = _whitespace.match(self._text, self._pos).end()
+            if self._pos < len(self._text):
+                return self._text[self._pos]
+            if not await self._fill(self._chunk_size):
+                return ""
+
+    async def expect(self, *chars: str) -> str:
+        char = await self.peek()
+        if char not in chars:
+            msg = f"Expected {' or '.join(repr(c) for c in chars)} in the JSON file, found {char or 'the end'!r}"
+            raise ValueError(msg)
+        self._pos += 1
+        return char
+
+    async def value(self) -> Any:
+        await self.peek()
+        size = self._chunk_size
+        while True:
+            try:
+                value, end = _json_decoder.raw_decode(self._text, self._pos)
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            else:
+                # A number at the end of the buffer may continue in the next chunk
+                if end < len(self._text) or self._eof:
+                    self._pos = end
+                    return value
+            # Each retry parses the value from its start, so large values are read in growing chunks
+            await self._fill(size)
+            size *= 2
+
+
+class FlowExport:
+    """A flow export read incrementally: an object with a ``flows`` array or a single flow.
+
+    The top-level fields before the ``flows`` array are read when the export is opened, the
+    ones after it while the flows are iterated.
+    """
+
+    @classmethod
+    async def open(cls, file: Any, *, chunk_size: int = READ_CHUNK_SIZE) -> FlowExport:
+        """Start reading an export from a file with an async ``read``, such as an ``UploadFile``.
+
+        Raises:
+            ValueError: If the file is not a JSON object.
+        """
+        stream = _JSONStream(file.read, chunk_size)
+        await stream.expect("{")
+        export = cls(stream)
+        await export._read_fields()
+        return export
+
+    def __init__(self, stream: _JSONStream) -> None:
+        self._stream = stream
+        self.metadata: dict[str, Any] = {}
+        self.has_flows = False
+        self._consumed = False
+
+    async def _read_fields(self) -> None:
+        """Read top-level fields until the ``flows`` array or the end of the object."""
+        stream = self._stream
+        while (await stream.peek()) != "}":
+            if self.metadata or self.has_flows:
+                await stream.expect(",")
+            key = await stream.value()
+            if not isinstance(key, str):
+                msg = "Expected a field name in the JSON file"
+                raise ValueError(msg)  # noqa: TRY004
+            await stream.expect(":")
+            if key == "flows" and not self.has_flows and await stream.peek() == "[":
+                self.has_flows = True
+                return
+            self.metadata[key] = await stream.value()
+        await stream.expect("}")
+        self._consumed = True
+
+    async def flows(self) -> AsyncIterator[dict]:
+        """Yield the flows of the export, or the export itself if it is a single flow."""
+        if self._consumed:
+            if not self.has_flows:
+                yield self.metadata
+            return
+        stream = self._stream
+        await stream.expect("[")
+        if await stream.peek() == "]":
+            await stream.expect("]")
+        else:
+            while True:
+                flow = await stream.value()
+                if not isinstance(flow, dict):
+                    msg = "Each flow must be a JSON object"
+                    raise ValueError(msg)  # noqa: TRY004
+                yield flow
+                if await stream.expect(",", "]") == "]":
+                    break
+        await self._read_fields()
+
+
+class UniqueNames:
+    """Resolves name collisions in memory against a set of taken names.
+
+    Names are made unique as ``generate_unique_flow_name`` does, with the first free ``(n)``
+    suffix; endpoint names get a ``-n`` suffix.
+    """
+
+    def __init__(self, taken: set[str], pattern: str = "{name} ({n})") -> None:
+        self._taken = taken
+        self._pattern = pattern
+        self._next_suffix: dict[str, int] = {}
+
+    def claim(self, name: str) -> str:
+        unique = name
+        n = self._next_suffix.get(name, 1)
+        while unique in self._taken:
+            unique = self._pattern.format(name=name, n=n)
+            n += 1
+        if unique != name:
+            self._next_suffix[name] = n
+        self._taken.add(unique)
+        return unique
+
+
+def validate_flow_graph(data: dict | None) -> str | None:
+    """Build the graph of a flow, returning the error if it cannot be built.
+
+    Runs in the worker processes of an import with graph validation.
+    """
+    if not data:
+        return None
+    from axiestudio.graph.graph.base import Graph
+
+    try:
+        Graph.from_payload(data)
+    except Exception as e:  # noqa: BLE001
+        return str(e) or type(e).__name__
+    return None
+
+
+def _graph_validation_executor() -> ProcessPoolExecutor:
+    # Forking a process that runs an event loop and database connections is unsafe
+    return ProcessPoolExecutor(
+        max_workers=min(MAX_GRAPH_VALIDATION_WORKERS, os.cpu_count() or 1),
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+def _validate_batch(batch: list[dict], offset: int) -> list[FlowCreate]:
+    flows = []
+    for index, data in enumerate(batch, start=offset + 1):
+        try:
+            flows.append(FlowCreate.model_validate(data))
+        except ValidationError as e:
+            msg = f"Flow {index} ({data.get('name', 'unnamed')}) is invalid: {e}"
+            raise FlowImportError(msg) from e
+    return flows
+
+
+async def import_flows(
+    flows: AsyncIterable[dict],
+    *,
+    user_id: UUID,
+    folder_id: UUID | None = None,
+    batch_size: int = IMPORT_BATCH_SIZE,
+    validate_graphs: bool = False,
+    executor: Executor | None = None,
+    on_progress: Callable[[FlowImportProgress], None] | None = None,
+) -> FlowImportResult:
+    """Import flows for a user, writing each batch in its own transaction.
+
+    The flows are validated a batch ahead of the writes, and taken names and endpoint names are
+    resolved in memory, so a batch costs no queries beyond its inserts.
+
+    Args:
+        flows: The flows to import, as exported. They are consumed lazily.
+        user_id: The user the flows are imported for.
+        folder_id: The project the flows are imported into, instead of their own.
+        batch_size: The number of flows written per transaction.
+        validate_graphs: Whether to build the graph of each flow, rejecting the flows whose graph
+            cannot be built. Graphs are built in a pool of worker processes.
+        executor: The pool to build the graphs in. Defaults to a process pool for this import.
+        on_progress: Called with the counts after each batch.
+
+    Returns:
+        The imported flows and the counts of the import.
+
+    Raises:
+        FlowImportError: If a flow is invalid. The batches before it stay imported.
+        IntegrityError: If the names of a batch were still taken after retrying it, as other
+            imports or saves kept claiming them.
+    """
+    result = FlowImportResult()
+    progress = result.progress
+
+    async def load_taken_names() -> tuple[UniqueNames, UniqueNames]:
+        async with session_scope() as session:
+            taken = (await session.exec(select(Flow.name, Flow.endpoint_name).where(Flow.user_id == user_id))).all()
+        return (
+            UniqueNames({name for name, _ in taken}),
+            UniqueNames({endpoint for _, endpoint in taken if endpoint}, pattern="{name}-{n}"),
+        )
+
+    names, endpoint_names = await load_taken_names()
+
+    owns_executor = validate_graphs and executor is None
+    if owns_executor:
+        executor = _graph_validation_executor()
+    queue: asyncio.Queue[list[FlowCreate] | None] = asyncio.Queue(maxsize=1)
+
+    async def validate(batch: list[dict], offset: int) -> list[FlowCreate]:
+        validated = await asyncio.to_thread(_validate_batch, batch, offset)
+        if validate_graphs:
+            loop = asyncio.get_running_loop()
+            errors = await asyncio.gather(
+                *(loop.run_in_executor(executor, validate_flow_graph, flow.data) for flow in validated)
+            )
+            for index, (flow, error) in enumerate(zip(validated, errors, strict=True), start=offset + 1):
+                if error is not None:
+                    msg = f"Flow {index} ({flow.name}) is invalid: {error}"
+                    raise FlowImportError(msg)
+        return validated
+
+    async def produce() -> None:
+        batch: list[dict] = []
+        try:
+            async for data in flows:
+                batch.append(data)
+                progress.parsed += 1
+                if len(batch) >= batch_size:
+                    await queue.put(await validate(batch, progress.parsed - len(batch)))
+                    batch = []
+            if batch:
+                await queue.put(await validate(batch, progress.parsed - len(batch)))
+        except asyncio.CancelledError:
+            # The consumer stopped reading the queue, so nothing waits for its end
+            raise
+        except Exception:
+            await queue.put(None)
+            raise
+        await queue.put(None)
+
+    async def write(batch: list[FlowCreate]) -> list[Flow]:
+        db_flows = []
+        async with session_scope() as session:
+            for flow in batch:
+                db_flow = Flow.model_validate(flow, from_attributes=True)
+                db_flow.user_id = user_id
+                db_flow.updated_at = datetime.now(timezone.utc)
+                if folder_id is not None:
+                    db_flow.folder_id = folder_id
+                db_flow.name = names.claim(db_flow.name)
+                if db_flow.endpoint_name:
+                    db_flow.endpoint_name = endpoint_names.claim(db_flow.endpoint_name)
+                session.add(db_flow)
+                await save_flow_version(session, db_flow)
+                # The flows are new, so their search documents are too
+                session.add(FlowSearchDocument(flow_id=db_flow.id, **extract_search_text(db_flow)))
+                db_flows.append(db_flow)
+        return db_flows
+
+    producer = asyncio.create_task(produce())
+    try:
+        while (batch := await queue.get()) is not None:
+            for attempt in range(MAX_NAME_CONFLICT_RETRIES + 1):
+                try:
+                    db_flows = await write(batch)
+                    break
+                except IntegrityError:
+                    if attempt == MAX_NAME_CONFLICT_RETRIES:
+                        raise
+                    # Another import or save claimed one of the names since they were loaded
+                    logger.debug("A name of the batch was taken meanwhile, writing it again with new names")
+                    names, endpoint_names = await load_taken_names()
+            progress.renamed += sum(db_flow.name != flow.name for db_flow, flow in zip(db_flows, batch, strict=True))
+            result.flows.extend(db_flows)
+            progress.imported += len(batch)
+            logger.debug(f"Imported {progress.imported} of {progress.parsed} flows read so far")
+            if on_progress is not None:
+                on_progress(progress)
+    except BaseException as e:
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+        if isinstance(e, FlowImportError):
+            e.imported = progress.imported
+        raise
+    finally:
+        if owns_executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+    try:
+        # Re-raise a failure of the parsing or validation
+        await producer
+    except FlowImportError as e:
+        e.imported = progress.imported
+        raise
+    return result
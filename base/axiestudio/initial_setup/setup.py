@@ -35,6 +35,8 @@ from axiestudio.base.constants import (
 from axiestudio.initial_setup.constants import STARTER_FOLDER_DESCRIPTION, STARTER_FOLDER_NAME
 from axiestudio.services.auth.utils import create_super_user
 from axiestudio.services.database.models.flow.model import Flow, FlowCreate
+from axiestudio.services.database.models.flow_search.crud import delete_flow_search_document, index_flow
+from axiestudio.services.database.models.flow_version.crud import delete_flow_versions, save_flow_version
 from axiestudio.services.database.models.folder.constants import DEFAULT_FOLDER_NAME
 from axiestudio.services.database.models.folder.model import Folder, FolderCreate, FolderRead
 from axiestudio.services.database.models.user.crud import get_user_by_username
@@ -693,6 +695,10 @@ async def get_all_flows_similar_to_project(session: AsyncSession, folder_id: UUI
 async def delete_starter_projects(session, folder_id) -> None:
     flows = await get_all_flows_similar_to_project(session, folder_id)
     for flow in flows:
+        # SQLite does not enforce foreign keys, so the versions and the search document are not
+        # deleted along with the flow
+        await delete_flow_versions(session, flow.id)
+        await delete_flow_search_document(session, flow.id)
         await session.delete(flow)
     await session.commit()
 
@@ -871,6 +877,7 @@ async def upsert_flow_from_file(file_content: AnyStr, filename: str, session: As
                 return
 
         session.add(existing)
+        await index_flow(session, existing)
     else:
         logger.info(f"Creating new flow: {flow_id} with endpoint name {flow_endpoint_name}")
 
@@ -882,6 +889,7 @@ async def upsert_flow_from_file(file_content: AnyStr, filename: str, session: As
         flow.updated_at = datetime.now(tz=timezone.utc).astimezone()
 
         session.add(flow)
+        await index_flow(session, flow)
 
 
 async def find_existing_flow(session, flow_id, flow_endpoint_name):
@@ -1056,48 +1064,151 @@ async def get_or_create_default_folder(session: AsyncSession, user_id: UUID) ->
     return FolderRead.model_validate(folder_obj, from_attributes=True)
 
 
-async def sync_flows_from_fs():
-    flow_mtimes = {}
+# Events of the running flow file watchers, set when flows with a file path are created or updated
+_fs_flows_changed_events: set[asyncio.Event] = set()
+
+
+def notify_fs_flows_changed() -> None:
+    """Signals the flow file watchers that the set of file-backed flows has changed."""
+    for event in _fs_flows_changed_events:
+        event.set()
+
+
+async def _sync_flow_from_fs(session: AsyncSession, flow: Flow, flow_mtimes: dict[UUID, float]) -> None:
+    """Updates a flow from its file if the file changed since it was last synced."""
+    mtime = flow_mtimes.setdefault(flow.id, 0)
+    path = anyio.Path(flow.fs_path)
+    try:
+        if await path.exists():
+            new_mtime = (await path.stat()).st_mtime
+            if new_mtime > mtime:
+                update_data = orjson.loads(await path.read_text(encoding="utf-8"))
+                try:
+                    for field_name in ("name", "description", "data", "locked"):
+                        if new_value := update_data.get(field_name):
+                            setattr(flow, field_name, new_value)
+                    if folder_id := update_data.get("folder_id"):
+                        flow.folder_id = UUID(folder_id)
+                    # Edits made to the file are versioned like edits made in the editor
+                    await save_flow_version(session, flow)
+                    await session.commit()
+                    await session.refresh(flow)
+                except Exception:  # noqa: BLE001
+                    logger.exception(f"Couldn't update flow {flow.id} in database from path {path}")
+                flow_mtimes[flow.id] = new_mtime
+    except Exception:  # noqa: BLE001
+        logger.exception(f"Error while handling flow file {path}")
+
+
+async def _sync_flows_from_fs(flow_mtimes: dict[UUID, float], flow_ids: set[UUID] | None = None) -> None:
+    """Updates the given file-backed flows, or all of them, from their files."""
+    async with session_scope() as session:
+        stmt = select(Flow).where(col(Flow.fs_path).is_not(None))
+        if flow_ids is not None:
+            stmt = stmt.where(col(Flow.id).in_(flow_ids))
+        flows = (await session.exec(stmt)).all()
+        for flow in flows:
+            await _sync_flow_from_fs(session, flow, flow_mtimes)
+
+
+async def _get_fs_flow_ids_by_path() -> dict[str, set[UUID]]:
+    async with session_scope() as session:
+        stmt = select(Flow.id, Flow.fs_path).where(col(Flow.fs_path).is_not(None))
+        rows = (await session.exec(stmt)).all()
+    flow_ids_by_path: dict[str, set[UUID]] = defaultdict(set)
+    for flow_id, fs_path in rows:
+        flow_ids_by_path[str(await anyio.Path(fs_path).resolve())].add(flow_id)
+    return flow_ids_by_path
+
+
+async def _poll_flows_from_fs() -> None:
+    flow_mtimes: dict[UUID, float] = {}
     fs_flows_polling_interval = get_settings_service().settings.fs_flows_polling_interval / 1000
+    while True:
+        try:
+            await _sync_flows_from_fs(flow_mtimes)
+        except asyncio.CancelledError:
+            logger.debug("Flow sync cancelled")
+            break
+        except (sa.exc.OperationalError, ValueError) as e:
+            if "no active connection" in str(e) or "connection is closed" in str(e):
+                logger.debug("Database connection lost, assuming shutdown")
+                break  # Exit gracefully, don't error
+            raise  # Re-raise if it's a real connection problem
+        except Exception:  # noqa: BLE001
+            logger.exception("Error while syncing flows from database")
+            break
+
+        await asyncio.sleep(fs_flows_polling_interval)
+
+
+async def _watch_flows_from_fs() -> None:
+    """Syncs flows whenever their files change, using filesystem notifications.
+
+    The watched directories are derived from the flows' file paths. They are recomputed when
+    flows are created or updated through the API, and periodically to pick up changes made by
+    other workers. Flows that are new to the watcher are synced once when it (re)starts.
+    """
+    flow_mtimes: dict[UUID, float] = {}
+    fs_flows_changed = asyncio.Event()
+    _fs_flows_changed_events.add(fs_flows_changed)
     try:
-        while True:
+        await _watch_flow_files(fs_flows_changed, flow_mtimes)
+    finally:
+        _fs_flows_changed_events.discard(fs_flows_changed)
+
+
+async def _watch_flow_files(fs_flows_changed: asyncio.Event, flow_mtimes: dict[UUID, float]) -> None:
+    from watchfiles import Change, awatch
+
+    settings = get_settings_service().settings
+    refresh_interval = settings.fs_flows_watch_refresh_interval / 1000
+    while True:
+        fs_flows_changed.clear()
+        flow_ids_by_path = await _get_fs_flow_ids_by_path()
+        new_flow_ids = {flow_id for flow_ids in flow_ids_by_path.values() for flow_id in flow_ids} - flow_mtimes.keys()
+        if new_flow_ids:
+            await _sync_flows_from_fs(flow_mtimes, new_flow_ids)
+
+        directories = {str(Path(path).parent) for path in flow_ids_by_path}
+        directories = {directory for directory in directories if await anyio.Path(directory).is_dir()}
+        timer = asyncio.get_running_loop().call_later(refresh_interval, fs_flows_changed.set)
+        try:
+            if not directories:
+                await fs_flows_changed.wait()
+                continue
+            async for changes in awatch(
+                *directories,
+                watch_filter=lambda change, path: change != Change.deleted and path in flow_ids_by_path,  # noqa: B023
+                debounce=settings.fs_flows_watch_debounce,
+                stop_event=fs_flows_changed,
+                recursive=False,
+            ):
+                changed_flow_ids = {flow_id for _, path in changes for flow_id in flow_ids_by_path[path]}
+                await _sync_flows_from_fs(flow_mtimes, changed_flow_ids)
+        finally:
+            timer.cancel()
+
+
+async def sync_flows_from_fs():
+    """Keeps flows that have a file path in sync with their files.
+
+    Files are watched with watchfiles when it is available, falling back to polling them every
+    ``fs_flows_polling_interval`` milliseconds otherwise or if the watcher fails.
+    """
+    try:
+        if get_settings_service().settings.fs_flows_watch_enabled:
             try:
-                async with session_scope() as session:
-                    stmt = select(Flow).where(col(Flow.fs_path).is_not(None))
-                    flows = (await session.exec(stmt)).all()
-                    for flow in flows:
-                        mtime = flow_mtimes.setdefault(flow.id, 0)
-                        path = anyio.Path(flow.fs_path)
-                        try:
-                            if await path.exists():
-                                new_mtime = (await path.stat()).st_mtime
-                                if new_mtime > mtime:
-                                    update_data = orjson.loads(await path.read_text(encoding="utf-8"))
-                                    try:
-                                        for field_name in ("name", "description", "data", "locked"):
-                                            if new_value := update_data.get(field_name):
-                                                setattr(flow, field_name, new_value)
-                                        if folder_id := update_data.get("folder_id"):
-                                            flow.folder_id = UUID(folder_id)
-                                        await session.commit()
-                                        await session.refresh(flow)
-                                    except Exception:  # noqa: BLE001
-                                        logger.exception(f"Couldn't update flow {flow.id} in database from path {path}")
-                                    flow_mtimes[flow.id] = new_mtime
-                        except Exception:  # noqa: BLE001
-                            logger.exception(f"Error while handling flow file {path}")
-            except asyncio.CancelledError:
-                logger.debug("Flow sync cancelled")
-                break
+                await _watch_flows_from_fs()
+            except ImportError:
+                logger.debug("watchfiles is not installed, polling flow files instead")
             except (sa.exc.OperationalError, ValueError) as e:
                 if "no active connection" in str(e) or "connection is closed" in str(e):
                     logger.debug("Database connection lost, assuming shutdown")
-                    break  # Exit gracefully, don't error
-                raise  # Re-raise if it's a real connection problem
+                    return
+                logger.exception("Flow file watcher failed, polling flow files instead")
             except Exception:  # noqa: BLE001
-                logger.exception("Error while syncing flows from database")
-                break
-
-            await asyncio.sleep(fs_flows_polling_interval)
+                logger.exception("Flow file watcher failed, polling flow files instead")
+        await _poll_flows_from_fs()
     except asyncio.CancelledError:
         logger.debug("Flow sync task cancelled")
@@ -27,8 +27,19 @@ class ComponentCache:
 
         Creates empty storage for all component types and tracking of fully loaded components.
         """
-        self.all_types_dict: dict[str, Any] | None = None
+        self._all_types_dict: dict[str, Any] | None = None
         self.fully_loaded_components: dict[str, bool] = {}
+        # Incremented whenever the component types change, so encodings of them can be reused until then
+        self.version = 0
+
+    @property
+    def all_types_dict(self) -> dict[str, Any] | None:
+        return self._all_types_dict
+
+    @all_types_dict.setter
+    def all_types_dict(self, value: dict[str, Any] | None) -> None:
+        self._all_types_dict = value
+        self.version += 1
 
 
 # Singleton instance
@@ -381,6 +392,7 @@ async def ensure_component_loaded(component_type: str, component_name: str, sett
 
             # Mark as fully loaded
             component_cache.fully_loaded_components[component_key] = True
+            component_cache.version += 1
             logger.debug(f"Component {component_type}:{component_name} fully loaded")
         else:
             logger.warning(f"Failed to fully load component {component_type}:{component_name}")
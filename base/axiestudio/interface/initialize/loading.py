@@ -114,11 +114,12 @@ async def update_params_with_load_from_db_fields(
     *,
     fallback_to_env_vars=False,
 ):
-    async with session_scope() as session:
-        for field in load_from_db_fields:
-            if field not in params or not params[field]:
-                continue
-
+    fields = [field for field in load_from_db_fields if params.get(field)]
+    if not fields:
+        return params
+    # Variables are only read, from the read replica if there is one
+    async with session_scope(read_only=True) as session:
+        for field in fields:
             try:
                 key = await custom_component.get_variable(name=params[field], field=field, session=session)
             except ValueError as e:
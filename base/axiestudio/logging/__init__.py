@@ -1,5 +1,5 @@
 # noqa: A005
-from .logger import configure, logger
+from .logger import configure, logger, sampled, throttled
 from .setup import disable_logging, enable_logging
 
-__all__ = ["configure", "disable_logging", "enable_logging", "logger"]
+__all__ = ["configure", "disable_logging", "enable_logging", "logger", "sampled", "throttled"]
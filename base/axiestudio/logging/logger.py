@@ -1,20 +1,19 @@
 import json
 import logging
 import os
+import random
 import sys
+import time
 from collections import deque
 from pathlib import Path
 from threading import Lock, Semaphore
 from typing import TypedDict
 
-import orjson
 from loguru import logger
 from platformdirs import user_cache_dir
 from rich.logging import RichHandler
 from typing_extensions import NotRequired, override
 
-from axiestudio.settings import DEV
-
 VALID_LOG_LEVELS = ["TRACE", "DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
 # Human-readable
 DEFAULT_LOG_FORMAT = (
@@ -43,9 +42,20 @@ class SizedLogBuffer:
         return self._wlock
 
     def write(self, message: str) -> None:
-        record = json.loads(message)
-        log_entry = record["text"]
-        epoch = int(record["record"]["time"]["timestamp"] * 1000)
+        """Store a log line written by loguru.
+
+        Loguru passes the formatted line along with its record, so the timestamp is taken from
+        the record as is. A serialized (JSON) line is also accepted.
+        """
+        record = getattr(message, "record", None)
+        if record is None:
+            serialized = json.loads(message)
+            self.append(int(serialized["record"]["time"]["timestamp"] * 1000), serialized["text"])
+        else:
+            self.append(int(record["time"].timestamp() * 1000), str(message))
+
+    def append(self, epoch: int, log_entry: str) -> None:
+        """Store a log line with its timestamp in milliseconds, dropping the oldest lines if full."""
         with self._wlock:
             if len(self.buffer) >= self.max:
                 for _ in range(len(self.buffer) - self.max + 1):
@@ -126,20 +136,45 @@ class SizedLogBuffer:
 log_buffer = SizedLogBuffer()
 
 
-def serialize_log(record):
-    subset = {
-        "timestamp": record["time"].timestamp(),
-        "message": record["message"],
-        "level": record["level"].name,
-        "module": record["module"],
-    }
-    return orjson.dumps(subset)
+def _discard(*_args, **_kwargs) -> "_DiscardingLogger":
+    return _DISCARDING_LOGGER
+
+
+class _DiscardingLogger:
+    """Stands in for the logger when a log line is skipped; every call does nothing."""
+
+    def __getattr__(self, _name: str):
+        return _discard
+
+
+_DISCARDING_LOGGER = _DiscardingLogger()
+_throttled_at: dict[str, float] = {}
+
+
+def throttled(key: str, interval: float):
+    """Return the logger at most once every ``interval`` seconds for ``key``.
 
+    Meant for hot paths, which would otherwise log on every iteration:
 
-def patching(record) -> None:
-    record["extra"]["serialized"] = serialize_log(record)
-    if DEV is False:
-        record.pop("exception", None)
+        throttled("build-event", 5).debug("Event {} consumed", event_id)
+
+    Between two lines, calls go to a logger that discards them without formatting anything.
+    """
+    now = time.monotonic()
+    if now - _throttled_at.get(key, float("-inf")) < interval:
+        return _DISCARDING_LOGGER
+    _throttled_at[key] = now
+    return logger
+
+
+def sampled(rate: float):
+    """Return the logger for a ``rate`` fraction of the calls, chosen at random.
+
+    Meant for hot paths where a sample of the lines is enough:
+
+        sampled(0.01).debug("Event {} consumed", event_id)
+    """
+    return logger if random.random() < rate else _DISCARDING_LOGGER  # noqa: S311
 
 
 class LogConfig(TypedDict):
@@ -183,6 +218,7 @@ def configure(
     log_format: str | None = None,
     async_file: bool = False,
     log_rotation: str | None = None,
+    enqueue: bool | None = None,
 ) -> None:
     if disable and log_level is None and log_file is None:
         logger.disable("axiestudio")
@@ -198,12 +234,19 @@ def configure(
     if log_env is None:
         log_env = os.getenv("AXIESTUDIO_LOG_ENV", "")
 
+    # Writing to stdout from a background thread keeps slow terminals and pipes off the event loop
+    if enqueue is None:
+        enqueue = os.getenv("AXIESTUDIO_LOG_ENQUEUE", "false").lower() == "true"
+
     logger.remove()  # Remove default handlers
-    logger.patch(patching)
     if log_env.lower() == "container" or log_env.lower() == "container_json":
-        logger.add(sys.stdout, format="{message}", serialize=True)
+        logger.add(sys.stdout, format="{message}", serialize=True, enqueue=enqueue)
     elif log_env.lower() == "container_csv":
-        logger.add(sys.stdout, format="{time:YYYY-MM-DD HH:mm:ss.SSS} {level} {file} {line} {function} {message}")
+        logger.add(
+            sys.stdout,
+            format="{time:YYYY-MM-DD HH:mm:ss.SSS} {level} {file} {line} {function} {message}",
+            enqueue=enqueue,
+        )
     else:
         if os.getenv("AXIESTUDIO_LOG_FORMAT") and log_format is None:
             log_format = os.getenv("AXIESTUDIO_LOG_FORMAT")
@@ -211,8 +254,9 @@ def configure(
         if log_format is None or not is_valid_log_format(log_format):
             log_format = DEFAULT_LOG_FORMAT
         # pretty print to rich stdout development-friendly but poor performance, It's better for debugger.
-        # suggest directly print to stdout in production
-        log_stdout_pretty = os.getenv("AXIESTUDIO_PRETTY_LOGS", "true").lower() == "true"
+        # By default it is only used when a terminal is attached, so production logs are printed directly
+        is_terminal = sys.stdout is not None and sys.stdout.isatty()
+        log_stdout_pretty = os.getenv("AXIESTUDIO_PRETTY_LOGS", str(is_terminal)).lower() == "true"
         if log_stdout_pretty:
             logger.configure(
                 handlers=[
@@ -220,11 +264,19 @@ def configure(
                         "sink": RichHandler(rich_tracebacks=True, markup=True),
                         "format": log_format,
                         "level": log_level.upper(),
+                        "enqueue": enqueue,
                     }
                 ]
             )
         else:
-            logger.add(sys.stdout, level=log_level.upper(), format=log_format, backtrace=True, diagnose=True)
+            logger.add(
+                sys.stdout,
+                level=log_level.upper(),
+                format=log_format,
+                backtrace=True,
+                diagnose=True,
+                enqueue=enqueue,
+            )
 
         if not log_file:
             cache_dir = Path(user_cache_dir("axiestudio"))
@@ -250,7 +302,8 @@ def configure(
             logger.exception("Error setting up log file")
 
     if log_buffer.enabled():
-        logger.add(sink=log_buffer.write, format="{time} {level} {message}", serialize=True)
+        # The buffer takes the formatted line and the record as they are, without a JSON round trip
+        logger.add(sink=log_buffer.write, format="{time} {level} {message}")
 
     logger.debug(f"Logger set up with log level: {log_level}")
 
@@ -7,7 +7,7 @@ from contextlib import asynccontextmanager
 from http import HTTPStatus
 from pathlib import Path
 from typing import TYPE_CHECKING
-from urllib.parse import urlencode
+from urllib.parse import parse_qsl, urlencode
 
 import anyio
 import httpx
@@ -21,7 +21,8 @@ from loguru import logger
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from pydantic import PydanticDeprecatedSince20
 from pydantic_core import PydanticSerializationError
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from axiestudio.api import health_check_router, log_router, router
 from axiestudio.api.v1.mcp_projects import init_mcp_servers
@@ -36,19 +37,8 @@ from axiestudio.interface.components import get_and_cache_all_types_dict
 from axiestudio.interface.utils import setup_llm_caching
 from axiestudio.logging.logger import configure
 from axiestudio.middleware import ContentSizeLimitMiddleware
-try:
-    from axiestudio.middleware.trial_middleware import TrialMiddleware
-    TRIAL_MIDDLEWARE_AVAILABLE = True
-except ImportError:
-    TRIAL_MIDDLEWARE_AVAILABLE = False
-    TrialMiddleware = None
-
-# Import verification middleware
-try:
-    from axiestudio.middleware.verification_middleware import add_verification_middleware
-    VERIFICATION_MIDDLEWARE_AVAILABLE = True
-except ImportError:
-    VERIFICATION_MIDDLEWARE_AVAILABLE = False
+from axiestudio.middleware.trial_middleware import TrialMiddleware
+from axiestudio.middleware.verification_middleware import add_verification_middleware
 
 # Import verification scheduler
 try:
@@ -71,6 +61,7 @@ try:
 except ImportError:
     ENHANCED_SECURITY_SETUP_AVAILABLE = False
 from axiestudio.services.deps import (
+    get_db_service,
     get_queue_service,
     get_settings_service,
     get_telemetry_service,
@@ -88,52 +79,181 @@ _tasks: list[asyncio.Task] = []
 MAX_PORT = 65535
 
 
-class RequestCancelledMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app) -> None:
-        super().__init__(app)
+class RequestCancelledMiddleware:
+    """Cancels the request handler as soon as the client disconnects.
+
+    Disconnects are detected from the ``http.disconnect`` message of the ASGI receive channel,
+    so no polling is involved. Request body chunks are handed to the application one at a time
+    to keep the server's backpressure. Once the response is complete the handler is left to
+    finish its background tasks, as servers report a disconnect from then on.
+    """
 
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
-        sentinel = object()
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
 
-        async def cancel_handler():
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        messages: asyncio.Queue[Message] = asyncio.Queue()
+        disconnected = asyncio.Event()
+        response_started = False
+        response_complete = False
+
+        async def receive_from_client() -> None:
             while True:
-                if await request.is_disconnected():
-                    return sentinel
-                await asyncio.sleep(0.1)
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    disconnected.set()
+                    return
+                messages.put_nowait(message)
+                if message.get("more_body", False):
+                    await messages.join()
+
+        async def receive_wrapper() -> Message:
+            if disconnected.is_set() and messages.empty():
+                return {"type": "http.disconnect"}
+            message = await messages.get()
+            messages.task_done()
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started, response_complete
+            if message["type"] == "http.response.start":
+                response_started = True
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_complete = True
+            await send(message)
+
+        handler_task = asyncio.create_task(self.app(scope, receive_wrapper, send_wrapper))
+        receiver_task = asyncio.create_task(receive_from_client())
+        try:
+            await asyncio.wait([handler_task, receiver_task], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            receiver_task.cancel()
+        if not handler_task.done() and not response_complete:
+            handler_task.cancel()
+            await asyncio.gather(handler_task, return_exceptions=True)
+            if not response_started:
+                await Response("Request was cancelled", status_code=499)(scope, receive_wrapper, send)
+            return
+        await handler_task
+
+
+class JavaScriptMIMETypeMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        send_wrapper = send
+        if "files/" not in path and path.endswith(".js"):
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start" and message["status"] == HTTPStatus.OK:
+                    MutableHeaders(scope=message)["Content-Type"] = "text/javascript"
+                await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except PydanticSerializationError as exc:
+            message = (
+                "Something went wrong while serializing the response. Please share this error on our GitHub repository."
+            )
+            error_messages = json.dumps([message, str(exc)])
+            raise HTTPException(status_code=HTTPStatus.INTERNAL_SERVER_ERROR, detail=error_messages) from exc
 
-        handler_task = asyncio.create_task(call_next(request))
-        cancel_task = asyncio.create_task(cancel_handler())
 
-        done, pending = await asyncio.wait([handler_task, cancel_task], return_when=asyncio.FIRST_COMPLETED)
+class MultipartBoundaryMiddleware:
+    """Rejects file uploads whose body does not match the multipart boundary of their Content-Type."""
 
-        for task in pending:
-            task.cancel()
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
 
-        if cancel_task in done:
-            return Response("Request was cancelled", status_code=499)
-        return await handler_task
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or "/api/v1/files/upload" not in scope["path"]:
+            await self.app(scope, receive, send)
+            return
 
+        content_type = Headers(scope=scope).get("Content-Type")
+        if not content_type or "multipart/form-data" not in content_type or "boundary=" not in content_type:
+            response = JSONResponse(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                content={"detail": "Content-Type header must be 'multipart/form-data' with a boundary parameter."},
+            )
+            await response(scope, receive, send)
+            return
 
-class JavaScriptMIMETypeMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
-        try:
-            response = await call_next(request)
-        except Exception as exc:
-            if isinstance(exc, PydanticSerializationError):
-                message = (
-                    "Something went wrong while serializing the response. "
-                    "Please share this error on our GitHub repository."
-                )
-                error_messages = json.dumps([message, str(exc)])
-                raise HTTPException(status_code=HTTPStatus.INTERNAL_SERVER_ERROR, detail=error_messages) from exc
-            raise
-        if (
-            "files/" not in request.url.path
-            and request.url.path.endswith(".js")
-            and response.status_code == HTTPStatus.OK
-        ):
-            response.headers["Content-Type"] = "text/javascript"
-        return response
+        boundary = content_type.split("boundary=")[-1].strip()
+
+        if not re.match(r"^[\w\-]{1,70}$", boundary):
+            response = JSONResponse(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                content={"detail": "Invalid boundary format"},
+            )
+            await response(scope, receive, send)
+            return
+
+        body = await Request(scope, receive).body()
+
+        boundary_start = f"--{boundary}".encode()
+        # The multipart/form-data spec doesn't require a newline after the boundary, however many clients do
+        # implement it that way
+        boundary_end = f"--{boundary}--\r\n".encode()
+        boundary_end_no_newline = f"--{boundary}--".encode()
+
+        if not body.startswith(boundary_start) or not body.endswith((boundary_end, boundary_end_no_newline)):
+            response = JSONResponse(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                content={"detail": "Invalid multipart formatting"},
+            )
+            await response(scope, receive, send)
+            return
+
+        body_sent = False
+
+        async def replay_body() -> Message:
+            nonlocal body_sent
+            if body_sent:
+                return await receive()
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        await self.app(scope, replay_body, send)
+
+
+class QueryStringListMiddleware:
+    """Splits comma-separated query parameter values into repeated parameters."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["query_string"]:
+            flattened: list[tuple[str, str]] = []
+            for key, value in parse_qsl(scope["query_string"].decode("latin-1"), keep_blank_values=True):
+                flattened.extend((key, entry) for entry in value.split(","))
+            scope["query_string"] = urlencode(flattened, doseq=True).encode("utf-8")
+        await self.app(scope, receive, send)
+
+
+class DatabaseUnitOfWorkMiddleware:
+    """Lets the database operations of a request that follow each other share a session."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        async with get_db_service().unit_of_work():
+            await self.app(scope, receive, send)
 
 
 async def load_bundles_with_error_handling():
@@ -365,6 +485,7 @@ def create_app():
     app.add_middleware(
         ContentSizeLimitMiddleware,
     )
+    app.add_middleware(RequestCancelledMiddleware)
 
     setup_sentry(app)
     origins = ["*"]
@@ -378,60 +499,17 @@ def create_app():
     )
     app.add_middleware(JavaScriptMIMETypeMiddleware)
 
-    # Add trial middleware if available
-    if TRIAL_MIDDLEWARE_AVAILABLE:
+    settings = get_settings_service().settings
+    if settings.enforce_trials:
         app.add_middleware(TrialMiddleware)
-
-    # Add verification middleware if available
-    if VERIFICATION_MIDDLEWARE_AVAILABLE:
+    if settings.email_verification_repair:
         add_verification_middleware(app)
 
-    @app.middleware("http")
-    async def check_boundary(request: Request, call_next):
-        if "/api/v1/files/upload" in request.url.path:
-            content_type = request.headers.get("Content-Type")
-
-            if not content_type or "multipart/form-data" not in content_type or "boundary=" not in content_type:
-                return JSONResponse(
-                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                    content={"detail": "Content-Type header must be 'multipart/form-data' with a boundary parameter."},
-                )
-
-            boundary = content_type.split("boundary=")[-1].strip()
-
-            if not re.match(r"^[\w\-]{1,70}$", boundary):
-                return JSONResponse(
-                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                    content={"detail": "Invalid boundary format"},
-                )
+    app.add_middleware(MultipartBoundaryMiddleware)
+    app.add_middleware(QueryStringListMiddleware)
+    # Outermost, so the middlewares reading the database share the session of the request
+    app.add_middleware(DatabaseUnitOfWorkMiddleware)
 
-            body = await request.body()
-
-            boundary_start = f"--{boundary}".encode()
-            # The multipart/form-data spec doesn't require a newline after the boundary, however many clients do
-            # implement it that way
-            boundary_end = f"--{boundary}--\r\n".encode()
-            boundary_end_no_newline = f"--{boundary}--".encode()
-
-            if not body.startswith(boundary_start) or not body.endswith((boundary_end, boundary_end_no_newline)):
-                return JSONResponse(
-                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                    content={"detail": "Invalid multipart formatting"},
-                )
-
-        return await call_next(request)
-
-    @app.middleware("http")
-    async def flatten_query_string_lists(request: Request, call_next):
-        flattened: list[tuple[str, str]] = []
-        for key, value in request.query_params.multi_items():
-            flattened.extend((key, entry) for entry in value.split(","))
-
-        request.scope["query_string"] = urlencode(flattened, doseq=True).encode("utf-8")
-
-        return await call_next(request)
-
-    settings = get_settings_service().settings
     if prome_port_str := os.environ.get("AXIESTUDIO_PROMETHEUS_PORT"):
         # set here for create_app() entry point
         prome_port = int(prome_port_str)
@@ -0,0 +1,3 @@
+from .content_size_limit import ContentSizeLimitMiddleware, MaxFileSizeException
+
+__all__ = ["ContentSizeLimitMiddleware", "MaxFileSizeException"]
@@ -1,22 +1,40 @@
 """Middleware to check trial status and restrict access for expired users."""
 
-from fastapi import HTTPException, Request, Response, status
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from cachetools import TTLCache
+from fastapi import Request, status
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
 from loguru import logger
 
-from axiestudio.services.trial.service import trial_service
 from axiestudio.services.auth.utils import get_current_user_by_jwt
 from axiestudio.services.deps import get_db_service
+from axiestudio.services.trial.service import trial_service
+
+if TYPE_CHECKING:
+    from starlette.types import ASGIApp, Receive, Scope, Send
 
+    from axiestudio.services.database.models.user.model import User
 
-class TrialMiddleware(BaseHTTPMiddleware):
-    """Middleware to check user trial status and restrict access."""
+# Seconds the trial status of a user is reused before it is checked again
+TRIAL_STATUS_CACHE_TTL = 30
 
-    def __init__(self, app):
-        super().__init__(app)
+
+class TrialMiddleware:
+    """Middleware to check user trial status and restrict access.
+
+    The authenticated user is resolved once per request and exposed to endpoints as
+    ``request.state.user``, which the auth dependency reuses instead of loading the user again.
+    Trial statuses are kept for ``TRIAL_STATUS_CACHE_TTL`` seconds and exposed as
+    ``request.state.trial_status``.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
         # Paths that should be accessible even with expired trial
-        self.exempt_paths = {
+        self.exempt_paths = (
             "/api/v1/subscriptions",
             "/api/v1/login",
             "/api/v1/logout",
@@ -30,96 +48,87 @@ class TrialMiddleware(BaseHTTPMiddleware):
             "/docs",
             "/openapi.json",
             "/static",
-        }
+        )
+        self._trial_statuses: TTLCache = TTLCache(maxsize=4096, ttl=TRIAL_STATUS_CACHE_TTL)
 
-        # Paths that should be completely exempt from trial checks
-        self.always_allow_paths = {
-            "/health",
-            "/docs",
-            "/openapi.json",
-            "/static",
-            "/login",
-            "/signup",
-            "/pricing",
-        }
-    
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """Check trial status before processing request."""
+        path = scope.get("path", "")
+        # Skip trial check for exempt paths and non-API requests (static files, etc.)
+        if scope["type"] != "http" or path.startswith(self.exempt_paths) or not path.startswith("/api/"):
+            await self.app(scope, receive, send)
+            return
 
+        request = Request(scope)
         try:
-            # Always allow certain paths without any checks
-            if any(request.url.path.startswith(path) for path in self.always_allow_paths):
-                return await call_next(request)
-
-            # Skip trial check for exempt paths
-            if any(request.url.path.startswith(path) for path in self.exempt_paths):
-                return await call_next(request)
-
-            # Skip trial check for non-API requests (static files, etc.)
-            if not request.url.path.startswith("/api/"):
-                return await call_next(request)
-
             # Get authorization header
             auth_header = request.headers.get("Authorization")
             if not auth_header or not auth_header.startswith("Bearer "):
-                # No auth token, let the auth middleware handle it
-                return await call_next(request)
+                # No auth token, let the auth dependency handle it
+                await self.app(scope, receive, send)
+                return
 
-            # Extract token
             token = auth_header.split(" ")[1]
-
-            # Get user from token
-            db_service = get_db_service()
-            if not db_service:
-                logger.warning("Database service not available, skipping trial check")
-                return await call_next(request)
-
-            async with db_service.with_session() as session:
-                try:
-                    user = await get_current_user_by_jwt(token, session)
-                except Exception as e:
-                    # If JWT validation fails, let the auth middleware handle it
-                    logger.debug(f"JWT validation failed in trial middleware: {e}")
-                    return await call_next(request)
-
-                if not user:
-                    return await call_next(request)
-
-                # Skip trial check for superusers
-                if user.is_superuser:
-                    return await call_next(request)
-
-                # Check trial status
-                try:
-                    trial_status = await trial_service.check_trial_status(user)
-
-                    # If trial expired and no subscription, block access
-                    if trial_status.get("should_cleanup", False):
-                        logger.info(f"Blocking access for expired trial user: {user.username}")
-                        return JSONResponse(
-                            status_code=status.HTTP_402_PAYMENT_REQUIRED,
-                            content={
-                                "detail": "Your free trial has expired. Please subscribe to continue using Axie Studio.",
-                                "trial_expired": True,
-                                "subscription_required": True,
-                                "redirect_to": "/pricing"
-                            }
-                        )
-
-                    # Add trial info to request state for use in endpoints
-                    request.state.trial_status = trial_status
-                    request.state.user = user
-
-                except Exception as e:
-                    # If trial service fails, let the request proceed
-                    # This prevents trial service issues from breaking the app
-                    logger.warning(f"Trial service error, allowing request: {e}")
-                    pass
-
-        except Exception as e:
+            user = await self._resolve_user(token)
+            if user is not None:
+                request.state.user = user
+                request.state.auth_token = token
+                trial_status = await self._get_trial_status(user)
+                # If trial expired and no subscription, block access
+                if trial_status is not None and trial_status.get("should_cleanup", False):
+                    logger.info(f"Blocking access for expired trial user: {user.username}")
+                    response = JSONResponse(
+                        status_code=status.HTTP_402_PAYMENT_REQUIRED,
+                        content={
+                            "detail": "Your free trial has expired. Please subscribe to continue using Axie Studio.",
+                            "trial_expired": True,
+                            "subscription_required": True,
+                            "redirect_to": "/pricing",
+                        },
+                    )
+                    await response(scope, receive, send)
+                    return
+
+                # Add trial info to request state for use in endpoints
+                request.state.trial_status = trial_status
+
+        except Exception as e:  # noqa: BLE001
             # If there's any error in middleware, let the request proceed
-            # The auth middleware will handle authentication errors properly
+            # The auth dependency will handle authentication errors properly
             logger.warning(f"Trial middleware error, allowing request: {e}")
-            pass
 
-        return await call_next(request)
+        await self.app(scope, receive, send)
+
+    @staticmethod
+    async def _resolve_user(token: str) -> User | None:
+        """Returns the user of a token, or None if the auth dependency should handle the token."""
+        db_service = get_db_service()
+        if not db_service:
+            logger.warning("Database service not available, skipping trial check")
+            return None
+
+        # The request's unit of work lets the endpoint's session reuse this one, and the user with it
+        async with db_service.with_session() as session:
+            try:
+                return await get_current_user_by_jwt(token, session)
+            except Exception as e:  # noqa: BLE001
+                # If JWT validation fails, let the auth dependency handle it
+                logger.debug(f"JWT validation failed in trial middleware: {e}")
+                return None
+
+    async def _get_trial_status(self, user: User) -> dict | None:
+        """Returns the trial status of a user, or None if no trial check applies."""
+        # Skip trial check for superusers
+        if user.is_superuser:
+            return None
+        if user.id in self._trial_statuses:
+            return self._trial_statuses[user.id]
+        try:
+            trial_status = await trial_service.check_trial_status(user)
+        except Exception as e:  # noqa: BLE001
+            # If trial service fails, let the request proceed
+            # This prevents trial service issues from breaking the app
+            logger.warning(f"Trial service error, allowing request: {e}")
+            return None
+        self._trial_statuses[user.id] = trial_status
+        return trial_status
@@ -4,38 +4,36 @@ This middleware automatically handles verification issues and ensures
 users are properly activated after email verification.
 """
 
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi import Request
 from loguru import logger
 from datetime import datetime, timezone
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 
-class EmailVerificationMiddleware(BaseHTTPMiddleware):
+class EmailVerificationMiddleware:
     """Middleware to automatically handle email verification issues."""
 
-    def __init__(self, app):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp):
+        self.app = app
         # Paths that trigger verification checks
         self.verification_paths = {
             "/api/v1/email/verify",
             "/api/v1/login",
         }
 
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """Check and fix verification issues on relevant endpoints."""
-        
         # Only check on verification-related endpoints
-        if not any(path in str(request.url.path) for path in self.verification_paths):
-            return await call_next(request)
+        if scope["type"] != "http" or not any(path in scope["path"] for path in self.verification_paths):
+            await self.app(scope, receive, send)
+            return
 
         # Process the request first
-        response = await call_next(request)
+        await self.app(scope, receive, send)
 
         # If this was a verification endpoint, ensure user is properly activated
-        if "/api/v1/email/verify" in str(request.url.path):
-            await self._ensure_verification_completed(request)
-
-        return response
+        if "/api/v1/email/verify" in scope["path"]:
+            await self._ensure_verification_completed(Request(scope))
 
     async def _ensure_verification_completed(self, request: Request):
         """Ensure email verification properly activates the user."""
@@ -53,18 +51,9 @@ class EmailVerificationMiddleware(BaseHTTPMiddleware):
             db_service = get_db_service()
             
             async with db_service.with_session() as session:
-                # Find user by token (even if token was cleared)
+                # Only the user holding the token is touched; once the token is cleared there is nothing to fix
                 stmt = select(User).where(User.email_verification_token == token)
                 user = (await session.exec(stmt)).first()
-                
-                if not user:
-                    # Token might have been cleared, try to find recently updated user
-                    recent_time = datetime.now(timezone.utc).replace(second=0, microsecond=0)
-                    stmt = select(User).where(
-                        User.updated_at >= recent_time,
-                        User.email_verified == True
-                    )
-                    user = (await session.exec(stmt)).first()
 
                 if user:
                     # Ensure user is properly activated
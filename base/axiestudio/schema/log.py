@@ -1,4 +1,5 @@
 from typing import Any, Literal, TypeAlias
+from uuid import UUID
 
 from pydantic import BaseModel
 from typing_extensions import Protocol
@@ -31,3 +32,7 @@ class SendMessageFunctionType(Protocol):
 
 class OnTokenFunctionType(Protocol):
     def __call__(self, data: dict[str, Any]) -> None: ...
+
+
+class SendTokenFunctionType(Protocol):
+    async def __call__(self, chunk: str, message_id: str | UUID) -> None: ...
@@ -1,15 +1,18 @@
-from collections.abc import AsyncIterator, Generator, Iterator
+import dataclasses
+from collections.abc import AsyncIterator, Callable, Generator, Iterator
 from datetime import datetime, timezone
 from decimal import Decimal
 from functools import lru_cache
 from typing import Any, cast
 from uuid import UUID
+from weakref import WeakKeyDictionary
 
 import numpy as np
 import pandas as pd
 from langchain_core.documents import Document
 from loguru import logger
 from pydantic import BaseModel
+from pydantic.functional_serializers import PlainSerializer, WrapSerializer
 from pydantic.v1 import BaseModel as BaseModelV1
 
 from axiestudio.serialization.constants import MAX_ITEMS_LENGTH, MAX_TEXT_LENGTH
@@ -90,10 +93,62 @@ def _serialize_iterator(_: AsyncIterator | Generator | Iterator, *__) -> str:
     return "Unconsumed Stream"
 
 
+# The fields of each model class walked when serializing, and those dumped by pydantic
+_pydantic_fields: "WeakKeyDictionary[type[BaseModel], tuple[list[str], set[str]] | None]" = WeakKeyDictionary()
+
+
+def _get_pydantic_fields(model_class: type[BaseModel]) -> tuple[list[str], set[str]] | None:
+    """Return the fields of a model and which of them have a serializer, or None if the model has its own."""
+    try:
+        return _pydantic_fields[model_class]
+    except KeyError:
+        pass
+    decorators = model_class.__pydantic_decorators__
+    fields: tuple[list[str], set[str]] | None = None
+    is_root = "root" in model_class.model_fields and getattr(model_class, "__pydantic_root_model__", False)
+    if not is_root and not any(
+        decorator.info.when_used != "json" for decorator in decorators.model_serializers.values()
+    ):
+        names = [name for name, field in model_class.model_fields.items() if not field.exclude]
+        dumped = {
+            name
+            for decorator in decorators.field_serializers.values()
+            if decorator.info.when_used != "json"
+            for name in decorator.info.fields
+        }
+        dumped.update(
+            name
+            for name, field in model_class.model_fields.items()
+            if any(isinstance(metadata, PlainSerializer | WrapSerializer) for metadata in field.metadata)
+        )
+        fields = ([*names, *model_class.model_computed_fields], dumped)
+    _pydantic_fields[model_class] = fields
+    return fields
+
+
 def _serialize_pydantic(obj: BaseModel, max_length: int | None, max_items: int | None) -> Any:
-    """Handle modern Pydantic models."""
-    serialized = obj.model_dump()
-    return {k: serialize(v, max_length, max_items) for k, v in serialized.items()}
+    """Handle modern Pydantic models.
+
+    The fields are serialized one at a time, so large values are truncated without being copied
+    by ``model_dump`` first. Fields with a serializer, and dataclasses, are still dumped by pydantic.
+    """
+    fields = _get_pydantic_fields(type(obj))
+    if fields is None:
+        serialized = obj.model_dump()
+        return {k: serialize(v, max_length, max_items) for k, v in serialized.items()}
+    names, dumped = fields
+    result = {}
+    for name in names:
+        value = getattr(obj, name)
+        if name in dumped or (dataclasses.is_dataclass(value) and not isinstance(value, type)):
+            value = obj.model_dump(include={name}).get(name)
+        result[name] = serialize(value, max_length, max_items)
+    if obj.__pydantic_extra__:
+        # Extra fields come before the computed ones in a dump
+        computed = {name: result.pop(name) for name in type(obj).model_computed_fields}
+        result.update({k: serialize(v, max_length, max_items) for k, v in obj.__pydantic_extra__.items()})
+        result.update(computed)
+    return result
 
 
 def _serialize_pydantic_v1(obj: BaseModelV1, max_length: int | None, max_items: int | None) -> Any:
@@ -111,19 +166,12 @@ def _serialize_dict(obj: dict, max_length: int | None, max_items: int | None) ->
 def _serialize_list_tuple(obj: list | tuple, max_length: int | None, max_items: int | None) -> list:
     """Truncate long lists and process items recursively."""
     if max_items is not None and len(obj) > max_items:
-        truncated = list(obj)[:max_items]
+        truncated = list(obj[:max_items])
         truncated.append(f"... [truncated {len(obj) - max_items} items]")
         obj = truncated
     return [serialize(item, max_length, max_items) for item in obj]
 
 
-def _serialize_primitive(obj: Any, *_) -> Any:
-    """Handle primitive types without conversion."""
-    if obj is None or isinstance(obj, int | float | bool | complex):
-        return obj
-    return UNSERIALIZABLE_SENTINEL
-
-
 def _serialize_instance(obj: Any, *_) -> str:
     """Handle regular class instances by converting to string."""
     return str(obj)
@@ -186,46 +234,14 @@ def _serialize_numpy_type(obj: Any, max_length: int | None, max_items: int | Non
     return UNSERIALIZABLE_SENTINEL
 
 
-def _serialize_dispatcher(obj: Any, max_length: int | None, max_items: int | None) -> Any | _UnserializableSentinel:
-    """Dispatch object to appropriate serializer."""
-    # Handle primitive types first
-    if obj is None:
-        return obj
-    primitive = _serialize_primitive(obj, max_length, max_items)
-    if primitive is not UNSERIALIZABLE_SENTINEL:
-        return primitive
+def _serialize_as_is(obj: Any, *_) -> Any:
+    """Handle primitive types without conversion."""
+    return obj
 
+
+def _serialize_class_like(obj: Any, *_) -> Any:
+    """Handle classes, which are matched on their attributes rather than their type."""
     match obj:
-        case str():
-            return _serialize_str(obj, max_length, max_items)
-        case bytes():
-            return _serialize_bytes(obj, max_length, max_items)
-        case datetime():
-            return _serialize_datetime(obj, max_length, max_items)
-        case Decimal():
-            return _serialize_decimal(obj, max_length, max_items)
-        case UUID():
-            return _serialize_uuid(obj, max_length, max_items)
-        case Document():
-            return _serialize_document(obj, max_length, max_items)
-        case AsyncIterator() | Generator() | Iterator():
-            return _serialize_iterator(obj, max_length, max_items)
-        case BaseModel():
-            return _serialize_pydantic(obj, max_length, max_items)
-        case BaseModelV1():
-            return _serialize_pydantic_v1(obj, max_length, max_items)
-        case dict():
-            return _serialize_dict(obj, max_length, max_items)
-        case pd.DataFrame():
-            return _serialize_dataframe(obj, max_length, max_items)
-        case pd.Series():
-            return _serialize_series(obj, max_length, max_items)
-        case list() | tuple():
-            return _serialize_list_tuple(obj, max_length, max_items)
-        case object() if _is_numpy_type(obj):
-            return _serialize_numpy_type(obj, max_length, max_items)
-        case object() if not isinstance(obj, type):  # Match any instance that's not a class
-            return _serialize_instance(obj, max_length, max_items)
         case object() if hasattr(obj, "_name_"):  # Enum case
             return f"{obj.__class__.__name__}.{obj._name_}"
         case object() if hasattr(obj, "__name__") and hasattr(obj, "__bound__"):  # TypeVar case
@@ -250,6 +266,69 @@ def _serialize_dispatcher(obj: Any, max_length: int | None, max_items: int | Non
             return UNSERIALIZABLE_SENTINEL
 
 
+_Serializer = Callable[[Any, int | None, int | None], Any]
+
+# The serializer of each concrete type, found once by _find_serializer
+_serializers: "WeakKeyDictionary[type, _Serializer]" = WeakKeyDictionary()
+
+
+def _find_serializer(obj: Any) -> _Serializer:
+    """Find the serializer of an object, in order of precedence."""
+    match obj:
+        case int() | float() | bool() | complex():
+            return _serialize_as_is
+        case str():
+            return _serialize_str
+        case bytes():
+            return _serialize_bytes
+        case datetime():
+            return _serialize_datetime
+        case Decimal():
+            return _serialize_decimal
+        case UUID():
+            return _serialize_uuid
+        case Document():
+            return _serialize_document
+        case AsyncIterator() | Generator() | Iterator():
+            return _serialize_iterator
+        case BaseModel():
+            return _serialize_pydantic
+        case BaseModelV1():
+            return _serialize_pydantic_v1
+        case dict():
+            return _serialize_dict
+        case pd.DataFrame():
+            return _serialize_dataframe
+        case pd.Series():
+            return _serialize_series
+        case list() | tuple():
+            return _serialize_list_tuple
+        case object() if _is_numpy_type(obj):
+            return _serialize_numpy_type
+        case object() if not isinstance(obj, type):  # Match any instance that's not a class
+            return _serialize_instance
+        case _:
+            return _serialize_class_like
+
+
+def _serialize_dispatcher(obj: Any, max_length: int | None, max_items: int | None) -> Any | _UnserializableSentinel:
+    """Dispatch object to appropriate serializer.
+
+    The serializer is looked up by the concrete type of the object, so the checks of
+    _find_serializer only run for the first object of each type.
+    """
+    if obj is None:
+        return obj
+    obj_type = type(obj)
+    serializer = _serializers.get(obj_type)
+    if serializer is None:
+        serializer = _find_serializer(obj)
+        # Classes and proxies, whose __class__ is not their type, are matched on their attributes
+        if obj.__class__ is obj_type and not isinstance(obj, type):
+            _serializers[obj_type] = serializer
+    return serializer(obj, max_length, max_items)
+
+
 def serialize(
     obj: Any,
     max_length: int | None = None,
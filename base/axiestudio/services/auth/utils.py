@@ -8,7 +8,7 @@ from typing import TYPE_CHECKING, Annotated
 from uuid import UUID
 
 from cryptography.fernet import Fernet
-from fastapi import Depends, HTTPException, Security, WebSocketException, status
+from fastapi import Depends, HTTPException, Request, Security, WebSocketException, status
 from fastapi.security import APIKeyHeader, APIKeyQuery, OAuth2PasswordBearer
 from jose import JWTError, jwt
 from loguru import logger
@@ -163,12 +163,16 @@ async def ws_api_key_security(
 
 
 async def get_current_user(
+    request: Request,
     token: Annotated[str, Security(oauth2_login)],
     query_param: Annotated[str, Security(api_key_query)],
     header_param: Annotated[str, Security(api_key_header)],
     db: Annotated[AsyncSession, Depends(get_session)],
 ) -> User:
     if token:
+        # The trial middleware already resolved the user of this token for the request
+        if getattr(request.state, "auth_token", None) == token:
+            return request.state.user
         return await get_current_user_by_jwt(token, db)
     user = await api_key_security(query_param, header_param)
     if user:
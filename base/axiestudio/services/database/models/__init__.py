@@ -1,6 +1,8 @@
 from .api_key import ApiKey
 from .file import File
 from .flow import Flow
+from .flow_search import FlowSearchDocument
+from .flow_version import FlowPayload, FlowVersion
 from .folder import Folder
 from .message import MessageTable
 from .transactions import TransactionTable
@@ -11,6 +13,9 @@ __all__ = [
     "ApiKey",
     "File",
     "Flow",
+    "FlowPayload",
+    "FlowSearchDocument",
+    "FlowVersion",
     "Folder",
     "MessageTable",
     "TransactionTable",
@@ -10,6 +10,7 @@ from sqlmodel.ext.asyncio.session import AsyncSession
 from axiestudio.services.database.models.api_key.model import ApiKey, ApiKeyCreate, ApiKeyRead, UnmaskedApiKeyRead
 from axiestudio.services.database.models.user.model import User
 from axiestudio.services.deps import get_settings_service, session_scope
+from axiestudio.services.usage.accounting import api_key_id_var
 
 if TYPE_CHECKING:
     from sqlmodel.sql.expression import SelectOfScalar
@@ -54,6 +55,8 @@ async def check_key(session: AsyncSession, api_key: str) -> User | None:
     query: SelectOfScalar = select(ApiKey).options(selectinload(ApiKey.user)).where(ApiKey.api_key == api_key)
     api_key_object: ApiKey | None = (await session.exec(query)).first()
     if api_key_object is not None:
+        # The runs started by this request are accounted to the key
+        api_key_id_var.set(str(api_key_object.id))
         settings_service = get_settings_service()
         if settings_service.settings.disable_track_apikey_usage is not True:
             await update_total_uses(api_key_object.id)
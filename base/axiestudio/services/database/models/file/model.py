@@ -1,6 +1,7 @@
 from datetime import datetime, timezone
 from uuid import UUID, uuid4
 
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 
 from axiestudio.schema.serialize import UUIDstr
@@ -13,5 +14,9 @@ class File(SQLModel, table=True):  # type: ignore[call-arg]
     path: str = Field(nullable=False)
     size: int = Field(nullable=False)
     provider: str | None = Field(default=None)
+    # SHA-256 of the content, so a user's identical uploads share one stored object
+    content_hash: str | None = Field(default=None)
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (Index("ix_file_user_id_content_hash", "user_id", "content_hash"),)
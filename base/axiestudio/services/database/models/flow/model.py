@@ -190,6 +190,8 @@ class FlowBase(SQLModel):
 
 class Flow(FlowBase, table=True):  # type: ignore[call-arg]
     id: UUID = Field(default_factory=uuid4, primary_key=True, unique=True)
+    # The working copy of the flow's data, which the code base reads and writes. Its history is kept
+    # as immutable versions in flow_version, and `version` is the one it matches
     data: dict | None = Field(default=None, sa_column=Column(JSON))
     user_id: UUID | None = Field(index=True, foreign_key="user.id", nullable=True)
     user: "User" = Relationship(back_populates="flows")
@@ -198,6 +200,7 @@ class Flow(FlowBase, table=True):  # type: ignore[call-arg]
     locked: bool | None = Field(default=False, nullable=True)
     folder_id: UUID | None = Field(default=None, foreign_key="folder.id", nullable=True, index=True)
     fs_path: str | None = Field(default=None, nullable=True)
+    version: int | None = Field(default=None, nullable=True, description="The version of the flow's data")
     folder: Optional["Folder"] = Relationship(back_populates="flows")
 
     def to_data(self):
@@ -228,6 +231,7 @@ class FlowRead(FlowBase):
     user_id: UUID | None = Field()
     folder_id: UUID | None = Field()
     tags: list[str] | None = Field(None, description="The tags of the flow")
+    version: int | None = Field(None, description="The version of the flow's data")
 
 
 class FlowHeader(BaseModel):
@@ -0,0 +1,3 @@
+from .model import FlowSearchDocument, FlowSearchResult
+
+__all__ = ["FlowSearchDocument", "FlowSearchResult"]
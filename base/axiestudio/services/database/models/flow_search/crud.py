@@ -0,0 +1,163 @@
+import re
+from uuid import UUID
+
+from fastapi_pagination import Page, Params
+from fastapi_pagination.ext.sqlmodel import apaginate
+from sqlalchemy import Float, Subquery, Uuid, and_, func, literal, literal_column, or_, text
+from sqlmodel import col, delete, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from axiestudio.services.database.models.flow.model import Flow
+from axiestudio.services.database.models.flow_search.model import (
+    PG_SEARCH_VECTOR,
+    SEARCH_COLUMNS,
+    SQLITE_FTS_TABLE,
+    FlowSearchDocument,
+    FlowSearchResult,
+)
+
+# Characters of each column of a search document; prompts can be arbitrarily long
+MAX_INDEXED_TEXT_LENGTH = 20_000
+MAX_SEARCH_TERMS = 16
+# Weights of the name, description, tags, components and prompts columns in the SQLite ranking
+SQLITE_COLUMN_WEIGHTS = (10.0, 2.0, 5.0, 3.0, 1.0)
+
+_PROMPT_FIELD_NAMES = {"template", "system_prompt", "system_message"}
+
+
+def _is_prompt_field(name: str, field: dict) -> bool:
+    return field.get("type") == "prompt" or field.get("_input_type") == "PromptInput" or name in _PROMPT_FIELD_NAMES
+
+
+def extract_search_text(flow: Flow) -> dict[str, str]:
+    """Return the searchable text of a flow: its name, description, tags, component types and prompts."""
+    components: dict[str, None] = {}
+    prompts: list[str] = []
+    nodes = (flow.data or {}).get("nodes") or []
+    for node in nodes:
+        node_data = node.get("data") or {}
+        node_info = node_data.get("node") or {}
+        for component_name in (node_data.get("type"), node_info.get("display_name")):
+            if isinstance(component_name, str) and component_name:
+                components[component_name] = None
+        for field_name, field in (node_info.get("template") or {}).items():
+            if isinstance(field, dict) and _is_prompt_field(field_name, field):
+                value = field.get("value")
+                if isinstance(value, str) and value.strip():
+                    prompts.append(value)
+    return {
+        "name": flow.name or "",
+        "description": (flow.description or "")[:MAX_INDEXED_TEXT_LENGTH],
+        "tags": " ".join(flow.tags or []),
+        "components": " ".join(components)[:MAX_INDEXED_TEXT_LENGTH],
+        "prompts": "\n".join(prompts)[:MAX_INDEXED_TEXT_LENGTH],
+    }
+
+
+async def index_flow(db: AsyncSession, flow: Flow) -> FlowSearchDocument:
+    """Create or update the search document of a flow. It is written with the caller's commit."""
+    values = extract_search_text(flow)
+    stmt = select(FlowSearchDocument).where(FlowSearchDocument.flow_id == flow.id)
+    # The flow may not be flushed yet, which is left to the caller's commit
+    with db.no_autoflush:
+        document = (await db.exec(stmt)).first()
+    if document is None:
+        document = FlowSearchDocument(flow_id=flow.id, **values)
+        db.add(document)
+    elif any(getattr(document, key) != value for key, value in values.items()):
+        for key, value in values.items():
+            setattr(document, key, value)
+        db.add(document)
+    return document
+
+
+async def delete_flow_search_document(db: AsyncSession, flow_id: UUID) -> None:
+    await db.exec(delete(FlowSearchDocument).where(col(FlowSearchDocument.flow_id) == flow_id))
+
+
+def search_terms(query: str) -> list[str]:
+    """Split a search into the words that are matched, ignoring full-text query syntax."""
+    return re.findall(r"\w+", query.lower())[:MAX_SEARCH_TERMS]
+
+
+async def ranked_flow_ids(db: AsyncSession, query: str) -> Subquery | None:
+    """Return a subquery of the ids of the flows matching a search, with their rank, lower first.
+
+    Every word of the search must match, as a prefix of a word of the flow. Returns None if the
+    search has no words.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return None
+    dialect = (await db.connection()).dialect.name
+
+    if dialect == "postgresql":
+        vector = literal_column(PG_SEARCH_VECTOR)
+        tsquery = func.to_tsquery("simple", " & ".join(f"{term}:*" for term in terms))
+        return (
+            select(FlowSearchDocument.flow_id, (-func.ts_rank(vector, tsquery)).label("rank"))
+            .where(vector.op("@@")(tsquery))
+            .subquery("flow_search")
+        )
+
+    if dialect == "sqlite" and await _has_sqlite_fts(db):
+        weights = ", ".join(str(weight) for weight in SQLITE_COLUMN_WEIGHTS)
+        match = " ".join(f'"{term}"*' for term in terms)
+        return (
+            text(
+                f"SELECT document.flow_id AS flow_id, bm25({SQLITE_FTS_TABLE}, {weights}) AS rank "  # noqa: S608
+                f"FROM {SQLITE_FTS_TABLE} JOIN flow_search_document AS document "
+                f"ON document.id = {SQLITE_FTS_TABLE}.rowid WHERE {SQLITE_FTS_TABLE} MATCH :match"
+            )
+            .bindparams(match=match)
+            .columns(flow_id=Uuid, rank=Float)
+            .subquery("flow_search")
+        )
+
+    # Without a full-text index the words are looked up in every column
+    columns = [getattr(FlowSearchDocument, column) for column in SEARCH_COLUMNS]
+    return (
+        select(FlowSearchDocument.flow_id, literal(0.0).label("rank"))
+        .where(and_(*(or_(*(column.icontains(term, autoescape=True) for column in columns)) for term in terms)))
+        .subquery("flow_search")
+    )
+
+
+async def _has_sqlite_fts(db: AsyncSession) -> bool:
+    stmt = text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name").bindparams(name=SQLITE_FTS_TABLE)
+    return (await db.exec(stmt)).first() is not None
+
+
+async def search_flows(
+    db: AsyncSession,
+    query: str,
+    *,
+    user_id: UUID,
+    params: Params,
+    folder_id: UUID | None = None,
+    is_component: bool | None = None,
+) -> Page[FlowSearchResult]:
+    """Search the flows of a user, the most relevant first, without loading their data."""
+    ranked = await ranked_flow_ids(db, query)
+    columns = [getattr(Flow, field) for field in FlowSearchResult.model_fields if field != "rank"]
+    if ranked is None:
+        stmt = select(*columns, literal(0.0).label("rank")).order_by(col(Flow.updated_at).desc())
+    else:
+        stmt = (
+            select(*columns, ranked.c.rank)
+            .join(ranked, ranked.c.flow_id == Flow.id)
+            .order_by(ranked.c.rank, col(Flow.updated_at).desc())
+        )
+    stmt = stmt.where(Flow.user_id == user_id)
+    if folder_id is not None:
+        stmt = stmt.where(Flow.folder_id == folder_id)
+    if is_component is not None:
+        stmt = stmt.where(Flow.is_component == is_component)
+    return await apaginate(
+        db,
+        stmt,
+        params=params,
+        # Tags are lists, which cannot be hashed to deduplicate the rows
+        unique=False,
+        transformer=lambda rows: [FlowSearchResult.model_validate(row, from_attributes=True) for row in rows],
+    )
@@ -0,0 +1,103 @@
+from datetime import datetime
+from uuid import UUID
+
+from loguru import logger
+from sqlalchemy import Column, Index, Text, event, text
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Field, SQLModel
+
+# The text columns of a search document, in the order of the SQLite full-text index
+SEARCH_COLUMNS = ("name", "description", "tags", "components", "prompts")
+
+# The PostgreSQL full-text document of a flow, weighted from its name down to its prompts.
+# Queries must use the same expression for the index to apply.
+PG_SEARCH_VECTOR = (
+    "(setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(tags, '') || ' ' || coalesce(description, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(components, '')), 'C') || "
+    "setweight(to_tsvector('simple', coalesce(prompts, '')), 'D'))"
+)
+
+# The SQLite full-text index of the search documents, kept in sync by triggers
+SQLITE_FTS_TABLE = "flow_search_fts"
+_columns = ", ".join(SEARCH_COLUMNS)
+_new_values = ", ".join(f"new.{column}" for column in SEARCH_COLUMNS)
+_old_values = ", ".join(f"old.{column}" for column in SEARCH_COLUMNS)
+SQLITE_FTS_CREATE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} USING fts5({_columns}, "
+    "content='flow_search_document', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS flow_search_document_ai AFTER INSERT ON flow_search_document BEGIN "  # noqa: S608
+    f"INSERT INTO {SQLITE_FTS_TABLE}(rowid, {_columns}) VALUES (new.id, {_new_values}); END",
+    f"CREATE TRIGGER IF NOT EXISTS flow_search_document_ad AFTER DELETE ON flow_search_document BEGIN "  # noqa: S608
+    f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, {_columns}) VALUES ('delete', old.id, {_old_values}); "
+    "END",
+    f"CREATE TRIGGER IF NOT EXISTS flow_search_document_au AFTER UPDATE ON flow_search_document BEGIN "  # noqa: S608
+    f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, {_columns}) VALUES ('delete', old.id, {_old_values}); "
+    f"INSERT INTO {SQLITE_FTS_TABLE}(rowid, {_columns}) VALUES (new.id, {_new_values}); END",
+    # Index the documents that were written before the index existed
+    f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}) VALUES ('rebuild')",  # noqa: S608
+)
+SQLITE_FTS_DROP = (
+    "DROP TRIGGER IF EXISTS flow_search_document_ai",
+    "DROP TRIGGER IF EXISTS flow_search_document_ad",
+    "DROP TRIGGER IF EXISTS flow_search_document_au",
+    f"DROP TABLE IF EXISTS {SQLITE_FTS_TABLE}",
+)
+
+
+class FlowSearchDocument(SQLModel, table=True):  # type: ignore[call-arg]
+    """The searchable text of a flow, updated when the flow is saved.
+
+    On SQLite the documents are indexed by an FTS5 table, on PostgreSQL by a GIN index over
+    their weighted ``tsvector``.
+    """
+
+    __tablename__ = "flow_search_document"
+    __table_args__ = (
+        Index("ix_flow_search_document_vector", text(PG_SEARCH_VECTOR), postgresql_using="gin").ddl_if(
+            dialect="postgresql"
+        ),
+    )
+
+    id: int | None = Field(default=None, primary_key=True)
+    flow_id: UUID = Field(foreign_key="flow.id", unique=True, index=True, ondelete="CASCADE")
+    name: str = Field(default="")
+    description: str = Field(default="", sa_column=Column(Text, nullable=False, default=""))
+    tags: str = Field(default="")
+    components: str = Field(default="", sa_column=Column(Text, nullable=False, default=""))
+    prompts: str = Field(default="", sa_column=Column(Text, nullable=False, default=""))
+
+
+@event.listens_for(FlowSearchDocument.__table__, "after_create")
+def _create_sqlite_fts(_target, connection, **_kw) -> None:
+    if connection.dialect.name == "sqlite":
+        try:
+            for statement in SQLITE_FTS_CREATE:
+                connection.exec_driver_sql(statement)
+        except OperationalError:
+            logger.warning("SQLite was built without FTS5, flows will be searched without a full-text index")
+
+
+@event.listens_for(FlowSearchDocument.__table__, "before_drop")
+def _drop_sqlite_fts(_target, connection, **_kw) -> None:
+    if connection.dialect.name == "sqlite":
+        for statement in SQLITE_FTS_DROP:
+            connection.exec_driver_sql(statement)
+
+
+class FlowSearchResult(SQLModel):
+    """A flow matching a search, without its data."""
+
+    id: UUID
+    name: str
+    description: str | None = None
+    icon: str | None = None
+    icon_bg_color: str | None = None
+    gradient: str | None = None
+    is_component: bool | None = None
+    endpoint_name: str | None = None
+    tags: list[str] | None = None
+    folder_id: UUID | None = None
+    updated_at: datetime | None = None
+    rank: float = 0.0
+    """The relevance of the flow to the search; lower is more relevant."""
@@ -0,0 +1,3 @@
+from .model import FlowPayload, FlowVersion, FlowVersionRead
+
+__all__ = ["FlowPayload", "FlowVersion", "FlowVersionRead"]
@@ -0,0 +1,132 @@
+import asyncio
+import hashlib
+import json
+import zlib
+from uuid import UUID
+
+import orjson
+from sqlalchemy import inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import col, delete, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from axiestudio.services.database.models.flow.model import Flow
+from axiestudio.services.database.models.flow_version.model import FlowPayload, FlowVersion, FlowVersionRead
+from axiestudio.services.deps import get_settings_service
+
+_INSERT_BY_DIALECT = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def encode_payload(data: dict) -> tuple[str, bytes, int]:
+    """Return the content hash, the compressed bytes and the uncompressed size of a flow payload.
+
+    The payload is serialized with sorted keys, so equal payloads always get the same hash.
+    """
+    try:
+        canonical = orjson.dumps(data, option=orjson.OPT_SORT_KEYS)
+    except orjson.JSONEncodeError:
+        canonical = json.dumps(data, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(canonical).hexdigest(), zlib.compress(canonical), len(canonical)
+
+
+def decode_payload(payload: FlowPayload) -> dict:
+    return orjson.loads(zlib.decompress(payload.data))
+
+
+async def save_flow_version(db: AsyncSession, flow: Flow) -> FlowVersion | None:
+    """Record the current data of a flow as its next version and point the flow at it.
+
+    Nothing is recorded if the data is the same as the latest version's. The payload itself is
+    only stored if no flow or version uses it yet. Versions beyond max_flow_versions_per_flow
+    are deleted, the oldest first.
+    """
+    if flow.data is None:
+        return None
+    # Serializing and compressing large flows is kept off the event loop
+    payload_hash, compressed, size = await asyncio.to_thread(encode_payload, flow.data)
+
+    if inspect(flow).persistent:
+        # Saves of the same flow number their versions one after the other: the flow row stays
+        # locked until the caller commits, by the update flushed here and, on PostgreSQL, FOR UPDATE
+        await db.flush()
+        await db.exec(select(Flow.id).where(Flow.id == flow.id).with_for_update())
+
+    stmt = select(FlowVersion).where(FlowVersion.flow_id == flow.id).order_by(col(FlowVersion.version).desc())
+    # A new flow may not be flushed yet, which is left to the caller's commit
+    with db.no_autoflush:
+        latest = (await db.exec(stmt.limit(1))).first()
+        if latest is not None and latest.payload_hash == payload_hash:
+            flow.version = latest.version
+            return latest
+        await _store_payload(db, FlowPayload(hash=payload_hash, data=compressed, size=size))
+
+    version = FlowVersion(
+        flow_id=flow.id, version=latest.version + 1 if latest is not None else 1, payload_hash=payload_hash
+    )
+    db.add(version)
+    flow.version = version.version
+
+    max_versions = get_settings_service().settings.max_flow_versions_per_flow
+    if max_versions and version.version > max_versions:
+        await _delete_versions(
+            db, col(FlowVersion.flow_id) == flow.id, col(FlowVersion.version) <= version.version - max_versions
+        )
+    return version
+
+
+async def _store_payload(db: AsyncSession, payload: FlowPayload) -> None:
+    """Store a payload unless it is stored already, as another save may store it at the same time."""
+    if any(isinstance(obj, FlowPayload) and obj.hash == payload.hash for obj in db.new):
+        return
+    insert = _INSERT_BY_DIALECT.get(db.get_bind().dialect.name)
+    if insert is None:
+        if await db.get(FlowPayload, payload.hash) is None:
+            db.add(payload)
+        return
+    values = payload.model_dump()
+    await db.exec(insert(FlowPayload).values(**values).on_conflict_do_nothing(index_elements=["hash"]))
+
+
+async def get_flow_versions(db: AsyncSession, flow_id: UUID) -> list[FlowVersionRead]:
+    """Get the versions of a flow, the most recent first, without their payloads."""
+    stmt = (
+        select(FlowVersion, FlowPayload.size)
+        .join(FlowPayload, col(FlowPayload.hash) == col(FlowVersion.payload_hash))
+        .where(FlowVersion.flow_id == flow_id)
+        .order_by(col(FlowVersion.version).desc())
+    )
+    return [
+        FlowVersionRead.model_validate({**version.model_dump(), "size": size}) for version, size in await db.exec(stmt)
+    ]
+
+
+async def get_flow_version_data(db: AsyncSession, flow_id: UUID, version: int) -> dict | None:
+    """Get the payload of a version of a flow, or None if the flow has no such version."""
+    stmt = (
+        select(FlowPayload)
+        .join(FlowVersion, col(FlowPayload.hash) == col(FlowVersion.payload_hash))
+        .where(FlowVersion.flow_id == flow_id)
+        .where(FlowVersion.version == version)
+    )
+    payload = (await db.exec(stmt)).first()
+    if payload is None:
+        return None
+    return await asyncio.to_thread(decode_payload, payload)
+
+
+async def delete_flow_versions(db: AsyncSession, flow_id: UUID) -> None:
+    """Delete the versions of a flow, and the payloads no other flow uses."""
+    await _delete_versions(db, col(FlowVersion.flow_id) == flow_id)
+
+
+async def _delete_versions(db: AsyncSession, *conditions) -> None:
+    """Delete the versions matching the conditions, and the payloads no version uses anymore."""
+    hashes = set((await db.exec(select(FlowVersion.payload_hash).where(*conditions))).all())
+    await db.exec(delete(FlowVersion).where(*conditions))
+    if not hashes:
+        return
+    still_used = set(
+        (await db.exec(select(FlowVersion.payload_hash).where(col(FlowVersion.payload_hash).in_(hashes)))).all()
+    )
+    if unused := hashes - still_used:
+        await db.exec(delete(FlowPayload).where(col(FlowPayload.hash).in_(unused)))
@@ -0,0 +1,40 @@
+from datetime import datetime, timezone
+from uuid import UUID, uuid4
+
+from sqlalchemy import Column, LargeBinary, UniqueConstraint
+from sqlmodel import Field, SQLModel
+
+
+class FlowPayload(SQLModel, table=True):  # type: ignore[call-arg]
+    """A flow's nodes and edges, stored once however many flows or versions use them.
+
+    The payload is keyed by the SHA-256 of its canonical JSON and stored zlib-compressed.
+    """
+
+    __tablename__ = "flow_payload"
+
+    hash: str = Field(primary_key=True)
+    data: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+    size: int = Field(nullable=False)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class FlowVersionBase(SQLModel):
+    flow_id: UUID = Field(foreign_key="flow.id", index=True, ondelete="CASCADE")
+    version: int = Field(nullable=False)
+    payload_hash: str = Field(foreign_key="flow_payload.hash", index=True)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class FlowVersion(FlowVersionBase, table=True):  # type: ignore[call-arg]
+    """An immutable version of a flow's payload."""
+
+    __tablename__ = "flow_version"
+    __table_args__ = (UniqueConstraint("flow_id", "version", name="unique_flow_version"),)
+
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
+
+
+class FlowVersionRead(FlowVersionBase):
+    id: UUID
+    size: int | None = None
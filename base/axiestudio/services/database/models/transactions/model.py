@@ -16,6 +16,7 @@ class TransactionBase(SQLModel):
     status: str = Field(nullable=False)
     error: str | None = Field(default=None)
     flow_id: UUID = Field()
+    flow_version: int | None = Field(default=None, nullable=True)
 
     # Needed for Column(JSON)
     class Config:
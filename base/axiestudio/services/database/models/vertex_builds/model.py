@@ -16,6 +16,7 @@ class VertexBuildBase(SQLModel):
     params: str | None = Field(default=None, sa_column=Column(Text, nullable=True))
     valid: bool = Field(nullable=False)
     flow_id: UUID = Field()
+    flow_version: int | None = Field(default=None, nullable=True)
 
     # Needed for Column(JSON)
     class Config:
@@ -7,7 +7,7 @@ import time
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 import anyio
 import sqlalchemy as sa
@@ -27,15 +27,97 @@ from axiestudio.initial_setup.constants import STARTER_FOLDER_NAME
 from axiestudio.services.base import Service
 from axiestudio.services.database import models
 from axiestudio.services.database.models.user.crud import get_user_by_username
-from axiestudio.services.database.session import NoopSession
+from axiestudio.services.database.session import NoopSession, SessionUnit, session_unit_var
 from axiestudio.services.database.utils import Result, TableResults
 from axiestudio.services.deps import get_settings_service
 from axiestudio.services.utils import teardown_superuser
 
 if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
     from axiestudio.services.settings.service import SettingsService
 
 
+class PoolMonitor:
+    """Measures how the connections of an engine's pool are used.
+
+    Counts the connections checked out of the pool, how long getting one waited, which includes
+    opening it and its pre-ping, and how long they were held. A connection held longer than
+    ``long_held_threshold`` seconds is logged, as a request or a run keeping it while it waits
+    on something else starves the pool.
+    """
+
+    def __init__(self, engine: AsyncEngine, long_held_threshold: float) -> None:
+        self.pool = engine.sync_engine.pool
+        self.long_held_threshold = long_held_threshold
+        self.checkouts = 0
+        self.in_use = 0
+        self.max_in_use = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_held = 0.0
+        self.max_held = 0.0
+        self.long_held = 0
+        self._checked_out_at: dict[int, float] = {}
+        # Pool events do not tell how long a checkout waited, so the checkout itself is timed
+        self._connect = self.pool.connect
+        self.pool.connect = self._timed_connect  # type: ignore[method-assign]
+        event.listen(self.pool, "checkout", self._on_checkout)
+        event.listen(self.pool, "checkin", self._on_checkin)
+
+    def _timed_connect(self):
+        start = time.perf_counter()
+        connection = self._connect()
+        wait = time.perf_counter() - start
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        return connection
+
+    def _on_checkout(self, _dbapi_connection, connection_record, _connection_proxy) -> None:
+        self._checked_out_at[id(connection_record)] = time.perf_counter()
+        self.checkouts += 1
+        self.in_use += 1
+        self.max_in_use = max(self.max_in_use, self.in_use)
+
+    def _on_checkin(self, _dbapi_connection, connection_record) -> None:
+        checked_out_at = self._checked_out_at.pop(id(connection_record), None)
+        if checked_out_at is None:
+            return
+        self.in_use -= 1
+        held = time.perf_counter() - checked_out_at
+        self.total_held += held
+        self.max_held = max(self.max_held, held)
+        if self.long_held_threshold and held > self.long_held_threshold:
+            self.long_held += 1
+            logger.warning(f"A database connection was held for {held:.1f}s before going back to the pool")
+
+    def get_stats(self) -> dict[str, Any]:
+        now = time.perf_counter()
+        held_now = [now - checked_out_at for checked_out_at in self._checked_out_at.values()]
+        stats: dict[str, Any] = {
+            "status": self.pool.status(),
+            "checkouts": self.checkouts,
+            "in_use": self.in_use,
+            "max_in_use": self.max_in_use,
+            "average_wait": self.total_wait / self.checkouts if self.checkouts else 0.0,
+            "max_wait": self.max_wait,
+            "average_held": self.total_held / (self.checkouts - self.in_use) if self.checkouts > self.in_use else 0.0,
+            "max_held": max([self.max_held, *held_now]),
+            "long_held": self.long_held,
+            "long_held_now": sum(held > self.long_held_threshold for held in held_now),
+        }
+        # Only queue pools have a size
+        for name in ("size", "checkedout", "overflow"):
+            if callable(method := getattr(self.pool, name, None)):
+                stats[name] = method()
+        return stats
+
+    def close(self) -> None:
+        self.pool.connect = self._connect  # type: ignore[method-assign]
+        event.remove(self.pool, "checkout", self._on_checkout)
+        event.remove(self.pool, "checkin", self._on_checkin)
+
+
 class DatabaseService(Service):
     name = "database_service"
 
@@ -47,6 +129,9 @@ class DatabaseService(Service):
             raise ValueError(msg)
         self.database_url: str = settings_service.settings.database_url
         self._sanitize_database_url()
+        self.database_read_url: str | None = None
+        if settings_service.settings.database_read_url:
+            self.database_read_url = self._to_async_url(settings_service.settings.database_read_url)
 
         # This file is in axiestudio.services.database.manager.py
         # the ini is in axiestudio
@@ -57,10 +142,7 @@ class DatabaseService(Service):
         # register the event listener for sqlite as part of this class.
         # Using decorator will make the method not able to use self
         event.listen(Engine, "connect", self.on_connection)
-        if self.settings_service.settings.database_connection_retry:
-            self.engine = self._create_engine_with_retry()
-        else:
-            self.engine = self._create_engine()
+        self._create_engines()
 
         alembic_log_file = self.settings_service.settings.alembic_log_file
         # Check if the provided path is absolute, cross-platform.
@@ -76,14 +158,34 @@ class DatabaseService(Service):
 
     def reload_engine(self) -> None:
         self._sanitize_database_url()
-        if self.settings_service.settings.database_connection_retry:
-            self.engine = self._create_engine_with_retry()
-        else:
-            self.engine = self._create_engine()
+        self._close_pool_monitors()
+        self._create_engines()
+
+    def _create_engines(self) -> None:
+        """Create the engine for the database and, if one is set, the engine for the read replica."""
+        settings = self.settings_service.settings
+        create_engine = self._create_engine_with_retry if settings.database_connection_retry else self._create_engine
+        self.engine = create_engine()
+        self.pool_monitor = PoolMonitor(self.engine, settings.db_long_held_connection_threshold)
+        self.read_engine: AsyncEngine | None = None
+        self.read_pool_monitor: PoolMonitor | None = None
+        if self.database_read_url:
+            self.read_engine = create_engine(self.database_read_url)
+            self.read_pool_monitor = PoolMonitor(self.read_engine, settings.db_long_held_connection_threshold)
+
+    def _close_pool_monitors(self) -> None:
+        self.pool_monitor.close()
+        if self.read_pool_monitor is not None:
+            self.read_pool_monitor.close()
 
     def _sanitize_database_url(self):
         """Create the engine for the database."""
-        url_components = self.database_url.split("://", maxsplit=1)
+        self.database_url = self._to_async_url(self.database_url)
+
+    @staticmethod
+    def _to_async_url(database_url: str) -> str:
+        """Return the database URL with the async driver of its database."""
+        url_components = database_url.split("://", maxsplit=1)
 
         driver = url_components[0]
 
@@ -98,7 +200,7 @@ class DatabaseService(Service):
                 )
             driver = "postgresql+psycopg"
 
-        self.database_url = f"{driver}://{url_components[1]}"
+        return f"{driver}://{url_components[1]}"
 
     def _build_connection_kwargs(self):
         """Build connection kwargs by merging deprecated settings with db_connection_settings.
@@ -120,7 +222,7 @@ class DatabaseService(Service):
 
         return connection_kwargs
 
-    def _create_engine(self) -> AsyncEngine:
+    def _create_engine(self, database_url: str | None = None) -> AsyncEngine:
         # Get connection settings from config, with defaults if not specified
         # if the user specifies an empty dict, we allow it.
         kwargs = self._build_connection_kwargs()
@@ -134,24 +236,26 @@ class DatabaseService(Service):
             else:
                 logger.error(f"Invalid poolclass '{poolclass_key}' specified. Using default pool class.")
 
+        database_url = database_url or self.database_url
         return create_async_engine(
-            self.database_url,
-            connect_args=self._get_connect_args(),
+            database_url,
+            connect_args=self._get_connect_args(database_url),
             **kwargs,
         )
 
     @retry(wait=wait_fixed(2), stop=stop_after_attempt(10))
-    def _create_engine_with_retry(self) -> AsyncEngine:
+    def _create_engine_with_retry(self, database_url: str | None = None) -> AsyncEngine:
         """Create the engine for the database with retry logic."""
-        return self._create_engine()
+        return self._create_engine(database_url)
 
-    def _get_connect_args(self):
+    def _get_connect_args(self, database_url: str | None = None):
         settings = self.settings_service.settings
 
         if settings.db_driver_connection_settings is not None:
             return settings.db_driver_connection_settings
 
-        if settings.database_url and settings.database_url.startswith("sqlite"):
+        database_url = database_url or settings.database_url
+        if database_url and database_url.startswith("sqlite"):
             return {
                 "check_same_thread": False,
                 "timeout": settings.db_connect_timeout,
@@ -182,18 +286,73 @@ class DatabaseService(Service):
                     cursor.close()
 
     @asynccontextmanager
-    async def with_session(self):
+    async def with_session(self, *, read_only: bool = False):
+        """Open a session, the one of the current unit of work if it is free.
+
+        Args:
+            read_only: Whether the session only reads. It then uses the read replica, if one is set,
+                and may not see the latest writes.
+        """
         if self.settings_service.settings.use_noop_database:
             yield NoopSession()
+            return
+        unit = session_unit_var.get()
+        session = None
+        if read_only and self.read_engine is not None:
+            engine = self.read_engine
         else:
-            async with AsyncSession(self.engine, expire_on_commit=False) as session:
-                # Start of Selection
-                try:
-                    yield session
-                except exc.SQLAlchemyError as db_exc:
-                    logger.error(f"Database error during session scope: {db_exc}")
-                    await session.rollback()
-                    raise
+            engine = self.engine
+            if unit is not None and unit.engine is engine:
+                session = await unit.acquire()
+        if session is None:
+            async with AsyncSession(engine, expire_on_commit=False) as session, self._rollback_on_error(session):
+                yield session
+            return
+        failed = True
+        try:
+            async with self._rollback_on_error(session):
+                yield session
+            failed = False
+        finally:
+            await unit.release(failed=failed)
+
+    @staticmethod
+    @asynccontextmanager
+    async def _rollback_on_error(session: AsyncSession) -> AsyncIterator[None]:
+        try:
+            yield
+        except exc.SQLAlchemyError as db_exc:
+            logger.error(f"Database error during session scope: {db_exc}")
+            await session.rollback()
+            raise
+
+    @asynccontextmanager
+    async def unit_of_work(self) -> AsyncIterator[SessionUnit | None]:
+        """Share a session between the database operations of a request or a run that follow each other.
+
+        Within the unit, a session opened while no other one of the unit is open reuses the same
+        connection, instead of checking one out of the pool each time. The connection goes back to
+        the pool once the unit has been idle for db_session_idle_timeout seconds, and when it ends.
+        A unit opened within another one replaces it until it ends.
+        """
+        settings = self.settings_service.settings
+        if settings.use_noop_database or not settings.db_session_idle_timeout:
+            yield None
+            return
+        unit = SessionUnit(self.engine, idle_timeout=settings.db_session_idle_timeout)
+        token = session_unit_var.set(unit)
+        try:
+            yield unit
+        finally:
+            session_unit_var.reset(token)
+            await unit.close()
+
+    def get_pool_stats(self) -> dict[str, Any]:
+        """Return how the connections of the database, and of its read replica if one is set, are used."""
+        stats = {"primary": self.pool_monitor.get_stats()}
+        if self.read_pool_monitor is not None:
+            stats["replica"] = self.read_pool_monitor.get_stats()
+        return stats
 
     async def assign_orphaned_flows_to_superuser(self) -> None:
         """Assign orphaned flows to the default superuser when auto login is enabled."""
@@ -633,4 +792,7 @@ class DatabaseService(Service):
                 await teardown_superuser(settings_service, session)
         except Exception:  # noqa: BLE001
             logger.exception("Error tearing down database")
+        self._close_pool_monitors()
         await self.engine.dispose()
+        if self.read_engine is not None:
+            await self.read_engine.dispose()
@@ -1,3 +1,18 @@
+from __future__ import annotations
+
+import asyncio
+from contextvars import ContextVar
+from typing import TYPE_CHECKING
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+# The unit of work of the current request or run, whose database operations share a session
+session_unit_var: ContextVar[SessionUnit | None] = ContextVar("session_unit", default=None)
+
+
 class NoopSession:
     class NoopBind:
         class NoopConnect:
@@ -60,3 +75,96 @@ class NoopSession:
                 return None
 
         return _NoopResult()
+
+
+class SessionUnit:
+    """A database session shared by the database operations of a request or a run that follow each other.
+
+    The session is bound to one pooled connection, so those operations do not each check a
+    connection out of the pool. An operation starting while the session is in use gets a
+    session of its own, so concurrent operations never share one. The connection goes back to
+    the pool once the unit has been idle for ``idle_timeout`` seconds: a run waiting on a model
+    holds none.
+    """
+
+    def __init__(self, engine: AsyncEngine, *, idle_timeout: float) -> None:
+        self.engine = engine
+        self.idle_timeout = idle_timeout
+        self.closed = False
+        self.reuses = 0
+        self._loop = asyncio.get_running_loop()
+        self._connection: AsyncConnection | None = None
+        self._session: AsyncSession | None = None
+        self._busy = False
+        self._release_handle: asyncio.TimerHandle | None = None
+        self._release_task: asyncio.Task | None = None
+
+    async def acquire(self) -> AsyncSession | None:
+        """Return the session of the unit, or None if it is in use, closed or on another event loop."""
+        if self.closed or self._busy or asyncio.get_running_loop() is not self._loop:
+            return None
+        self._busy = True
+        if self._release_handle is not None:
+            self._release_handle.cancel()
+            self._release_handle = None
+        if self._session is not None:
+            self.reuses += 1
+            return self._session
+        try:
+            self._connection = await self.engine.connect()
+        except BaseException:
+            self._busy = False
+            raise
+        self._session = AsyncSession(bind=self._connection, expire_on_commit=False)
+        return self._session
+
+    async def release(self, *, failed: bool = False) -> None:
+        """End the use of the session, leaving it as a new one would be. A failed session is not reused."""
+        session = self._session
+        try:
+            if session is not None and not failed:
+                # As closing a session would, without giving the connection back
+                session.expunge_all()
+                if session.in_transaction():
+                    await session.rollback()
+        except Exception:  # noqa: BLE001
+            failed = True
+        if failed or self.closed or not self.idle_timeout:
+            await self._close_session()
+            self._busy = False
+            return
+        self._busy = False
+        self._release_handle = self._loop.call_later(self.idle_timeout, self._release_when_idle)
+
+    def _release_when_idle(self) -> None:
+        self._release_handle = None
+        if self._busy or self._session is None:
+            return
+        self._busy = True
+        self._release_task = asyncio.ensure_future(self._close_idle_session())
+
+    async def _close_idle_session(self) -> None:
+        try:
+            await self._close_session()
+        finally:
+            self._busy = False
+            self._release_task = None
+
+    async def _close_session(self) -> None:
+        session, connection = self._session, self._connection
+        self._session = self._connection = None
+        if session is not None:
+            await session.close()
+        if connection is not None:
+            await connection.close()
+
+    async def close(self) -> None:
+        """Give the connection back to the pool. The operations still running keep their session until they end."""
+        self.closed = True
+        if self._release_handle is not None:
+            self._release_handle.cancel()
+            self._release_handle = None
+        if self._release_task is not None:
+            await self._release_task
+        elif not self._busy:
+            await self._close_session()
@@ -7,7 +7,6 @@ from typing import TYPE_CHECKING
 from alembic.util.exc import CommandError
 from loguru import logger
 from sqlmodel import text
-from sqlmodel.ext.asyncio.session import AsyncSession
 
 if TYPE_CHECKING:
     from axiestudio.services.database.service import DatabaseService
@@ -63,15 +62,13 @@ async def initialize_database(*, fix_migration: bool = False) -> None:
 
 @asynccontextmanager
 async def session_getter(db_service: DatabaseService):
-    try:
-        session = AsyncSession(db_service.engine, expire_on_commit=False)
-        yield session
-    except Exception:
-        logger.exception("Session rollback because of exception")
-        await session.rollback()
-        raise
-    finally:
-        await session.close()
+    async with db_service.with_session() as session:
+        try:
+            yield session
+        except Exception:
+            logger.exception("Session rollback because of exception")
+            await session.rollback()
+            raise
 
 
 @dataclass
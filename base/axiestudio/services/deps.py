@@ -24,6 +24,7 @@ if TYPE_CHECKING:
     from axiestudio.services.task.service import TaskService
     from axiestudio.services.telemetry.service import TelemetryService
     from axiestudio.services.tracing.service import TracingService
+    from axiestudio.services.usage.service import UsageService
     from axiestudio.services.variable.service import VariableService
 
 
@@ -70,6 +71,17 @@ def get_tracing_service() -> TracingService:
     return get_service(ServiceType.TRACING_SERVICE, TracingServiceFactory())
 
 
+def get_usage_service() -> UsageService:
+    """Retrieves the service accounting the resources used by flow runs.
+
+    Returns:
+        The usage service instance.
+    """
+    from axiestudio.services.usage.factory import UsageServiceFactory
+
+    return get_service(ServiceType.USAGE_SERVICE, UsageServiceFactory())
+
+
 def get_state_service() -> StateService:
     """Retrieves the StateService instance from the service manager.
 
@@ -153,13 +165,17 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
 
 
 @asynccontextmanager
-async def session_scope() -> AsyncGenerator[AsyncSession, None]:
+async def session_scope(*, read_only: bool = False) -> AsyncGenerator[AsyncSession, None]:
     """Context manager for managing an async session scope.
 
     This context manager is used to manage an async session scope for database operations.
     It ensures that the session is properly committed if no exceptions occur,
     and rolled back if an exception is raised.
 
+    Args:
+        read_only: Whether the scope only reads. Its session is not committed and uses the
+            read replica, if one is set.
+
     Yields:
         AsyncSession: The async session object.
 
@@ -168,10 +184,11 @@ async def session_scope() -> AsyncGenerator[AsyncSession, None]:
 
     """
     db_service = get_db_service()
-    async with db_service.with_session() as session:
+    async with db_service.with_session(read_only=read_only) as session:
         try:
             yield session
-            await session.commit()
+            if not read_only:
+                await session.commit()
         except Exception:
             logger.exception("An error occurred during the session scope.")
             await session.rollback()
@@ -200,6 +217,17 @@ def get_shared_component_cache_service() -> CacheService:
     return get_service(ServiceType.SHARED_COMPONENT_CACHE_SERVICE, SharedComponentCacheServiceFactory())
 
 
+def get_vertex_cache_service() -> CacheService:
+    """Retrieves the cache used to memoize results of deterministic components.
+
+    Returns:
+        The vertex cache service instance.
+    """
+    from axiestudio.services.vertex_cache.factory import VertexCacheServiceFactory
+
+    return get_service(ServiceType.VERTEX_CACHE_SERVICE, VertexCacheServiceFactory())
+
+
 def get_session_service() -> SessionService:
     """Retrieves the session service from the service manager.
 
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import TYPE_CHECKING, Any
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
+# Events kept per job; older ones are dropped, so very long token streams cannot grow the log without bound
+MAX_EVENTS_PER_JOB = 10_000
+
+
+class EventLog:
+    """An append-only, bounded log of the events of a job, read by any number of consumers.
+
+    Each event gets a sequence number, starting at 1. Consumers read the events after a cursor,
+    the sequence number of the last event they received, so a client that reconnects or a
+    second observer can replay the events it missed. Reading never removes events.
+
+    The log has the ``put``/``put_nowait`` interface of the queue an ``EventManager`` writes to.
+    A ``None`` event, as sent at the end of a build, closes the log.
+    """
+
+    def __init__(self, max_events: int = MAX_EVENTS_PER_JOB) -> None:
+        self._events: list[tuple[int, str, bytes, float]] = []
+        self._max_events = max_events
+        self._last_seq = 0
+        self._closed = False
+        # Events are sent from components running in worker threads too
+        self._lock = threading.Lock()
+        self._loop = asyncio.get_running_loop()
+        self._changed = asyncio.Event()
+        # When a consumer last started reading, to tell whether a client came back after a disconnect
+        self.last_read_at = time.monotonic()
+        # The cursor of clients that poll without giving one
+        self.default_cursor = 0
+
+    @property
+    def last_seq(self) -> int:
+        return self._last_seq
+
+    @property
+    def first_seq(self) -> int:
+        """The sequence number of the oldest event still in the log."""
+        with self._lock:
+            return self._events[0][0] if self._events else self._last_seq + 1
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def put_nowait(self, item: tuple[Any, bytes | None, float]) -> None:
+        event_id, value, put_time = item
+        with self._lock:
+            if self._closed:
+                return
+            if value is None:
+                self._closed = True
+            else:
+                self._last_seq += 1
+                self._events.append((self._last_seq, event_id, value, put_time))
+                # Trimmed in chunks, so the events are not shifted on every append
+                if len(self._events) > self._max_events + self._max_events // 10:
+                    del self._events[: len(self._events) - self._max_events]
+        self._notify()
+
+    async def put(self, item: tuple[Any, bytes | None, float]) -> None:
+        self.put_nowait(item)
+
+    def close(self) -> None:
+        """Mark the log as complete, waking the consumers waiting for events."""
+        with self._lock:
+            self._closed = True
+        self._notify()
+
+    def _notify(self) -> None:
+        try:
+            in_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            in_loop = False
+        if in_loop:
+            self._wake()
+        elif not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def events_after(self, cursor: int) -> list[tuple[int, str, bytes, float]]:
+        """Return the events after a cursor that are still in the log, without waiting.
+
+        Each event is a tuple of its sequence number, event id, encoded data and the time it was added.
+        """
+        with self._lock:
+            if not self._events:
+                return []
+            first_seq = self._events[0][0]
+            if cursor < first_seq - 1:
+                logger.debug(f"Events {cursor + 1} to {first_seq - 1} were dropped from the log")
+            return self._events[max(cursor - first_seq + 1, 0) :]
+
+    async def wait(self, cursor: int) -> None:
+        """Wait until there are events after the cursor or the log is closed."""
+        while self._last_seq <= cursor and not self._closed:
+            await self._changed.wait()
+
+    async def read(self, cursor: int = 0) -> AsyncIterator[tuple[int, str, bytes, float]]:
+        """Yield the events after the cursor as they are added, until the log is closed."""
+        self.touch()
+        while True:
+            for event in self.events_after(cursor):
+                cursor = event[0]
+                yield event
+            if self._closed and cursor >= self._last_seq:
+                return
+            await self.wait(cursor)
+
+    def touch(self) -> None:
+        self.last_read_at = time.monotonic()
+
+    def clear(self) -> int:
+        with self._lock:
+            count = len(self._events)
+            self._events.clear()
+        return count
@@ -6,6 +6,7 @@ from loguru import logger
 
 from axiestudio.events.event_manager import EventManager
 from axiestudio.services.base import Service
+from axiestudio.services.job_queue.event_log import EventLog
 
 
 class JobQueueNotFoundError(Exception):
@@ -17,25 +18,25 @@ class JobQueueNotFoundError(Exception):
 
 
 class JobQueueService(Service):
-    """Asynchronous service for managing job-specific queues and their associated tasks.
+    """Asynchronous service for managing job-specific event logs and their associated tasks.
 
     This service allows clients to:
-      - Create dedicated asyncio queues for individual jobs.
+      - Create dedicated event logs for individual jobs, which any number of consumers read by cursor.
       - Associate each queue with an EventManager, enabling event-driven handling.
       - Launch and manage asynchronous tasks that process these job queues.
       - Safely clean up resources by cancelling active tasks and emptying queues.
       - Automatically perform periodic cleanup of inactive or completed job queues.
 
     The cleanup process follows a two-phase approach:
-      1. When a task is cancelled or fails, it is marked for cleanup by setting a timestamp
+      1. When a task finishes, is cancelled or fails, it is marked for cleanup by setting a timestamp
       2. The actual cleanup only occurs after CLEANUP_GRACE_PERIOD seconds have elapsed
-         since the task was marked
+         since the task was marked, so the events of a finished job can still be replayed
 
     Attributes:
         name (str): Unique identifier for the service.
-        _queues (dict[str, tuple[asyncio.Queue, EventManager, asyncio.Task | None, float | None]]):
+        _queues (dict[str, tuple[EventLog, EventManager, asyncio.Task | None, float | None]]):
             Dictionary mapping job IDs to a tuple containing:
-              * The job's asyncio.Queue instance.
+              * The job's EventLog instance.
               * The associated EventManager instance.
               * The asyncio.Task processing the job (if any).
               * The cleanup timestamp (if any).
@@ -67,7 +68,7 @@ class JobQueueService(Service):
         Sets up the internal registry for job queues, initializes the cleanup task, and sets the service state
         to active.
         """
-        self._queues: dict[str, tuple[asyncio.Queue, EventManager, asyncio.Task | None, float | None]] = {}
+        self._queues: dict[str, tuple[EventLog, EventManager, asyncio.Task | None, float | None]] = {}
         self._cleanup_task: asyncio.Task | None = None
         self._closed = False
         self.ready = False
@@ -122,16 +123,16 @@ class JobQueueService(Service):
     async def teardown(self) -> None:
         await self.stop()
 
-    def create_queue(self, job_id: str) -> tuple[asyncio.Queue, EventManager]:
-        """Create and register a new queue along with its corresponding event manager for a job.
+    def create_queue(self, job_id: str) -> tuple[EventLog, EventManager]:
+        """Create and register a new event log along with its corresponding event manager for a job.
 
         Args:
             job_id (str): Unique identifier for the job.
 
         Returns:
-            tuple[asyncio.Queue, EventManager]: A tuple containing:
-                - The asyncio.Queue instance for handling the job's tasks or messages.
-                - The EventManager instance for event handling tied to the queue.
+            tuple[EventLog, EventManager]: A tuple containing:
+                - The EventLog instance holding the job's events.
+                - The EventManager instance for event handling tied to the log.
         """
         if self._closed:
             msg = "Queue service is closed"
@@ -142,7 +143,7 @@ class JobQueueService(Service):
             msg = f"Queue for job_id {job_id} already exists"
             raise ValueError(msg)
 
-        main_queue: asyncio.Queue = asyncio.Queue()
+        main_queue = EventLog()
         event_manager: EventManager = self._create_default_event_manager(main_queue)
 
         # Register the queue without an active task.
@@ -181,18 +182,20 @@ class JobQueueService(Service):
 
         # Initiate the new asynchronous task.
         task = asyncio.create_task(task_coro)
+        # A failed or cancelled job never sends the end of its events, so consumers are released here
+        task.add_done_callback(lambda _: main_queue.close())
         self._queues[job_id] = (main_queue, event_manager, task, None)
         logger.debug(f"New task started for job_id {job_id}")
 
-    def get_queue_data(self, job_id: str) -> tuple[asyncio.Queue, EventManager, asyncio.Task | None, float | None]:
+    def get_queue_data(self, job_id: str) -> tuple[EventLog, EventManager, asyncio.Task | None, float | None]:
         """Retrieve the complete data structure associated with a job's queue.
 
         Args:
             job_id (str): Unique identifier for the job.
 
         Returns:
-            tuple[asyncio.Queue, EventManager, asyncio.Task | None, float | None]:
-                A tuple containing the job's main queue, its linked event manager, the associated task (if any),
+            tuple[EventLog, EventManager, asyncio.Task | None, float | None]:
+                A tuple containing the job's event log, its linked event manager, the associated task (if any),
                 and the cleanup timestamp (if any).
 
         Raises:
@@ -237,14 +240,9 @@ class JobQueueService(Service):
                 logger.error(f"Error in task for job_id {job_id}: {exc}")
             logger.debug(f"Task cancellation complete for job_id {job_id}")
 
-        # Clear the queue since we just cancelled the task or it has completed
-        items_cleared = 0
-        while not main_queue.empty():
-            try:
-                main_queue.get_nowait()
-                items_cleared += 1
-            except asyncio.QueueEmpty:
-                break
+        # Clear the log since we just cancelled the task or it has completed
+        main_queue.close()
+        items_cleared = main_queue.clear()
 
         logger.debug(f"Removed {items_cleared} items from queue for job_id {job_id}")
         # Remove the job entry from the registry
@@ -281,11 +279,11 @@ class JobQueueService(Service):
                 logger.debug(
                     f"Queue {job_id} status - Done: {task.done()}, "
                     f"Cancelled: {task.cancelled()}, "
-                    f"Has exception: {task.exception() is not None if task.done() else 'N/A'}"
+                    f"Has exception: {task.exception() is not None if task.done() and not task.cancelled() else 'N/A'}"
                 )
 
                 # Check if task should be marked for cleanup
-                if task and (task.cancelled() or (task.done() and task.exception() is not None)):
+                if task.done():
                     if cleanup_time is None:
                         # Mark for cleanup by setting the timestamp
                         self._queues[job_id] = (
@@ -294,17 +292,17 @@ class JobQueueService(Service):
                             self._queues[job_id][2],
                             current_time,
                         )
-                        logger.debug(f"Job queue for job_id {job_id} marked for cleanup - Task cancelled or failed")
+                        logger.debug(f"Job queue for job_id {job_id} marked for cleanup - Task done")
                     elif current_time - cleanup_time >= self.CLEANUP_GRACE_PERIOD:
                         # Enough time has passed, perform the actual cleanup
                         logger.debug(f"Cleaning up job_id {job_id} after grace period")
                         await self.cleanup_job(job_id)
 
-    def _create_default_event_manager(self, queue: asyncio.Queue) -> EventManager:
+    def _create_default_event_manager(self, queue: EventLog) -> EventManager:
         """Creates the default event manager with predefined events.
 
         Args:
-            queue (asyncio.Queue): The queue to be associated with the event manager.
+            queue (EventLog): The event log to be associated with the event manager.
 
         Returns:
             EventManager: The configured EventManager instance.
@@ -7,6 +7,7 @@ class ServiceType(str, Enum):
     AUTH_SERVICE = "auth_service"
     CACHE_SERVICE = "cache_service"
     SHARED_COMPONENT_CACHE_SERVICE = "shared_component_cache_service"
+    VERTEX_CACHE_SERVICE = "vertex_cache_service"
     SETTINGS_SERVICE = "settings_service"
     DATABASE_SERVICE = "database_service"
     CHAT_SERVICE = "chat_service"
@@ -19,3 +20,4 @@ class ServiceType(str, Enum):
     TRACING_SERVICE = "tracing_service"
     TELEMETRY_SERVICE = "telemetry_service"
     JOB_QUEUE_SERVICE = "job_queue_service"
+    USAGE_SERVICE = "usage_service"
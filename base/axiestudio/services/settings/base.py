@@ -126,6 +126,15 @@ class Settings(BaseSettings):
     - echo: Enable SQL query logging (development only)
     """
 
+    database_read_url: str | None = None
+    """Database URL of a read replica. If set, the sessions opened for reading only, such as the
+    loading of global variables, use it. The replica may lag behind the primary database."""
+    db_session_idle_timeout: float = 0.1
+    """Seconds a request or a run keeps its database connection after an operation, so the
+    operations that follow reuse it. 0 disables the reuse of sessions."""
+    db_long_held_connection_threshold: float = 10.0
+    """Seconds after which a connection held out of the pool is logged as long held."""
+
     use_noop_database: bool = False
     """If True, disables all database operations and uses a no-op session.
     Controlled by AXIESTUDIO_USE_NOOP_DATABASE env variable."""
@@ -135,6 +144,37 @@ class Settings(BaseSettings):
     """The cache type can be 'async' or 'redis'."""
     cache_expire: int = 3600
     """The cache expire in seconds."""
+    memoize_deterministic_components: bool = True
+    """If set to True, results of components declared as deterministic are reused across runs
+    when their code, parameters and upstream results are unchanged."""
+    incremental_playground_builds: bool = True
+    """If set to True, rebuilding a flow in the playground after an edit only re-runs the edited
+    components and their descendants, reusing the previous results of everything else."""
+    max_concurrent_vertex_builds: int = 16
+    """Maximum number of components of a run built at the same time, in the playground and API runs.
+    Set to 0 to build every runnable component at once."""
+    max_run_duration: float = 0
+    """Maximum time in seconds a flow run may take before it is cancelled. Set to 0 for no limit."""
+    max_run_tokens: int = 0
+    """Maximum number of LLM tokens a flow run may use before it is cancelled. Set to 0 for no limit."""
+    max_concurrent_runs_per_user: int = 0
+    """Maximum number of flow runs a user may have in progress at once, further runs are refused.
+    Runs are counted by each worker on its own, so with several workers a user may have this many
+    runs in progress on each of them. Set to 0 for no limit."""
+    run_capsules: Literal["off", "failed", "all"] = "off"
+    """Records runs to capsules in the config dir, to replay them offline with `axiestudio replay`.
+    'failed' keeps the capsules of the runs with a failed component, 'all' those of every run."""
+    run_capsules_max_count: int = 100
+    """The maximum number of run capsules kept per user, the oldest are deleted first."""
+    vertex_cache_max_size: int = 1024
+    """Maximum number of memoized component results kept in memory."""
+    state_type: Literal["memory", "shared"] = "memory"
+    """Where the state of a run is kept. 'memory' keeps it in the worker running the flow, 'shared'
+    keeps it in a SQLite database in the config dir so every worker on the host sees the same state."""
+    state_expire: int = 3600
+    """Seconds the state of a run is kept after it was last used if the run never finishes."""
+    vertex_cache_expire: int = 3600
+    """Time in seconds a memoized component result is kept."""
     variable_store: str = "db"
     """The store can be 'db' or 'kubernetes'."""
 
@@ -224,16 +264,33 @@ class Settings(BaseSettings):
     """The maximum file size for the upload in MB."""
     deactivate_tracing: bool = False
     """If set to True, tracing will be deactivated."""
+    local_tracing: bool = False
+    """If set to True, runs are traced to a SQLite file in the config directory, queried with the monitor API."""
+    local_tracing_sample_rate: float = 0.01
+    """The share of the runs traced locally that neither failed nor were slow."""
+    local_tracing_slow_run_threshold: float = 10.0
+    """Runs taking at least this many seconds are always traced locally."""
+    local_tracing_max_runs: int = 10000
+    """The maximum number of runs to keep in the local trace store."""
     max_transactions_to_keep: int = 3000
     """The maximum number of transactions to keep in the database."""
     max_vertex_builds_to_keep: int = 3000
     """The maximum number of vertex builds to keep in the database."""
     max_vertex_builds_per_vertex: int = 2
     """The maximum number of builds to keep per vertex. Older builds will be deleted."""
+    max_flow_versions_per_flow: int = 50
+    """The maximum number of versions to keep per flow. Older versions will be deleted. 0 keeps them all."""
     webhook_polling_interval: int = 5000
     """The polling interval for the webhook in ms."""
     fs_flows_polling_interval: int = 10000
     """The polling interval in milliseconds for synchronizing flows from the file system."""
+    fs_flows_watch_enabled: bool = True
+    """If set to True, flow files are watched for changes with watchfiles instead of polled.
+    Polling is used as a fallback when watchfiles is not installed or the watcher fails."""
+    fs_flows_watch_debounce: int = 200
+    """Time in milliseconds during which bursts of flow file changes are grouped before syncing."""
+    fs_flows_watch_refresh_interval: int = 60000
+    """Interval in milliseconds at which the watcher re-reads which flows are backed by files."""
     ssl_cert_file: str | None = None
     """Path to the SSL certificate file on the local system."""
     ssl_key_file: str | None = None
@@ -275,6 +332,14 @@ class Settings(BaseSettings):
     # Email Verification
     EMAIL_VERIFICATION_METHOD: Literal["code", "link"] = "code"
     """Email verification method: 'code' for 6-digit verification code, 'link' for verification link."""
+    email_verification_repair: bool = False
+    """If set to True, a request to the email verification endpoint also activates the user holding
+    the verification token if the endpoint left them verified but inactive."""
+
+    # Trials
+    enforce_trials: bool = False
+    """If set to True, API requests of users whose free trial expired without a subscription are
+    refused with a 402 status."""
 
     @field_validator("use_noop_database", mode="before")
     @classmethod
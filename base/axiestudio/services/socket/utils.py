@@ -101,6 +101,7 @@ async def build_vertex(
             params=params,
             data=result_dict,
             artifacts=artifacts,
+            flow_version=graph.flow_version,
         )
 
         # Emit the vertex build response
@@ -2,15 +2,17 @@ from typing_extensions import override
 
 from axiestudio.services.factory import ServiceFactory
 from axiestudio.services.settings.service import SettingsService
-from axiestudio.services.state.service import InMemoryStateService
+from axiestudio.services.state.service import InMemoryStateService, SharedStateService, StateService
 
 
 class StateServiceFactory(ServiceFactory):
     def __init__(self) -> None:
-        super().__init__(InMemoryStateService)
+        super().__init__(StateService)
 
     @override
     def create(self, settings_service: SettingsService):
+        if settings_service.settings.state_type == "shared":
+            return SharedStateService(settings_service)
         return InMemoryStateService(
             settings_service,
         )
@@ -1,11 +1,19 @@
+from __future__ import annotations
+
+import time
 from collections import defaultdict
-from collections.abc import Callable
 from threading import Lock
+from typing import TYPE_CHECKING, Any
 
+from diskcache import Cache
 from loguru import logger
 
 from axiestudio.services.base import Service
-from axiestudio.services.settings.service import SettingsService
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from axiestudio.services.settings.service import SettingsService
 
 
 class StateService(Service):
@@ -20,64 +28,170 @@ class StateService(Service):
     def get_state(self, key, run_id: str):
         raise NotImplementedError
 
-    def subscribe(self, key, observer: Callable) -> None:
+    def subscribe(self, key, observer: Callable, run_id: str) -> None:
         raise NotImplementedError
 
-    def unsubscribe(self, key, observer: Callable) -> None:
+    def unsubscribe(self, key, observer: Callable, run_id: str) -> None:
         raise NotImplementedError
 
-    def notify_observers(self, key, new_state) -> None:
+    def notify_observers(self, key, new_state, run_id: str) -> None:
         raise NotImplementedError
 
+    def end_run(self, run_id: str) -> None:
+        """Free the state and observers of a run once it finished or was cancelled."""
+        raise NotImplementedError
+
+
+class RunState:
+    """The state and observers of a single run, with a lock of its own."""
+
+    __slots__ = ("expires_at", "lock", "observers", "states")
+
+    def __init__(self, expires_at: float) -> None:
+        self.lock = Lock()
+        self.states: dict[str, Any] = {}
+        self.observers: dict[str, list[Callable]] = defaultdict(list)
+        self.expires_at = expires_at
+
 
 class InMemoryStateService(StateService):
+    """Keeps the state of each run in memory until the run ends.
+
+    Every run has its own lock and observers, so runs never wait on each other. A run that
+    never ends, because its worker lost track of it, is dropped ``state_expire`` seconds after
+    it was last used.
+    """
+
     def __init__(self, settings_service: SettingsService):
         self.settings_service = settings_service
-        self.states: dict[str, dict] = {}
-        self.observers: dict[str, list[Callable]] = defaultdict(list)
+        self.expiration_time = settings_service.settings.state_expire
+        self.runs: dict[str, RunState] = {}
+        # Only guards adding and removing runs, never held while a run's state is used
         self.lock = Lock()
+        self._next_expiry_check = time.monotonic() + self.expiration_time
 
-    def append_state(self, key, new_state, run_id: str) -> None:
+    def _get_run(self, run_id: str) -> RunState:
+        now = time.monotonic()
         with self.lock:
-            if run_id not in self.states:
-                self.states[run_id] = {}
-            if key not in self.states[run_id]:
-                self.states[run_id][key] = []
-            elif not isinstance(self.states[run_id][key], list):
-                self.states[run_id][key] = [self.states[run_id][key]]
-            self.states[run_id][key].append(new_state)
-            self.notify_append_observers(key, new_state)
+            if now >= self._next_expiry_check:
+                self._remove_expired_runs(now)
+            run = self.runs.get(run_id)
+            if run is None:
+                run = self.runs[run_id] = RunState(now + self.expiration_time)
+            else:
+                run.expires_at = now + self.expiration_time
+            return run
+
+    def _remove_expired_runs(self, now: float) -> None:
+        expired = [run_id for run_id, run in self.runs.items() if run.expires_at <= now]
+        for run_id in expired:
+            del self.runs[run_id]
+        if expired:
+            logger.debug(f"Removed the state of {len(expired)} expired runs")
+        self._next_expiry_check = now + self.expiration_time
+
+    def _read(self, run: RunState, key, run_id: str):  # noqa: ARG002
+        return run.states.get(key, "")
+
+    def _write(self, run: RunState, key, new_state, run_id: str) -> None:  # noqa: ARG002
+        run.states[key] = new_state
+
+    def _append(self, run: RunState, key, new_state, run_id: str) -> None:  # noqa: ARG002
+        if key not in run.states:
+            run.states[key] = []
+        elif not isinstance(run.states[key], list):
+            run.states[key] = [run.states[key]]
+        run.states[key].append(new_state)
+
+    def append_state(self, key, new_state, run_id: str) -> None:
+        run = self._get_run(run_id)
+        with run.lock:
+            self._append(run, key, new_state, run_id)
+            observers = list(run.observers[key])
+        # Observers are called without the lock, so they can read the state themselves
+        self._notify(observers, key, new_state, append=True)
 
     def update_state(self, key, new_state, run_id: str) -> None:
-        with self.lock:
-            if run_id not in self.states:
-                self.states[run_id] = {}
-            self.states[run_id][key] = new_state
-            self.notify_observers(key, new_state)
+        run = self._get_run(run_id)
+        with run.lock:
+            self._write(run, key, new_state, run_id)
+            observers = list(run.observers[key])
+        self._notify(observers, key, new_state, append=False)
 
     def get_state(self, key, run_id: str):
+        run = self._get_run(run_id)
+        with run.lock:
+            return self._read(run, key, run_id)
+
+    def subscribe(self, key, observer: Callable, run_id: str) -> None:
+        run = self._get_run(run_id)
+        with run.lock:
+            if observer not in run.observers[key]:
+                run.observers[key].append(observer)
+
+    def unsubscribe(self, key, observer: Callable, run_id: str) -> None:
+        run = self._get_run(run_id)
+        with run.lock:
+            if observer in run.observers[key]:
+                run.observers[key].remove(observer)
+
+    def notify_observers(self, key, new_state, run_id: str) -> None:
+        run = self._get_run(run_id)
+        with run.lock:
+            observers = list(run.observers[key])
+        self._notify(observers, key, new_state, append=False)
+
+    def _notify(self, observers: list[Callable], key, new_state, *, append: bool) -> None:
+        for callback in observers:
+            try:
+                callback(key, new_state, append=append)
+            except Exception:  # noqa: BLE001
+                logger.exception(f"Error in observer {callback} for key {key}")
+
+    def end_run(self, run_id: str) -> None:
         with self.lock:
-            return self.states.get(run_id, {}).get(key, "")
+            self.runs.pop(run_id, None)
 
-    def subscribe(self, key, observer: Callable) -> None:
+    async def teardown(self) -> None:
         with self.lock:
-            if observer not in self.observers[key]:
-                self.observers[key].append(observer)
+            self.runs.clear()
 
-    def notify_observers(self, key, new_state) -> None:
-        for callback in self.observers[key]:
-            callback(key, new_state, append=False)
 
-    def notify_append_observers(self, key, new_state) -> None:
-        for callback in self.observers[key]:
-            try:
-                callback(key, new_state, append=True)
-            except Exception:  # noqa: BLE001
-                logger.exception(f"Error in observer {callback} for key {key}")
-                logger.warning("Callbacks not implemented yet")
+class SharedStateService(InMemoryStateService):
+    """Keeps the state of each run in a SQLite database shared by the workers of a host.
 
-    def unsubscribe(self, key, observer: Callable) -> None:
-        with self.lock:
-            if observer in self.observers[key]:
-                # Use list.remove() since observers[key] is a list
-                self.observers[key].remove(observer)
+    Observers are callbacks of the worker running the flow, so they stay in memory; only the
+    state itself is shared.
+    """
+
+    def __init__(self, settings_service: SettingsService):
+        super().__init__(settings_service)
+        self.cache = Cache(directory=f"{settings_service.settings.config_dir}/state", tag_index=True)
+
+    def _read(self, run: RunState, key, run_id: str):  # noqa: ARG002
+        return self.cache.get((run_id, key), default="")
+
+    def _write(self, run: RunState, key, new_state, run_id: str) -> None:  # noqa: ARG002
+        self.cache.set((run_id, key), new_state, expire=self.expiration_time, tag=run_id)
+
+    def _append(self, run: RunState, key, new_state, run_id: str) -> None:  # noqa: ARG002
+        # The run lock only covers this worker, the transaction covers the others
+        with self.cache.transact():
+            states = self.cache.get((run_id, key), default=[])
+            if not isinstance(states, list):
+                states = [states]
+            states.append(new_state)
+            self.cache.set((run_id, key), states, expire=self.expiration_time, tag=run_id)
+
+    def _remove_expired_runs(self, now: float) -> None:
+        super()._remove_expired_runs(now)
+        self.cache.expire()
+
+    def end_run(self, run_id: str) -> None:
+        super().end_run(run_id)
+        self.cache.evict(run_id)
+
+    async def teardown(self) -> None:
+        await super().teardown()
+        self.cache.expire()
+        self.cache.close()
@@ -1,7 +1,12 @@
+from collections.abc import AsyncIterable, AsyncIterator
+from uuid import uuid4
+
 import anyio
 from aiofile import async_open
 from loguru import logger
 
+from axiestudio.services.usage.accounting import record_bytes_read
+
 from .service import StorageService
 
 
@@ -42,6 +47,33 @@ class LocalStorageService(StorageService):
             logger.exception(f"Error saving file {file_name} in flow {flow_id}")
             raise
 
+    async def save_file_stream(self, flow_id: str, file_name: str, chunks: AsyncIterable[bytes]) -> None:
+        """Save a file in the local storage, writing each chunk as it arrives.
+
+        The chunks are written to a temporary file that replaces the target only once
+        the stream is complete, so a failed upload never leaves a truncated file behind.
+
+        Args:
+            flow_id: The identifier for the flow.
+            file_name: The name of the file to be saved.
+            chunks: The byte content of the file, in order.
+        """
+        folder_path = self.data_dir / flow_id
+        await folder_path.mkdir(parents=True, exist_ok=True)
+        file_path = folder_path / file_name
+        part_path = folder_path / f".{file_name}.{uuid4().hex}.part"
+
+        try:
+            async with async_open(str(part_path), "wb") as f:
+                async for chunk in chunks:
+                    await f.write(chunk)
+            await part_path.replace(file_path)
+            logger.info(f"File {file_name} saved successfully in flow {flow_id}.")
+        except BaseException:
+            logger.exception(f"Error saving file {file_name} in flow {flow_id}")
+            await part_path.unlink(missing_ok=True)
+            raise
+
     async def get_file(self, flow_id: str, file_name: str) -> bytes:
         """Retrieve a file from the local storage.
 
@@ -63,10 +95,29 @@ class LocalStorageService(StorageService):
 
         async with async_open(str(file_path), "rb") as f:
             content = await f.read()
+        record_bytes_read(len(content))
 
         logger.debug(f"File {file_name} retrieved successfully from flow {flow_id}.")
         return content
 
+    async def get_file_stream(
+        self, flow_id: str, file_name: str, chunk_size: int = 1024 * 1024
+    ) -> AsyncIterator[bytes]:
+        """Read a file from the local storage a chunk at a time.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+        """
+        file_path = self.data_dir / flow_id / file_name
+        if not await file_path.exists():
+            msg = f"File {file_name} not found in flow {flow_id}"
+            raise FileNotFoundError(msg)
+
+        async with async_open(str(file_path), "rb") as f:
+            while chunk := await f.read(chunk_size):
+                record_bytes_read(len(chunk))
+                yield chunk
+
     async def list_files(self, flow_id: str):
         """List all files in a specified flow.
 
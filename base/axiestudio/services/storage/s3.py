@@ -1,9 +1,17 @@
+import asyncio
+from collections.abc import AsyncIterable, AsyncIterator
+
 import boto3
 from botocore.exceptions import ClientError, NoCredentialsError
 from loguru import logger
 
+from axiestudio.services.usage.accounting import record_bytes_read
+
 from .service import StorageService
 
+# S3 rejects multipart upload parts smaller than 5 MiB, except for the last one
+MULTIPART_PART_SIZE = 8 * 1024 * 1024
+
 
 class S3StorageService(StorageService):
     """A service class for handling operations with AWS S3 storage."""
@@ -36,6 +44,69 @@ class S3StorageService(StorageService):
             logger.exception(f"Error saving file {file_name} in folder {folder}")
             raise
 
+    async def save_file_stream(self, folder: str, file_name: str, chunks: AsyncIterable[bytes]) -> None:
+        """Save a file to the S3 bucket with a multipart upload, one part at a time.
+
+        Files smaller than a single part are sent with a plain ``put_object``. At most one
+        part is held in memory, and a failed upload is aborted so no parts are left behind.
+
+        Args:
+            folder: The folder in the bucket to save the file.
+            file_name: The name of the file to be saved.
+            chunks: The byte content of the file, in order.
+
+        Raises:
+            Exception: If an error occurs during file saving.
+        """
+        key = f"{folder}/{file_name}"
+        buffer = bytearray()
+        upload_id = None
+        parts: list[dict] = []
+        try:
+            async for chunk in chunks:
+                buffer.extend(chunk)
+                if len(buffer) < MULTIPART_PART_SIZE:
+                    continue
+                if upload_id is None:
+                    response = await asyncio.to_thread(
+                        self.s3_client.create_multipart_upload, Bucket=self.bucket, Key=key
+                    )
+                    upload_id = response["UploadId"]
+                parts.append(await self._upload_part(key, upload_id, len(parts) + 1, bytes(buffer)))
+                buffer.clear()
+
+            if upload_id is None:
+                await asyncio.to_thread(self.s3_client.put_object, Bucket=self.bucket, Key=key, Body=bytes(buffer))
+            else:
+                if buffer:
+                    parts.append(await self._upload_part(key, upload_id, len(parts) + 1, bytes(buffer)))
+                await asyncio.to_thread(
+                    self.s3_client.complete_multipart_upload,
+                    Bucket=self.bucket,
+                    Key=key,
+                    UploadId=upload_id,
+                    MultipartUpload={"Parts": parts},
+                )
+            logger.info(f"File {file_name} saved successfully in folder {folder}.")
+        except BaseException:
+            logger.exception(f"Error saving file {file_name} in folder {folder}")
+            if upload_id is not None:
+                await asyncio.to_thread(
+                    self.s3_client.abort_multipart_upload, Bucket=self.bucket, Key=key, UploadId=upload_id
+                )
+            raise
+
+    async def _upload_part(self, key: str, upload_id: str, part_number: int, body: bytes) -> dict:
+        response = await asyncio.to_thread(
+            self.s3_client.upload_part,
+            Bucket=self.bucket,
+            Key=key,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            Body=body,
+        )
+        return {"ETag": response["ETag"], "PartNumber": part_number}
+
     async def get_file(self, folder: str, file_name: str):
         """Retrieve a file from the S3 bucket.
 
@@ -51,11 +122,34 @@ class S3StorageService(StorageService):
         """
         try:
             response = self.s3_client.get_object(Bucket=self.bucket, Key=f"{folder}/{file_name}")
+            content = response["Body"].read()
             logger.info(f"File {file_name} retrieved successfully from folder {folder}.")
-            return response["Body"].read()
         except ClientError:
             logger.exception(f"Error retrieving file {file_name} from folder {folder}")
             raise
+        record_bytes_read(len(content))
+        return content
+
+    async def get_file_stream(self, folder: str, file_name: str, chunk_size: int = 1024 * 1024) -> AsyncIterator[bytes]:
+        """Read a file from the S3 bucket a chunk at a time.
+
+        Raises:
+            Exception: If an error occurs during file retrieval.
+        """
+        try:
+            response = await asyncio.to_thread(
+                self.s3_client.get_object, Bucket=self.bucket, Key=f"{folder}/{file_name}"
+            )
+        except ClientError:
+            logger.exception(f"Error retrieving file {file_name} from folder {folder}")
+            raise
+        body = response["Body"]
+        try:
+            while chunk := await asyncio.to_thread(body.read, chunk_size):
+                record_bytes_read(len(chunk))
+                yield chunk
+        finally:
+            body.close()
 
     async def list_files(self, folder: str):
         """List all files in a specified folder of the S3 bucket.
@@ -8,6 +8,8 @@ import anyio
 from axiestudio.services.base import Service
 
 if TYPE_CHECKING:
+    from collections.abc import AsyncIterable, AsyncIterator
+
     from axiestudio.services.session.service import SessionService
     from axiestudio.services.settings.service import SettingsService
 
@@ -31,10 +33,28 @@ class StorageService(Service):
     async def save_file(self, flow_id: str, file_name: str, data) -> None:
         raise NotImplementedError
 
+    async def save_file_stream(self, flow_id: str, file_name: str, chunks: AsyncIterable[bytes]) -> None:
+        """Save a file from an async iterable of byte chunks.
+
+        Backends override this to write the chunks as they arrive; this fallback buffers them.
+        """
+        await self.save_file(flow_id=flow_id, file_name=file_name, data=b"".join([chunk async for chunk in chunks]))
+
     @abstractmethod
     async def get_file(self, flow_id: str, file_name: str) -> bytes:
         raise NotImplementedError
 
+    async def get_file_stream(
+        self, flow_id: str, file_name: str, chunk_size: int = 1024 * 1024
+    ) -> AsyncIterator[bytes]:
+        """Read a file as an async iterator of byte chunks.
+
+        Backends override this to read the file a chunk at a time; this fallback reads it whole.
+        """
+        content = await self.get_file(flow_id=flow_id, file_name=file_name)
+        for start in range(0, len(content), chunk_size):
+            yield content[start : start + chunk_size]
+
     @abstractmethod
     async def list_files(self, flow_id: str) -> list[str]:
         raise NotImplementedError
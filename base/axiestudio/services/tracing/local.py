@@ -0,0 +1,530 @@
+"""A first-party span recorder that keeps traces of runs in a local SQLite store.
+
+Unlike the external tracers, recording a span only stores a few values in memory. Whether a run
+is kept is decided when it ends, so failed and slow runs are always kept while the others are
+sampled, and the kept runs are serialized and written in batches by a background thread.
+"""
+
+from __future__ import annotations
+
+import queue
+import random
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+import orjson
+from langchain_core.callbacks import BaseCallbackHandler
+from loguru import logger
+
+from axiestudio.serialization.serialization import serialize
+
+if TYPE_CHECKING:
+    from pathlib import Path
+    from uuid import UUID
+
+    from langchain_core.outputs import LLMResult
+
+# Spans recorded per run, past which the spans of a run are dropped
+MAX_SPANS_PER_RUN = 5_000
+# Truncation of the inputs and outputs stored with a span
+MAX_STORED_TEXT_LENGTH = 2_000
+MAX_STORED_ITEMS = 100
+
+FLUSH_BATCH_SIZE = 50
+FLUSH_INTERVAL = 1.0
+# Runs written between two deletions of the runs past the retention limit
+PRUNE_INTERVAL = 100
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS trace_run ("
+    "run_id TEXT PRIMARY KEY, run_name TEXT, user_id TEXT, session_id TEXT, start_time REAL NOT NULL, "
+    "latency_ms REAL, status TEXT NOT NULL, error TEXT, sampled_by TEXT NOT NULL, "
+    "prompt_tokens INTEGER, completion_tokens INTEGER, total_tokens INTEGER)",
+    "CREATE INDEX IF NOT EXISTS ix_trace_run_start_time ON trace_run (start_time)",
+    "CREATE TABLE IF NOT EXISTS trace_span ("
+    "run_id TEXT NOT NULL, span_id TEXT NOT NULL, parent_id TEXT, name TEXT, type TEXT, start_time REAL NOT NULL, "
+    "latency_ms REAL, status TEXT NOT NULL, error TEXT, inputs TEXT, outputs TEXT, "
+    "prompt_tokens INTEGER, completion_tokens INTEGER, total_tokens INTEGER, PRIMARY KEY (run_id, span_id))",
+)
+_SPAN_COLUMNS = (
+    "span_id",
+    "parent_id",
+    "name",
+    "type",
+    "start_time",
+    "latency_ms",
+    "status",
+    "error",
+    "inputs",
+    "outputs",
+    "prompt_tokens",
+    "completion_tokens",
+    "total_tokens",
+)
+_RUN_COLUMNS = (
+    "run_id",
+    "run_name",
+    "user_id",
+    "session_id",
+    "start_time",
+    "latency_ms",
+    "status",
+    "error",
+    "sampled_by",
+    "prompt_tokens",
+    "completion_tokens",
+    "total_tokens",
+)
+
+
+@dataclass
+class SamplingPolicy:
+    """Decides which runs are kept, once they ended."""
+
+    sample_rate: float = 0.01
+    """The share of the runs that are neither failed nor slow to keep, decided when a run starts."""
+    slow_run_threshold: float = 10.0
+    """Runs taking at least this many seconds are kept."""
+    keep_errors: bool = True
+    """Whether failed runs are kept."""
+
+    def head_sample(self) -> bool:
+        return random.random() < self.sample_rate  # noqa: S311
+
+    def keep(self, *, head_sampled: bool, error: bool, duration: float) -> str | None:
+        """Return why a run is kept, or None if it is dropped."""
+        if error and self.keep_errors:
+            return "error"
+        if duration >= self.slow_run_threshold:
+            return "slow"
+        if head_sampled:
+            return "sample"
+        return None
+
+
+@dataclass
+class Span:
+    span_id: str
+    parent_id: str | None
+    name: str
+    type: str
+    start_time: float
+    inputs: Any = None
+    outputs: Any = None
+    latency_ms: float | None = None
+    status: str = "running"
+    error: str | None = None
+    prompt_tokens: int | None = None
+    completion_tokens: int | None = None
+    total_tokens: int | None = None
+    _start: float = field(default_factory=time.perf_counter, repr=False)
+
+    def end(self, outputs: Any = None, error: BaseException | str | None = None) -> None:
+        self.latency_ms = (time.perf_counter() - self._start) * 1000
+        self.outputs = outputs
+        if error is not None:
+            self.status = "error"
+            self.error = str(error) or type(error).__name__
+        else:
+            self.status = "ok"
+
+
+@dataclass
+class RunRecord:
+    """A run that ended and was kept, waiting to be written."""
+
+    run: Span
+    user_id: str | None
+    session_id: str | None
+    sampled_by: str
+    spans: list[Span]
+
+
+class SpanRecorder:
+    """Records the spans of one run: the builds of its vertices and the LangChain runs inside them.
+
+    Spans are recorded from the event loop and from the threads components run LangChain in.
+    """
+
+    def __init__(
+        self,
+        store: LocalTraceStore,
+        policy: SamplingPolicy,
+        *,
+        run_id: UUID,
+        run_name: str | None,
+        user_id: str | None,
+        session_id: str | None,
+    ) -> None:
+        self.store = store
+        self.policy = policy
+        self.user_id = user_id
+        self.session_id = session_id
+        self.head_sampled = policy.head_sample()
+        self.run = Span(span_id=str(run_id), parent_id=None, name=run_name or "", type="run", start_time=time.time())
+        self._spans: list[Span] = []
+        # The open span of each key; a vertex can be built more than once in a run
+        self._open: dict[str, Span] = {}
+        self._span_ids: set[str] = set()
+        self._lock = threading.Lock()
+        self._dropped = 0
+        self._ended = False
+
+    def start_span(
+        self, key: str, name: str, span_type: str, *, parent_key: str | None = None, inputs: Any = None
+    ) -> None:
+        with self._lock:
+            if self._ended or len(self._spans) >= MAX_SPANS_PER_RUN:
+                self._dropped += 1
+                return
+            parent = self._open.get(parent_key) if parent_key is not None else None
+            span_id = key if key not in self._span_ids else f"{key}-{len(self._spans)}"
+            self._span_ids.add(span_id)
+            span = Span(
+                span_id=span_id,
+                parent_id=parent.span_id if parent is not None else None,
+                name=name,
+                type=span_type,
+                start_time=time.time(),
+                inputs=inputs,
+            )
+            self._spans.append(span)
+            self._open[key] = span
+
+    def is_open(self, key: str) -> bool:
+        return key in self._open
+
+    def end_span(
+        self,
+        key: str,
+        *,
+        outputs: Any = None,
+        error: BaseException | str | None = None,
+        token_usage: dict[str, int] | None = None,
+    ) -> None:
+        with self._lock:
+            span = self._open.pop(key, None)
+        if span is None:
+            return
+        span.end(outputs, error)
+        if token_usage:
+            span.prompt_tokens = token_usage.get("prompt_tokens")
+            span.completion_tokens = token_usage.get("completion_tokens")
+            span.total_tokens = token_usage.get("total_tokens")
+
+    def end(self, outputs: Any = None, error: BaseException | None = None) -> bool:
+        """End the run and hand it to the store if the sampling policy keeps it."""
+        with self._lock:
+            if self._ended:
+                return False
+            self._ended = True
+            spans = self._spans
+        self.run.end(outputs, error)
+        sampled_by = self.policy.keep(
+            head_sampled=self.head_sampled, error=error is not None, duration=self.run.latency_ms / 1000
+        )
+        if sampled_by is None:
+            return False
+        if self._dropped:
+            logger.debug(f"Dropped {self._dropped} spans of run {self.run.span_id}")
+        for span in spans:
+            if span.status == "running":
+                span.status = "cancelled" if error is None else "error"
+        self.store.add(RunRecord(self.run, self.user_id, self.session_id, sampled_by, spans))
+        return True
+
+    def get_langchain_callback(self, parent_key: str | None = None) -> SpanRecorderCallbackHandler:
+        return SpanRecorderCallbackHandler(self, parent_key)
+
+
+def get_token_usage(response: LLMResult) -> dict[str, int] | None:
+    llm_output = response.llm_output or {}
+    usage = llm_output.get("token_usage") or llm_output.get("usage")
+    if isinstance(usage, dict) and usage:
+        return {
+            "prompt_tokens": usage.get("prompt_tokens", usage.get("input_tokens")),
+            "completion_tokens": usage.get("completion_tokens", usage.get("output_tokens")),
+            "total_tokens": usage.get("total_tokens"),
+        }
+    totals = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    found = False
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if metadata:
+                found = True
+                totals["prompt_tokens"] += metadata.get("input_tokens", 0)
+                totals["completion_tokens"] += metadata.get("output_tokens", 0)
+                totals["total_tokens"] += metadata.get("total_tokens", 0)
+    return totals if found else None
+
+
+def _run_name(serialized: dict[str, Any] | None, kwargs: dict[str, Any], default: str) -> str:
+    if kwargs.get("name"):
+        return kwargs["name"]
+    if serialized:
+        if serialized.get("name"):
+            return serialized["name"]
+        if serialized.get("id"):
+            return serialized["id"][-1]
+    return default
+
+
+class SpanRecorderCallbackHandler(BaseCallbackHandler):
+    """Records the LangChain runs of a component as spans under the component's span."""
+
+    def __init__(self, recorder: SpanRecorder, parent_key: str | None = None) -> None:
+        self.recorder = recorder
+        self.parent_key = parent_key
+
+    def _start(self, run_type: str, run_id: UUID, parent_run_id: UUID | None, name: str, inputs: Any) -> None:
+        parent_key = str(parent_run_id) if parent_run_id is not None else None
+        # Runs started outside of the recorded ones are shown under the component
+        if parent_key is None or not self.recorder.is_open(parent_key):
+            parent_key = self.parent_key
+        self.recorder.start_span(str(run_id), name, run_type, parent_key=parent_key, inputs=inputs)
+
+    def _end(self, run_id: UUID, outputs: Any = None, error: BaseException | None = None, **kwargs) -> None:
+        self.recorder.end_span(str(run_id), outputs=outputs, error=error, **kwargs)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs) -> None:
+        self._start("chain", run_id, parent_run_id, _run_name(serialized, kwargs, "chain"), inputs)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs) -> None:  # noqa: ARG002
+        self._end(run_id, outputs)
+
+    def on_chain_error(self, error, *, run_id, **kwargs) -> None:  # noqa: ARG002
+        self._end(run_id, error=error)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, **kwargs) -> None:
+        self._start("llm", run_id, parent_run_id, _run_name(serialized, kwargs, "llm"), prompts)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs) -> None:
+        self._start("llm", run_id, parent_run_id, _run_name(serialized, kwargs, "chat_model"), messages)
+
+    def on_llm_end(self, response, *, run_id, **kwargs) -> None:  # noqa: ARG002
+        self._end(run_id, response.generations, token_usage=get_token_usage(response))
+
+    def on_llm_error(self, error, *, run_id, **kwargs) -> None:  # noqa: ARG002
+        self._end(run_id, error=error)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs) -> None:
+        self._start("tool", run_id, parent_run_id, _run_name(serialized, kwargs, "tool"), input_str)
+
+    def on_tool_end(self, output, *, run_id, **kwargs) -> None:  # noqa: ARG002
+        self._end(run_id, output)
+
+    def on_tool_error(self, error, *, run_id, **kwargs) -> None:  # noqa: ARG002
+        self._end(run_id, error=error)
+
+    def on_retriever_start(self, serialized, query, *, run_id, parent_run_id=None, **kwargs) -> None:
+        self._start("retriever", run_id, parent_run_id, _run_name(serialized, kwargs, "retriever"), query)
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs) -> None:  # noqa: ARG002
+        self._end(run_id, documents)
+
+    def on_retriever_error(self, error, *, run_id, **kwargs) -> None:  # noqa: ARG002
+        self._end(run_id, error=error)
+
+
+def _dump(value: Any) -> str | None:
+    if value is None:
+        return None
+    try:
+        value = serialize(value, max_length=MAX_STORED_TEXT_LENGTH, max_items=MAX_STORED_ITEMS, to_str=True)
+        return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+    except Exception:  # noqa: BLE001
+        return orjson.dumps(str(value)[:MAX_STORED_TEXT_LENGTH]).decode()
+
+
+class LocalTraceStore:
+    """Kept runs and their spans, in a SQLite file written by a background thread."""
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        max_runs: int = 10_000,
+        batch_size: int = FLUSH_BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+    ) -> None:
+        self.path = path
+        self.max_runs = max_runs
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue[RunRecord | None] = queue.Queue()
+        self._writer: threading.Thread | None = None
+        self._writer_lock = threading.Lock()
+        self._written_since_prune = 0
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        if not self._initialized:
+            connection.execute("PRAGMA journal_mode=WAL")
+            for statement in _SCHEMA:
+                connection.execute(statement)
+            connection.commit()
+            self._initialized = True
+        return connection
+
+    def add(self, record: RunRecord) -> None:
+        """Queue a run to be written. Never blocks on the database."""
+        self._queue.put(record)
+        if self._writer is None:
+            with self._writer_lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name="local-trace-writer", daemon=True)
+                    self._writer.start()
+
+    def flush(self) -> None:
+        """Wait until the queued runs are written."""
+        if self._writer is not None:
+            self._queue.join()
+
+    def close(self) -> None:
+        """Write the queued runs and stop the writer."""
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+
+    def _write_loop(self) -> None:
+        with closing(self._connect()) as connection:
+            while True:
+                record = self._queue.get()
+                batch = [record] if record is not None else []
+                stop = record is None
+                # Runs that end close together are written in one transaction
+                deadline = time.monotonic() + self.flush_interval
+                while not stop and len(batch) < self.batch_size:
+                    try:
+                        record = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                    except queue.Empty:
+                        break
+                    if record is None:
+                        stop = True
+                    else:
+                        batch.append(record)
+                try:
+                    if batch:
+                        self._write(connection, batch)
+                except Exception:  # noqa: BLE001
+                    logger.exception("Error writing local traces")
+                finally:
+                    for _ in range(len(batch) + stop):
+                        self._queue.task_done()
+                if stop:
+                    return
+
+    def _write(self, connection: sqlite3.Connection, batch: list[RunRecord]) -> None:
+        run_rows = []
+        span_rows = []
+        for record in batch:
+            run = record.run
+            tokens = [span for span in record.spans if span.total_tokens is not None]
+            run_rows.append(
+                (
+                    run.span_id,
+                    run.name,
+                    record.user_id,
+                    record.session_id,
+                    run.start_time,
+                    run.latency_ms,
+                    run.status,
+                    run.error,
+                    record.sampled_by,
+                    sum(span.prompt_tokens or 0 for span in tokens) if tokens else None,
+                    sum(span.completion_tokens or 0 for span in tokens) if tokens else None,
+                    sum(span.total_tokens or 0 for span in tokens) if tokens else None,
+                )
+            )
+            span_rows.extend(
+                (
+                    run.span_id,
+                    span.span_id,
+                    span.parent_id,
+                    span.name,
+                    span.type,
+                    span.start_time,
+                    span.latency_ms,
+                    span.status,
+                    span.error,
+                    _dump(span.inputs),
+                    _dump(span.outputs),
+                    span.prompt_tokens,
+                    span.completion_tokens,
+                    span.total_tokens,
+                )
+                for span in record.spans
+            )
+        with connection:
+            connection.executemany(
+                f"INSERT OR REPLACE INTO trace_run ({', '.join(_RUN_COLUMNS)}) "  # noqa: S608
+                f"VALUES ({', '.join('?' * len(_RUN_COLUMNS))})",
+                run_rows,
+            )
+            connection.executemany(
+                f"INSERT OR REPLACE INTO trace_span (run_id, {', '.join(_SPAN_COLUMNS)}) "  # noqa: S608
+                f"VALUES (?, {', '.join('?' * len(_SPAN_COLUMNS))})",
+                span_rows,
+            )
+            self._written_since_prune += len(batch)
+            if self._written_since_prune >= PRUNE_INTERVAL:
+                self._written_since_prune = 0
+                connection.execute(
+                    "DELETE FROM trace_run WHERE run_id NOT IN "
+                    "(SELECT run_id FROM trace_run ORDER BY start_time DESC LIMIT ?)",
+                    (self.max_runs,),
+                )
+                connection.execute("DELETE FROM trace_span WHERE run_id NOT IN (SELECT run_id FROM trace_run)")
+
+    def list_runs(self, *, user_id: str | None = None, session_id: str | None = None, limit: int = 50) -> list[dict]:
+        """Return the most recent kept runs, without their spans."""
+        if not self.path.exists():
+            return []
+        conditions = []
+        params: list[Any] = []
+        if user_id is not None:
+            conditions.append("user_id = ?")
+            params.append(user_id)
+        if session_id is not None:
+            conditions.append("session_id = ?")
+            params.append(session_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                f"SELECT * FROM trace_run {where} ORDER BY start_time DESC LIMIT ?",  # noqa: S608
+                (*params, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_run(self, run_id: str, *, user_id: str | None = None) -> dict | None:
+        """Return a kept run with its spans as a tree, or None if the run was not kept."""
+        if not self.path.exists():
+            return None
+        with closing(self._connect()) as connection:
+            run = connection.execute("SELECT * FROM trace_run WHERE run_id = ?", (run_id,)).fetchone()
+            if run is None or (user_id is not None and run["user_id"] != user_id):
+                return None
+            rows = connection.execute(
+                "SELECT * FROM trace_span WHERE run_id = ? ORDER BY start_time", (run_id,)
+            ).fetchall()
+        spans: dict[str, dict] = {}
+        for row in rows:
+            span = dict(row)
+            del span["run_id"]
+            for key in ("inputs", "outputs"):
+                span[key] = orjson.loads(span[key]) if span[key] is not None else None
+            span["children"] = []
+            spans[span["span_id"]] = span
+        roots = []
+        for span in spans.values():
+            parent = spans.get(span["parent_id"]) if span["parent_id"] is not None else None
+            (parent["children"] if parent is not None else roots).append(span)
+        return {**dict(run), "spans": roots}
@@ -1,3 +1,5 @@
+from typing import Any
+
 from pydantic import BaseModel, field_serializer
 from pydantic_core import PydanticSerializationError
 
@@ -18,3 +20,39 @@ class Log(BaseModel):
             return str(value)  # Fallback to string representation
         except PydanticSerializationError:
             return str(value)  # Fallback to string for Pydantic errors
+
+
+class TraceSpanRead(BaseModel):
+    span_id: str
+    parent_id: str | None = None
+    name: str | None = None
+    type: str | None = None
+    start_time: float
+    """When the span started, in seconds since the epoch."""
+    latency_ms: float | None = None
+    status: str
+    error: str | None = None
+    inputs: Any = None
+    outputs: Any = None
+    prompt_tokens: int | None = None
+    completion_tokens: int | None = None
+    total_tokens: int | None = None
+    children: list["TraceSpanRead"] = []
+
+
+class TraceRunRead(BaseModel):
+    run_id: str
+    run_name: str | None = None
+    user_id: str | None = None
+    session_id: str | None = None
+    start_time: float
+    latency_ms: float | None = None
+    status: str
+    error: str | None = None
+    sampled_by: str
+    """Why the run was kept: it failed, it was slow, or it was sampled."""
+    prompt_tokens: int | None = None
+    completion_tokens: int | None = None
+    total_tokens: int | None = None
+    spans: list[TraceSpanRead] = []
+    """The builds of the vertices of the run, with the LangChain runs inside them as children."""
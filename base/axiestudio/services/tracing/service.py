@@ -5,11 +5,13 @@ import os
 from collections import defaultdict
 from contextlib import asynccontextmanager
 from contextvars import ContextVar
+from pathlib import Path
 from typing import TYPE_CHECKING, Any
 
 from loguru import logger
 
 from axiestudio.services.base import Service
+from axiestudio.services.tracing.local import LocalTraceStore, SamplingPolicy, SpanRecorder
 
 if TYPE_CHECKING:
     from uuid import UUID
@@ -72,6 +74,7 @@ class TraceContext:
         self.user_id: str | None = user_id
         self.session_id: str | None = session_id
         self.tracers: dict[str, BaseTracer] = {}
+        self.recorder: SpanRecorder | None = None
         self.all_inputs: dict[str, dict] = defaultdict(dict)
         self.all_outputs: dict[str, dict] = defaultdict(dict)
 
@@ -120,6 +123,21 @@ class TracingService(Service):
     def __init__(self, settings_service: SettingsService):
         self.settings_service = settings_service
         self.deactivated = self.settings_service.settings.deactivate_tracing
+        self.local_trace_store: LocalTraceStore | None = None
+        self.sampling_policy: SamplingPolicy | None = None
+        settings = self.settings_service.settings
+        if settings.local_tracing and not self.deactivated and settings.config_dir:
+            self.local_trace_store = LocalTraceStore(
+                Path(settings.config_dir) / "traces.db", max_runs=settings.local_tracing_max_runs
+            )
+            self.sampling_policy = SamplingPolicy(
+                sample_rate=settings.local_tracing_sample_rate,
+                slow_run_threshold=settings.local_tracing_slow_run_threshold,
+            )
+
+    async def teardown(self) -> None:
+        if self.local_trace_store is not None:
+            await asyncio.to_thread(self.local_trace_store.close)
 
     async def _trace_worker(self, trace_context: TraceContext) -> None:
         while trace_context.running or not trace_context.traces_queue.empty():
@@ -201,6 +219,18 @@ class TracingService(Service):
             session_id=trace_context.session_id,
         )
 
+    def _initialize_span_recorder(self, trace_context: TraceContext) -> None:
+        if self.local_trace_store is None or self.sampling_policy is None or trace_context.run_id is None:
+            return
+        trace_context.recorder = SpanRecorder(
+            self.local_trace_store,
+            self.sampling_policy,
+            run_id=trace_context.run_id,
+            run_name=trace_context.run_name,
+            user_id=trace_context.user_id,
+            session_id=trace_context.session_id,
+        )
+
     async def start_tracers(
         self,
         run_id: UUID,
@@ -227,6 +257,7 @@ class TracingService(Service):
             self._initialize_langfuse_tracer(trace_context)
             self._initialize_arize_phoenix_tracer(trace_context)
             self._initialize_opik_tracer(trace_context)
+            self._initialize_span_recorder(trace_context)
         except Exception as e:  # noqa: BLE001
             logger.debug(f"Error initializing tracers: {e}")
 
@@ -271,6 +302,8 @@ class TracingService(Service):
             raise RuntimeError(msg)
         await self._stop(trace_context)
         self._end_all_tracers(trace_context, outputs, error)
+        if trace_context.recorder is not None:
+            trace_context.recorder.end(outputs, error)
 
     @staticmethod
     def _cleanup_inputs(inputs: dict[str, Any]):
@@ -353,15 +386,23 @@ class TracingService(Service):
             msg = "called trace_component but no trace context found"
             raise RuntimeError(msg)
         trace_context.all_inputs[trace_name] |= inputs or {}
+        recorder = trace_context.recorder
+        # Recorded here rather than by the trace worker, so the span times are those of the build
+        if recorder is not None:
+            recorder.start_span(trace_id, trace_name, trace_type, inputs=self._cleanup_inputs(inputs or {}))
         await trace_context.traces_queue.put((self._start_component_traces, (component_trace_context, trace_context)))
         try:
             yield self
         except Exception as e:
+            if recorder is not None:
+                recorder.end_span(trace_id, outputs=trace_context.all_outputs[trace_name], error=e)
             await trace_context.traces_queue.put(
                 (self._end_component_traces, (component_trace_context, trace_context, e))
             )
             raise
         else:
+            if recorder is not None:
+                recorder.end_span(trace_id, outputs=trace_context.all_outputs[trace_name])
             await trace_context.traces_queue.put(
                 (self._end_component_traces, (component_trace_context, trace_context, None))
             )
@@ -428,4 +469,9 @@ class TracingService(Service):
             langchain_callback = tracer.get_langchain_callback()
             if langchain_callback:
                 callbacks.append(langchain_callback)
+        if trace_context.recorder is not None:
+            component_context = component_context_var.get()
+            callbacks.append(
+                trace_context.recorder.get_langchain_callback(component_context.trace_id if component_context else None)
+            )
         return callbacks
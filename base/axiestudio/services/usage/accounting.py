@@ -0,0 +1,225 @@
+"""Measurement of the resources used by flow runs and by the vertices they build.
+
+The run and the vertex being built are kept in context variables, so what is measured deep in a
+build, such as the tokens of an LLM call or the bytes read from storage, is added to both without
+being passed around.
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from axiestudio.services.tracing.local import get_token_usage
+
+if TYPE_CHECKING:
+    import asyncio
+    from collections.abc import Awaitable, Generator, Iterator
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None  # type: ignore[assignment]
+
+# The API key that authenticated the current request, runs started by it are accounted to it
+api_key_id_var: ContextVar[str | None] = ContextVar("api_key_id", default=None)
+run_usage_var: ContextVar[RunUsage | None] = ContextVar("run_usage", default=None)
+vertex_usage_var: ContextVar[VertexUsage | None] = ContextVar("vertex_usage", default=None)
+
+
+def peak_memory() -> int:
+    """Return the peak resident memory of the process in bytes, or 0 where it is not available."""
+    if resource is None:
+        return 0
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+@dataclass
+class VertexUsage:
+    """Resources used to build a vertex."""
+
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+    """CPU time spent on the event loop by the build. Work it hands to threads is only in wall_time."""
+    peak_memory_delta: int = 0
+    """Growth of the peak memory of the process during the build, in bytes."""
+    tokens: int = 0
+    bytes_read: int = 0
+
+    def meter(self, awaitable: Awaitable[Any]) -> _Metered:
+        """Wrap an awaitable so the CPU time of each of its steps is added to this usage."""
+        return _Metered(awaitable, self)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "wall_time": self.wall_time,
+            "cpu_time": self.cpu_time,
+            "peak_memory_delta": self.peak_memory_delta,
+            "tokens": self.tokens,
+            "bytes_read": self.bytes_read,
+        }
+
+
+class _Metered:
+    __slots__ = ("_awaitable", "_usage")
+
+    def __init__(self, awaitable: Awaitable[Any], usage: VertexUsage) -> None:
+        self._awaitable = awaitable
+        self._usage = usage
+
+    def __await__(self) -> Generator[Any, Any, Any]:
+        # Steps the awaitable by hand, timing the CPU of this thread between two suspensions,
+        # as other tasks run on the same thread while it waits
+        iterator = self._awaitable.__await__()
+        value: Any = None
+        error: BaseException | None = None
+        while True:
+            start = time.thread_time()
+            try:
+                yielded = iterator.send(value) if error is None else iterator.throw(error)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self._usage.cpu_time += time.thread_time() - start
+            try:
+                value, error = (yield yielded), None
+            except BaseException as exc:  # noqa: BLE001
+                value, error = None, exc
+
+
+@dataclass
+class RunUsage:
+    """Resources used by a flow run, in total and by vertex."""
+
+    run_id: str | None = None
+    user_id: str | None = None
+    flow_id: str | None = None
+    api_key_id: str | None = field(default_factory=api_key_id_var.get)
+    started_at: float = field(default_factory=time.time)
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+    peak_memory_delta: int = 0
+    tokens: int = 0
+    bytes_read: int = 0
+    vertices: dict[str, VertexUsage] = field(default_factory=dict)
+    exceeded: str | None = None
+    """The quota the run exceeded, if it was stopped."""
+    max_tokens: int = 0
+    _task: asyncio.Task | None = field(default=None, init=False, repr=False)
+    _loop: asyncio.AbstractEventLoop | None = field(default=None, init=False, repr=False)
+
+    def attach(self, task: asyncio.Task) -> None:
+        """Set the task running the run, the one cancelled if the run exceeds a quota."""
+        self._task = task
+        self._loop = task.get_loop()
+
+    def add_vertex(self, vertex_id: str, usage: VertexUsage) -> None:
+        # A vertex built more than once in a run, as in a loop, adds up
+        vertex_usage = self.vertices.setdefault(vertex_id, VertexUsage())
+        vertex_usage.wall_time += usage.wall_time
+        vertex_usage.cpu_time += usage.cpu_time
+        vertex_usage.peak_memory_delta = max(vertex_usage.peak_memory_delta, usage.peak_memory_delta)
+        vertex_usage.tokens += usage.tokens
+        vertex_usage.bytes_read += usage.bytes_read
+        # Tokens and bytes are added to the run as they are used, to enforce the quotas during the build
+        self.cpu_time += usage.cpu_time
+
+    def add_tokens(self, tokens: int) -> None:
+        self.tokens += tokens
+        if self.max_tokens and self.tokens > self.max_tokens:
+            self.stop("max_run_tokens")
+
+    def stop(self, quota: str) -> None:
+        """Cancel the run for exceeding a quota. Safe to call from any thread."""
+        if self.exceeded is not None or self._task is None or self._loop is None:
+            return
+        self.exceeded = quota
+        self._loop.call_soon_threadsafe(self._task.cancel)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "run_id": self.run_id,
+            "user_id": self.user_id,
+            "flow_id": self.flow_id,
+            "api_key_id": self.api_key_id,
+            "started_at": self.started_at,
+            "wall_time": self.wall_time,
+            "cpu_time": self.cpu_time,
+            "peak_memory_delta": self.peak_memory_delta,
+            "tokens": self.tokens,
+            "bytes_read": self.bytes_read,
+            "exceeded": self.exceeded,
+            "vertices": {vertex_id: usage.to_dict() for vertex_id, usage in self.vertices.items()},
+        }
+
+
+@contextmanager
+def account_vertex(vertex_id: str) -> Iterator[VertexUsage]:
+    """Measure the build of a vertex, adding its usage to the current run if there is one."""
+    usage = VertexUsage()
+    token = vertex_usage_var.set(usage)
+    start = time.perf_counter()
+    start_peak_memory = peak_memory()
+    try:
+        yield usage
+    finally:
+        vertex_usage_var.reset(token)
+        usage.wall_time += time.perf_counter() - start
+        usage.peak_memory_delta = max(0, peak_memory() - start_peak_memory)
+        if (run := run_usage_var.get()) is not None:
+            run.add_vertex(vertex_id, usage)
+
+
+def record_bytes_read(size: int) -> None:
+    """Add bytes read from storage to the vertex being built and to the current run."""
+    if (vertex_usage := vertex_usage_var.get()) is not None:
+        vertex_usage.bytes_read += size
+    if (run := run_usage_var.get()) is not None:
+        run.bytes_read += size
+
+
+def record_tokens(tokens: int, vertex_usage: VertexUsage | None = None, run: RunUsage | None = None) -> None:
+    """Add LLM tokens to a vertex and a run, the current ones by default."""
+    if vertex_usage is None:
+        vertex_usage = vertex_usage_var.get()
+    if run is None:
+        run = run_usage_var.get()
+    if vertex_usage is not None:
+        vertex_usage.tokens += tokens
+    if run is not None:
+        run.add_tokens(tokens)
+
+
+class UsageCallbackHandler(BaseCallbackHandler):
+    """Counts the tokens of the LLM calls of a component against its vertex and run."""
+
+    def __init__(self, vertex_usage: VertexUsage | None, run: RunUsage | None) -> None:
+        self.vertex_usage = vertex_usage
+        self.run = run
+
+    def on_llm_end(self, response, **kwargs) -> None:  # noqa: ARG002
+        token_usage = get_token_usage(response)
+        if not token_usage:
+            return
+        tokens = token_usage.get("total_tokens") or (
+            (token_usage.get("prompt_tokens") or 0) + (token_usage.get("completion_tokens") or 0)
+        )
+        if tokens:
+            record_tokens(tokens, self.vertex_usage, self.run)
+
+
+def get_usage_callback() -> UsageCallbackHandler | None:
+    """Return a callback counting LLM tokens against the vertex being built and its run, if any."""
+    vertex_usage = vertex_usage_var.get()
+    run = run_usage_var.get()
+    if vertex_usage is None and run is None:
+        return None
+    return UsageCallbackHandler(vertex_usage, run)
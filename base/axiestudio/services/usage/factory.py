@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from typing_extensions import override
+
+from axiestudio.services.factory import ServiceFactory
+from axiestudio.services.usage.service import UsageService
+
+if TYPE_CHECKING:
+    from axiestudio.services.settings.service import SettingsService
+
+
+class UsageServiceFactory(ServiceFactory):
+    def __init__(self) -> None:
+        super().__init__(UsageService)
+
+    @override
+    def create(self, settings_service: SettingsService):
+        return UsageService(settings_service)
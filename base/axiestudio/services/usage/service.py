@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import defaultdict, deque
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from cachetools import LRUCache
+from loguru import logger
+
+from axiestudio.services.base import Service
+from axiestudio.services.usage.accounting import RunUsage, peak_memory, run_usage_var
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable
+
+    from axiestudio.services.settings.service import SettingsService
+
+T = TypeVar("T")
+
+# Finished runs kept in memory, for the usage of recent runs
+MAX_RECENT_RUNS = 200
+# Users, flows and API keys whose totals are kept in memory, the least recently used are dropped
+MAX_TRACKED_TOTALS = 10_000
+
+
+class RunQuotaExceededError(ValueError):
+    """Raised when a run is refused or stopped for exceeding a quota."""
+
+    def __init__(self, quota: str, message: str) -> None:
+        self.quota = quota
+        super().__init__(message)
+
+
+@dataclass
+class UsageTotals:
+    """Resources used by a set of runs."""
+
+    runs: int = 0
+    stopped_runs: int = 0
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+    peak_memory_delta: int = 0
+    tokens: int = 0
+    bytes_read: int = 0
+
+    def add(self, run: RunUsage) -> None:
+        self.runs += 1
+        self.stopped_runs += run.exceeded is not None
+        self.wall_time += run.wall_time
+        self.cpu_time += run.cpu_time
+        self.peak_memory_delta = max(self.peak_memory_delta, run.peak_memory_delta)
+        self.tokens += run.tokens
+        self.bytes_read += run.bytes_read
+
+
+def _get_totals(totals_by_key: LRUCache, key: Any) -> UsageTotals:
+    totals = totals_by_key.get(key)
+    if totals is None:
+        totals = totals_by_key[key] = UsageTotals()
+    return totals
+
+
+class UsageService(Service):
+    """Accounts the resources used by flow runs and enforces the run quotas.
+
+    Usage is aggregated by user, and by flow and API key for each user. The quotas are read from
+    the settings on each run: max_run_duration, max_run_tokens and max_concurrent_runs_per_user,
+    where 0 means no limit.
+
+    Usage and the runs in progress are kept in the memory of each worker. Totals cover the runs
+    of this worker since it started, for the ``MAX_TRACKED_TOTALS`` most recently used users,
+    flows and API keys, and the concurrency quota applies to each worker on its own.
+    """
+
+    name = "usage_service"
+
+    def __init__(self, settings_service: SettingsService):
+        self.settings_service = settings_service
+        self.active_runs: dict[str, int] = defaultdict(int)
+        self.recent_runs: deque[RunUsage] = deque(maxlen=MAX_RECENT_RUNS)
+        self._user_totals: LRUCache[str, UsageTotals] = LRUCache(maxsize=MAX_TRACKED_TOTALS)
+        self._flow_totals: LRUCache[tuple[str, str], UsageTotals] = LRUCache(maxsize=MAX_TRACKED_TOTALS)
+        self._api_key_totals: LRUCache[tuple[str, str], UsageTotals] = LRUCache(maxsize=MAX_TRACKED_TOTALS)
+
+    async def track_run(self, run: RunUsage, awaitable: Awaitable[T]) -> T:
+        """Await a flow run, measuring the resources it uses and stopping it if it exceeds a quota.
+
+        The run is awaited in its own task, which is cancelled, along with the builds it started,
+        when the run takes too long or uses too many tokens. A run started from within another
+        run, as a subflow, is part of that run and is not measured on its own.
+
+        Raises:
+            RunQuotaExceededError: If the user already has too many runs running, or the run was
+                stopped for exceeding a quota.
+        """
+        if run_usage_var.get() is not None:
+            return await awaitable
+        settings = self.settings_service.settings
+        max_concurrent_runs = settings.max_concurrent_runs_per_user
+        if max_concurrent_runs and run.user_id and self.active_runs[run.user_id] >= max_concurrent_runs:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            quota = "max_concurrent_runs_per_user"
+            msg = f"Too many runs in progress: at most {max_concurrent_runs} runs can run at once"
+            raise RunQuotaExceededError(quota, msg)
+
+        run.max_tokens = settings.max_run_tokens
+        token = run_usage_var.set(run)
+        try:
+            # The task copies the context, so the builds of the run add their usage to it
+            task = asyncio.ensure_future(awaitable)
+        finally:
+            run_usage_var.reset(token)
+        run.attach(task)
+        if run.user_id:
+            self.active_runs[run.user_id] += 1
+        start = time.perf_counter()
+        start_peak_memory = peak_memory()
+        try:
+            return await asyncio.wait_for(task, timeout=settings.max_run_duration or None)
+        except asyncio.TimeoutError as exc:
+            # A timeout raised by the run itself is not a quota
+            if not task.cancelled():
+                raise
+            run.exceeded = "max_run_duration"
+            msg = f"The run was stopped after {settings.max_run_duration} seconds"
+            raise RunQuotaExceededError(run.exceeded, msg) from exc
+        except asyncio.CancelledError:
+            if run.exceeded is None:
+                raise
+            msg = f"The run was stopped after using more than {run.max_tokens} tokens"
+            raise RunQuotaExceededError(run.exceeded, msg) from None
+        finally:
+            run.wall_time = time.perf_counter() - start
+            run.peak_memory_delta = max(0, peak_memory() - start_peak_memory)
+            if run.user_id:
+                self.active_runs[run.user_id] -= 1
+                if not self.active_runs[run.user_id]:
+                    del self.active_runs[run.user_id]
+            self._add_run(run)
+
+    def _add_run(self, run: RunUsage) -> None:
+        self.recent_runs.append(run)
+        user_id = run.user_id or ""
+        _get_totals(self._user_totals, user_id).add(run)
+        if run.flow_id:
+            _get_totals(self._flow_totals, (user_id, run.flow_id)).add(run)
+        if run.api_key_id:
+            _get_totals(self._api_key_totals, (user_id, run.api_key_id)).add(run)
+        logger.debug(
+            f"Run {run.run_id} of flow {run.flow_id} took {run.wall_time:.3f}s, "
+            f"{run.cpu_time:.3f}s of CPU and {run.tokens} tokens"
+        )
+
+    def get_usage(self, user_id: str) -> dict[str, Any]:
+        """Return the usage of a user: totals, by flow and by API key, and their recent runs."""
+        return {
+            "user_id": user_id,
+            "active_runs": self.active_runs.get(user_id, 0),
+            "totals": asdict(self._user_totals.get(user_id, UsageTotals())),
+            "flows": {
+                flow_id: asdict(totals) for (owner, flow_id), totals in self._flow_totals.items() if owner == user_id
+            },
+            "api_keys": {
+                api_key_id: asdict(totals)
+                for (owner, api_key_id), totals in self._api_key_totals.items()
+                if owner == user_id
+            },
+            "recent_runs": [run.to_dict() for run in self.recent_runs if run.user_id == user_id],
+        }
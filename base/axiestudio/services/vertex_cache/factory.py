@@ -0,0 +1,21 @@
+from typing import TYPE_CHECKING
+
+from typing_extensions import override
+
+from axiestudio.services.factory import ServiceFactory
+from axiestudio.services.vertex_cache.service import VertexCacheService
+
+if TYPE_CHECKING:
+    from axiestudio.services.settings.service import SettingsService
+
+
+class VertexCacheServiceFactory(ServiceFactory):
+    def __init__(self) -> None:
+        super().__init__(VertexCacheService)
+
+    @override
+    def create(self, settings_service: "SettingsService"):
+        return VertexCacheService(
+            max_size=settings_service.settings.vertex_cache_max_size,
+            expiration_time=settings_service.settings.vertex_cache_expire,
+        )
@@ -0,0 +1,11 @@
+from axiestudio.services.cache.service import ThreadingInMemoryCache
+
+
+class VertexCacheService(ThreadingInMemoryCache):
+    """A bounded cache holding memoized results of deterministic components.
+
+    Entries are keyed by the content fingerprint of a vertex (component code, parameters
+    and upstream results), so identical work is shared across runs and flows.
+    """
+
+    name = "vertex_cache_service"
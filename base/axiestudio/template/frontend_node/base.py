@@ -46,6 +46,8 @@ class FrontendNode(BaseModel):
     """List of conditional paths for the frontend node."""
     frozen: bool = False
     """Whether the frontend node is frozen."""
+    deterministic: bool = False
+    """Whether the outputs depend only on the code, parameters and inputs, so they can be memoized."""
     outputs: list[Output] = []
     """List of output fields for the frontend node."""
 
@@ -1,10 +1,18 @@
+import asyncio
 import gzip
+import hashlib
 import json
+from dataclasses import dataclass
 from typing import Any
 
-from fastapi import Response
+from fastapi import Request, Response
 from fastapi.encoders import jsonable_encoder
 
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
 
 def compress_response(data: Any) -> Response:
     """Compress data and return it as a FastAPI Response with appropriate headers."""
@@ -17,3 +25,87 @@ def compress_response(data: Any) -> Response:
         media_type="application/json",
         headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding", "Content-Length": str(len(compressed_data))},
     )
+
+
+@dataclass(frozen=True)
+class EncodedJSON:
+    """A JSON document encoded once, with its compressed variants and the SHA-256 of its JSON."""
+
+    digest: str
+    identity: bytes
+    gzip: bytes
+    br: bytes | None = None
+
+    def etag(self, coding: str | None = None) -> str:
+        """Return the strong ETag of the document in a content coding.
+
+        Each coding is a different representation, so each one gets its own tag.
+        """
+        return f'"{self.digest}-{coding}"' if coding else f'"{self.digest}"'
+
+
+def _compress_json(json_data: bytes) -> EncodedJSON:
+    """Compress a JSON document with gzip and, when available, brotli.
+
+    This is meant for large documents served many times, so the slower, denser settings are used.
+    """
+    return EncodedJSON(
+        digest=hashlib.sha256(json_data).hexdigest(),
+        identity=json_data,
+        gzip=gzip.compress(json_data, compresslevel=9),
+        br=brotli.compress(json_data, quality=9) if brotli is not None else None,
+    )
+
+
+def _accepts(accept_encoding: str, coding: str) -> bool:
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        if name.strip().lower() in {coding, "*"}:
+            return params.replace(" ", "") not in {"q=0", "q=0.0", "q=0.00", "q=0.000"}
+    return False
+
+
+def encoded_json_response(request: Request, encoded: EncodedJSON) -> Response:
+    """Serve a pre-encoded JSON document, answering conditional requests with 304 Not Modified."""
+    accept_encoding = request.headers.get("Accept-Encoding", "")
+    if encoded.br is not None and _accepts(accept_encoding, "br"):
+        content, coding = encoded.br, "br"
+    elif _accepts(accept_encoding, "gzip"):
+        content, coding = encoded.gzip, "gzip"
+    else:
+        content, coding = encoded.identity, None
+
+    etag = encoded.etag(coding)
+    headers = {"ETag": etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("If-None-Match", "")
+    if etag in {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")} or if_none_match == "*":
+        return Response(status_code=304, headers=headers)
+
+    if coding is not None:
+        headers["Content-Encoding"] = coding
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+class VersionedJSONCache:
+    """Keeps the encodings of a JSON document for as long as its version does not change.
+
+    Concurrent requests for a new version wait for a single encoding instead of each doing it.
+    """
+
+    def __init__(self) -> None:
+        self._version: Any = None
+        self._encoded: EncodedJSON | None = None
+        self._lock = asyncio.Lock()
+
+    async def get(self, version: Any, data: Any) -> EncodedJSON:
+        """Return the encoded document, encoding ``data`` if ``version`` changed."""
+        if self._encoded is not None and self._version == version:
+            return self._encoded
+        async with self._lock:
+            if self._encoded is None or self._version != version:
+                # Serialize on the event loop so the data cannot change while it is read,
+                # then compress off the loop
+                json_data = json.dumps(jsonable_encoder(data)).encode("utf-8")
+                self._encoded = await asyncio.to_thread(_compress_json, json_data)
+                self._version = version
+            return self._encoded
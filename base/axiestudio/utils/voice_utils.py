@@ -1,11 +1,17 @@
 import asyncio
 import base64
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import cache
 from pathlib import Path
+from typing import Protocol
 
 import numpy as np
-from scipy.signal import resample
+from scipy.signal import resample, resample_poly
 
-from axiestudio.logging import logger
+from axiestudio.logging import logger, throttled
 
 SAMPLE_RATE_24K = 24000
 VAD_SAMPLE_RATE_16K = 16000
@@ -15,6 +21,11 @@ BYTES_PER_SAMPLE = 2
 BYTES_PER_24K_FRAME = int(SAMPLE_RATE_24K * FRAME_DURATION_MS / 1000) * BYTES_PER_SAMPLE
 BYTES_PER_16K_FRAME = int(VAD_SAMPLE_RATE_16K * FRAME_DURATION_MS / 1000) * BYTES_PER_SAMPLE
 
+# Audio chunks a voice session may have waiting for speech detection before the oldest are dropped
+VAD_MAX_QUEUED_CHUNKS = 50
+# Delay between receiving audio and detecting speech in it past which a warning is logged
+VAD_LAG_WARNING_SECONDS = 0.5
+
 
 def resample_24k_to_16k(frame_24k_bytes):
     """Resample a 20ms frame from 24kHz to 16kHz.
@@ -44,6 +55,103 @@ def resample_24k_to_16k(frame_24k_bytes):
     return frame_16k.tobytes()
 
 
+def resample_24k_to_16k_frames(audio_24k: bytes) -> bytes:
+    """Resample any number of whole 20ms frames from 24kHz to 16kHz in a single pass.
+
+    Args:
+        audio_24k: 24kHz audio, a multiple of 960 bytes long
+
+    Returns:
+        The 16kHz audio, 640 bytes for each input frame
+    """
+    if len(audio_24k) % BYTES_PER_24K_FRAME:
+        msg = f"Expected a multiple of {BYTES_PER_24K_FRAME} bytes of 24kHz audio, got {len(audio_24k)}"
+        raise ValueError(msg)
+    samples_16k = resample_poly(np.frombuffer(audio_24k, dtype=np.int16), up=2, down=3)
+    return np.clip(np.rint(samples_16k), -32768, 32767).astype(np.int16).tobytes()
+
+
+class Vad(Protocol):
+    def is_speech(self, buf: bytes, sample_rate: int) -> bool: ...
+
+
+@cache
+def get_dsp_executor() -> ThreadPoolExecutor:
+    """The threads shared by the voice sessions of this worker to process their audio."""
+    return ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1), thread_name_prefix="voice-dsp")
+
+
+@dataclass
+class AudioLagStats:
+    """How far behind the audio of a voice session the speech detection runs."""
+
+    batches: int = 0
+    chunks: int = 0
+    dropped_chunks: int = 0
+    max_lag: float = 0.0
+    total_lag: float = 0.0
+
+    @property
+    def mean_lag(self) -> float:
+        return self.total_lag / self.batches if self.batches else 0.0
+
+
+class SpeechDetector:
+    """Detects speech in the 24kHz audio of a voice session without blocking the event loop.
+
+    Chunks are queued as they arrive and processed in batches on a DSP worker thread: all the
+    audio queued since the previous batch is decoded, resampled and run through the VAD at once.
+    The queue is bounded and drops its oldest chunks when the worker falls behind, since barge-in
+    only cares about what the user is saying now.
+    """
+
+    def __init__(self, vad: Vad, max_queued_chunks: int = VAD_MAX_QUEUED_CHUNKS) -> None:
+        self.vad = vad
+        self.queue: asyncio.Queue[tuple[float, str]] = asyncio.Queue(maxsize=max_queued_chunks)
+        self.stats = AudioLagStats()
+        # The end of the last batch that does not make a whole frame, only used by the worker
+        self._partial_frame = b""
+
+    def feed(self, base64_audio: str) -> None:
+        """Queue a base64-encoded chunk of 24kHz audio."""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.stats.dropped_chunks += 1
+        self.queue.put_nowait((time.monotonic(), base64_audio))
+
+    async def detect(self) -> bool:
+        """Wait for audio and return whether the next batch of it contains speech."""
+        batch = [await self.queue.get()]
+        while not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+
+        loop = asyncio.get_running_loop()
+        has_speech = await loop.run_in_executor(get_dsp_executor(), self._process, [chunk for _, chunk in batch])
+
+        lag = time.monotonic() - batch[0][0]
+        self.stats.batches += 1
+        self.stats.chunks += len(batch)
+        self.stats.total_lag += lag
+        self.stats.max_lag = max(self.stats.max_lag, lag)
+        if lag > VAD_LAG_WARNING_SECONDS:
+            throttled("voice-dsp-lag", 10).warning(
+                "Speech detection is {:.2f}s behind the audio, {} chunks dropped so far", lag, self.stats.dropped_chunks
+            )
+        return has_speech
+
+    def _process(self, chunks: list[str]) -> bool:
+        audio = self._partial_frame + b"".join(base64.b64decode(chunk) for chunk in chunks)
+        whole_frames = len(audio) - len(audio) % BYTES_PER_24K_FRAME
+        self._partial_frame = audio[whole_frames:]
+        if not whole_frames:
+            return False
+        audio_16k = resample_24k_to_16k_frames(audio[:whole_frames])
+        return any(
+            self.vad.is_speech(audio_16k[offset : offset + BYTES_PER_16K_FRAME], VAD_SAMPLE_RATE_16K)
+            for offset in range(0, len(audio_16k), BYTES_PER_16K_FRAME)
+        )
+
+
 # def resample_24k_to_16k(frame_24k_bytes: bytes) -> bytes:
 #    """
 #    Convert one 20ms chunk (960 bytes @ 24kHz) to 20ms @ 16kHz (640 bytes).
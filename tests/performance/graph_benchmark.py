@@ -0,0 +1,277 @@
+"""Benchmarks for the hot paths of the graph engine.
+
+Synthetic graphs of varying depth, width and fan-in are built from the stub components in
+``stub_components`` so no network access or LLM is needed. Each scenario measures graph
+construction from a payload, ``prepare``, ``async_start`` and ``process`` throughput, the
+cost of streaming the build events through an ``EventManager`` and the number of database
+statements issued per vertex by ``log_vertex_build`` and ``log_transaction``.
+
+Results are compared against the JSON baseline in ``baselines/graph_benchmark.json``:
+
+    python -m tests.performance.graph_benchmark            # compare with the baseline
+    python -m tests.performance.graph_benchmark --update   # record a new baseline
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+from uuid import uuid4
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+BASELINE_PATH = Path(__file__).parent / "baselines" / "graph_benchmark.json"
+# Relative slowdown of a timing allowed before it is reported as a regression
+DEFAULT_TOLERANCE = 0.5
+
+
+@dataclass(frozen=True)
+class GraphShape:
+    """A synthetic graph: ``depth`` layers of ``width`` stubs, each fed by ``fan_in`` stubs of the previous layer."""
+
+    name: str
+    depth: int
+    width: int
+    fan_in: int
+
+    @property
+    def vertex_count(self) -> int:
+        # The layers plus the sink joining the last layer
+        return self.depth * self.width + 1
+
+
+SHAPES = (
+    GraphShape("deep", depth=40, width=1, fan_in=1),
+    GraphShape("wide", depth=2, width=40, fan_in=1),
+    GraphShape("dense", depth=8, width=8, fan_in=4),
+)
+
+
+@dataclass(frozen=True)
+class Measurement:
+    value: float
+    unit: str
+
+    @property
+    def is_timing(self) -> bool:
+        return self.unit == "s"
+
+
+def build_payload(shape: GraphShape) -> dict:
+    """Return the graph payload (nodes and edges) of a synthetic graph with the given shape."""
+    from axiestudio.graph import Graph
+
+    from tests.performance.stub_components import StubComponent
+
+    layers = [[StubComponent(_id=f"Stub-0-{index}", value=f"0-{index}") for index in range(shape.width)]]
+    for depth in range(1, shape.depth):
+        layer = []
+        for index in range(shape.width):
+            component = StubComponent(_id=f"Stub-{depth}-{index}", value=f"{depth}-{index}")
+            upstream = [layers[-1][(index + offset) % shape.width] for offset in range(min(shape.fan_in, shape.width))]
+            component.set(upstream=[stub.build_text for stub in upstream])
+            layer.append(component)
+        layers.append(layer)
+    sink = StubComponent(_id="Stub-sink", value="sink")
+    sink.set(upstream=[stub.build_text for stub in layers[-1]])
+    return Graph(layers[0][0], sink).dump()["data"]
+
+
+def _load_graph(payload: dict, flow_id: str | None = None):
+    from axiestudio.graph import Graph
+
+    return Graph.from_payload(payload, flow_id=flow_id)
+
+
+def _prepared_graph(payload: dict, flow_id: str | None = None):
+    graph = _load_graph(payload, flow_id)
+    graph.prepare()
+    return graph
+
+
+async def _time(
+    setup: Callable[[], Awaitable[Any] | Any], run: Callable[[Any], Awaitable[Any] | Any], rounds: int
+) -> Measurement:
+    """Return the median duration of ``run`` over ``rounds`` fresh ``setup`` results."""
+    durations = []
+    for _ in range(rounds):
+        subject = setup()
+        if asyncio.iscoroutine(subject):
+            subject = await subject
+        start = time.perf_counter()
+        result = run(subject)
+        if asyncio.iscoroutine(result):
+            await result
+        durations.append(time.perf_counter() - start)
+    return Measurement(statistics.median(durations), "s")
+
+
+async def _run_async_start(graph) -> None:
+    await graph.initialize_run()
+    async for _ in graph.async_start():
+        pass
+    await graph.end_all_traces()
+
+
+async def _process(graph, event_manager=None) -> None:
+    await graph.initialize_run()
+    await graph.process(fallback_to_env_vars=False, event_manager=event_manager)
+    await graph.end_all_traces()
+
+
+async def _built_graph(payload: dict):
+    graph = _load_graph(payload)
+    await _process(graph)
+    return graph
+
+
+def _stream_build_events(graph) -> None:
+    """Send one end_vertex event per built vertex through an EventManager, as a playground build does."""
+    from axiestudio.events.event_manager import create_default_event_manager
+
+    event_manager = create_default_event_manager(asyncio.Queue())
+    for vertex in graph.vertices:
+        event_manager.on_end_vertex(data={"build_data": {"id": vertex.id, "valid": True, "data": vertex.result}})
+
+
+async def _count_db_statements(payload: dict, vertex_count: int) -> dict[str, Measurement]:
+    """Process a graph with build and transaction logging on and count the statements issued per vertex."""
+    from axiestudio.services.deps import get_db_service
+    from sqlalchemy import event
+
+    engine = get_db_service().engine.sync_engine
+    counts = {"statements": 0, "commits": 0}
+
+    def _on_statement(*_args, **_kwargs) -> None:
+        counts["statements"] += 1
+
+    def _on_commit(*_args, **_kwargs) -> None:
+        counts["commits"] += 1
+
+    graph = _load_graph(payload, flow_id=str(uuid4()))
+    event.listen(engine, "before_cursor_execute", _on_statement)
+    event.listen(engine, "commit", _on_commit)
+    try:
+        await _process(graph)
+        # Transactions are logged in background tasks
+        await asyncio.gather(*(task for vertex in graph.vertices for task in vertex.log_transaction_tasks))
+    finally:
+        event.remove(engine, "before_cursor_execute", _on_statement)
+        event.remove(engine, "commit", _on_commit)
+    return {
+        "db_statements_per_vertex": Measurement(counts["statements"] / vertex_count, "count"),
+        "db_commits_per_vertex": Measurement(counts["commits"] / vertex_count, "count"),
+    }
+
+
+async def run_shape(shape: GraphShape, *, rounds: int = 5, measure_db: bool = True) -> dict[str, Measurement]:
+    """Run every benchmark on one graph shape."""
+    payload = build_payload(shape)
+    results = {
+        "from_payload": await _time(lambda: payload, _load_graph, rounds),
+        "prepare": await _time(lambda: _load_graph(payload), lambda graph: graph.prepare(), rounds),
+        "async_start": await _time(lambda: _prepared_graph(payload), _run_async_start, rounds),
+        "process": await _time(lambda: _load_graph(payload), _process, rounds),
+        "stream_events": await _time(lambda: _built_graph(payload), _stream_build_events, rounds),
+    }
+    results["process_vertices_per_second"] = Measurement(shape.vertex_count / results["process"].value, "1/s")
+    if measure_db:
+        results.update(await _count_db_statements(payload, shape.vertex_count))
+    return {f"{shape.name}.{name}": measurement for name, measurement in results.items()}
+
+
+async def run_benchmarks(
+    shapes: tuple[GraphShape, ...] = SHAPES, *, rounds: int = 5, measure_db: bool = True
+) -> dict[str, Measurement]:
+    results: dict[str, Measurement] = {}
+    for shape in shapes:
+        results.update(await run_shape(shape, rounds=rounds, measure_db=measure_db))
+    return results
+
+
+def find_regressions(
+    results: dict[str, Measurement], baseline: dict[str, dict], tolerance: float = DEFAULT_TOLERANCE
+) -> list[str]:
+    """Return a description of every result that is worse than its baseline.
+
+    Timings may be up to ``tolerance`` slower than the baseline, throughputs up to ``tolerance``
+    lower, and counts must not increase at all.
+    """
+    regressions = []
+    for name, measurement in results.items():
+        if name not in baseline:
+            continue
+        expected = baseline[name]["value"]
+        if measurement.is_timing:
+            regressed = measurement.value > expected * (1 + tolerance)
+        elif measurement.unit == "count":
+            regressed = round(measurement.value, 9) > expected
+        else:
+            regressed = measurement.value < expected * (1 - tolerance)
+        if regressed:
+            regressions.append(f"{name}: {measurement.value:.6g}{measurement.unit} (baseline {expected:.6g})")
+    return regressions
+
+
+def load_baseline(path: Path = BASELINE_PATH) -> dict[str, dict]:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))["results"]
+
+
+def save_baseline(results: dict[str, Measurement], path: Path = BASELINE_PATH) -> None:
+    data = {
+        "meta": {"python": platform.python_version(), "platform": platform.platform()},
+        "results": {name: {"value": round(m.value, 9), "unit": m.unit} for name, m in sorted(results.items())},
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, indent=2) + "\n", encoding="utf-8")
+
+
+async def _create_database() -> None:
+    from axiestudio.services.deps import get_db_service
+
+    await get_db_service().create_db_and_tables()
+
+
+async def _main(args: argparse.Namespace) -> int:
+    await _create_database()
+    results = await run_benchmarks(rounds=args.rounds)
+
+    for name, measurement in sorted(results.items()):
+        print(f"{name:45} {measurement.value:12.6g} {measurement.unit}")  # noqa: T201
+    if args.update:
+        save_baseline(results, args.baseline)
+        return 0
+    regressions = find_regressions(results, load_baseline(args.baseline), args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")  # noqa: T201
+    return 1 if regressions else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--update", action="store_true", help="Record the results as the new baseline.")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="Path of the JSON baseline.")
+    parser.add_argument("--rounds", type=int, default=5, help="Rounds per timing; the median is kept.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed relative slowdown.")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        # Services read their settings when first used, so configure them before anything runs
+        os.environ["AXIESTUDIO_DATABASE_URL"] = f"sqlite:///{directory}/benchmark.db"
+        sys.exit(asyncio.run(_main(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""Dependency-free components used to build synthetic graphs for the graph benchmarks.
+
+This module is loaded as component code by ``Graph.from_payload``, so it must stay self-contained.
+"""
+
+from axiestudio.custom.custom_component.component import Component
+from axiestudio.io import HandleInput, MessageTextInput, Output
+from axiestudio.schema.message import Message
+
+
+class StubComponent(Component):
+    display_name = "Stub"
+    description = "Joins its value with the text of its upstream messages."
+
+    inputs = [
+        MessageTextInput(name="value", display_name="Value"),
+        HandleInput(name="upstream", display_name="Upstream", input_types=["Message"], is_list=True),
+    ]
+    outputs = [Output(display_name="Text", name="text", method="build_text")]
+
+    def build_text(self) -> Message:
+        texts = [message.text for message in self.upstream or []]
+        return Message(text="|".join([self.value, *texts]))
@@ -0,0 +1,44 @@
+import pytest
+
+from tests.performance.graph_benchmark import GraphShape, Measurement, build_payload, find_regressions, run_shape
+
+SMALL_SHAPE = GraphShape("small", depth=3, width=3, fan_in=2)
+
+
+def test_synthetic_graph_has_requested_shape():
+    payload = build_payload(SMALL_SHAPE)
+
+    assert len(payload["nodes"]) == SMALL_SHAPE.vertex_count
+    # Two edges into each stub below the first layer, plus one per stub of the last layer into the sink
+    assert len(payload["edges"]) == 2 * 3 * 2 + 3
+
+
+@pytest.mark.benchmark
+async def test_benchmarks_run_on_small_graph():
+    results = await run_shape(SMALL_SHAPE, rounds=1, measure_db=False)
+
+    assert {"small.from_payload", "small.prepare", "small.async_start", "small.process"} <= results.keys()
+    assert all(measurement.value >= 0 for measurement in results.values())
+
+
+def test_find_regressions_applies_tolerance_and_counts_strictly():
+    baseline = {
+        "shape.process": {"value": 1.0, "unit": "s"},
+        "shape.prepare": {"value": 1.0, "unit": "s"},
+        "shape.db_statements_per_vertex": {"value": 3.0, "unit": "count"},
+        "shape.process_vertices_per_second": {"value": 100.0, "unit": "1/s"},
+    }
+    results = {
+        "shape.process": Measurement(1.1, "s"),
+        "shape.prepare": Measurement(1.5, "s"),
+        "shape.db_statements_per_vertex": Measurement(3.5, "count"),
+        "shape.process_vertices_per_second": Measurement(90.0, "1/s"),
+        "shape.new_metric": Measurement(1.0, "s"),
+    }
+
+    regressions = find_regressions(results, baseline, tolerance=0.25)
+
+    assert [regression.split(":")[0] for regression in regressions] == [
+        "shape.prepare",
+        "shape.db_statements_per_vertex",
+    ]
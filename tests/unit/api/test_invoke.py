@@ -0,0 +1,95 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from axiestudio.api import invoke
+from axiestudio.api.invoke import EventQueue, invoke_flow
+from axiestudio.events.event_manager import FlowEvent
+from axiestudio.schema.message import ErrorMessage
+from axiestudio.schema.playground_events import TokenEvent
+
+
+def _token(chunk: str, message_id: str = "message") -> tuple:
+    return ("token", FlowEvent("token", TokenEvent(chunk=chunk, id=message_id)), time.time())
+
+
+def _build_data(text: str, *, valid: bool = True) -> dict:
+    return {"build_data": {"valid": valid, "data": {"results": {"message": {"text": text}}}}}
+
+
+def test_event_queue_merges_tokens_past_the_limit():
+    queue = EventQueue(max_buffered_events=2)
+    for chunk in ["a", "b", "c", "d"]:
+        queue.put_nowait(_token(chunk))
+    queue.put_nowait(_token("e", message_id="other"))
+
+    events = [queue.get_nowait()[1] for _ in range(queue.qsize())]
+    assert [(event.data.id, event.data.chunk) for event in events] == [
+        ("message", "a"),
+        ("message", "bcd"),
+        ("other", "e"),
+    ]
+
+
+async def test_invoke_flow_delivers_events_and_result(monkeypatch):
+    async def generate_flow_events(*, event_manager, background_tasks, **kwargs):  # noqa: ARG001
+        event_manager.on_vertices_sorted(data={"ids": ["a"], "to_run": ["a", "b"]})
+        event_manager.on_end_vertex(data=_build_data("first"))
+        event_manager.on_end_vertex(data=_build_data("second"))
+        event_manager.on_end(data={})
+        background_tasks.add_task(ran_background_tasks.set)
+
+    ran_background_tasks = asyncio.Event()
+    monkeypatch.setattr(invoke, "generate_flow_events", generate_flow_events)
+
+    async with invoke_flow(uuid4(), user=SimpleNamespace(id=uuid4())) as invocation:
+        events = [event async for event in invocation]
+
+    assert [event.event for event in events] == ["vertices_sorted", "end_vertex", "end_vertex", "end"]
+    assert events[0].to_dict() == {"event": "vertices_sorted", "data": {"ids": ["a"], "to_run": ["a", "b"]}}
+    assert invocation.result.valid
+    assert invocation.result.messages == ["first", "second"]
+    assert invocation.result.text == "second"
+    await asyncio.wait_for(ran_background_tasks.wait(), 1)
+
+
+async def test_leaving_the_invocation_early_cancels_the_flow(monkeypatch):
+    cancelled = asyncio.Event()
+
+    async def generate_flow_events(*, event_manager, **kwargs):  # noqa: ARG001
+        event_manager.on_end_vertex(data=_build_data("first"))
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    monkeypatch.setattr(invoke, "generate_flow_events", generate_flow_events)
+
+    async with invoke_flow(uuid4(), user=SimpleNamespace(id=uuid4())) as invocation:
+        async for _ in invocation:
+            break
+
+    assert cancelled.is_set()
+
+
+async def test_failed_flow_ends_the_events(monkeypatch):
+    async def generate_flow_events(*, event_manager, **kwargs):  # noqa: ARG001
+        msg = "boom"
+        exc = ValueError(msg)
+        event_manager.on_error(data=ErrorMessage(flow_id=uuid4(), exception=exc).data)
+        raise exc
+
+    monkeypatch.setattr(invoke, "generate_flow_events", generate_flow_events)
+
+    result = await invoke_flow(uuid4(), user=SimpleNamespace(id=uuid4())).wait()
+
+    assert "boom" in result.error.text
+    assert not result.valid
+
+
+def test_invoke_flow_rejects_invalid_ids():
+    with pytest.raises(ValueError, match="badly formed"):
+        invoke_flow("not-a-uuid", user=SimpleNamespace(id=uuid4()))
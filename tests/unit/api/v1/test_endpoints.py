@@ -5,6 +5,7 @@ from typing import Any
 from anyio import Path
 from fastapi import status
 from httpx import AsyncClient
+from axiestudio.api.v1 import endpoints
 from axiestudio.api.v1.schemas import UpdateCustomComponentRequest
 from axiestudio.components.agents.agent import AgentComponent
 from axiestudio.custom.utils import build_custom_component_template
@@ -106,3 +107,29 @@ async def test_update_component_model_name_options(client: AsyncClient, logged_i
     assert response.status_code == status.HTTP_200_OK
     assert "template" in result
     assert "model_name" not in result["template"]
+
+
+async def test_update_component_superseded_by_newer_update(client: AsyncClient, logged_in_headers: dict, monkeypatch):
+    started = asyncio.Event()
+
+    async def update_component(code_request, _user):
+        if code_request.field_value == "first":
+            started.set()
+            await asyncio.sleep(10)
+        return {"field_value": code_request.field_value}
+
+    monkeypatch.setattr(endpoints, "_update_component", update_component)
+
+    def post(field_value: str):
+        request = UpdateCustomComponentRequest(
+            code="", frontend_node={}, field="text", field_value=field_value, template={}, node_id="node-1"
+        )
+        return client.post("api/v1/custom_component/update", json=request.model_dump(), headers=logged_in_headers)
+
+    first = asyncio.create_task(post("first"))
+    await started.wait()
+    second = await post("second")
+
+    assert second.status_code == status.HTTP_200_OK
+    assert second.json() == {"field_value": "second"}
+    assert (await first).status_code == status.HTTP_409_CONFLICT
@@ -153,6 +153,37 @@ async def test_update_flow(client: AsyncClient, logged_in_headers):
         await flow_file.unlink(missing_ok=True)
 
 
+async def test_flow_versions(client: AsyncClient, logged_in_headers):
+    response = await client.post(
+        "api/v1/flows/", json={"name": "versioned", "data": {"nodes": [], "edges": []}}, headers=logged_in_headers
+    )
+    id_ = response.json()["id"]
+    assert response.json()["version"] == 1
+
+    updated_data = {"nodes": [{"id": "a"}], "edges": []}
+    response = await client.patch(f"api/v1/flows/{id_}", json={"data": updated_data}, headers=logged_in_headers)
+    assert response.json()["version"] == 2
+    # Updates that leave the data as it is do not add a version
+    response = await client.patch(f"api/v1/flows/{id_}", json={"name": "renamed"}, headers=logged_in_headers)
+    assert response.json()["version"] == 2
+
+    response = await client.get(f"api/v1/flows/{id_}/versions", headers=logged_in_headers)
+    assert [version["version"] for version in response.json()] == [2, 1]
+
+    response = await client.post(f"api/v1/flows/{id_}/versions/1/restore", headers=logged_in_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["data"] == {"nodes": [], "edges": []}
+    assert response.json()["version"] == 3
+
+    response = await client.get(f"api/v1/flows/{id_}/versions/2", headers=logged_in_headers)
+    assert response.json() == updated_data
+    response = await client.get(f"api/v1/flows/{id_}/versions/4", headers=logged_in_headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    response = await client.delete(f"api/v1/flows/{id_}", headers=logged_in_headers)
+    assert response.status_code == status.HTTP_200_OK
+
+
 async def test_create_flows(client: AsyncClient, logged_in_headers):
     amount_flows = 10
     basic_case = {
@@ -1,6 +1,10 @@
+import io
+import zipfile
 from uuid import uuid4
 
+import orjson
 import pytest
+from axiestudio.api import project_bundle
 from fastapi import status
 from httpx import AsyncClient
 
@@ -169,3 +173,195 @@ async def test_create_and_read_project_cyrillic(client: AsyncClient, logged_in_h
 
     assert fetched["name"] == CYRILLIC_NAME
     assert fetched["description"] == CYRILLIC_DESC
+
+
+async def test_read_project_search_is_ranked(client: AsyncClient, logged_in_headers, basic_case):
+    project_id = (await client.post("api/v1/projects/", json=basic_case, headers=logged_in_headers)).json()["id"]
+    for name, description in [("Notes", "Summarize meeting notes"), ("Summarizer", ""), ("Translator", "")]:
+        flow = {"name": name, "description": description, "data": {"nodes": [], "edges": []}, "folder_id": project_id}
+        response = await client.post("api/v1/flows/", json=flow, headers=logged_in_headers)
+        assert response.status_code == status.HTTP_201_CREATED
+
+    response = await client.get(
+        f"api/v1/projects/{project_id}", params={"page": 1, "size": 10, "search": "summar"}, headers=logged_in_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert [flow["name"] for flow in response.json()["flows"]["items"]] == ["Summarizer", "Notes"]
+
+    response = await client.get(
+        "api/v1/search/flows", params={"q": "summar", "project_id": project_id}, headers=logged_in_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    items = response.json()["items"]
+    assert [item["name"] for item in items] == ["Summarizer", "Notes"]
+    assert "data" not in items[0]
+
+
+async def test_upload_project_resolves_taken_names(client: AsyncClient, logged_in_headers):
+    flow = {"name": "Uploaded flow", "description": "", "data": {"nodes": [], "edges": []}}
+    response = await client.post("api/v1/flows/", json=flow, headers=logged_in_headers)
+    assert response.status_code == status.HTTP_201_CREATED
+    export = {"folder_name": "Uploaded", "folder_description": "", "flows": [flow, flow]}
+
+    response = await client.post(
+        "api/v1/projects/upload/",
+        files={"file": ("project.json", orjson.dumps(export), "application/json")},
+        headers=logged_in_headers,
+    )
+
+    assert response.status_code == status.HTTP_201_CREATED
+    result = response.json()
+    assert [flow["name"] for flow in result] == ["Uploaded flow (1)", "Uploaded flow (2)"]
+    assert result[0]["folder_id"] == result[1]["folder_id"]
+
+
+async def test_failed_upload_leaves_no_project(client: AsyncClient, logged_in_headers):
+    flows = [{"name": "Valid flow", "data": {"nodes": [], "edges": []}}, {"name": "Invalid flow", "data": 1}]
+    export = {"folder_name": "Failed upload", "flows": flows}
+
+    response = await client.post(
+        "api/v1/projects/upload/",
+        files={"file": ("project.json", orjson.dumps(export), "application/json")},
+        headers=logged_in_headers,
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    response = await client.get("api/v1/projects/", headers=logged_in_headers)
+    assert "Failed upload" not in [project["name"] for project in response.json()]
+
+
+def _flow_using_file(name: str, file_path: str) -> dict:
+    template = {
+        "path": {"type": "file", "file_path": file_path, "value": "report.txt"},
+        "api_key": {"type": "str", "load_from_db": True, "value": "BUNDLE_TEST_KEY"},
+    }
+    node = {"id": "File-1", "data": {"node": {"template": template}}}
+    return {"name": name, "description": "", "data": {"nodes": [node], "edges": []}}
+
+
+async def _project_with_shared_file(client: AsyncClient, headers) -> tuple[dict, list[dict]]:
+    response = await client.post("api/v2/files", files={"file": ("report.txt", b"shared content")}, headers=headers)
+    assert response.status_code == status.HTTP_201_CREATED
+    file_path = response.json()["path"]
+    response = await client.post("api/v1/projects/", json={"name": "Bundled"}, headers=headers)
+    project = response.json()
+    flows = []
+    for name in ("First flow", "Second flow"):
+        flow = {**_flow_using_file(name, file_path), "folder_id": project["id"]}
+        response = await client.post("api/v1/flows/", json=flow, headers=headers)
+        assert response.status_code == status.HTTP_201_CREATED
+        flows.append(response.json())
+    return project, flows
+
+
+async def test_project_bundle_round_trip(client: AsyncClient, logged_in_headers):
+    project, _ = await _project_with_shared_file(client, logged_in_headers)
+
+    response = await client.get(f"api/v1/projects/{project['id']}/bundle", headers=logged_in_headers)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/zip"
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        manifest = orjson.loads(archive.read("manifest.json"))
+        (file,) = manifest["files"]
+        assert archive.read(f"files/{file['sha256']}") == b"shared content"
+    assert sorted(flow["name"] for flow in manifest["flows"]) == ["First flow", "Second flow"]
+    assert len(file["references"]) == 1
+    assert manifest["variables"] == [{"name": "BUNDLE_TEST_KEY", "type": None}]
+
+    response = await client.post(
+        "api/v1/projects/bundle/",
+        files={"file": ("bundle.zip", response.content, "application/zip")},
+        headers=logged_in_headers,
+    )
+
+    assert response.status_code == status.HTTP_201_CREATED
+    result = response.json()
+    assert result["project_id"] != project["id"]
+    assert result["flows_created"] == 2
+    assert result["files_reused"] == 1
+    assert result["missing_variables"] == ["BUNDLE_TEST_KEY"]
+    response = await client.get(f"api/v1/projects/{result['project_id']}", headers=logged_in_headers)
+    assert sorted(flow["name"] for flow in response.json()["flows"]) == ["First flow (1)", "Second flow (1)"]
+
+
+async def test_project_bundle_of_changes(client: AsyncClient, logged_in_headers):
+    project, flows = await _project_with_shared_file(client, logged_in_headers)
+    response = await client.get(f"api/v1/projects/{project['id']}/bundle", headers=logged_in_headers)
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        base = orjson.loads(archive.read("manifest.json"))
+    response = await client.patch(
+        f"api/v1/flows/{flows[0]['id']}", json={"description": "Changed"}, headers=logged_in_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+    response = await client.post(f"api/v1/projects/{project['id']}/bundle", json=base, headers=logged_in_headers)
+
+    assert response.status_code == status.HTTP_200_OK
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        manifest = orjson.loads(archive.read("manifest.json"))
+        assert sorted(archive.namelist()) == sorted(["manifest.json", f"flows/{flows[0]['id']}.json"])
+    assert manifest["base_id"] == base["id"]
+    assert {flow["id"]: flow["included"] for flow in manifest["flows"]} == {
+        flows[0]["id"]: True,
+        flows[1]["id"]: False,
+    }
+    assert [file["included"] for file in manifest["files"]] == [False]
+
+    response = await client.post(
+        "api/v1/projects/bundle/",
+        params={"project_id": project["id"]},
+        files={"file": ("bundle.zip", response.content, "application/zip")},
+        headers=logged_in_headers,
+    )
+
+    assert response.status_code == status.HTTP_201_CREATED
+    result = response.json()
+    assert result["project_id"] == project["id"]
+    assert result["flows_updated"] == 1
+    assert result["flows_created"] == 0
+
+
+async def test_failed_bundle_import_leaves_no_project(client: AsyncClient, logged_in_headers, active_user, monkeypatch):
+    project, _ = await _project_with_shared_file(client, logged_in_headers)
+    response = await client.get(f"api/v1/projects/{project['id']}/bundle", headers=logged_in_headers)
+    projects = await client.get("api/v1/projects/", headers=logged_in_headers)
+    # Without a file of the same content to reuse, the import stores the bundled file
+    await client.delete("api/v2/files", headers=logged_in_headers)
+
+    async def fail(*_args, **_kwargs):
+        msg = "failed"
+        raise RuntimeError(msg)
+
+    monkeypatch.setattr(project_bundle, "save_flow_version", fail)
+    with pytest.raises(RuntimeError, match="failed"):
+        await project_bundle.import_project_bundle(io.BytesIO(response.content), user=active_user)
+
+    response = await client.get("api/v1/projects/", headers=logged_in_headers)
+    assert len(response.json()) == len(projects.json())
+    response = await client.get("api/v2/files", headers=logged_in_headers)
+    assert response.json() == []
+
+
+async def test_import_project_bundle_rejects_a_tampered_bundle(client: AsyncClient, logged_in_headers):
+    project, _ = await _project_with_shared_file(client, logged_in_headers)
+    response = await client.get(f"api/v1/projects/{project['id']}/bundle", headers=logged_in_headers)
+    tampered = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive, zipfile.ZipFile(tampered, "w") as output:
+        for name in archive.namelist():
+            content = b"other content" if name.startswith("files/") else archive.read(name)
+            output.writestr(name, content)
+
+    response = await client.post(
+        "api/v1/projects/bundle/",
+        files={"file": ("bundle.zip", tampered.getvalue(), "application/zip")},
+        headers=logged_in_headers,
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    response = await client.post(
+        "api/v1/projects/bundle/",
+        files={"file": ("bundle.zip", b"not a zip", "application/zip")},
+        headers=logged_in_headers,
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -521,3 +521,108 @@ async def test_unique_filename_path_storage(files_client, files_created_api_key)
     download2 = await files_client.get(f"api/v2/files/{file2['id']}", headers=headers)
     assert download2.status_code == 200
     assert download2.content == b"path content 2"
+
+
+async def test_upload_same_content_is_stored_once(files_client, files_created_api_key):
+    """Test that uploading the same content twice records two files sharing one stored object."""
+    headers = {"x-api-key": files_created_api_key.api_key}
+
+    response1 = await files_client.post(
+        "api/v2/files",
+        files={"file": ("report.pdf", b"same content")},
+        headers=headers,
+    )
+    assert response1.status_code == 201
+    file1 = response1.json()
+
+    response2 = await files_client.post(
+        "api/v2/files",
+        files={"file": ("copy.pdf", b"same content")},
+        headers=headers,
+    )
+    assert response2.status_code == 201
+    file2 = response2.json()
+
+    assert file1["id"] != file2["id"]
+    assert file2["name"] == "copy"
+    assert file1["path"] == file2["path"]
+
+    # Deleting one of the files keeps the content of the other
+    delete_response = await files_client.delete(f"api/v2/files/{file1['id']}", headers=headers)
+    assert delete_response.status_code == 200
+
+    download = await files_client.get(f"api/v2/files/{file2['id']}", headers=headers)
+    assert download.status_code == 200
+    assert download.content == b"same content"
+
+
+async def test_unique_filename_ignores_names_sharing_a_prefix(files_client, files_created_api_key):
+    """Test that a file is only renamed when its own name is taken, not a longer one."""
+    headers = {"x-api-key": files_created_api_key.api_key}
+
+    response1 = await files_client.post(
+        "api/v2/files",
+        files={"file": ("notes_2024.txt", b"content1")},
+        headers=headers,
+    )
+    assert response1.status_code == 201
+
+    response2 = await files_client.post(
+        "api/v2/files",
+        files={"file": ("notes.txt", b"content2")},
+        headers=headers,
+    )
+    assert response2.status_code == 201
+    assert response2.json()["name"] == "notes"
+
+
+async def test_resumable_upload(files_client, files_created_api_key):
+    """Test that a file can be uploaded in chunks, resuming at the offset the server reports."""
+    headers = {"x-api-key": files_created_api_key.api_key}
+    content = b"0123456789" * 10
+
+    response = await files_client.post(
+        "api/v2/files/uploads",
+        json={"filename": "chunked.txt", "size": len(content)},
+        headers=headers,
+    )
+    assert response.status_code == 201
+    upload = response.json()
+    assert upload["offset"] == 0
+
+    response = await files_client.put(
+        f"api/v2/files/uploads/{upload['id']}", params={"offset": 0}, content=content[:40], headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json()["offset"] == 40
+
+    # A chunk sent at the wrong offset is rejected
+    response = await files_client.put(
+        f"api/v2/files/uploads/{upload['id']}", params={"offset": 0}, content=content[40:], headers=headers
+    )
+    assert response.status_code == 409
+
+    # Completing an incomplete upload is rejected
+    response = await files_client.post(f"api/v2/files/uploads/{upload['id']}/complete", headers=headers)
+    assert response.status_code == 409
+
+    response = await files_client.get(f"api/v2/files/uploads/{upload['id']}", headers=headers)
+    assert response.json()["offset"] == 40
+
+    response = await files_client.put(
+        f"api/v2/files/uploads/{upload['id']}", params={"offset": 40}, content=content[40:], headers=headers
+    )
+    assert response.json()["offset"] == len(content)
+
+    response = await files_client.post(f"api/v2/files/uploads/{upload['id']}/complete", headers=headers)
+    assert response.status_code == 201
+    file = response.json()
+    assert file["name"] == "chunked"
+    assert file["size"] == len(content)
+
+    download = await files_client.get(f"api/v2/files/{file['id']}", headers=headers)
+    assert download.content == content
+
+    # The upload session is gone once completed
+    response = await files_client.get(f"api/v2/files/uploads/{upload['id']}", headers=headers)
+    assert response.status_code == 404
@@ -21,6 +21,9 @@ class FakeStorageService:  # Minimal stub for storage interactions
     async def save_file(self, flow_id: str, file_name: str, data: bytes):
         self._store[f"{flow_id}/{file_name}"] = data
 
+    async def save_file_stream(self, flow_id: str, file_name: str, chunks):
+        self._store[f"{flow_id}/{file_name}"] = b"".join([chunk async for chunk in chunks])
+
     async def get_file_size(self, flow_id: str, file_name: str):
         return len(self._store.get(f"{flow_id}/{file_name}", b""))
 
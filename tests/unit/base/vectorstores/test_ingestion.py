@@ -0,0 +1,75 @@
+import pytest
+from axiestudio.base.vectorstores.ingestion import ingest_documents
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.vectorstores import InMemoryVectorStore
+from langchain_text_splitters import CharacterTextSplitter
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    embedded: int = 0
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.embedded += len(texts)
+        return super().embed_documents(texts)
+
+
+@pytest.fixture
+def embedding():
+    return CountingEmbedding(size=8)
+
+
+def _documents(count: int):
+    for i in range(count):
+        yield Document(page_content=f"first {i}\nsecond {i}\nsame", metadata={"source": f"doc-{i}"})
+
+
+async def test_ingestion_splits_in_batches_and_skips_indexed_chunks(embedding):
+    vector_store = InMemoryVectorStore(embedding)
+    splitter = CharacterTextSplitter(separator="\n", chunk_size=1, chunk_overlap=0)
+    stages = []
+
+    progress = await ingest_documents(
+        vector_store,
+        _documents(10),
+        splitter=splitter,
+        batch_size=4,
+        on_progress=lambda stage, progress: stages.append((stage, progress.chunks, progress.indexed)),
+    )
+
+    assert (progress.documents, progress.chunks, progress.indexed, progress.skipped) == (10, 30, 30, 0)
+    assert len(vector_store.store) == 30
+    assert ("index", 30, 30) in stages
+    # Splitting stays at most a couple of batches ahead of indexing
+    assert all(chunks - indexed <= 4 * 3 for stage, chunks, indexed in stages if stage == "split")
+
+    embedding.embedded = 0
+    progress = await ingest_documents(vector_store, _documents(11), splitter=splitter, batch_size=4)
+
+    assert (progress.indexed, progress.skipped) == (3, 30)
+    assert embedding.embedded == 3
+    assert len(vector_store.store) == 33
+
+
+async def test_identical_chunks_are_all_stored(embedding):
+    vector_store = InMemoryVectorStore(embedding)
+    documents = [Document(page_content="same"), Document(page_content="same")]
+
+    progress = await ingest_documents(vector_store, documents)
+
+    assert progress.indexed == 2
+    assert len(vector_store.store) == 2
+    assert (await ingest_documents(vector_store, documents)).skipped == 2
+
+
+async def test_ingestion_failure_stops_the_split(embedding):
+    vector_store = InMemoryVectorStore(embedding)
+
+    def documents():
+        yield Document(page_content="ok")
+        msg = "broken document"
+        raise ValueError(msg)
+
+    with pytest.raises(ValueError, match="broken document"):
+        await ingest_documents(vector_store, documents(), batch_size=1)
+    assert len(vector_store.store) == 1
@@ -3,8 +3,10 @@ from typing import Any
 from unittest.mock import AsyncMock
 
 from langchain_core.agents import AgentFinish
+from langchain_core.messages import AIMessageChunk
 from axiestudio.base.agents.agent import process_agent_events
 from axiestudio.base.agents.events import (
+    MessageStreamCoalescer,
     handle_on_chain_end,
     handle_on_chain_start,
     handle_on_chain_stream,
@@ -203,6 +205,59 @@ async def test_chain_stream_event():
     assert result.text == "streamed output"
 
 
+async def test_chat_model_stream_events_are_coalesced():
+    """Streamed chunks are sent as token deltas and persisted only when flushed."""
+    send_message = AsyncMock(side_effect=lambda message: message)
+    send_token = AsyncMock()
+
+    chunks = [f"token{i} " for i in range(50)]
+    events = [{"event": "on_chat_model_stream", "data": {"chunk": AIMessageChunk(content=chunk)}} for chunk in chunks]
+    agent_message = Message(
+        sender=MESSAGE_SENDER_AI,
+        sender_name="Agent",
+        properties={"icon": "Bot", "state": "partial"},
+        content_blocks=[ContentBlock(title="Agent Steps", contents=[])],
+        session_id="test_session_id",
+    )
+    agent_message.id = "test_message_id"
+
+    result = await process_agent_events(create_event_iterator(events), agent_message, send_message, send_token)
+
+    assert result.text == "".join(chunks)
+    assert send_token.await_count == len(chunks)
+    send_token.assert_any_await(chunks[0], "test_message_id")
+    # Initial store plus the final flush of pending tokens
+    assert send_message.await_count == 2
+
+
+async def test_message_stream_coalescer_flushes_on_size_threshold():
+    send_message = AsyncMock(side_effect=lambda message: message)
+    send_token = AsyncMock()
+    coalescer = MessageStreamCoalescer(send_message, send_token, flush_interval=3600, flush_chars=10)
+    message = Message(text="", sender=MESSAGE_SENDER_AI, sender_name="Agent")
+    message.id = "test_message_id"
+
+    await coalescer.stream(message=message, chunk="12345")
+    assert send_message.await_count == 0
+    assert coalescer.has_pending
+
+    await coalescer.stream(message=message, chunk="67890")
+    assert send_message.await_count == 1
+    assert not coalescer.has_pending
+
+
+async def test_message_stream_coalescer_without_token_method_persists_every_chunk():
+    send_message = AsyncMock(side_effect=lambda message: message)
+    coalescer = MessageStreamCoalescer(send_message)
+    message = Message(text="", sender=MESSAGE_SENDER_AI, sender_name="Agent")
+    message.id = "test_message_id"
+
+    await coalescer.stream(message=message, chunk="a")
+    await coalescer.stream(message=message, chunk="b")
+
+    assert send_message.await_count == 2
+
+
 async def test_multiple_events():
     """Test handling of multiple events in sequence."""
     send_message = AsyncMock(side_effect=lambda message: message)
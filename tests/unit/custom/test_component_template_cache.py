@@ -0,0 +1,35 @@
+from unittest.mock import patch
+
+from axiestudio.custom import utils
+from axiestudio.custom.utils import build_component_template_from_code
+
+CODE = """
+from axiestudio.custom import Component
+from axiestudio.io import MessageTextInput, Output
+
+
+class CachedTemplateComponent(Component):
+    display_name = "Cached Template"
+    inputs = [MessageTextInput(name="text", display_name="Text")]
+    outputs = [Output(display_name="Text", name="text_output", method="build_text")]
+
+    def build_text(self) -> str:
+        return self.text
+"""
+
+
+def test_templates_are_built_once_per_code():
+    utils._component_template_cache.clear()
+    first_template, first_instance = build_component_template_from_code(CODE)
+
+    with patch.object(utils, "build_custom_component_template") as build:
+        second_template, second_instance = build_component_template_from_code(CODE, user_id="user")
+    build.assert_not_called()
+
+    assert second_template == first_template
+    # Each build gets its own template and instance to update
+    second_template["template"]["text"]["value"] = "changed"
+    assert first_template["template"]["text"].get("value") != "changed"
+    assert second_instance is not first_instance
+    assert type(second_instance) is type(first_instance)
+    assert second_instance._user_id == "user"
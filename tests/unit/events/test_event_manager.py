@@ -2,10 +2,13 @@ import asyncio
 import json
 import time
 import uuid
+from datetime import datetime, timezone
 
 import pytest
-from axiestudio.events.event_manager import EventManager
+from axiestudio.events.event_manager import EventManager, FlowEvent
 from axiestudio.schema.log import LoggableType
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
 
 
 class TestEventManager:
@@ -210,3 +213,30 @@ class TestEventManager:
         # Accessing a non-registered event callback should return the 'noop' function
         callback = event_manager.on_non_existing_event
         assert callback.__name__ == "noop"
+
+    # Encoding a model in the event data through pydantic, as jsonable_encoder would
+    def test_send_event_with_model_data(self):
+        class BuildData(BaseModel):
+            id: str
+            timestamp: datetime
+
+        queue = asyncio.Queue()
+        manager = EventManager(queue)
+        build_data = BuildData(id="vertex", timestamp=datetime(2024, 1, 1, tzinfo=timezone.utc))
+        manager.send_event(event_type="end_vertex", data={"build_data": build_data})
+
+        _, str_data, _ = queue.get_nowait()
+        assert str_data.endswith(b"\n\n")
+        assert json.loads(str_data) == {"event": "end_vertex", "data": {"build_data": jsonable_encoder(build_data)}}
+
+    # Sending events to an in-process consumer, without encoding them
+    def test_send_event_without_encoding(self):
+        queue = asyncio.Queue()
+        manager = EventManager(queue, encode=False)
+        data = {"key": object()}
+        manager.send_event(event_type="test_type", data=data)
+
+        _, event, _ = queue.get_nowait()
+        assert isinstance(event, FlowEvent)
+        assert event.event == "test_type"
+        assert event.data is data
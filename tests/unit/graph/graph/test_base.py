@@ -7,6 +7,7 @@ from axiestudio.components.langchain_utilities import ToolCallingAgentComponent
 from axiestudio.components.tools import YfinanceToolComponent
 from axiestudio.graph import Graph
 from axiestudio.graph.graph.constants import Finish
+from axiestudio.services.deps import get_state_service
 
 
 async def test_graph_not_prepared():
@@ -83,6 +84,25 @@ async def test_graph_functional_async_start():
     assert results[-1] == Finish()
 
 
+async def test_run_state_outlives_a_vertex_error():
+    chat_input = ChatInput(_id="chat_input")
+    chat_output = ChatOutput(input_value="test", _id="chat_output")
+    chat_output.set(sender_name=chat_input.message_response)
+    graph = Graph(chat_input, chat_output)
+    await graph.initialize_run()
+    state_service = get_state_service()
+    state_service.update_state("answer", "a", run_id=graph.run_id)
+
+    # A vertex error ends the traces while the other branches may still be building
+    await graph.end_all_traces(error=ValueError("failed"))
+    assert state_service.get_state("answer", run_id=graph.run_id) == "a"
+
+    # The state goes once the run is over
+    results = [result async for result in graph.async_start()]
+    assert results[-1] == Finish()
+    assert state_service.get_state("answer", run_id=graph.run_id) == ""
+
+
 def test_graph_functional_start():
     chat_input = ChatInput(_id="chat_input")
     chat_output = ChatOutput(input_value="test", _id="chat_output")
@@ -0,0 +1,143 @@
+import os
+
+import pytest
+from axiestudio.components.input_output import ChatOutput, TextInputComponent
+from axiestudio.custom.custom_component.component import Component
+from axiestudio.graph import Graph
+from axiestudio.graph.graph.capsule import RunCapsule, _strip_secrets, replay_capsule
+from axiestudio.io import MessageTextInput, Output
+from axiestudio.schema.message import Message
+from axiestudio.services.deps import get_settings_service
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+class ReplyModel(BaseChatModel):
+    reply: str
+
+    @property
+    def _llm_type(self) -> str:
+        return "reply"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):  # noqa: ARG002
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(self.reply))])
+
+
+class AnswerComponent(Component):
+    display_name = "Answer"
+
+    inputs = [MessageTextInput(name="input_value", display_name="Input")]
+    outputs = [Output(display_name="Text", name="text", method="build_text")]
+
+    async def build_text(self) -> Message:
+        # The reply changes between the recorded run and the replay, as a real model's would
+        reply = os.environ.get("CAPSULE_TEST_REPLY", "")
+        if reply == "fail":
+            msg = "The model is unavailable"
+            raise ValueError(msg)
+        response = await ReplyModel(reply=reply).ainvoke(str(self.input_value))
+        return Message(text=f"{response.content} {self.input_value}")
+
+
+@pytest.fixture
+def capsule_dir(tmp_path, monkeypatch):
+    settings = get_settings_service().settings
+    monkeypatch.setattr(settings, "config_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "run_capsules", "all")
+    return tmp_path / "capsules" / "local"
+
+
+def _build_graph(text: str) -> Graph:
+    text_input = TextInputComponent(_id="text_input", input_value=text)
+    answer = AnswerComponent(_id="answer")
+    answer.set(input_value=text_input.text_response)
+    chat_output = ChatOutput(_id="chat_output", should_store_message=False)
+    chat_output.set(input_value=answer.build_text)
+    return Graph(text_input, chat_output)
+
+
+async def _record(capsule_dir, monkeypatch, reply: str) -> RunCapsule:
+    monkeypatch.setenv("CAPSULE_TEST_REPLY", reply)
+    graph = _build_graph("hello")
+    try:
+        await graph.process(fallback_to_env_vars=False)
+    finally:
+        monkeypatch.setenv("CAPSULE_TEST_REPLY", "replayed")
+    return RunCapsule.load(capsule_dir / f"{graph.run_id}.capsule")
+
+
+async def test_replay_restores_recorded_results(capsule_dir, monkeypatch):
+    capsule = await _record(capsule_dir, monkeypatch, "recorded")
+
+    result = await replay_capsule(capsule)
+
+    assert sorted(result.restored) == ["answer", "chat_output", "text_input"]
+    assert result.rebuilt == []
+    assert result.reproduced
+    assert result.graph.get_vertex("chat_output").results["message"].text == "recorded hello"
+
+
+async def test_rerun_serves_llm_calls_from_the_capsule(capsule_dir, monkeypatch):
+    capsule = await _record(capsule_dir, monkeypatch, "recorded")
+    assert len(capsule.llm_calls) == 1
+
+    result = await replay_capsule(capsule, rerun_components=True)
+
+    assert sorted(result.rebuilt) == ["answer", "chat_output", "text_input"]
+    assert result.reproduced
+    assert result.graph.get_vertex("chat_output").results["message"].text == "recorded hello"
+
+
+async def test_rerun_fails_on_an_llm_call_missing_from_the_capsule(capsule_dir, monkeypatch):
+    capsule = await _record(capsule_dir, monkeypatch, "recorded")
+    capsule.llm_calls.clear()
+
+    result = await replay_capsule(capsule, rerun_components=True)
+
+    assert not result.reproduced
+    assert "no response for this LLM call" in result.error
+
+
+async def test_failed_run_is_recorded_and_replayed(capsule_dir, monkeypatch):
+    monkeypatch.setattr(get_settings_service().settings, "run_capsules", "failed")
+    monkeypatch.setenv("CAPSULE_TEST_REPLY", "recorded")
+    await _build_graph("hello").process(fallback_to_env_vars=False)
+    assert not capsule_dir.exists()
+
+    with pytest.raises(Exception, match="The model is unavailable"):
+        await _record(capsule_dir, monkeypatch, "fail")
+    (capsule_path,) = capsule_dir.glob("*.capsule")
+    capsule = RunCapsule.load(capsule_path)
+    assert capsule.vertices["answer"].error == capsule.error
+
+    # The failed component is not rebuilt, its recorded error is raised again
+    result = await replay_capsule(capsule)
+    assert result.reproduced
+    assert "The model is unavailable" in result.error
+
+
+def test_strip_secrets_keeps_variable_names():
+    graph_data = {
+        "nodes": [
+            {
+                "data": {
+                    "node": {
+                        "template": {
+                            "api_key": {"password": True, "value": "sk-secret"},
+                            "token": {"password": True, "load_from_db": True, "value": "MY_TOKEN"},
+                            "model": {"value": "gpt-4o"},
+                        }
+                    }
+                }
+            }
+        ],
+        "edges": [],
+    }
+
+    template = _strip_secrets(graph_data)["nodes"][0]["data"]["node"]["template"]
+
+    assert template["api_key"]["value"] == ""
+    assert template["token"]["value"] == "MY_TOKEN"
+    assert template["model"]["value"] == "gpt-4o"
+    assert graph_data["nodes"][0]["data"]["node"]["template"]["api_key"]["value"] == "sk-secret"
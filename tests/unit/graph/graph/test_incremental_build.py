@@ -0,0 +1,190 @@
+from uuid import uuid4
+
+import pytest
+from axiestudio.custom.custom_component.component import Component
+from axiestudio.graph import Graph
+from axiestudio.io import MessageTextInput, Output, SecretStrInput
+from axiestudio.schema.message import Message
+from axiestudio.services.cache.utils import CacheMiss
+from axiestudio.services.variable.constants import CREDENTIAL_TYPE
+from fastapi import status
+
+
+class SourceComponent(Component):
+    display_name = "Source"
+    build_count = 0
+
+    inputs = [MessageTextInput(name="value", display_name="Value")]
+    outputs = [Output(display_name="Text", name="text", method="build_text")]
+
+    def build_text(self) -> Message:
+        type(self).build_count += 1
+        return Message(text=self.value)
+
+
+class SuffixComponent(Component):
+    display_name = "Suffix"
+    build_count = 0
+
+    inputs = [
+        MessageTextInput(name="input_value", display_name="Input"),
+        MessageTextInput(name="suffix", display_name="Suffix"),
+    ]
+    outputs = [Output(display_name="Text", name="text", method="build_text")]
+
+    def build_text(self) -> Message:
+        type(self).build_count += 1
+        return Message(text=f"{self.input_value}{self.suffix}")
+
+
+class KeyedSourceComponent(Component):
+    display_name = "Keyed Source"
+
+    inputs = [SecretStrInput(name="api_key", display_name="API Key")]
+    outputs = [Output(display_name="Text", name="text", method="build_text")]
+
+    def build_text(self) -> Message:
+        return Message(text=self.api_key)
+
+
+@pytest.fixture(autouse=True)
+def _reset_build_counts():
+    SourceComponent.build_count = 0
+    SuffixComponent.build_count = 0
+
+
+class DictCache:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key, CacheMiss())
+
+    async def set(self, key, data):
+        self.data[key] = {"result": data}
+
+
+def _build_graph(value: str, suffix: str) -> Graph:
+    source = SourceComponent(_id="source", value=value)
+    suffix_component = SuffixComponent(_id="suffix", suffix=suffix)
+    suffix_component.set(input_value=source.build_text)
+    graph = Graph(source, suffix_component)
+    graph.prepare()
+    return graph
+
+
+async def _build(graph: Graph, cache: DictCache) -> None:
+    for vertex_id in ("source", "suffix"):
+        await graph.build_vertex(vertex_id, get_cache=cache.get, set_cache=cache.set)
+
+
+async def test_only_edited_vertex_and_descendants_are_rebuilt():
+    cache = DictCache()
+    first = _build_graph("hello", "!")
+    first.plan_incremental_build({})
+    await _build(first, cache)
+
+    graph = _build_graph("hello", "?")
+    assert graph.plan_incremental_build(first.vertex_fingerprints) == {"source"}
+    await _build(graph, cache)
+
+    assert SourceComponent.build_count == 1
+    assert SuffixComponent.build_count == 2
+    assert graph.get_vertex("source").result.used_frozen_result
+    assert graph.get_vertex("suffix").results["text"].text == "hello?"
+
+
+async def test_upstream_edit_marks_descendants_dirty():
+    first = _build_graph("hello", "!")
+    first.compute_vertex_fingerprints()
+
+    graph = _build_graph("world", "!")
+
+    assert graph.plan_incremental_build(first.vertex_fingerprints) == set()
+
+
+async def test_unchanged_flow_is_run_again():
+    first = _build_graph("hello", "!")
+    first.compute_vertex_fingerprints()
+
+    graph = _build_graph("hello", "!")
+
+    assert graph.plan_incremental_build(first.vertex_fingerprints) == set()
+
+
+async def test_stale_cached_result_is_not_reused():
+    cache = DictCache()
+    first = _build_graph("hello", "!")
+    first.plan_incremental_build({})
+    await _build(first, cache)
+    # Another configuration of the source overwrote its cached result
+    (source_key,) = (key for key in cache.data if key.endswith(":source"))
+    cache.data[source_key]["result"]["fingerprint"] = "stale"
+
+    graph = _build_graph("hello", "?")
+    graph.plan_incremental_build(first.vertex_fingerprints)
+    await _build(graph, cache)
+
+    assert SourceComponent.build_count == 2
+    assert "suffix" not in graph.reusable_vertices
+
+
+async def test_results_are_not_reused_across_flows():
+    cache = DictCache()
+    first = _build_graph("hello", "!")
+    first.flow_id = "first-flow"
+    first.plan_incremental_build({})
+    await _build(first, cache)
+
+    # A copy of the flow has the same vertex ids, and the same source configuration
+    graph = _build_graph("hello", "?")
+    graph.flow_id = "copied-flow"
+    assert graph.plan_incremental_build(first.vertex_fingerprints) == {"source"}
+    await _build(graph, cache)
+
+    assert SourceComponent.build_count == 2
+    assert not graph.get_vertex("source").result.used_frozen_result
+
+
+def _build_keyed_graph(suffix: str) -> Graph:
+    source = KeyedSourceComponent(_id="source", api_key="API_KEY")
+    suffix_component = SuffixComponent(_id="suffix", suffix=suffix)
+    suffix_component.set(input_value=source.build_text)
+    graph = Graph(source, suffix_component)
+    # As in flows saved by the frontend, the field loads the API_KEY variable
+    source_vertex = graph.get_vertex("source")
+    source_vertex.data["node"]["template"]["api_key"]["load_from_db"] = True
+    source_vertex.build_params()
+    graph.prepare()
+    return graph
+
+
+async def test_variable_edit_marks_vertex_dirty():
+    first = _build_keyed_graph("!")
+    first.compute_vertex_fingerprints({"API_KEY": "first key"})
+
+    graph = _build_keyed_graph("?")
+    assert graph.plan_incremental_build(first.vertex_fingerprints, variables={"API_KEY": "first key"}) == {"source"}
+
+    graph = _build_keyed_graph("?")
+    assert graph.plan_incremental_build(first.vertex_fingerprints, variables={"API_KEY": "second key"}) == set()
+
+
+async def test_vertex_with_unknown_variable_is_rebuilt():
+    first = _build_keyed_graph("!")
+    first.compute_vertex_fingerprints({"API_KEY": "first key"})
+
+    graph = _build_keyed_graph("?")
+
+    assert graph.plan_incremental_build(first.vertex_fingerprints) == set()
+
+
+async def test_variable_values_are_loaded_for_the_user(client, logged_in_headers, active_user):
+    variable = {"name": "API_KEY", "value": "first key", "type": CREDENTIAL_TYPE, "default_fields": []}
+    response = await client.post("api/v1/variables/", json=variable, headers=logged_in_headers)
+    assert response.status_code == status.HTTP_201_CREATED
+
+    graph = _build_keyed_graph("!")
+
+    assert await graph.get_variable_values(str(active_user.id)) == {"API_KEY": "first key"}
+    assert await graph.get_variable_values(str(uuid4())) == {"API_KEY": None}
@@ -0,0 +1,101 @@
+import pytest
+from axiestudio.components.input_output import ChatOutput, TextInputComponent
+from axiestudio.custom.custom_component.component import Component
+from axiestudio.graph import Graph
+from axiestudio.graph.vertex.fingerprint import UnfingerprintableValueError, fingerprint_value
+from axiestudio.io import MessageTextInput, Output
+from axiestudio.schema.message import Message
+from axiestudio.services.deps import get_vertex_cache_service
+
+
+class UppercaseComponent(Component):
+    display_name = "Uppercase"
+    deterministic = True
+    build_count = 0
+
+    inputs = [MessageTextInput(name="input_value", display_name="Input")]
+    outputs = [Output(display_name="Text", name="text", method="build_text")]
+
+    def build_text(self) -> Message:
+        type(self).build_count += 1
+        return Message(text=str(self.input_value).upper())
+
+
+@pytest.fixture(autouse=True)
+def _clear_vertex_cache():
+    UppercaseComponent.build_count = 0
+    get_vertex_cache_service().clear()
+    yield
+    get_vertex_cache_service().clear()
+
+
+def _build_graph(text: str, user_id: str | None = None) -> Graph:
+    text_input = TextInputComponent(_id="text_input", input_value=text)
+    uppercase = UppercaseComponent(_id="uppercase")
+    uppercase.set(input_value=text_input.text_response)
+    chat_output = ChatOutput(_id="chat_output", should_store_message=False)
+    chat_output.set(input_value=uppercase.build_text)
+    return Graph(text_input, chat_output, user_id=user_id)
+
+
+async def _run(graph: Graph) -> list:
+    return [result async for result in graph.async_start()]
+
+
+async def test_deterministic_component_is_memoized_across_runs():
+    await _run(_build_graph("hello"))
+    graph = _build_graph("hello")
+    await _run(graph)
+
+    assert UppercaseComponent.build_count == 1
+    vertex = graph.get_vertex("uppercase")
+    assert vertex.result.used_frozen_result
+    assert vertex.results["text"].text == "HELLO"
+
+
+async def test_changed_upstream_result_invalidates_memoized_result():
+    await _run(_build_graph("hello"))
+    graph = _build_graph("world")
+    await _run(graph)
+
+    assert UppercaseComponent.build_count == 2
+    assert graph.get_vertex("uppercase").results["text"].text == "WORLD"
+
+
+async def test_memoized_result_is_not_shared_between_builds():
+    first = _build_graph("hello")
+    await _run(first)
+    first.get_vertex("uppercase").results["text"].text = "changed"
+    second = _build_graph("hello")
+    await _run(second)
+
+    assert UppercaseComponent.build_count == 1
+    assert second.get_vertex("uppercase").results["text"].text == "HELLO"
+
+
+async def test_memoized_result_is_not_shared_between_users():
+    await _run(_build_graph("hello", user_id="first-user"))
+    await _run(_build_graph("hello", user_id="second-user"))
+
+    assert UppercaseComponent.build_count == 2
+
+
+def test_fingerprint_ignores_message_timestamps():
+    first = Message(text="hello", sender="User", sender_name="User", timestamp="2024-01-01 00:00:00 UTC")
+    second = Message(text="hello", sender="User", sender_name="User", timestamp="2025-01-01 00:00:00 UTC")
+
+    assert fingerprint_value(first) == fingerprint_value(second)
+    assert fingerprint_value(first) != fingerprint_value(Message(text="other", sender="User", sender_name="User"))
+
+
+def test_fingerprint_rejects_streams():
+    with pytest.raises(UnfingerprintableValueError):
+        fingerprint_value(iter(["a", "b"]))
+
+
+def test_strict_fingerprint_rejects_values_without_serialized_form():
+    value = {"client": object()}
+
+    assert fingerprint_value(value)
+    with pytest.raises(UnfingerprintableValueError):
+        fingerprint_value(value, strict=True)
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+from axiestudio.graph.graph.scheduler import run_vertices
+
+
+async def test_run_vertices_limits_concurrency_and_queues_each_vertex_once():
+    branches = [f"branch-{i}" for i in range(10)]
+    built = []
+    running = 0
+    max_running = 0
+
+    async def build(vertex_id: str) -> list[str]:
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        built.append(vertex_id)
+        # Each branch is reported twice, as by two predecessors finishing together
+        return [*branches, *branches] if vertex_id == "root" else []
+
+    await run_vertices(["root"], build, max_concurrency=3)
+
+    assert max_running == 3
+    assert built[0] == "root"
+    assert sorted(built[1:]) == sorted(branches)
+
+
+async def test_run_vertices_cancels_the_other_builds_on_failure():
+    cancelled = []
+
+    async def build(vertex_id: str) -> list[str]:
+        if vertex_id == "failing":
+            await asyncio.sleep(0.01)
+            msg = "Build failed"
+            raise ValueError(msg)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(vertex_id)
+            raise
+        return []
+
+    with pytest.raises(ValueError, match="Build failed"):
+        await run_vertices(["slow-1", "failing", "slow-2"], build)
+
+    assert sorted(cancelled) == ["slow-1", "slow-2"]
+
+
+async def test_run_vertices_cancellation_reaches_every_build():
+    started = asyncio.Event()
+    cancelled = []
+
+    async def build(vertex_id: str) -> list[str]:
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(vertex_id)
+            raise
+        return []
+
+    task = asyncio.create_task(run_vertices(["a", "b"], build))
+    await started.wait()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert sorted(cancelled) == ["a", "b"]
@@ -0,0 +1,107 @@
+import asyncio
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import orjson
+import pytest
+from axiestudio.helpers.flow_import import FlowExport, FlowImportError, UniqueNames, import_flows
+
+
+class _AsyncFile:
+    def __init__(self, data: bytes) -> None:
+        self._file = io.BytesIO(data)
+
+    async def read(self, size: int = -1) -> bytes:
+        return self._file.read(size)
+
+
+async def _read(export: dict, chunk_size: int = 7) -> tuple[dict, list[dict]]:
+    reader = await FlowExport.open(_AsyncFile(orjson.dumps(export, option=orjson.OPT_INDENT_2)), chunk_size=chunk_size)
+    flows = [flow async for flow in reader.flows()]
+    return reader.metadata, flows
+
+
+async def test_export_is_read_incrementally():
+    flows = [{"name": f"Flow {i}", "data": {"nodes": [], "edges": [], "x": 12345.678}} for i in range(3)]
+
+    metadata, read_flows = await _read({"folder_name": "Project", "flows": flows, "folder_description": "é"})
+
+    assert read_flows == flows
+    assert metadata == {"folder_name": "Project", "folder_description": "é"}
+
+
+async def test_export_of_a_single_flow():
+    flow = {"name": "Flow", "data": {"nodes": [], "edges": []}, "locked": 10}
+
+    assert await _read(flow) == (flow, [flow])
+    assert await _read({"flows": []}) == ({}, [])
+
+
+@pytest.mark.parametrize("content", [b"[]", b'{"flows": [1]}', b'{"flows": [{"name": "a"}'])
+async def test_invalid_export(content: bytes):
+    with pytest.raises(ValueError, match="JSON"):  # noqa: PT012
+        reader = await FlowExport.open(_AsyncFile(content))
+        [flow async for flow in reader.flows()]
+
+
+def test_unique_names_take_the_first_free_suffix():
+    names = UniqueNames({"Flow", "Flow (1)", "Flow (3)"})
+
+    assert [names.claim(name) for name in ["Flow", "Flow", "Flow", "Other", "Other"]] == [
+        "Flow (2)",
+        "Flow (4)",
+        "Flow (5)",
+        "Other",
+        "Other (1)",
+    ]
+    endpoint_names = UniqueNames({"chat"}, pattern="{name}-{n}")
+    assert endpoint_names.claim("chat") == "chat-1"
+
+
+async def _flows(flows: list[dict]):
+    for flow in flows:
+        yield flow
+
+
+async def test_import_flows_in_batches(active_user):
+    flows = [{"name": "Imported", "endpoint_name": "imported", "data": {"nodes": [], "edges": []}} for _ in range(5)]
+    progress = []
+
+    result = await import_flows(
+        _flows(flows), user_id=active_user.id, batch_size=2, on_progress=lambda p: progress.append(p.imported)
+    )
+
+    assert [flow.name for flow in result.flows] == [
+        "Imported",
+        "Imported (1)",
+        "Imported (2)",
+        "Imported (3)",
+        "Imported (4)",
+    ]
+    assert [flow.endpoint_name for flow in result.flows][:2] == ["imported", "imported-1"]
+    assert progress == [2, 4, 5]
+    assert result.progress.renamed == 4
+
+
+async def test_import_stops_at_an_invalid_graph(active_user):
+    flows = [{"name": f"Graph {i}", "data": {"nodes": [], "edges": []}} for i in range(2)]
+    flows.append({"name": "Broken", "data": {"nodes": []}})
+
+    with ThreadPoolExecutor() as executor, pytest.raises(FlowImportError, match="Flow 3 \\(Broken\\)") as exc_info:
+        await import_flows(_flows(flows), user_id=active_user.id, batch_size=2, validate_graphs=True, executor=executor)
+    assert exc_info.value.imported == 2
+
+
+async def test_import_stops_when_writing_fails(active_user):
+    flows = [{"name": f"Flow {i}", "data": {"nodes": [], "edges": []}} for i in range(10)]
+
+    def fail(progress):
+        if progress.imported == 2:
+            msg = "The database is unavailable"
+            raise RuntimeError(msg)
+
+    # The validated batches fill the queue while the writes fail
+    with pytest.raises(RuntimeError, match="unavailable"):
+        await asyncio.wait_for(
+            import_flows(_flows(flows), user_id=active_user.id, batch_size=1, on_progress=fail), timeout=10
+        )
@@ -1,6 +1,7 @@
 import math
 from datetime import datetime, timezone
 from typing import Any
+from unittest.mock import patch
 
 import numpy as np
 import pandas as pd
@@ -10,6 +11,7 @@ from langchain_core.documents import Document
 from axiestudio.serialization.constants import MAX_ITEMS_LENGTH, MAX_TEXT_LENGTH
 from axiestudio.serialization.serialization import serialize, serialize_or_str
 from pydantic import BaseModel as PydanticBaseModel
+from pydantic import Field, field_serializer
 from pydantic.v1 import BaseModel as PydanticV1BaseModel
 
 # Comprehensive hypothesis strategies
@@ -342,3 +344,32 @@ class TestSerializationHypothesis:
         assert isinstance(result, dict)
         assert len(result) == MAX_ITEMS_LENGTH
         assert all(isinstance(v, int) for v in result.values())
+
+    def test_pydantic_models_are_truncated_without_being_dumped(self) -> None:
+        """Test that the fields of a model are truncated as they are walked, without a full model_dump."""
+
+        class Large(PydanticBaseModel):
+            text: str
+            rows: list[dict]
+
+        model = Large(text="x" * 1000, rows=[{"value": i} for i in range(1000)])
+        with patch.object(Large, "model_dump", side_effect=AssertionError("model_dump was called")):
+            result = serialize(model, max_length=30, max_items=2)
+
+        assert result == {
+            "text": "x" * 30 + "...",
+            "rows": [{"value": 0}, {"value": 1}, "... [truncated 998 items]"],
+        }
+
+    def test_pydantic_field_serializers_are_applied(self) -> None:
+        """Test that fields with a serializer are still serialized by pydantic."""
+
+        class WithSerializer(PydanticBaseModel):
+            name: str
+            hidden: str = Field(default="secret", exclude=True)
+
+            @field_serializer("name")
+            def serialize_name(self, value: str) -> str:
+                return value.upper()
+
+        assert serialize(WithSerializer(name="flow")) == {"name": "FLOW"}
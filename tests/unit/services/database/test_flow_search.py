@@ -0,0 +1,93 @@
+from uuid import uuid4
+
+import pytest
+from axiestudio.services.database.models.flow.model import Flow
+from axiestudio.services.database.models.flow_search.crud import (
+    delete_flow_search_document,
+    extract_search_text,
+    index_flow,
+    search_flows,
+)
+from axiestudio.services.database.models.flow_search.model import SQLITE_FTS_DROP
+from fastapi_pagination import Params
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+
+@pytest.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+
+def _node(component_type: str, prompt: str | None = None) -> dict:
+    template = {"template": {"type": "prompt", "value": prompt}} if prompt else {}
+    return {"data": {"type": component_type, "node": {"display_name": component_type, "template": template}}}
+
+
+async def _add_flow(session: AsyncSession, user_id, name: str, nodes: list[dict] | None = None, **kwargs) -> Flow:
+    flow = Flow(id=uuid4(), name=name, user_id=user_id, data={"nodes": nodes or [], "edges": []}, **kwargs)
+    session.add(flow)
+    await index_flow(session, flow)
+    await session.commit()
+    return flow
+
+
+async def _search(session: AsyncSession, user_id, query: str) -> list[str]:
+    page = await search_flows(session, query, user_id=user_id, params=Params(page=1, size=50))
+    return [result.name for result in page.items]
+
+
+def test_extract_search_text_includes_components_and_prompts():
+    flow = Flow(name="Support", tags=["chat"], data={"nodes": [_node("OpenAIModel"), _node("Prompt", "Be polite")]})
+
+    text = extract_search_text(flow)
+
+    assert text["components"] == "OpenAIModel Prompt"
+    assert text["prompts"] == "Be polite"
+    assert text["tags"] == "chat"
+
+
+async def test_search_ranks_names_above_prompts_and_matches_prefixes(session: AsyncSession):
+    user_id = uuid4()
+    await _add_flow(session, user_id, "Translator", [_node("Prompt", "Summarize the document")])
+    await _add_flow(session, user_id, "Document summarizer")
+    await _add_flow(session, user_id, "Unrelated")
+    await _add_flow(session, uuid4(), "Document summarizer of another user")
+
+    assert await _search(session, user_id, "summar") == ["Document summarizer", "Translator"]
+    assert await _search(session, user_id, "summarize document") == ["Document summarizer", "Translator"]
+    assert await _search(session, user_id, "openai") == []
+
+
+async def test_search_follows_updates_and_deletes(session: AsyncSession):
+    user_id = uuid4()
+    flow = await _add_flow(session, user_id, "Agent")
+
+    flow.name = "Research agent"
+    flow.data = {"nodes": [_node("ArxivSearch")], "edges": []}
+    await index_flow(session, flow)
+    await session.commit()
+    assert await _search(session, user_id, "arxiv") == ["Research agent"]
+
+    await delete_flow_search_document(session, flow.id)
+    await session.commit()
+    assert await _search(session, user_id, "research") == []
+
+
+async def test_search_without_full_text_index(session: AsyncSession):
+    user_id = uuid4()
+    connection = await session.connection()
+    for statement in SQLITE_FTS_DROP:
+        await connection.exec_driver_sql(statement)
+    await _add_flow(session, user_id, "Memory chatbot", [_node("Memory")])
+    await _add_flow(session, user_id, "Vector store RAG")
+
+    assert await _search(session, user_id, "CHAT memory") == ["Memory chatbot"]
+    # An empty search lists every flow
+    assert sorted(await _search(session, user_id, "")) == ["Memory chatbot", "Vector store RAG"]
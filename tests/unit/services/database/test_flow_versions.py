@@ -0,0 +1,112 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+from axiestudio.services.database.models.flow.model import Flow
+from axiestudio.services.database.models.flow_version.crud import (
+    delete_flow_versions,
+    get_flow_version_data,
+    get_flow_versions,
+    save_flow_version,
+)
+from axiestudio.services.database.models.flow_version.model import FlowPayload
+from axiestudio.services.deps import get_settings_service
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+
+@pytest.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+
+def _flow(data: dict) -> Flow:
+    return Flow(id=uuid4(), name=f"Flow {uuid4()}", data=data)
+
+
+async def test_versions_are_only_recorded_when_the_data_changes(session: AsyncSession):
+    flow = _flow({"nodes": [], "edges": []})
+    session.add(flow)
+    await save_flow_version(session, flow)
+    await session.commit()
+
+    # Same content with another key order is the same version
+    flow.data = {"edges": [], "nodes": []}
+    await save_flow_version(session, flow)
+    flow.data = {"nodes": [{"id": "a"}], "edges": []}
+    await save_flow_version(session, flow)
+    await session.commit()
+
+    versions = await get_flow_versions(session, flow.id)
+    assert [version.version for version in versions] == [2, 1]
+    assert flow.version == 2
+    assert await get_flow_version_data(session, flow.id, 1) == {"nodes": [], "edges": []}
+    assert await get_flow_version_data(session, flow.id, 3) is None
+
+
+async def test_flows_with_the_same_data_share_the_payload(session: AsyncSession):
+    data = {"nodes": [{"id": "a", "data": "x" * 1000}], "edges": []}
+    flows = [_flow(dict(data)), _flow(dict(data))]
+    for flow in flows:
+        session.add(flow)
+        await save_flow_version(session, flow)
+    await session.commit()
+
+    payloads = (await session.exec(select(FlowPayload))).all()
+    assert len(payloads) == 1
+    # Payloads are stored compressed
+    assert len(payloads[0].data) < payloads[0].size
+
+    await delete_flow_versions(session, flows[0].id)
+    await session.commit()
+    assert len((await session.exec(select(FlowPayload))).all()) == 1
+
+    await delete_flow_versions(session, flows[1].id)
+    await session.commit()
+    assert (await session.exec(select(FlowPayload))).all() == []
+
+
+async def test_concurrent_saves_get_their_own_versions(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'versions.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    flow = _flow({"nodes": [], "edges": []})
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        session.add(flow)
+        await save_flow_version(session, flow)
+        await session.commit()
+
+    async def save(node_id: str) -> None:
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            db_flow = await session.get(Flow, flow.id)
+            db_flow.data = {"nodes": [{"id": node_id}], "edges": []}
+            await save_flow_version(session, db_flow)
+            # Both saves are in flight before either commits
+            await asyncio.sleep(0.05)
+            await session.commit()
+
+    try:
+        await asyncio.gather(save("a"), save("b"))
+        async with AsyncSession(engine) as session:
+            assert [version.version for version in await get_flow_versions(session, flow.id)] == [3, 2, 1]
+    finally:
+        await engine.dispose()
+
+
+async def test_old_versions_are_deleted(session: AsyncSession, monkeypatch):
+    monkeypatch.setattr(get_settings_service().settings, "max_flow_versions_per_flow", 2)
+    flow = _flow({"nodes": [], "edges": []})
+    session.add(flow)
+    for node_id in ("a", "b", "c"):
+        flow.data = {"nodes": [{"id": node_id}], "edges": []}
+        await save_flow_version(session, flow)
+        await session.commit()
+
+    assert [version.version for version in await get_flow_versions(session, flow.id)] == [3, 2]
+    assert len((await session.exec(select(FlowPayload))).all()) == 2
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+from axiestudio.services.database.service import DatabaseService
+from axiestudio.services.deps import get_settings_service
+from sqlmodel import text
+
+
+@pytest.fixture
+async def db_service(tmp_path, monkeypatch):
+    settings_service = get_settings_service()
+    monkeypatch.setattr(settings_service.settings, "database_url", f"sqlite:///{tmp_path / 'pool.db'}")
+    monkeypatch.setattr(settings_service.settings, "database_connection_retry", False)
+    monkeypatch.setattr(settings_service.settings, "db_session_idle_timeout", 0.05)
+    service = DatabaseService(settings_service)
+    yield service
+    service._close_pool_monitors()
+    await service.engine.dispose()
+
+
+async def _query(db_service: DatabaseService):
+    async with db_service.with_session() as session:
+        await session.exec(text("SELECT 1"))
+        return session
+
+
+async def test_sessions_following_each_other_share_a_connection(db_service):
+    async with db_service.unit_of_work() as unit:
+        first = await _query(db_service)
+        second = await _query(db_service)
+
+        assert first is second
+        assert unit.reuses == 1
+        assert db_service.pool_monitor.checkouts == 1
+        assert db_service.pool_monitor.in_use == 1
+
+    assert db_service.pool_monitor.in_use == 0
+
+
+async def test_concurrent_sessions_do_not_share_a_connection(db_service):
+    async with db_service.unit_of_work(), db_service.with_session() as outer:
+        await outer.exec(text("SELECT 1"))
+        inner = await _query(db_service)
+
+        assert inner is not outer
+        assert db_service.pool_monitor.checkouts == 2
+        assert db_service.pool_monitor.max_in_use == 2
+
+
+async def test_idle_unit_gives_its_connection_back(db_service):
+    async with db_service.unit_of_work():
+        await _query(db_service)
+        assert db_service.pool_monitor.in_use == 1
+
+        # A run waiting on a model holds no connection
+        await asyncio.sleep(0.2)
+        assert db_service.pool_monitor.in_use == 0
+
+        await _query(db_service)
+        assert db_service.pool_monitor.checkouts == 2
+
+
+async def test_failed_session_is_not_reused(db_service):
+    sessions = []
+
+    async def fail():
+        async with db_service.with_session() as session:
+            sessions.append(session)
+            await session.exec(text("SELECT 1"))
+            msg = "failed"
+            raise ValueError(msg)
+
+    async with db_service.unit_of_work():
+        with pytest.raises(ValueError, match="failed"):
+            await fail()
+
+        assert db_service.pool_monitor.in_use == 0
+        assert await _query(db_service) is not sessions[0]
+
+
+async def test_pool_stats_without_unit(db_service, monkeypatch):
+    monkeypatch.setattr(db_service.pool_monitor, "long_held_threshold", 0.01)
+    async with db_service.with_session() as session:
+        await session.exec(text("SELECT 1"))
+        await asyncio.sleep(0.05)
+    await _query(db_service)
+
+    stats = db_service.get_pool_stats()
+
+    assert set(stats) == {"primary"}
+    assert stats["primary"]["checkouts"] == 2
+    assert stats["primary"]["in_use"] == 0
+    assert stats["primary"]["long_held"] == 1
@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+import pytest
+from axiestudio.services.job_queue.event_log import EventLog
+from axiestudio.services.job_queue.service import JobQueueService
+
+
+def _event(index: int) -> tuple[str, bytes, float]:
+    return f"event-{index}", f'{{"event": "token", "data": {index}}}\n\n'.encode(), time.time()
+
+
+async def _read_all(event_log: EventLog, cursor: int = 0) -> list[int]:
+    return [seq async for seq, _, _, _ in event_log.read(cursor)]
+
+
+async def test_consumers_replay_events_after_their_cursor():
+    event_log = EventLog()
+    for index in range(3):
+        event_log.put_nowait(_event(index))
+
+    readers = [asyncio.create_task(_read_all(event_log)), asyncio.create_task(_read_all(event_log, 2))]
+    await asyncio.sleep(0)
+    await event_log.put(_event(3))
+    await event_log.put((None, None, time.time()))
+
+    assert await asyncio.gather(*readers) == [[1, 2, 3, 4], [3, 4]]
+    # The events are kept after they were read and after the log was closed
+    assert [seq for seq, _, _, _ in event_log.events_after(0)] == [1, 2, 3, 4]
+    assert await _read_all(event_log, 4) == []
+
+
+async def test_events_sent_from_threads_wake_consumers():
+    event_log = EventLog()
+    reader = asyncio.create_task(_read_all(event_log))
+    await asyncio.sleep(0)
+
+    def send():
+        event_log.put_nowait(_event(0))
+        event_log.put_nowait((None, None, time.time()))
+
+    await asyncio.to_thread(send)
+    assert await asyncio.wait_for(reader, timeout=1) == [1]
+
+
+async def test_the_log_is_bounded():
+    event_log = EventLog(max_events=10)
+    for index in range(100):
+        event_log.put_nowait(_event(index))
+
+    events = event_log.events_after(0)
+    assert len(events) <= 11
+    assert events[-1][0] == 100
+    assert event_log.first_seq == events[0][0]
+    assert [seq for seq, _, _, _ in event_log.events_after(97)] == [98, 99, 100]
+
+
+async def test_failed_jobs_close_their_log():
+    service = JobQueueService()
+    event_log, _ = service.create_queue("job")
+
+    async def fail():
+        msg = "boom"
+        raise ValueError(msg)
+
+    service.start_job("job", fail())
+    _, _, task, _ = service.get_queue_data("job")
+    with pytest.raises(ValueError, match="boom"):
+        await task
+    await asyncio.sleep(0)
+
+    assert event_log.closed
+    assert await asyncio.wait_for(_read_all(event_log), timeout=1) == []
@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+
+import pytest
+from axiestudio.services.state.service import InMemoryStateService, SharedStateService
+
+
+def _settings_service(config_dir, state_expire=3600):
+    return SimpleNamespace(settings=SimpleNamespace(state_expire=state_expire, config_dir=str(config_dir)))
+
+
+@pytest.fixture(params=["memory", "shared"])
+async def service(request, tmp_path):
+    service_class = InMemoryStateService if request.param == "memory" else SharedStateService
+    service = service_class(_settings_service(tmp_path))
+    yield service
+    await service.teardown()
+
+
+def test_state_is_scoped_to_the_run(service):
+    service.update_state("answer", "a", run_id="run-1")
+    service.append_state("history", "first", run_id="run-1")
+    service.append_state("history", "second", run_id="run-1")
+
+    assert service.get_state("answer", run_id="run-1") == "a"
+    assert service.get_state("history", run_id="run-1") == ["first", "second"]
+    assert service.get_state("answer", run_id="run-2") == ""
+
+
+def test_observers_are_scoped_to_the_run(service):
+    calls = []
+
+    def observer(key, new_state, *, append):
+        calls.append((key, new_state, append))
+        # Observers may read the state they are notified about
+        assert service.get_state(key, run_id="run-1") is not None
+
+    service.subscribe("answer", observer, run_id="run-1")
+    service.update_state("answer", "ignored", run_id="run-2")
+    service.update_state("answer", "a", run_id="run-1")
+    service.append_state("answer", "b", run_id="run-1")
+    service.unsubscribe("answer", observer, run_id="run-1")
+    service.update_state("answer", "c", run_id="run-1")
+
+    assert calls == [("answer", "a", False), ("answer", "b", True)]
+
+
+def test_end_run_frees_the_run_state(service):
+    service.update_state("answer", "a", run_id="run-1")
+    service.update_state("answer", "b", run_id="run-2")
+
+    service.end_run("run-1")
+
+    assert "run-1" not in service.runs
+    assert service.get_state("answer", run_id="run-1") == ""
+    assert service.get_state("answer", run_id="run-2") == "b"
+
+
+def test_unfinished_runs_expire(tmp_path, monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr("axiestudio.services.state.service.time.monotonic", lambda: now)
+    service = InMemoryStateService(_settings_service(tmp_path, state_expire=60))
+    service.update_state("answer", "a", run_id="abandoned")
+
+    now += 61
+    service.update_state("answer", "b", run_id="active")
+
+    assert set(service.runs) == {"active"}
+
+
+async def test_shared_state_is_visible_to_other_workers(tmp_path):
+    worker_1 = SharedStateService(_settings_service(tmp_path))
+    worker_2 = SharedStateService(_settings_service(tmp_path))
+    try:
+        worker_1.append_state("history", "first", run_id="run-1")
+        worker_2.append_state("history", "second", run_id="run-1")
+
+        assert worker_1.get_state("history", run_id="run-1") == ["first", "second"]
+
+        worker_2.end_run("run-1")
+        assert worker_1.get_state("history", run_id="run-1") == ""
+    finally:
+        await worker_1.teardown()
+        await worker_2.teardown()
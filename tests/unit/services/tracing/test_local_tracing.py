@@ -0,0 +1,99 @@
+import uuid
+from unittest.mock import MagicMock
+
+import pytest
+from axiestudio.services.settings.base import Settings
+from axiestudio.services.settings.service import SettingsService
+from axiestudio.services.tracing.local import LocalTraceStore, SamplingPolicy, SpanRecorder
+from axiestudio.services.tracing.service import TracingService
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = LocalTraceStore(tmp_path / "traces.db", flush_interval=0.01)
+    yield store
+    store.close()
+
+
+def test_sampling_policy_keeps_errors_and_slow_runs():
+    policy = SamplingPolicy(sample_rate=0.0, slow_run_threshold=5.0)
+
+    assert policy.keep(head_sampled=False, error=True, duration=0.1) == "error"
+    assert policy.keep(head_sampled=False, error=False, duration=6.0) == "slow"
+    assert policy.keep(head_sampled=True, error=False, duration=0.1) == "sample"
+    assert policy.keep(head_sampled=False, error=False, duration=0.1) is None
+
+
+def test_recorder_stores_the_span_tree_with_token_usage(store: LocalTraceStore):
+    run_id = uuid.uuid4()
+    recorder = SpanRecorder(
+        store, SamplingPolicy(sample_rate=1.0), run_id=run_id, run_name="Flow", user_id="user", session_id="session"
+    )
+    recorder.start_span("vertex-1", "Agent (vertex-1)", "agent", inputs={"input_value": "hi"})
+    handler = recorder.get_langchain_callback("vertex-1")
+
+    message = AIMessage("HI", usage_metadata={"input_tokens": 3, "output_tokens": 2, "total_tokens": 5})
+    model = GenericFakeChatModel(messages=iter([message]))
+
+    def call_model(text: str, config: RunnableConfig) -> str:
+        return model.invoke(text, config).content
+
+    RunnableLambda(call_model).invoke("hi", config={"callbacks": [handler]})
+    recorder.end_span("vertex-1", outputs={"message": "HI"})
+    assert recorder.end({})
+    store.flush()
+
+    run = store.get_run(str(run_id), user_id="user")
+    assert run["sampled_by"] == "sample"
+    assert run["total_tokens"] == 5
+    [vertex] = run["spans"]
+    assert vertex["name"] == "Agent (vertex-1)"
+    assert vertex["outputs"] == {"message": "HI"}
+    [chain] = vertex["children"]
+    assert chain["type"] == "chain"
+    assert chain["latency_ms"] is not None
+    [llm] = chain["children"]
+    assert (llm["type"], llm["prompt_tokens"], llm["completion_tokens"]) == ("llm", 3, 2)
+    assert store.get_run(str(run_id), user_id="another user") is None
+    assert [run["run_id"] for run in store.list_runs(user_id="user")] == [str(run_id)]
+
+
+def test_unsampled_runs_are_not_stored(store: LocalTraceStore):
+    recorder = SpanRecorder(
+        store, SamplingPolicy(sample_rate=0.0), run_id=uuid.uuid4(), run_name="Flow", user_id=None, session_id=None
+    )
+    recorder.start_span("vertex-1", "Component", "chain")
+    recorder.end_span("vertex-1")
+
+    assert not recorder.end({})
+    assert store.list_runs() == []
+
+
+async def test_tracing_service_records_failed_runs(tmp_path):
+    settings = Settings()
+    settings.config_dir = str(tmp_path)
+    settings.deactivate_tracing = False
+    settings.local_tracing = True
+    settings.local_tracing_sample_rate = 0.0
+    tracing_service = TracingService(SettingsService(settings, MagicMock()))
+    component = MagicMock()
+    component._vertex.id = "vertex-1"
+    component.trace_type = "chain"
+    run_id = uuid.uuid4()
+
+    await tracing_service.start_tracers(run_id, "Flow - 1", "user", "session")
+    with pytest.raises(ValueError, match="boom"):  # noqa: PT012
+        async with tracing_service.trace_component(component, "Component (vertex-1)", {"api_key": "secret"}):
+            msg = "boom"
+            raise ValueError(msg)
+    await tracing_service.end_tracers({}, ValueError("boom"))
+    await tracing_service.teardown()
+
+    run = tracing_service.local_trace_store.get_run(str(run_id))
+    assert (run["status"], run["sampled_by"], run["error"]) == ("error", "error", "boom")
+    [span] = run["spans"]
+    assert span["status"] == "error"
+    assert span["inputs"] == {"api_key": "*****"}
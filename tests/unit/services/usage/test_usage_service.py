@@ -0,0 +1,176 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+from axiestudio.components.input_output import ChatOutput, TextInputComponent
+from axiestudio.custom.custom_component.component import Component
+from axiestudio.graph import Graph
+from axiestudio.io import MessageTextInput, Output
+from axiestudio.schema.message import Message
+from axiestudio.services.settings.base import Settings
+from axiestudio.services.settings.service import SettingsService
+from axiestudio.services.usage import service as usage_service_module
+from axiestudio.services.usage.accounting import (
+    RunUsage,
+    account_vertex,
+    api_key_id_var,
+    get_usage_callback,
+    record_bytes_read,
+    record_tokens,
+)
+from axiestudio.services.usage.service import RunQuotaExceededError, UsageService
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+
+@pytest.fixture
+def usage_service():
+    settings = Settings()
+    settings.max_run_duration = 0
+    settings.max_run_tokens = 0
+    settings.max_concurrent_runs_per_user = 0
+    return UsageService(SettingsService(settings, MagicMock()))
+
+
+def _fake_model(tokens: int) -> GenericFakeChatModel:
+    message = AIMessage("Hi", usage_metadata={"input_tokens": tokens - 1, "output_tokens": 1, "total_tokens": tokens})
+    return GenericFakeChatModel(messages=iter([message]))
+
+
+async def test_track_run_measures_vertices_and_aggregates_usage(usage_service: UsageService):
+    async def run() -> str:
+        with account_vertex("model") as usage:
+            await usage.meter(_fake_model(5).ainvoke("Hello", config={"callbacks": [get_usage_callback()]}))
+            record_bytes_read(100)
+        return "done"
+
+    token = api_key_id_var.set("api-key")
+    try:
+        run_usage = RunUsage(run_id="run", user_id="user", flow_id="flow")
+    finally:
+        api_key_id_var.reset(token)
+
+    assert await usage_service.track_run(run_usage, run()) == "done"
+
+    assert (run_usage.tokens, run_usage.bytes_read) == (5, 100)
+    assert run_usage.wall_time > 0
+    vertex_usage = run_usage.vertices["model"]
+    assert (vertex_usage.tokens, vertex_usage.bytes_read) == (5, 100)
+    assert vertex_usage.cpu_time > 0
+    assert run_usage.cpu_time == vertex_usage.cpu_time
+    usage = usage_service.get_usage("user")
+    assert usage["active_runs"] == 0
+    assert usage["totals"]["runs"] == 1
+    assert usage["flows"]["flow"]["tokens"] == 5
+    assert usage["api_keys"]["api-key"]["bytes_read"] == 100
+    assert [run["run_id"] for run in usage["recent_runs"]] == ["run"]
+    assert usage_service.get_usage("another user")["totals"]["runs"] == 0
+
+
+async def test_run_using_too_many_tokens_is_cancelled(usage_service: UsageService):
+    usage_service.settings_service.settings.max_run_tokens = 10
+    cancelled = asyncio.Event()
+
+    async def run() -> None:
+        record_tokens(11)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    run_usage = RunUsage(user_id="user")
+    with pytest.raises(RunQuotaExceededError, match="more than 10 tokens") as exc_info:
+        await usage_service.track_run(run_usage, run())
+
+    assert exc_info.value.quota == "max_run_tokens"
+    assert cancelled.is_set()
+    assert usage_service.get_usage("user")["totals"]["stopped_runs"] == 1
+
+
+async def test_run_taking_too_long_is_cancelled(usage_service: UsageService):
+    usage_service.settings_service.settings.max_run_duration = 0.05
+
+    with pytest.raises(RunQuotaExceededError, match="0.05 seconds") as exc_info:
+        await usage_service.track_run(RunUsage(user_id="user"), asyncio.sleep(10))
+
+    assert exc_info.value.quota == "max_run_duration"
+
+
+async def test_timeout_raised_by_the_run_is_not_a_quota(usage_service: UsageService):
+    usage_service.settings_service.settings.max_run_duration = 10
+
+    async def run() -> None:
+        await asyncio.wait_for(asyncio.sleep(10), timeout=0.01)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await usage_service.track_run(RunUsage(user_id="user"), run())
+
+
+async def test_concurrent_runs_per_user_are_limited(usage_service: UsageService):
+    usage_service.settings_service.settings.max_concurrent_runs_per_user = 1
+    release = asyncio.Event()
+
+    async def subflow() -> str:
+        return "subflow"
+
+    async def run() -> str:
+        # A run started by a run is part of it, not another run of the user
+        assert await usage_service.track_run(RunUsage(user_id="user"), subflow()) == "subflow"
+        await release.wait()
+        return "done"
+
+    first_run = asyncio.create_task(usage_service.track_run(RunUsage(user_id="user"), run()))
+    await asyncio.sleep(0)
+
+    with pytest.raises(RunQuotaExceededError) as exc_info:
+        await usage_service.track_run(RunUsage(user_id="user"), run())
+    assert exc_info.value.quota == "max_concurrent_runs_per_user"
+    assert await usage_service.track_run(RunUsage(user_id="another user"), subflow()) == "subflow"
+
+    release.set()
+    assert await first_run == "done"
+    assert usage_service.active_runs == {}
+    assert usage_service.get_usage("user")["totals"]["runs"] == 1
+
+
+async def test_totals_of_least_recently_used_flows_are_dropped(monkeypatch):
+    monkeypatch.setattr(usage_service_module, "MAX_TRACKED_TOTALS", 2)
+    usage_service = UsageService(SettingsService(Settings(), MagicMock()))
+
+    async def run() -> str:
+        return "done"
+
+    for flow_id in ("first", "second", "first", "third"):
+        await usage_service.track_run(RunUsage(user_id="user", flow_id=flow_id), run())
+
+    usage = usage_service.get_usage("user")
+    assert usage["flows"].keys() == {"first", "third"}
+    assert usage["totals"]["runs"] == 4
+
+
+class ModelComponent(Component):
+    display_name = "Model"
+
+    inputs = [MessageTextInput(name="input_value", display_name="Input")]
+    outputs = [Output(display_name="Text", name="text", method="build_text")]
+
+    async def build_text(self) -> Message:
+        response = await _fake_model(7).ainvoke(self.input_value, config={"callbacks": self.get_langchain_callbacks()})
+        return Message(text=response.content)
+
+
+async def test_graph_run_accounts_usage_by_vertex():
+    text_input = TextInputComponent(_id="text_input", input_value="Hello")
+    model = ModelComponent(_id="model")
+    model.set(input_value=text_input.text_response)
+    chat_output = ChatOutput(_id="chat_output", should_store_message=False)
+    chat_output.set(input_value=model.build_text)
+    graph = Graph(text_input, chat_output, user_id="user")
+
+    await graph.process(fallback_to_env_vars=False)
+
+    assert graph.usage.tokens == 7
+    assert set(graph.usage.vertices) == {"text_input", "model", "chat_output"}
+    assert graph.usage.vertices["model"].tokens == 7
+    assert graph.get_vertex("model").usage.tokens == 7
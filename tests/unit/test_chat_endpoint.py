@@ -270,6 +270,42 @@ async def test_build_flow_polling(client, json_memory_chatbot_no_llm, logged_in_
     await consume_and_assert_stream(polling_response, job_id)
 
 
+async def test_build_events_are_replayed_by_cursor(client, json_memory_chatbot_no_llm, logged_in_headers):
+    """Test that the events of a build can be read again, from the start or after a cursor."""
+    flow_id = await create_flow(client, json_memory_chatbot_no_llm, logged_in_headers)
+    build_response = await build_flow(client, flow_id, logged_in_headers)
+    job_id = build_response["job_id"]
+
+    events_response = await get_build_events(client, job_id, logged_in_headers)
+    await consume_and_assert_stream(events_response, job_id)
+
+    # A second observer replays the whole build after it finished
+    replay = await get_build_events(client, job_id, logged_in_headers)
+    events = [json.loads(line) for line in replay.text.splitlines() if line]
+    assert events[0]["event"] == "vertices_sorted"
+    assert events[-1]["event"] == "end"
+
+    # A poll returns the cursor of its last event, after which there is nothing left to read
+    response = await client.get(
+        f"api/v1/build/{job_id}/events?event_delivery=polling&after=1", headers=logged_in_headers
+    )
+    assert [json.loads(line) for line in response.text.splitlines() if line] == events[1:]
+    last_event_id = response.headers["Last-Event-ID"]
+    assert int(last_event_id) == len(events)
+    response = await client.get(
+        f"api/v1/build/{job_id}/events?event_delivery=polling",
+        headers={**logged_in_headers, "Last-Event-ID": last_event_id},
+    )
+    assert response.text == ""
+
+    # As server-sent events, each event carries its cursor
+    response = await client.get(
+        f"api/v1/build/{job_id}/events?after={len(events) - 1}",
+        headers={**logged_in_headers, "Accept": "text/event-stream"},
+    )
+    assert response.text.startswith(f"id: {len(events)}\ndata: ")
+
+
 @pytest.mark.benchmark
 async def test_cancel_build_unexpected_error(client, json_memory_chatbot_no_llm, logged_in_headers, monkeypatch):
     """Test handling of unexpected exceptions during flow build cancellation."""
@@ -267,11 +267,15 @@ async def test_load_bundles_from_urls():
             await asyncio.to_thread(temp_dir.cleanup)
 
 
-@pytest.fixture
-def set_fs_flows_polling_interval():
+@pytest.fixture(params=["true", "false"], ids=["watch", "poll"])
+def set_fs_flows_polling_interval(request):
     os.environ["AXIESTUDIO_FS_FLOWS_POLLING_INTERVAL"] = "100"
+    os.environ["AXIESTUDIO_FS_FLOWS_WATCH_ENABLED"] = request.param
+    os.environ["AXIESTUDIO_FS_FLOWS_WATCH_DEBOUNCE"] = "10"
     yield
     os.unsetenv("AXIESTUDIO_FS_FLOWS_POLLING_INTERVAL")
+    os.unsetenv("AXIESTUDIO_FS_FLOWS_WATCH_ENABLED")
+    os.unsetenv("AXIESTUDIO_FS_FLOWS_WATCH_DEBOUNCE")
 
 
 @pytest.mark.usefixtures("set_fs_flows_polling_interval")
@@ -310,3 +314,40 @@ async def test_sync_flows_from_fs(client: AsyncClient, logged_in_headers):
         assert result["locked"] is True
     finally:
         await flow_file.unlink(missing_ok=True)
+
+
+async def test_flow_file_watcher_syncs_only_changed_flows(tmp_path, monkeypatch):
+    from axiestudio.initial_setup import setup
+
+    flow_file = tmp_path / "flow.json"
+    other_file = tmp_path / "other.json"
+    await Path(flow_file).write_text("{}", encoding="utf-8")
+    await Path(other_file).write_text("{}", encoding="utf-8")
+    flow_id = uuid.uuid4()
+    synced: list[set[uuid.UUID]] = []
+
+    async def get_fs_flow_ids_by_path():
+        return {str(flow_file.resolve()): {flow_id}}
+
+    async def sync_flows_from_fs(flow_mtimes, flow_ids=None):
+        synced.append(flow_ids)
+        flow_mtimes.update(dict.fromkeys(flow_ids, 1.0))
+
+    monkeypatch.setattr(setup, "_get_fs_flow_ids_by_path", get_fs_flow_ids_by_path)
+    monkeypatch.setattr(setup, "_sync_flows_from_fs", sync_flows_from_fs)
+    watcher = asyncio.create_task(setup._watch_flows_from_fs())
+    try:
+        # New flows are synced once when the watcher starts
+        await asyncio.sleep(0.5)
+        assert synced == [{flow_id}]
+
+        await Path(other_file).write_text('{"name": "other"}', encoding="utf-8")
+        await Path(flow_file).write_text('{"name": "new name"}', encoding="utf-8")
+        for _ in range(30):
+            if len(synced) > 1:
+                break
+            await asyncio.sleep(0.1)
+
+        assert synced == [{flow_id}, {flow_id}]
+    finally:
+        watcher.cancel()
@@ -3,7 +3,8 @@ import os
 from unittest.mock import patch
 
 import pytest
-from axiestudio.logging.logger import SizedLogBuffer
+from axiestudio.logging.logger import SizedLogBuffer, sampled, throttled
+from loguru import logger
 
 
 @pytest.fixture
@@ -99,3 +100,43 @@ def test_max_size(sized_log_buffer):
     assert sized_log_buffer.max_size() == 0
     sized_log_buffer.max = 100
     assert sized_log_buffer.max_size() == 100
+
+
+def test_write_from_loguru_sink(sized_log_buffer):
+    sized_log_buffer.max = 5
+    handler_id = logger.add(sized_log_buffer.write, format="{level} {message}")
+    try:
+        logger.info("Buffered line")
+    finally:
+        logger.remove(handler_id)
+
+    assert len(sized_log_buffer) == 1
+    epoch, text = sized_log_buffer.buffer[0]
+    assert isinstance(epoch, int)
+    assert text == "INFO Buffered line\n"
+
+
+def test_throttled_logs_once_per_interval():
+    lines = []
+    handler_id = logger.add(lines.append, format="{message}")
+    try:
+        throttled("test-key", 60).info("first")
+        throttled("test-key", 60).opt(lazy=True).info("{}", lambda: pytest.fail("Discarded lines are not formatted"))
+        throttled("test-key", 0).info("second")
+    finally:
+        logger.remove(handler_id)
+
+    assert [line.strip() for line in lines] == ["first", "second"]
+
+
+def test_sampled_logs_a_fraction_of_the_calls():
+    lines = []
+    handler_id = logger.add(lines.append, format="{message}")
+    try:
+        for _ in range(10):
+            sampled(0).info("never")
+            sampled(1).info("always")
+    finally:
+        logger.remove(handler_id)
+
+    assert [line.strip() for line in lines] == ["always"] * 10
@@ -0,0 +1,225 @@
+import asyncio
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock
+
+from axiestudio.api.utils import CurrentActiveUser
+from axiestudio.main import (
+    DatabaseUnitOfWorkMiddleware,
+    JavaScriptMIMETypeMiddleware,
+    MultipartBoundaryMiddleware,
+    QueryStringListMiddleware,
+    RequestCancelledMiddleware,
+    create_app,
+)
+from axiestudio.middleware import trial_middleware
+from axiestudio.middleware.trial_middleware import TrialMiddleware
+from axiestudio.middleware.verification_middleware import EmailVerificationMiddleware
+from axiestudio.services import deps
+from axiestudio.services.auth import utils as auth_utils
+from axiestudio.services.database.models.user.model import User
+from axiestudio.services.deps import get_settings_service
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+
+async def echo(request: Request):
+    body = await request.body()
+    return JSONResponse({"query": request.query_params.multi_items(), "body_length": len(body)})
+
+
+async def script(_request: Request):
+    return PlainTextResponse("console.log(1)")
+
+
+def _client(*middleware) -> AsyncClient:
+    app = Starlette(
+        routes=[
+            Route("/api/v1/files/upload/flow", echo, methods=["POST"]),
+            Route("/echo", echo, methods=["GET", "POST"]),
+            Route("/assets/index.js", script),
+        ]
+    )
+    for middleware_class in middleware:
+        app.add_middleware(middleware_class)
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+async def test_javascript_files_are_served_as_javascript():
+    async with _client(JavaScriptMIMETypeMiddleware) as client:
+        response = await client.get("/assets/index.js")
+
+    assert response.headers["content-type"] == "text/javascript"
+
+
+async def test_query_string_lists_are_flattened():
+    async with _client(QueryStringListMiddleware) as client:
+        response = await client.get("/echo?ids=a,b&ids=c&empty=")
+
+    assert response.json()["query"] == [["ids", "a"], ["ids", "b"], ["ids", "c"], ["empty", ""]]
+
+
+async def test_multipart_boundary_is_validated_and_body_is_replayed():
+    body = b'--abc\r\nContent-Disposition: form-data; name="file"\r\n\r\ndata\r\n--abc--\r\n'
+    async with _client(MultipartBoundaryMiddleware) as client:
+        valid = await client.post(
+            "/api/v1/files/upload/flow", content=body, headers={"Content-Type": "multipart/form-data; boundary=abc"}
+        )
+        invalid = await client.post(
+            "/api/v1/files/upload/flow", content=b"data", headers={"Content-Type": "multipart/form-data; boundary=abc"}
+        )
+
+    assert valid.json()["body_length"] == len(body)
+    assert invalid.status_code == 422
+
+
+async def test_request_is_cancelled_when_client_disconnects():
+    handler_cancelled = asyncio.Event()
+    sent = []
+
+    async def slow_app(_scope, _receive, _send):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            handler_cancelled.set()
+            raise
+
+    messages = iter([{"type": "http.request", "body": b"", "more_body": False}, {"type": "http.disconnect"}])
+
+    async def receive():
+        message = next(messages)
+        if message["type"] == "http.disconnect":
+            await asyncio.sleep(0.05)
+        return message
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [], "query_string": b""}
+    await asyncio.wait_for(RequestCancelledMiddleware(slow_app)(scope, receive, send), timeout=1)
+
+    assert handler_cancelled.is_set()
+    assert sent[0]["status"] == 499
+
+
+async def test_request_body_reaches_handler_when_client_stays_connected():
+    async with _client(RequestCancelledMiddleware) as client:
+        response = await client.post("/echo", content=b"x" * 100_000)
+
+    assert response.json()["body_length"] == 100_000
+
+
+async def test_background_work_is_not_cancelled_after_the_response():
+    background_done = asyncio.Event()
+
+    async def app_with_background_work(_scope, _receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"done"})
+        await asyncio.sleep(0.05)
+        background_done.set()
+
+    messages = iter([{"type": "http.request", "body": b"", "more_body": False}, {"type": "http.disconnect"}])
+
+    async def receive():
+        return next(messages)
+
+    async def send(_message):
+        pass
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [], "query_string": b""}
+    await asyncio.wait_for(RequestCancelledMiddleware(app_with_background_work)(scope, receive, send), timeout=1)
+
+    assert background_done.is_set()
+
+
+def test_trial_and_verification_middleware_are_opt_in(monkeypatch):
+    installed = {middleware.cls for middleware in create_app().user_middleware}
+
+    assert RequestCancelledMiddleware in installed
+    assert not {TrialMiddleware, EmailVerificationMiddleware} & installed
+
+    settings = get_settings_service().settings
+    monkeypatch.setattr(settings, "enforce_trials", True)
+    monkeypatch.setattr(settings, "email_verification_repair", True)
+    installed = {middleware.cls for middleware in create_app().user_middleware}
+
+    assert {TrialMiddleware, EmailVerificationMiddleware} <= installed
+
+
+def _trial_client() -> AsyncClient:
+    app = FastAPI()
+
+    @app.get("/api/v1/me")
+    async def me(user: CurrentActiveUser):
+        return {"username": user.username}
+
+    app.add_middleware(TrialMiddleware)
+    app.add_middleware(DatabaseUnitOfWorkMiddleware)
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+async def test_expired_trial_is_refused(logged_in_headers, monkeypatch):
+    monkeypatch.setattr(
+        trial_middleware.trial_service, "check_trial_status", AsyncMock(return_value={"should_cleanup": True})
+    )
+
+    async with _trial_client() as client:
+        response = await client.get("/api/v1/me", headers=logged_in_headers)
+
+    assert response.status_code == 402
+    assert response.json()["trial_expired"]
+
+
+async def test_user_is_looked_up_once_per_request(logged_in_headers, active_user, monkeypatch):
+    monkeypatch.setattr(
+        trial_middleware.trial_service, "check_trial_status", AsyncMock(return_value={"should_cleanup": False})
+    )
+    lookups = []
+    get_user_by_id = auth_utils.get_user_by_id
+
+    async def counting_get_user_by_id(db, user_id):
+        lookups.append(user_id)
+        return await get_user_by_id(db, user_id)
+
+    monkeypatch.setattr(auth_utils, "get_user_by_id", counting_get_user_by_id)
+
+    async with _trial_client() as client:
+        response = await client.get("/api/v1/me", headers=logged_in_headers)
+
+    assert response.json() == {"username": active_user.username}
+    assert len(lookups) == 1
+
+
+async def test_verification_only_activates_the_user_holding_the_token(async_session, monkeypatch):
+    holder = User(username="holder", password="hashed", email_verified=True, email_verification_token="token")  # noqa: S106
+    deactivated = User(username="deactivated", password="hashed", email_verified=True)  # noqa: S106
+    async_session.add_all([holder, deactivated])
+    await async_session.commit()
+
+    class DatabaseService:
+        @asynccontextmanager
+        async def with_session(self):
+            yield async_session
+
+    monkeypatch.setattr(deps, "get_db_service", DatabaseService)
+
+    async def verify(_scope, _receive, _send):
+        pass
+
+    middleware = EmailVerificationMiddleware(verify)
+    for token in ("unknown", "token"):
+        scope = {
+            "type": "http",
+            "method": "POST",
+            "path": "/api/v1/email/verify",
+            "headers": [],
+            "query_string": f"token={token}".encode(),
+        }
+        await middleware(scope, None, None)
+
+    assert holder.is_active
+    assert holder.email_verification_token is None
+    assert not deactivated.is_active
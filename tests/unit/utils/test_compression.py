@@ -0,0 +1,64 @@
+import gzip
+import json
+
+from axiestudio.utils.compression import VersionedJSONCache, encoded_json_response
+from starlette.requests import Request
+
+
+def _request(**headers: str) -> Request:
+    raw_headers = [(name.replace("_", "-").lower().encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/api/v1/all", "headers": raw_headers})
+
+
+async def test_encoded_json_is_served_gzipped_when_accepted():
+    encoded = await VersionedJSONCache().get(1, {"components": {"a": 1}})
+
+    response = encoded_json_response(_request(accept_encoding="gzip, deflate"), encoded)
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == encoded.etag("gzip")
+    assert json.loads(gzip.decompress(response.body)) == {"components": {"a": 1}}
+
+
+async def test_encoded_json_is_served_uncompressed_when_not_accepted():
+    encoded = await VersionedJSONCache().get(1, {"components": {}})
+
+    response = encoded_json_response(_request(accept_encoding="gzip;q=0"), encoded)
+
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == encoded.etag()
+    assert json.loads(response.body) == {"components": {}}
+
+
+async def test_matching_etag_returns_not_modified():
+    encoded = await VersionedJSONCache().get(1, {"components": {}})
+
+    response = encoded_json_response(
+        _request(accept_encoding="gzip", if_none_match=f'"other", {encoded.etag("gzip")}'), encoded
+    )
+
+    assert response.status_code == 304
+    assert not response.body
+
+
+async def test_etag_of_another_encoding_does_not_match():
+    encoded = await VersionedJSONCache().get(1, {"components": {}})
+
+    response = encoded_json_response(_request(if_none_match=encoded.etag("gzip")), encoded)
+
+    assert response.status_code == 200
+    assert json.loads(response.body) == {"components": {}}
+
+
+async def test_versioned_cache_encodes_once_per_version():
+    cache = VersionedJSONCache()
+    data = {"components": {"a": 1}}
+
+    first = await cache.get(1, data)
+    data["components"]["b"] = 2
+    same_version = await cache.get(1, data)
+    new_version = await cache.get(2, data)
+
+    assert same_version is first
+    assert new_version.etag() != first.etag()
+    assert json.loads(new_version.identity) == {"components": {"a": 1, "b": 2}}
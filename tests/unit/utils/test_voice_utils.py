@@ -0,0 +1,69 @@
+import base64
+import threading
+
+import numpy as np
+import pytest
+from axiestudio.utils.voice_utils import (
+    BYTES_PER_16K_FRAME,
+    BYTES_PER_24K_FRAME,
+    SAMPLE_RATE_24K,
+    SpeechDetector,
+    resample_24k_to_16k_frames,
+)
+
+
+class LoudnessVad:
+    """Stands in for webrtcvad, calling any frame that is not silent speech."""
+
+    def __init__(self):
+        self.frames = 0
+        self.threads = set()
+
+    def is_speech(self, buf: bytes, sample_rate: int) -> bool:  # noqa: ARG002
+        self.frames += 1
+        self.threads.add(threading.current_thread().name)
+        assert len(buf) == BYTES_PER_16K_FRAME
+        return bool(np.abs(np.frombuffer(buf, dtype=np.int16)).max() > 1000)
+
+
+def _audio(frames: float, *, loud: bool) -> str:
+    samples = int(frames * BYTES_PER_24K_FRAME / 2)
+    t = np.arange(samples) / SAMPLE_RATE_24K
+    amplitude = 10000 if loud else 0
+    return base64.b64encode((amplitude * np.sin(2 * np.pi * 440 * t)).astype(np.int16).tobytes()).decode()
+
+
+def test_resample_24k_to_16k_frames():
+    audio_24k = base64.b64decode(_audio(50, loud=True))
+
+    assert len(resample_24k_to_16k_frames(audio_24k)) == 50 * BYTES_PER_16K_FRAME
+    with pytest.raises(ValueError, match="multiple of"):
+        resample_24k_to_16k_frames(audio_24k[:-2])
+
+
+async def test_speech_detector_processes_queued_chunks_in_one_batch_off_the_loop():
+    vad = LoudnessVad()
+    detector = SpeechDetector(vad)
+    # Chunks that do not end on a frame boundary are carried over to the next batch
+    detector.feed(_audio(1.5, loud=False))
+    detector.feed(_audio(1.5, loud=False))
+
+    assert await detector.detect() is False
+    assert vad.frames == 3
+    assert all(name.startswith("voice-dsp") for name in vad.threads)
+
+    detector.feed(_audio(2, loud=True))
+    assert await detector.detect() is True
+    assert detector.stats.batches == 2
+    assert detector.stats.chunks == 3
+    assert detector.stats.max_lag >= detector.stats.mean_lag > 0
+
+
+async def test_speech_detector_drops_the_oldest_chunks_when_behind():
+    detector = SpeechDetector(LoudnessVad(), max_queued_chunks=2)
+    detector.feed(_audio(1, loud=True))
+    detector.feed(_audio(1, loud=False))
+    detector.feed(_audio(1, loud=False))
+
+    assert detector.stats.dropped_chunks == 1
+    assert await detector.detect() is False